@@ -5,31 +5,60 @@ Australian CGT Calculator - Fixed CSV-Only Streamlit Web App (AUD Version)
 Upload CSV files or use existing CSV files to get ATO-compliant Australian CGT calculations.
 Now with AUD conversion using RBA historical exchange rates!
 
-FIXED VERSION - Addresses cost basis creation issues
+FIXED VERSION - Addresses cost basis creation issues. The cost basis comes
+from the same hybrid FIFO engine as the CLI (all BUYs, SELLs up to 30 June
+before the FY), so earlier sales consume their lots.
+
+Streamlit reruns this script on every widget change, so the expensive steps
+are cached: the rate converter is built once per process (st.cache_resource)
+and standardized CSV files are keyed by their content hash (st.cache_data).
+
+The cost basis, FY sales and CGT results live in a process-wide ResultStore
+(cgt_result_store.py), keyed by the combined input hash, FY and strategy,
+rather than in st.cache_data, job results or st.session_state: the Excel
+report and full match table are spilled to disk and read back on download,
+the rest is held under a shared memory budget, and jobs and sessions only
+keep result ids and headline figures.
 """
 
 import streamlit as st
 import pandas as pd
 import tempfile
+import hashlib
+import io
 import os
-import json
 import shutil
 import glob
-from datetime import datetime
-import traceback
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 
 # Import your enhanced scripts
 try:
     from complete_unified_with_aud import (
         RBAAUDConverter,
-        robust_date_parser,
-        format_date_for_output
+        apply_hybrid_fifo_processing_with_aud,
+        robust_date_parser
+    )
+    from cgt_multi_year import build_sales_history
+    from cost_basis_codec import json_dumps, json_loads
+    from cost_basis_snapshots import SnapshotStore
+    from cgt_jobs import JOB_DONE, JobRegistry
+    from cgt_result_store import ResultStore
+    from transaction_formats import (
+        CSV_FORMATS,
+        STANDARD_COLUMNS,
+        detect_csv_format,
+        iter_csv_chunks,
+        read_csv_header,
+        standardize_frame
     )
     from cgt_calculator_australia_aud import (
+        CGT_STRATEGIES,
         calculate_australian_cgt_aud,
         save_cgt_excel_aud,
-        load_cost_basis_json_aud,
-        load_sales_csv
+        normalize_sales_df
     )
     SCRIPTS_AVAILABLE = True
 except ImportError as e:
@@ -37,6 +66,42 @@ except ImportError as e:
     st.error("Please ensure complete_unified_with_aud.py and cgt_calculator_australia_aud.py are in the same directory")
     SCRIPTS_AVAILABLE = False
 
+# Cached results expire after an hour; each cache keeps at most this many inputs
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 32
+
+# Hybrid FIFO lots are checkpointed here, keyed by input hash, SELL cutoff,
+# the rate table and the checkpoint version (bump it when the FIFO engine or
+# the lot layout changes). Checkpoints older than the age limit, and the
+# oldest beyond the count limit, are pruned.
+LOT_CHECKPOINT_DIR = os.path.join('.app_cache', 'lot_checkpoints')
+LOT_CHECKPOINT_VERSION = 2
+LOT_CHECKPOINT_MAX_AGE_DAYS = 30
+LOT_CHECKPOINT_MAX_COUNT = 64
+
+# Background processing: shared worker threads and the progress refresh interval
+JOB_WORKERS = 2
+JOB_POLL_SECONDS = 1.0
+# Uploads: size limits, rows parsed per chunk and files parsed at once
+UPLOAD_MAX_FILE_MB = 50
+UPLOAD_MAX_TOTAL_MB = 200
+UPLOAD_CHUNK_ROWS = 50000
+PARSE_WORKERS = 4
+
+# Finished results shared by all sessions: in-memory budget, then disk (LRU),
+# expiring like the cached loads; a prepared cost basis and a CGT result per entry
+RESULT_CACHE_DIR = os.path.join('.app_cache', 'results')
+RESULT_MEMORY_BUDGET_MB = 256
+RESULT_DISK_BUDGET_MB = 2048
+RESULT_MAX_ENTRIES = 2 * CACHE_MAX_ENTRIES
+RESULT_SESSION_TTL_SECONDS = CACHE_TTL_SECONDS
+
+JOB_STAGE_LABELS = [
+    ('files', "Files parsed"),
+    ('symbols', "Symbols processed"),
+    ('sales', "Sales matched")
+]
+
 # Page configuration
 st.set_page_config(
     page_title="Australian CGT Calculator (Fixed)",
@@ -50,10 +115,18 @@ if 'processing_complete' not in st.session_state:
     st.session_state.processing_complete = False
 if 'cgt_results' not in st.session_state:
     st.session_state.cgt_results = None
-if 'excel_data' not in st.session_state:
-    st.session_state.excel_data = None
-if 'filename' not in st.session_state:
-    st.session_state.filename = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if 'job_key' not in st.session_state:
+    st.session_state.job_key = None
+
+def content_hash(data):
+    """SHA-256 hex digest of raw file bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+def combine_hashes(*parts):
+    """Single digest for an ordered list of input hashes and settings."""
+    return hashlib.sha256('\n'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
 
 def create_mock_rba_rates(temp_dir):
     """Create mock RBA exchange rate data for the beta app."""
@@ -77,7 +150,6 @@ def create_mock_rba_rates(temp_dir):
     for date in dates:
         base_rate = base_rates.get(date.year, 0.67)
         # Add small daily variation
-        import hashlib
         daily_seed = int(hashlib.md5(date.strftime('%Y-%m-%d').encode()).hexdigest()[:8], 16)
         variation = (daily_seed % 400 - 200) / 10000  # ±2%
         rate = base_rate * (1 + variation)
@@ -102,8 +174,100 @@ def create_mock_rba_rates(temp_dir):
     
     return rates_folder
 
+@st.cache_resource(show_spinner=False)
+def get_aud_converter():
+    """
+    Build the AUD converter once per server process and share it across
+    sessions and reruns. The mock rate files are only needed while loading.
+    """
+    temp_dir = tempfile.mkdtemp(prefix='cgt_rates_')
+    try:
+        rates_folder = create_mock_rba_rates(temp_dir)
+        aud_converter = RBAAUDConverter()
+        aud_converter.load_rba_csv_files([
+            os.path.join(rates_folder, "FX_2018-2022.csv"),
+            os.path.join(rates_folder, "FX_2023-2025.csv")
+        ])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    # Raising keeps a broken converter out of the resource cache
+    if not aud_converter.exchange_rates:
+        raise ValueError("no exchange rates loaded")
+    
+    return aud_converter
+
+def standardize_transaction_csv(df, financial_year, source):
+    """
+    Standardize transaction CSV rows and apply hybrid filtering for the FY:
+    all buys, plus sells before the cutoff (30 June of the FY start year) or
+    inside the target FY. Works on any chunk of a file. Returns None for
+    unrecognized formats.
+    """
+    format_name = detect_csv_format(df.columns)
+    if format_name is None:
+        return None
+    
+    # Determine cutoff date for hybrid processing
+    fy_year = int(financial_year.split('-')[0])
+    cutoff_date = datetime(fy_year, 6, 30)
+    
+    # Calculate target FY range for sales
+    target_fy_start = datetime(fy_year, 7, 1)
+    target_fy_end = datetime(fy_year + 1, 6, 30)
+    
+    # Keep sells BEFORE cutoff OR in target FY
+    def keep_sell(dates):
+        return (dates <= cutoff_date) | ((dates >= target_fy_start) & (dates <= target_fy_end))
+    
+    return standardize_frame(df, format_name, source, keep_sell=keep_sell)
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def load_standardized_csv(file_hash, _data, source, financial_year):
+    """
+    Parse and standardize one CSV file. Cached by the file's content hash, so
+    the raw bytes (_data) are not hashed a second time by Streamlit. The
+    format is checked from the header first; rows are then read
+    UPLOAD_CHUNK_ROWS at a time and filtered before the next chunk, so only
+    the kept rows are held.
+    """
+    if detect_csv_format(read_csv_header(_data)) is None:
+        return None
+    
+    chunks = [standardize_transaction_csv(chunk, financial_year, source)
+              for chunk in iter_csv_chunks(_data, UPLOAD_CHUNK_ROWS)]
+    if not chunks:
+        return pd.DataFrame(columns=STANDARD_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+def standardize_sources(sources, financial_year, on_file_done=None):
+    """
+    Standardize (content hash, raw bytes, source label) files in parallel on
+    PARSE_WORKERS threads. Returns (standardized frame or None, error message
+    or None) per source, in order; on_file_done(done, source) reports progress.
+    """
+    results = [(None, None)] * len(sources)
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='cgt-parse') as executor:
+        futures = {
+            executor.submit(load_standardized_csv, file_hash, data, source, financial_year): i
+            for i, (file_hash, data, source) in enumerate(sources)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = (future.result(), None)
+            except Exception as e:
+                results[i] = (None, str(e))
+            if on_file_done is not None:
+                on_file_done(done, sources[i][2])
+    return results
+
 def load_existing_csv_files(financial_year):
-    """Load existing CSV files from csv_folder/ and current directory"""
+    """
+    Load existing CSV files from csv_folder/ and current directory.
+    Returns (transactions, sources) with one entry per loaded file; sources
+    holds the (content hash, raw bytes, source label) a job re-reads them by.
+    """
     
     # Look for CSV files in csv_folder/ and current directory
     all_csv_files = []
@@ -119,439 +283,402 @@ def load_existing_csv_files(financial_year):
             continue
         transaction_files.append(csv_file)
     
-    if not transaction_files:
-        return []
-    
-    # Determine cutoff date for hybrid processing
-    fy_year = int(financial_year.split('-')[0])
-    cutoff_date = datetime(fy_year, 6, 30)
-    
-    # Calculate target FY range for sales
-    target_fy_start = datetime(fy_year, 7, 1)
-    target_fy_end = datetime(fy_year + 1, 6, 30)
-    
-    all_transactions = []
-    
+    candidates = []
     for csv_file in transaction_files:
         try:
-            df = pd.read_csv(csv_file)
-            standardized = None
-            
-            # Format 1: Manual CSV format (Date, Activity_Type, Symbol, Quantity, Price_USD)
-            if all(col in df.columns for col in ['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']):
-                # Apply hybrid filtering
-                df_copy = df.copy()
-                df_copy['Date'] = pd.to_datetime(df_copy['Date'], format='%d.%m.%y', errors='coerce')
-                
-                # Split into SELL and BUY transactions
-                sell_transactions = df_copy[df_copy['Activity_Type'] == 'SOLD']
-                buy_transactions = df_copy[df_copy['Activity_Type'] == 'PURCHASED']
-                
-                # Keep sells BEFORE cutoff OR in target FY
-                sell_before_cutoff = sell_transactions[sell_transactions['Date'] <= cutoff_date]
-                sell_in_target_fy = sell_transactions[
-                    (sell_transactions['Date'] >= target_fy_start) & 
-                    (sell_transactions['Date'] <= target_fy_end)
-                ]
-                
-                # Combine: ALL buys + sells before cutoff + sells in target FY
-                df_filtered = pd.concat([
-                    buy_transactions, 
-                    sell_before_cutoff, 
-                    sell_in_target_fy
-                ], ignore_index=True).drop_duplicates()
-                
-                # Create standardized DataFrame
-                if len(df_filtered) > 0:
-                    standardized = pd.DataFrame()
-                    standardized['Symbol'] = df_filtered['Symbol']
-                    standardized['Date'] = df_filtered['Date'].astype(str)
-                    standardized['Activity'] = df_filtered['Activity_Type'].map({'PURCHASED': 'PURCHASED', 'SOLD': 'SOLD'})
-                    standardized['Quantity'] = pd.to_numeric(df_filtered['Quantity'], errors='coerce').abs()
-                    standardized['Price'] = pd.to_numeric(df_filtered['Price_USD'], errors='coerce').abs()
-                    standardized['Commission'] = 30.0  # Default for manual transactions
-                    standardized['Source'] = f'CSV_{os.path.basename(csv_file)}'
-            
-            # Format 2: Parsed format (Symbol, Trade Date, Type, Quantity, Price (USD))
-            elif all(col in df.columns for col in ['Symbol', 'Trade Date', 'Type', 'Quantity', 'Price (USD)']):
-                # Apply hybrid filtering
-                df_copy = df.copy()
-                df_copy['Trade Date'] = pd.to_datetime(df_copy['Trade Date'])
-                
-                # Split into SELL and BUY transactions
-                sell_transactions = df_copy[df_copy['Type'] == 'SELL']
-                buy_transactions = df_copy[df_copy['Type'] == 'BUY']
-                
-                # Keep sells BEFORE cutoff OR in target FY
-                sell_before_cutoff = sell_transactions[sell_transactions['Trade Date'] <= cutoff_date]
-                sell_in_target_fy = sell_transactions[
-                    (sell_transactions['Trade Date'] >= target_fy_start) & 
-                    (sell_transactions['Trade Date'] <= target_fy_end)
-                ]
-                
-                # Combine: ALL buys + sells before cutoff + sells in target FY
-                df_filtered = pd.concat([
-                    buy_transactions, 
-                    sell_before_cutoff, 
-                    sell_in_target_fy
-                ], ignore_index=True).drop_duplicates()
-                
-                # Create standardized DataFrame
-                if len(df_filtered) > 0:
-                    standardized = pd.DataFrame()
-                    standardized['Symbol'] = df_filtered['Symbol']
-                    standardized['Date'] = df_filtered['Trade Date'].astype(str)
-                    standardized['Activity'] = df_filtered['Type'].map({'BUY': 'PURCHASED', 'SELL': 'SOLD'})
-                    standardized['Quantity'] = pd.to_numeric(df_filtered['Quantity'], errors='coerce').abs()
-                    standardized['Price'] = pd.to_numeric(df_filtered['Price (USD)'], errors='coerce').abs()
-                    standardized['Commission'] = pd.to_numeric(df_filtered.get('Commission (USD)', 0), errors='coerce').abs()
-                    standardized['Source'] = f'CSV_{os.path.basename(csv_file)}'
-            
-            if standardized is not None:
-                standardized = standardized.dropna(subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'])
-                
-                if len(standardized) > 0:
-                    all_transactions.append(standardized)
-                    st.success(f"✅ Loaded {len(standardized)} transactions from {os.path.basename(csv_file)}")
-        
-        except Exception as e:
+            with open(csv_file, 'rb') as f:
+                data = f.read()
+            candidates.append((content_hash(data), data, f'CSV_{os.path.basename(csv_file)}'))
+        except OSError as e:
             st.error(f"❌ Error loading {os.path.basename(csv_file)}: {e}")
     
-    return all_transactions
-
-def process_uploaded_csv_files(uploaded_files, financial_year):
-    """Process uploaded CSV files"""
-    
-    # Determine cutoff date for hybrid processing
-    fy_year = int(financial_year.split('-')[0])
-    cutoff_date = datetime(fy_year, 6, 30)
-    target_fy_start = datetime(fy_year, 7, 1)
-    target_fy_end = datetime(fy_year + 1, 6, 30)
-    
     all_transactions = []
+    sources = []
+    
+    for candidate, (standardized, error) in zip(candidates, standardize_sources(candidates, financial_year)):
+        name = candidate[2][len('CSV_'):]
+        if error is not None:
+            st.error(f"❌ Error loading {name}: {error}")
+        elif standardized is not None and len(standardized) > 0:
+            all_transactions.append(standardized)
+            sources.append(candidate)
+            st.success(f"✅ Loaded {len(standardized)} transactions from {name}")
+    
+    return all_transactions, sources
+
+def upload_content_hash(uploaded_file):
+    """Content hash of an upload, computed once per uploaded file rather than on every rerun."""
+    hashes = st.session_state.setdefault('upload_hashes', {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = content_hash(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+def process_uploaded_csv_files(uploaded_files):
+    """
+    Check uploaded CSV files without parsing them: per-file and total size
+    limits, then the format from the header row alone. Accepted files are
+    parsed in chunks by the processing job, off the UI thread. Returns
+    sources as load_existing_csv_files() does.
+    """
+    
+    sources = []
+    total_bytes = 0
+    megabyte = 1024 * 1024
     
     for uploaded_file in uploaded_files:
-        try:
-            df = pd.read_csv(uploaded_file)
-            standardized = None
-            
-            # Format 1: Manual CSV format
-            if all(col in df.columns for col in ['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']):
-                df_copy = df.copy()
-                df_copy['Date'] = pd.to_datetime(df_copy['Date'], format='%d.%m.%y', errors='coerce')
-                
-                sell_transactions = df_copy[df_copy['Activity_Type'] == 'SOLD']
-                buy_transactions = df_copy[df_copy['Activity_Type'] == 'PURCHASED']
-                
-                sell_before_cutoff = sell_transactions[sell_transactions['Date'] <= cutoff_date]
-                sell_in_target_fy = sell_transactions[
-                    (sell_transactions['Date'] >= target_fy_start) & 
-                    (sell_transactions['Date'] <= target_fy_end)
-                ]
-                
-                df_filtered = pd.concat([
-                    buy_transactions, 
-                    sell_before_cutoff, 
-                    sell_in_target_fy
-                ], ignore_index=True).drop_duplicates()
-                
-                if len(df_filtered) > 0:
-                    standardized = pd.DataFrame()
-                    standardized['Symbol'] = df_filtered['Symbol']
-                    standardized['Date'] = df_filtered['Date'].astype(str)
-                    standardized['Activity'] = df_filtered['Activity_Type'].map({'PURCHASED': 'PURCHASED', 'SOLD': 'SOLD'})
-                    standardized['Quantity'] = pd.to_numeric(df_filtered['Quantity'], errors='coerce').abs()
-                    standardized['Price'] = pd.to_numeric(df_filtered['Price_USD'], errors='coerce').abs()
-                    standardized['Commission'] = 30.0
-                    standardized['Source'] = f'Uploaded_{uploaded_file.name}'
-            
-            # Format 2: Parsed format
-            elif all(col in df.columns for col in ['Symbol', 'Trade Date', 'Type', 'Quantity', 'Price (USD)']):
-                df_copy = df.copy()
-                df_copy['Trade Date'] = pd.to_datetime(df_copy['Trade Date'])
-                
-                sell_transactions = df_copy[df_copy['Type'] == 'SELL']
-                buy_transactions = df_copy[df_copy['Type'] == 'BUY']
-                
-                sell_before_cutoff = sell_transactions[sell_transactions['Trade Date'] <= cutoff_date]
-                sell_in_target_fy = sell_transactions[
-                    (sell_transactions['Trade Date'] >= target_fy_start) & 
-                    (sell_transactions['Trade Date'] <= target_fy_end)
-                ]
-                
-                df_filtered = pd.concat([
-                    buy_transactions, 
-                    sell_before_cutoff, 
-                    sell_in_target_fy
-                ], ignore_index=True).drop_duplicates()
-                
-                if len(df_filtered) > 0:
-                    standardized = pd.DataFrame()
-                    standardized['Symbol'] = df_filtered['Symbol']
-                    standardized['Date'] = df_filtered['Trade Date'].astype(str)
-                    standardized['Activity'] = df_filtered['Type'].map({'BUY': 'PURCHASED', 'SELL': 'SOLD'})
-                    standardized['Quantity'] = pd.to_numeric(df_filtered['Quantity'], errors='coerce').abs()
-                    standardized['Price'] = pd.to_numeric(df_filtered['Price (USD)'], errors='coerce').abs()
-                    standardized['Commission'] = pd.to_numeric(df_filtered.get('Commission (USD)', 0), errors='coerce').abs()
-                    standardized['Source'] = f'Uploaded_{uploaded_file.name}'
-            
-            if standardized is not None:
-                standardized = standardized.dropna(subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'])
-                
-                if len(standardized) > 0:
-                    all_transactions.append(standardized)
-                    st.success(f"✅ {uploaded_file.name}: {len(standardized)} transactions loaded")
-                else:
-                    st.warning(f"⚠️ {uploaded_file.name}: No valid transactions found")
-            else:
-                st.warning(f"⚠️ {uploaded_file.name}: Unrecognized CSV format")
+        size_mb = uploaded_file.size / megabyte
+        if uploaded_file.size > UPLOAD_MAX_FILE_MB * megabyte:
+            st.error(f"❌ {uploaded_file.name}: {size_mb:.1f} MB is over the {UPLOAD_MAX_FILE_MB} MB per-file limit")
+            continue
+        if total_bytes + uploaded_file.size > UPLOAD_MAX_TOTAL_MB * megabyte:
+            st.error(f"❌ {uploaded_file.name}: skipped, uploads would exceed the {UPLOAD_MAX_TOTAL_MB} MB total limit")
+            continue
+        
+        format_name = detect_csv_format(read_csv_header(uploaded_file))
+        if format_name is None:
+            st.warning(f"⚠️ {uploaded_file.name}: Unrecognized CSV format")
+            continue
         
-        except Exception as e:
-            st.error(f"❌ Error processing {uploaded_file.name}: {e}")
+        total_bytes += uploaded_file.size
+        sources.append((upload_content_hash(uploaded_file), uploaded_file.getvalue(), f'Uploaded_{uploaded_file.name}'))
+        st.success(f"✅ {uploaded_file.name}: {CSV_FORMATS[format_name]['label']} format ({size_mb:.1f} MB)")
     
-    return all_transactions
+    return sources
+
+# Jobs run on threads; pruning must not delete chunks a concurrent save is reusing
+_lot_checkpoint_lock = threading.Lock()
+
+def lot_checkpoint_key(input_hash, sell_cutoff_date, aud_converter):
+    """Checkpoint tag: a FIFO engine or rate table change must not reuse old lots."""
+    rates_digest = combine_hashes(*sorted(f"{date}={rate}" for date, rate in aud_converter.exchange_rates.items()))
+    return combine_hashes(LOT_CHECKPOINT_VERSION, rates_digest, input_hash, sell_cutoff_date.strftime('%Y-%m-%d'))
+
+def load_lot_checkpoint(checkpoint_key):
+    """(cost_basis, fifo_warnings, conversion_errors) saved under checkpoint_key, or None."""
+    with _lot_checkpoint_lock:
+        store = SnapshotStore(LOT_CHECKPOINT_DIR)
+        try:
+            manifest = store.resolve(checkpoint_key)
+        except KeyError:
+            return None
+        
+        messages = json_loads(store.load_artifact('messages', manifest['id']))
+        return store.load_snapshot(manifest['id']), messages['fifo_warnings'], messages['conversion_errors']
+
+def save_lot_checkpoint(checkpoint_key, cost_basis_dict, fifo_warnings, conversion_errors):
+    """Persist FIFO lots (unchanged symbols share chunks with earlier checkpoints) and prune old ones."""
+    messages = json_dumps({'fifo_warnings': fifo_warnings, 'conversion_errors': conversion_errors})
+    with _lot_checkpoint_lock:
+        store = SnapshotStore(LOT_CHECKPOINT_DIR)
+        store.save_snapshot(cost_basis_dict, tag=checkpoint_key, source='app', artifacts={'messages': messages})
+        store.prune(max_age=timedelta(days=LOT_CHECKPOINT_MAX_AGE_DAYS), max_count=LOT_CHECKPOINT_MAX_COUNT)
 
-def process_csv_files_enhanced_FIXED(existing_transactions, uploaded_transactions, financial_year, temp_dir):
-    """Process CSV files using the enhanced AUD system - FIXED VERSION."""
+def build_cost_basis_and_sales(input_hash, financial_year, all_transactions, aud_converter, progress=None):
+    """
+    Build the AUD cost basis with hybrid FIFO (all BUYs, SELLs up to 30 June
+    before the FY) and the FY sales table from standardized transactions.
+    
+    The FIFO lots are saved as a checkpoint on disk, so a restarted app does
+    not replay FIFO for inputs it has seen. Returns (overview, cost_basis,
+    sales_df): overview holds the counts and messages for the UI, so it can
+    be kept after the lots are released. progress(stage, done, total) gets
+    symbol progress.
+    """
     
-    # Combine existing and uploaded transactions
-    all_transactions = existing_transactions + uploaded_transactions
+    # Combine all transactions
+    combined_df = pd.concat(all_transactions, ignore_index=True)
     
-    if not all_transactions:
-        st.error("❌ No transaction data found")
-        return None, None
+    # Remove duplicates
+    combined_df = combined_df.drop_duplicates(
+        subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'], 
+        keep='first'
+    ).reset_index(drop=True)
     
-    # Set up AUD converter
-    rates_folder = create_mock_rba_rates(temp_dir)
+    fy_year = int(financial_year.split('-')[0])
+    sell_cutoff_date = datetime(fy_year, 6, 30)
+    checkpoint_key = lot_checkpoint_key(input_hash, sell_cutoff_date, aud_converter)
     
-    try:
-        aud_converter = RBAAUDConverter()
-        
-        rba_files = [
-            os.path.join(rates_folder, "FX_2018-2022.csv"),
-            os.path.join(rates_folder, "FX_2023-2025.csv")
+    checkpoint = load_lot_checkpoint(checkpoint_key)
+    if checkpoint is not None:
+        cost_basis_dict, fifo_warnings, conversion_errors = checkpoint
+    else:
+        dates = combined_df['Date'].apply(robust_date_parser)
+        fifo_transactions = combined_df[
+            (combined_df['Activity'] == 'PURCHASED') | (dates <= sell_cutoff_date)
         ]
         
-        aud_converter.load_rba_csv_files(rba_files)
-        
-        if not aud_converter.exchange_rates:
-            st.error("❌ Failed to initialize AUD converter")
-            return None, None
+        cost_basis_dict, fifo_log, conversion_errors = apply_hybrid_fifo_processing_with_aud(
+            fifo_transactions, aud_converter, sell_cutoff_date,
+            progress_callback=None if progress is None else lambda done, total: progress('symbols', done, total)
+        )
         
-        st.success(f"✅ AUD converter ready with {len(aud_converter.exchange_rates)} exchange rates")
+        # Sells before the cutoff that found no lots to consume
+        fifo_warnings = [
+            f"{symbol}: {operation.split('WARNING: ', 1)[1]}"
+            for symbol, operations in fifo_log.items()
+            for operation in operations if 'WARNING: ' in operation
+        ]
         
-    except Exception as e:
-        st.error(f"❌ Error setting up AUD converter: {e}")
+        save_lot_checkpoint(checkpoint_key, cost_basis_dict, fifo_warnings, conversion_errors)
+    
+    # Sales for the target financial year
+    sales_history = build_sales_history(combined_df)
+    sales_df = sales_history[sales_history['Financial_Year'] == financial_year].reset_index(drop=True)
+    
+    overview = {
+        'transaction_count': len(combined_df),
+        'purchase_count': int((combined_df['Activity'] == 'PURCHASED').sum()),
+        'sell_count': int((combined_df['Activity'] == 'SOLD').sum()),
+        'sale_count': len(sales_df),
+        'symbols': summarize_cost_basis(cost_basis_dict),
+        'fifo_warnings': fifo_warnings,
+        'conversion_errors': conversion_errors
+    }
+    return overview, cost_basis_dict, sales_df if len(sales_df) > 0 else None
+
+def summarize_cost_basis(cost_basis_dict):
+    """(symbol, lots, units, cost in AUD) per symbol, shown without keeping the lots."""
+    return [
+        (symbol, len(records), sum(r['units'] for r in records),
+         sum(r['units'] * r['price_aud'] + r['commission_aud'] for r in records))
+        for symbol, records in cost_basis_dict.items()
+    ]
+
+def load_stored(result_id, names):
+    """{name: artifact} from the result store, or None if any of them was evicted."""
+    try:
+        return {name: get_result_store().get(result_id, name) for name in names}
+    except KeyError:
+        return None
+
+def create_excel_download_enhanced(cgt_df, financial_year):
+    """Create enhanced Excel file with AUD amounts for download, rendered in memory."""
+    buffer = io.BytesIO()
+    
+    excel_file = save_cgt_excel_aud(cgt_df, financial_year, buffer)
+    
+    if not excel_file or buffer.tell() == 0:
         return None, None
     
-    # Combine all transactions
-    combined_df = pd.concat(all_transactions, ignore_index=True)
+    return buffer.getvalue(), f"Australian_CGT_Report_AUD_FY{financial_year}.xlsx"
+
+@st.cache_resource(show_spinner=False)
+def get_job_registry():
+    """One worker pool and job registry shared by all sessions."""
+    return JobRegistry(max_workers=JOB_WORKERS)
+
+@st.cache_resource(show_spinner=False)
+def get_result_store():
+    """Result artifacts for all sessions, bounded in memory, on disk, by count and by age."""
+    return ResultStore(RESULT_CACHE_DIR, memory_budget=RESULT_MEMORY_BUDGET_MB * 1024 * 1024,
+                       disk_budget=RESULT_DISK_BUDGET_MB * 1024 * 1024, max_results=RESULT_MAX_ENTRIES,
+                       ttl_seconds=CACHE_TTL_SECONDS, session_ttl_seconds=RESULT_SESSION_TTL_SECONDS)
+
+def summarize_cgt_df(cgt_df):
+    """Headline figures shown on every rerun, so the match table can stay on disk."""
+    long_term_count = len(cgt_df[cgt_df['Long_Term_Eligible'] == True])
+    return {
+        'records': len(cgt_df),
+        'total_gain_aud': float(cgt_df['Capital_Gain_Loss_AUD'].sum()),
+        'taxable_gain_aud': float(cgt_df['Taxable_Gain_AUD'].sum()),
+        'long_term_count': long_term_count,
+        'short_term_count': len(cgt_df) - long_term_count
+    }
+
+def run_processing_job(sources, financial_year, strategy, input_hash, progress):
+    """
+    Ingest, cost basis, CGT and Excel for one set of input files. Runs on the
+    job registry's worker pool, so it reports through progress(stage, done,
+    total, message) and returns what the UI shows instead of drawing it.
+    
+    The cost basis and FY sales are stored under (input hash, FY) and the
+    match table, remaining cost basis and Excel bytes under (input hash, FY,
+    strategy) in the result store, which is also the cache for later jobs;
+    the returned dict only carries the result id and small summaries.
+    """
+    store = get_result_store()
+    prepared_id = combine_hashes('prepared', input_hash, financial_year)
+    result_id = combine_hashes('cgt', input_hash, financial_year, strategy)
+    
+    progress('files', 0, len(sources), "Loading exchange rates...")
+    aud_converter = get_aud_converter()
+    
+    # Step 1: Standardize the files in parallel (local files are cache hits from the page load)
+    progress('files', 0, len(sources), "Parsing files...")
+    parsed = standardize_sources(sources, financial_year,
+                                 lambda done, source: progress('files', done, len(sources), f"Parsed {source}"))
+    all_transactions = []
+    for (_, _, source), (standardized, error) in zip(sources, parsed):
+        if error is not None:
+            raise ValueError(f"Could not parse {source}: {error}")
+        if standardized is not None and len(standardized) > 0:
+            all_transactions.append(standardized)
     
-    # Remove duplicates
-    combined_df = combined_df.drop_duplicates(
-        subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'], 
-        keep='first'
-    )
+    if not all_transactions:
+        raise ValueError("No transaction data found")
     
-    st.info(f"📊 Total transactions: {len(combined_df)} (after deduplication)")
+    # Step 2: Cost basis and FY sales with AUD conversion (stored unless an earlier job stored them)
+    prepared = load_stored(prepared_id, ('overview', 'cost_basis', 'sales_df'))
+    if prepared is None:
+        overview, cost_basis_dict, sales_df = build_cost_basis_and_sales(
+            input_hash, financial_year, all_transactions, aud_converter, progress=progress
+        )
+        store.put(prepared_id, {'overview': overview, 'cost_basis': cost_basis_dict, 'sales_df': sales_df})
+    else:
+        overview, cost_basis_dict, sales_df = prepared['overview'], prepared['cost_basis'], prepared['sales_df']
+    symbol_count = len(cost_basis_dict)
+    progress('symbols', symbol_count, symbol_count, "Cost basis ready")
+    
+    result = {
+        'financial_year': financial_year,
+        'exchange_rate_count': len(aud_converter.exchange_rates),
+        'overview': overview,
+        'result_id': None,
+        'summary': None,
+        'warnings': [],
+        'filename': None
+    }
     
-    # *** FIXED: CREATE COST BASIS DICTIONARY DIRECTLY (NO FIFO PROCESSING) ***
+    if sales_df is None:
+        return result
     
-    # Create cost basis dictionary from purchase transactions
-    cost_basis_dict = {}
+    # Step 3: Calculate CGT with AUD, unless this strategy's results are stored
+    stored = load_stored(result_id, ('outcome',))
+    if stored is not None:
+        result.update(stored['outcome'])
+        return result
     
-    purchases = combined_df[combined_df['Activity'] == 'PURCHASED'].copy()
-    st.info(f"📈 Processing {len(purchases)} purchase transactions...")
+    sales_df = normalize_sales_df(sales_df)
+    progress('sales', 0, len(sales_df), "Matching sales to lots...")
+    cgt_df, remaining_cost_basis, warnings_list = calculate_australian_cgt_aud(
+        sales_df, cost_basis_dict, strategy,
+        progress_callback=lambda done, total: progress('sales', done, total)
+    )
+    progress('sales', len(sales_df), len(sales_df), "Creating Excel report...")
+    
+    if cgt_df is None:
+        return result
+    
+    # Step 4: Create enhanced Excel file
+    artifacts = {'cgt_df': cgt_df, 'remaining_cost_basis': remaining_cost_basis}
+    if len(cgt_df) > 0:
+        excel_data, result['filename'] = create_excel_download_enhanced(cgt_df, financial_year)
+        if excel_data is not None:
+            artifacts['excel'] = excel_data
+    
+    # Step 5: Hand the large artifacts to the result store
+    outcome = {'result_id': result_id, 'summary': summarize_cgt_df(cgt_df), 'warnings': warnings_list,
+               'filename': result['filename']}
+    artifacts['outcome'] = outcome
+    store.put(result_id, artifacts, spill=('cgt_df', 'excel'))
+    result.update(outcome)
+    
+    return result
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job_key):
+    """Live progress of a background job; reruns the page once it finishes."""
+    job = get_job_registry().get(job_key)
+    if job is None or job.done:
+        st.rerun()
+    
+    snapshot = job.snapshot()
+    st.info(f"⏳ Processing in the background ({snapshot['status']}, {snapshot['elapsed']:.1f}s) - "
+            "the page stays usable and clicking Process again attaches to this job")
+    
+    for stage, label in JOB_STAGE_LABELS:
+        done, total = snapshot['progress'].get(stage, (0, None))
+        fraction = min(done / total, 1.0) if total else 0.0
+        st.progress(fraction, text=f"{label}: {done}/{total if total is not None else '?'}")
+    
+    if snapshot['message']:
+        st.caption(snapshot['message'])
+
+def show_processing_results(job):
+    """Report a finished job and move its results into session state."""
+    if job.error is not None:
+        st.error(f"❌ Processing failed: {job.error}")
+        if st.checkbox("Show debug information"):
+            st.code(job.traceback)
+        return
     
-    conversion_errors = []
+    result = job.result
+    overview = result['overview']
+    financial_year = result['financial_year']
     
-    for _, purchase in purchases.iterrows():
-        try:
-            symbol = purchase['Symbol']
-            quantity = purchase['Quantity']
-            price_usd = purchase['Price']
-            commission_usd = purchase['Commission']
-            date_str = purchase['Date']
-            
-            # Parse date and format
-            date_obj = robust_date_parser(date_str)
-            formatted_date = format_date_for_output(date_str)
-            
-            if date_obj.year <= 1900:
-                st.warning(f"⚠️ Skipping {symbol} purchase with invalid date: {date_str}")
-                continue
-            
-            # Convert to AUD
-            total_cost_usd = (quantity * price_usd) + commission_usd
-            total_cost_aud, exchange_rate = aud_converter.convert_usd_to_aud(total_cost_usd, date_obj)
-            
-            if total_cost_aud is None:
-                error_msg = f"No exchange rate for {symbol} on {formatted_date}"
-                conversion_errors.append(error_msg)
-                # Use USD values as fallback
-                price_aud = price_usd
-                commission_aud = commission_usd
-                exchange_rate = None
-            else:
-                price_aud = price_usd / exchange_rate
-                commission_aud = commission_usd / exchange_rate
-            
-            # Create cost basis record
-            record = {
-                'units': quantity,
-                'price': price_usd,
-                'commission': commission_usd,
-                'price_aud': price_aud,
-                'commission_aud': commission_aud,
-                'exchange_rate': exchange_rate,
-                'date': formatted_date
-            }
-            
-            if symbol not in cost_basis_dict:
-                cost_basis_dict[symbol] = []
-            
-            cost_basis_dict[symbol].append(record)
-            
-        except Exception as e:
-            st.warning(f"⚠️ Error processing {symbol} purchase: {e}")
-            continue
+    st.success(f"✅ AUD converter ready with {result['exchange_rate_count']} exchange rates")
+    st.info(f"📊 Total transactions: {overview['transaction_count']} (after deduplication)")
+    st.info(f"📈 Processing {overview['purchase_count']} purchase transactions...")
     
-    st.success(f"✅ Created cost basis for {len(cost_basis_dict)} symbols")
+    st.success(f"✅ Created FIFO cost basis for {len(overview['symbols'])} symbols")
+    
+    # Show sells before the cutoff that could not be matched
+    fifo_warnings = overview['fifo_warnings']
+    if fifo_warnings:
+        st.warning(f"⚠️ {len(fifo_warnings)} FIFO warnings before the FY cutoff")
+        with st.expander("View FIFO warnings"):
+            for warning in fifo_warnings:
+                st.write(f"   • {warning}")
     
     # Show what symbols have cost basis
-    if cost_basis_dict:
+    if overview['symbols']:
         with st.expander("🎯 Symbols with cost basis", expanded=False):
-            for symbol, records in cost_basis_dict.items():
-                total_units = sum(r['units'] for r in records)
-                total_cost_aud = sum(r['units'] * r['price_aud'] + r['commission_aud'] for r in records)
-                st.write(f"   ✅ {symbol}: {len(records)} records, {total_units:.0f} units, ${total_cost_aud:.2f} AUD")
+            for symbol, record_count, total_units, total_cost_aud in overview['symbols']:
+                st.write(f"   ✅ {symbol}: {record_count} records, {total_units:.0f} units, ${total_cost_aud:.2f} AUD")
     
     # Show conversion errors if any
+    conversion_errors = overview['conversion_errors']
     if conversion_errors:
         st.warning(f"⚠️ {len(conversion_errors)} AUD conversion warnings")
         with st.expander("View conversion errors"):
             for error in conversion_errors:
                 st.write(f"   • {error}")
     
-    # Save cost basis to temp file
-    cost_basis_path = os.path.join(temp_dir, f"cost_basis_aud_FY{financial_year}.json")
-    with open(cost_basis_path, 'w') as f:
-        json.dump(cost_basis_dict, f, indent=2)
-    
-    # Extract sales for the financial year
-    fy_year = int(financial_year.split('-')[0])
-    next_fy_year = fy_year + 1
-    fy_start = datetime(fy_year, 7, 1)
-    fy_end = datetime(next_fy_year, 6, 30)
-    
-    # Extract sales transactions for the target financial year
-    sell_transactions = combined_df[combined_df['Activity'] == 'SOLD'].copy()
+    if overview['sale_count'] == 0:
+        if overview['sell_count'] == 0:
+            st.warning("⚠️ No sales transactions found")
+        st.warning("⚠️ No sales found for the selected financial year")
+        st.info("This might mean no sales occurred in the selected financial year")
+        return
+    
+    st.success(f"✅ Found {overview['sale_count']} sales in FY {financial_year}")
+    
+    summary = result['summary']
+    if summary is None or summary['records'] == 0:
+        st.error("❌ No CGT calculations generated")
+        return
+    
+    st.success(f"✅ CGT calculations complete: {summary['records']} transactions processed ({job.elapsed():.1f}s)")
+    
+    if result['filename'] is None:
+        st.error("❌ Excel file creation failed")
+        return
+    
+    # The session keeps the result id and headline figures; artifacts stay in the store
+    get_result_store().attach(st.session_state.session_id, result['result_id'])
+    st.session_state.processing_complete = True
+    st.session_state.cgt_results = {
+        'result_id': result['result_id'],
+        'summary': summary,
+        'warnings': result['warnings'],
+        'filename': result['filename']
+    }
     
-    if len(sell_transactions) > 0:
-        sell_transactions['date_obj'] = sell_transactions['Date'].apply(robust_date_parser)
-        
-        fy_sales = sell_transactions[
-            (sell_transactions['date_obj'] >= fy_start) & 
-            (sell_transactions['date_obj'] <= fy_end)
-        ].copy()
-        
-        if len(fy_sales) > 0:
-            st.success(f"✅ Found {len(fy_sales)} sales in FY {financial_year}")
-            
-            # Create sales DataFrame for CGT calculator
-            sales_data = []
-            
-            for _, sale in fy_sales.iterrows():
-                quantity = abs(float(sale['Quantity']))
-                price_usd = abs(float(sale['Price']))
-                commission_usd = abs(float(sale['Commission']))
-                trade_date = robust_date_parser(sale['Date'])
-                
-                # Convert to AUD
-                total_proceeds_usd = quantity * price_usd
-                total_proceeds_aud, sale_rate = aud_converter.convert_usd_to_aud(total_proceeds_usd, trade_date)
-                commission_aud, _ = aud_converter.convert_usd_to_aud(commission_usd, trade_date)
-                
-                if total_proceeds_aud is None:
-                    total_proceeds_aud = total_proceeds_usd
-                    commission_aud = commission_usd
-                    sale_rate = None
-                
-                sales_data.append({
-                    'Symbol': sale['Symbol'],
-                    'Trade Date': pd.to_datetime(sale['Date']),
-                    'Units_Sold': quantity,
-                    'Sale_Price_Per_Unit': price_usd,
-                    'Total_Proceeds': total_proceeds_usd,
-                    'Commission_Paid': commission_usd,
-                    'Net_Proceeds': total_proceeds_usd - commission_usd,
-                    'Financial_Year': financial_year
-                })
-            
-            sales_df = pd.DataFrame(sales_data)
-            sales_path = os.path.join(temp_dir, f"sales_FY{financial_year}.csv")
-            sales_df.to_csv(sales_path, index=False)
-            
-            return cost_basis_path, sales_path
-        else:
-            st.warning("⚠️ No sales found in the selected financial year")
-            return cost_basis_path, None
-    else:
-        st.warning("⚠️ No sales transactions found")
-        return cost_basis_path, None
+    st.success("✅ Enhanced AUD processing complete!")
 
-def calculate_cgt_enhanced(sales_path, cost_basis_path, financial_year):
-    """Calculate CGT using the enhanced AUD system."""
-    try:
-        # Load data using enhanced functions
-        sales_df = load_sales_csv(sales_path)
-        cost_basis_dict = load_cost_basis_json_aud(cost_basis_path)
-        
-        if sales_df is None or cost_basis_dict is None:
-            st.error("❌ Failed to load input data")
-            return None, None, None
-        
-        st.info(f"📊 Processing {len(sales_df)} sales with cost basis for {len(cost_basis_dict)} symbols")
-        
-        # Calculate CGT using enhanced function
-        cgt_df, remaining_cost_basis, warnings_list = calculate_australian_cgt_aud(
-            sales_df, cost_basis_dict
-        )
-        
-        if cgt_df is None or len(cgt_df) == 0:
-            st.error("❌ No CGT calculations generated")
-            return None, None, None
-        
-        st.success(f"✅ CGT calculations complete: {len(cgt_df)} transactions processed")
-        
-        return cgt_df, remaining_cost_basis, warnings_list
-        
-    except Exception as e:
-        st.error(f"❌ Error calculating CGT: {str(e)}")
-        if st.checkbox("Show debug information"):
-            st.code(traceback.format_exc())
-        return None, None, None
+def format_megabytes(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
 
-def create_excel_download_enhanced(cgt_df, financial_year, temp_dir):
-    """Create enhanced Excel file with AUD amounts for download."""
-    try:
-        excel_path = os.path.join(temp_dir, f"Australian_CGT_Report_AUD_FY{financial_year}.xlsx")
-        
-        excel_file = save_cgt_excel_aud(cgt_df, financial_year, excel_path)
-        
-        if not excel_file or not os.path.exists(excel_path):
-            st.error("❌ Failed to create Excel file")
-            return None, None
-        
-        # Read file for download
-        with open(excel_path, 'rb') as f:
-            excel_data = f.read()
-        
-        return excel_data, f"Australian_CGT_Report_AUD_FY{financial_year}.xlsx"
-        
-    except Exception as e:
-        st.error(f"❌ Error creating Excel file: {str(e)}")
-        return None, None
+def show_result_storage_usage():
+    """Result store usage for this session and across all sessions."""
+    usage = get_result_store().usage()
+    mine = usage['sessions'].get(st.session_state.session_id, {'memory_bytes': 0, 'disk_bytes': 0})
+    with st.expander("💾 Result storage", expanded=False):
+        st.write(f"This session: {format_megabytes(mine['memory_bytes'])} in memory, "
+                 f"{format_megabytes(mine['disk_bytes'])} on disk")
+        st.write(f"All sessions ({len(usage['sessions'])}, {usage['results']} results): "
+                 f"{format_megabytes(usage['memory_bytes'])} of {format_megabytes(usage['memory_budget'])} in memory, "
+                 f"{format_megabytes(usage['disk_bytes'])} of {format_megabytes(usage['disk_budget'])} on disk")
 
 def main():
     """Main Streamlit app with CSV-only functionality."""
@@ -567,7 +694,7 @@ def main():
     
     # Configuration section
     st.header("⚙️ Configuration")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         financial_year = st.selectbox(
@@ -578,13 +705,21 @@ def main():
         )
     
     with col2:
+        strategy = st.selectbox(
+            "Lot Matching Strategy",
+            list(CGT_STRATEGIES),
+            index=0,
+            help="tax_optimal prefers discount-eligible, highest-cost lots; fifo sells the oldest lots first"
+        )
+    
+    with col3:
         st.info(f"🇦🇺 Processing for FY {financial_year} with RBA AUD conversion")
     
     # Data sources section
     st.header("📁 Data Sources")
     
     # Check for existing files
-    existing_transactions = load_existing_csv_files(financial_year)
+    existing_transactions, existing_sources = load_existing_csv_files(financial_year)
     
     if existing_transactions:
         total_existing = sum(len(df) for df in existing_transactions)
@@ -612,91 +747,67 @@ def main():
         help="Upload additional CSV files with transaction data"
     )
     
-    uploaded_transactions = []
+    uploaded_sources = []
     if uploaded_files:
         st.success(f"✅ {len(uploaded_files)} file(s) uploaded")
-        uploaded_transactions = process_uploaded_csv_files(uploaded_files, financial_year)
+        uploaded_sources = process_uploaded_csv_files(uploaded_files)
     
     # Processing section
-    total_transactions = len(existing_transactions) + len(uploaded_transactions)
-    
-    if total_transactions > 0:
+    if existing_transactions or uploaded_sources:
         if st.button("🔄 Process All CSV Data (Fixed AUD)", type="primary", use_container_width=True):
             
             # Reset session state
             st.session_state.processing_complete = False
             st.session_state.cgt_results = None
-            st.session_state.excel_data = None
+            get_result_store().detach(st.session_state.session_id)
             
-            # Create temporary directory for processing
-            with tempfile.TemporaryDirectory() as temp_dir:
-                try:
-                    # Step 1: Process CSV files with FIXED AUD system
-                    with st.spinner("Step 1/3: Processing CSV files with AUD conversion..."):
-                        cost_basis_path, sales_path = process_csv_files_enhanced_FIXED(
-                            existing_transactions, uploaded_transactions, financial_year, temp_dir
-                        )
-                    
-                    if not cost_basis_path:
-                        st.error("❌ Failed to create cost basis with AUD conversion")
-                        st.stop()
-                    
-                    if not sales_path:
-                        st.warning("⚠️ No sales found for the selected financial year")
-                        st.info("This might mean no sales occurred in the selected financial year")
-                        st.stop()
-                    
-                    # Step 2: Calculate CGT with AUD
-                    with st.spinner("Step 2/3: Calculating ATO-compliant CGT..."):
-                        cgt_df, remaining_cost_basis, warnings_list = calculate_cgt_enhanced(
-                            sales_path, cost_basis_path, financial_year
-                        )
-                    
-                    if cgt_df is None:
-                        st.error("❌ CGT calculation failed")
-                        st.stop()
-                    
-                    # Step 3: Create enhanced Excel file
-                    with st.spinner("Step 3/3: Creating ATO-compliant Excel report..."):
-                        excel_data, filename = create_excel_download_enhanced(
-                            cgt_df, financial_year, temp_dir
-                        )
-                    
-                    if excel_data is None:
-                        st.error("❌ Excel file creation failed")
-                        st.stop()
-                    
-                    # Store results in session state
-                    st.session_state.processing_complete = True
-                    st.session_state.cgt_results = {
-                        'cgt_df': cgt_df,
-                        'warnings': warnings_list,
-                        'remaining_cost_basis': remaining_cost_basis
-                    }
-                    st.session_state.excel_data = excel_data
-                    st.session_state.filename = filename
-                    
-                    st.success("✅ Enhanced AUD processing complete!")
-                    
-                except Exception as e:
-                    st.error(f"❌ Processing failed: {str(e)}")
-                    if st.checkbox("Show debug information"):
-                        st.code(traceback.format_exc())
+            # Submit as a background job keyed by inputs and settings
+            sources = existing_sources + uploaded_sources
+            input_hash = combine_hashes(*(f"{file_hash}:{source}" for file_hash, _, source in sources))
+            job_key = combine_hashes(input_hash, financial_year, strategy)
+            
+            # A finished job whose artifacts were evicted from the store runs again
+            finished = get_job_registry().get(job_key)
+            if (finished is not None and finished.status == JOB_DONE and finished.result['result_id'] is not None
+                    and not get_result_store().has(finished.result['result_id'])):
+                get_job_registry().discard(job_key)
+            
+            get_job_registry().submit(
+                job_key, run_processing_job, sources, financial_year, strategy, input_hash
+            )
+            st.session_state.job_key = job_key
     else:
         st.info("📄 Please add CSV transaction data by placing files in csv_folder/ directory or uploading files above")
     
+    # Background job: live progress while it runs, results once it finishes
+    job_key = st.session_state.job_key
+    if job_key is not None:
+        job = get_job_registry().get(job_key)
+        if job is None:
+            st.session_state.job_key = None
+            st.warning("⚠️ The processing job expired - please process the data again")
+        elif not job.done:
+            show_job_progress(job_key)
+        else:
+            st.session_state.job_key = None
+            show_processing_results(job)
+    
     # Results section
-    if st.session_state.processing_complete and st.session_state.cgt_results:
+    results = st.session_state.cgt_results
+    if st.session_state.processing_complete and results:
+        store = get_result_store()
+        result_id = results['result_id']
+        if store.session_result(st.session_state.session_id) != result_id:
+            st.session_state.processing_complete = False
+            st.session_state.cgt_results = None
+            st.warning("⚠️ These results were evicted from the result cache - please process the data again")
+            results = None
+    
+    if st.session_state.processing_complete and results:
         st.header("📊 ATO-Compliant Results")
         
-        cgt_df = st.session_state.cgt_results['cgt_df']
-        warnings = st.session_state.cgt_results['warnings']
-        
-        # Enhanced AUD metrics
-        total_gain_aud = cgt_df['Capital_Gain_Loss_AUD'].sum()
-        taxable_gain_aud = cgt_df['Taxable_Gain_AUD'].sum()
-        long_term_count = len(cgt_df[cgt_df['Long_Term_Eligible'] == True])
-        short_term_count = len(cgt_df) - long_term_count
+        summary = results['summary']
+        warnings = results['warnings']
         
         # Display enhanced metrics
         col1, col2, col3, col4 = st.columns(4)
@@ -704,39 +815,46 @@ def main():
         with col1:
             st.metric(
                 "Total Capital Gains (AUD)",
-                f"${total_gain_aud:,.2f}",
+                f"${summary['total_gain_aud']:,.2f}",
                 help="Total capital gains/losses in AUD using RBA rates"
             )
         
         with col2:
             st.metric(
                 "Taxable Amount (AUD)",
-                f"${taxable_gain_aud:,.2f}",
+                f"${summary['taxable_gain_aud']:,.2f}",
                 help="Report this amount to the ATO (after 50% CGT discount)"
             )
         
         with col3:
             st.metric(
                 "Long-term Sales",
-                f"{long_term_count}",
+                f"{summary['long_term_count']}",
                 help="Sales eligible for 50% CGT discount (held >12 months)"
             )
         
         with col4:
             st.metric(
                 "Short-term Sales", 
-                f"{short_term_count}",
+                f"{summary['short_term_count']}",
                 help="Sales not eligible for CGT discount (held <12 months)"
             )
         
         # Enhanced download section
         st.header("⬇️ Download ATO-Compliant Report")
         
-        if st.session_state.excel_data and st.session_state.filename:
+        if results['filename']:
+            # The report is read from the disk cache only when the button is clicked
+            def read_report():
+                try:
+                    return store.get(result_id, 'excel')
+                except KeyError:
+                    return b''  # evicted since this render; the next rerun reports it
+            
             st.download_button(
                 label="📊 Download ATO-Compliant CGT Report (Excel)",
-                data=st.session_state.excel_data,
-                file_name=st.session_state.filename,
+                data=read_report,
+                file_name=results['filename'],
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
@@ -753,18 +871,25 @@ def main():
         # Optional: Show detailed data
         if st.checkbox("Show detailed AUD CGT calculations"):
             st.subheader("Detailed AUD CGT Calculations")
-            display_columns = [
-                'Symbol', 'Sale_Date', 'Units_Sold', 'Sale_Price_Per_Unit_AUD',
-                'Buy_Date', 'Days_Held', 'Capital_Gain_Loss_AUD', 'Taxable_Gain_AUD',
-                'Long_Term_Eligible', 'CGT_Discount_Applied'
-            ]
-            
-            available_columns = [col for col in display_columns if col in cgt_df.columns]
-            
-            st.dataframe(
-                cgt_df[available_columns],
-                use_container_width=True
-            )
+            stored = load_stored(result_id, ('cgt_df',))
+            if stored is None:
+                st.warning("⚠️ These results were evicted from the result cache - please process the data again")
+            else:
+                cgt_df = stored['cgt_df']
+                display_columns = [
+                    'Symbol', 'Sale_Date', 'Units_Sold', 'Sale_Price_Per_Unit_AUD',
+                    'Buy_Date', 'Days_Held', 'Capital_Gain_Loss_AUD', 'Taxable_Gain_AUD',
+                    'Long_Term_Eligible', 'CGT_Discount_Applied'
+                ]
+                
+                available_columns = [col for col in display_columns if col in cgt_df.columns]
+                
+                st.dataframe(
+                    cgt_df[available_columns],
+                    use_container_width=True
+                )
+        
+        show_result_storage_usage()
     
     # Footer
     st.markdown("---")
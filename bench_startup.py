@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark
+
+Times module imports and the quick commands in fresh interpreters, the way
+a user starting a command pays for them, and lists which heavy libraries
+(pandas, NumPy, openpyxl, xlsxwriter) each import pulls in. The interpreter's
+own start-up time is measured separately and subtracted.
+
+Usage:
+    python bench_startup.py [--repeat 5] [--budget-ms 1000]
+
+--budget-ms exits non-zero if any quick command is slower (wall time
+including interpreter start-up), so it can run as a CI check.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('pandas', 'numpy', 'openpyxl', 'xlsxwriter')
+
+MODULES = [
+    'rba_rates',
+    'cost_basis_codec',
+    'lazy_cost_basis',
+    'cgt_quick',
+    'complete_unified_with_aud',
+    'cgt_calculator_australia_aud',
+    'cgt_pipeline',
+    'cgt_service'
+]
+
+QUICK_COMMANDS = [
+    ('rate', ['rate', '2024-08-15']),
+    ('holdings', ['holdings', os.path.join('json_folder', 'cost_basis_dictionary_post_FY2024-25.json')]),
+    ('validate csv', ['validate'] + [os.path.join('csv_folder', 'manual_csv_path.csv')])
+]
+
+
+def _time_command(command, repeat):
+    """Median wall time in ms of running command in a fresh process."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def heavy_imports(module):
+    """Heavy libraries loaded by importing module, and whether the import printed anything."""
+    code = (f"import sys; import {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    return [m for m in lines[-1].split(',') if m], len(lines) > 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import and quick command start-up times")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, help="Fail if a quick command takes longer")
+    args = parser.parse_args()
+
+    baseline = _time_command([sys.executable, '-c', 'pass'], args.repeat)
+    print(f"🚀 STARTUP BENCHMARK (median of {args.repeat}, interpreter start-up {baseline:.0f} ms)")
+    print("=" * 70)
+
+    print(f"\n📦 {'Module':<30} {'Import ms':>10}  Heavy imports")
+    for module in MODULES:
+        import_ms = _time_command([sys.executable, '-c', f'import {module}'], args.repeat) - baseline
+        heavy, printed = heavy_imports(module)
+        note = '  ⚠️ prints on import' if printed else ''
+        print(f"   {module:<30} {import_ms:>10.0f}  {', '.join(heavy) or '-'}{note}")
+
+    print(f"\n⚡ {'Quick command':<30} {'Wall ms':>10}")
+    over_budget = []
+    for label, command in QUICK_COMMANDS:
+        wall_ms = _time_command([sys.executable, 'cgt_quick.py'] + command, args.repeat)
+        print(f"   {label:<30} {wall_ms:>10.0f}")
+        if args.budget_ms is not None and wall_ms > args.budget_ms:
+            over_budget.append(label)
+
+    if over_budget:
+        print(f"\n❌ Over the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Batch CGT Runs Over a Portfolio Manifest
+
+Non-interactive counterpart of complete_unified_with_aud.main() +
+cgt_calculator_australia_aud.main() for overnight runs across many client
+portfolios. A manifest lists the portfolios; each one is ingested, run
+through hybrid FIFO and the CGT calculation, and exported to its own folder.
+Portfolios run on a process pool. The RBA rate table is loaded once in the
+parent and handed to every worker through the pool initializer.
+
+Manifest (JSON):
+    {
+      "defaults": {"financial_year": "2024-25", "strategy": "tax_optimal"},
+      "portfolios": [
+        {"name": "client_a", "inputs": ["clients/a/html", "clients/a/csv"]},
+        {"name": "client_b", "inputs": "clients/b", "financial_year": "2023-24",
+         "sell_cutoff": "2023-06-30", "strategy": "fifo"}
+      ]
+    }
+
+or CSV with columns name, inputs (';'-separated), financial_year,
+sell_cutoff, strategy. Inputs are directories (their *.htm, *.html and
+transaction *.csv files are read) or single files, relative to the manifest.
+sell_cutoff defaults to 30 June before the FY.
+
+Outputs:
+    <output-dir>/<name>/Australian_CGT_Report_FY<fy>_AUD.xlsx
+    <output-dir>/<name>/cost_basis_dictionary_AUD_post_FY<fy>.json
+    <output-dir>/<name>/cgt_records_FY<fy>.csv
+    <output-dir>/batch_summary.csv      one row per portfolio, with wall time
+
+A failing portfolio is recorded in the summary and does not stop the batch.
+
+Usage:
+    python cgt_batch.py manifest.json [--workers 4] [--output-dir batch_output] [--fy 2024-25]
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import CGT_STRATEGIES
+from cgt_pipeline import default_sell_cutoff, stage_cgt, stage_dedup, stage_export, stage_fifo, \
+    stage_rates, stage_sales
+from complete_unified_with_aud import is_transaction_csv, standardize_csv_file, standardize_html_file
+from thread_output import quiet
+
+DEFAULT_OUTPUT_DIR = 'batch_output'
+SUMMARY_FILE = 'batch_summary.csv'
+
+SUMMARY_COLUMNS = [
+    'portfolio', 'status', 'financial_year', 'strategy', 'sell_cutoff', 'files', 'transactions', 'sales',
+    'cgt_records', 'total_gain_aud', 'taxable_gain_aud', 'warnings', 'conversion_errors', 'wall_seconds',
+    'output_dir', 'error'
+]
+
+# Set in each worker process by _init_worker
+_RATES = None
+_VERBOSE = False
+
+
+# ---------------------------------------------------------------- manifest
+
+def _split_inputs(value):
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(';') if part.strip()]
+    return list(value or [])
+
+
+def load_manifest(path, defaults=None):
+    """
+    Read a JSON or CSV manifest into a list of portfolio dicts with name,
+    inputs (absolute paths), financial_year, sell_cutoff and strategy.
+    Raises ValueError describing every invalid entry.
+    """
+    base_dir = os.path.dirname(os.path.abspath(path))
+    defaults = dict(defaults or {})
+
+    if path.lower().endswith('.csv'):
+        entries = pd.read_csv(path, dtype=str, keep_default_na=False).to_dict('records')
+    else:
+        with open(path) as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            defaults.update(manifest.get('defaults', {}))
+            entries = manifest.get('portfolios', [])
+        else:
+            entries = manifest
+
+    portfolios, errors, names = [], [], set()
+    for number, entry in enumerate(entries, start=1):
+        settings = {**defaults, **{key: value for key, value in entry.items() if value not in ('', None)}}
+        name = str(settings.get('name', ''))
+        label = f"portfolio {number} ({name or 'unnamed'})"
+
+        if not re.fullmatch(r'[\w.-]+', name):
+            errors.append(f"{label}: name must be letters, digits, '_', '-' or '.'")
+        elif name in names:
+            errors.append(f"{label}: duplicate name")
+        names.add(name)
+
+        financial_year = str(settings.get('financial_year', ''))
+        if not re.fullmatch(r'\d{4}-\d{2}', financial_year):
+            errors.append(f"{label}: financial_year must look like 2024-25, got '{financial_year}'")
+            continue
+
+        strategy = settings.get('strategy', 'tax_optimal')
+        if strategy not in CGT_STRATEGIES:
+            errors.append(f"{label}: strategy must be one of {CGT_STRATEGIES}")
+
+        sell_cutoff = settings.get('sell_cutoff') or default_sell_cutoff(financial_year)
+        try:
+            datetime.strptime(sell_cutoff, '%Y-%m-%d')
+        except ValueError:
+            errors.append(f"{label}: sell_cutoff must be YYYY-MM-DD, got '{sell_cutoff}'")
+
+        inputs = [os.path.join(base_dir, item) for item in _split_inputs(settings.get('inputs'))]
+        if not inputs:
+            errors.append(f"{label}: no inputs")
+
+        portfolios.append({
+            'name': name,
+            'inputs': inputs,
+            'financial_year': financial_year,
+            'sell_cutoff': sell_cutoff,
+            'strategy': strategy
+        })
+
+    if errors:
+        raise ValueError("Invalid manifest:\n  " + "\n  ".join(errors))
+    return portfolios
+
+
+def portfolio_files(inputs):
+    """HTML statements and transaction CSVs under the given directories/files, sorted per input."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = []
+            for pattern in ('*.htm', '*.html', '*.csv'):
+                found.extend(glob.glob(os.path.join(item, pattern)))
+            files.extend(sorted(found))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            raise FileNotFoundError(f"Input not found: {item}")
+    return [path for path in files
+            if path.lower().endswith(('.htm', '.html'))
+            or (path.lower().endswith('.csv') and is_transaction_csv(os.path.basename(path)))]
+
+
+# ---------------------------------------------------------------- workers
+
+def _init_worker(exchange_rates, verbose=False):
+    """Pool initializer: keep the parent's rate table for every portfolio this worker runs."""
+    global _RATES, _VERBOSE
+    _RATES = exchange_rates
+    _VERBOSE = verbose
+
+
+def run_portfolio(portfolio, output_root):
+    """Process one portfolio with the worker's rate table. Returns its summary row."""
+    started = time.time()
+    output_dir = os.path.join(output_root, portfolio['name'])
+    row = {
+        'portfolio': portfolio['name'],
+        'financial_year': portfolio['financial_year'],
+        'strategy': portfolio['strategy'],
+        'sell_cutoff': portfolio['sell_cutoff'],
+        'output_dir': output_dir
+    }
+
+    try:
+        with quiet(_VERBOSE):
+            files = portfolio_files(portfolio['inputs'])
+            frames = []
+            for path in files:
+                if path.lower().endswith(('.htm', '.html')):
+                    standardized = standardize_html_file(path)
+                else:
+                    standardized = standardize_csv_file(path)
+                if standardized is not None and len(standardized):
+                    frames.append(standardized)
+            if not frames:
+                raise ValueError(f"No transactions found in {', '.join(portfolio['inputs'])}")
+
+            dedup = stage_dedup(pd.concat(frames, ignore_index=True))
+            fifo = stage_fifo(dedup, _RATES, portfolio['sell_cutoff'])
+            sales = stage_sales(dedup, portfolio['financial_year'])
+            cgt = stage_cgt(sales, fifo, portfolio['strategy'])
+            stage_export(cgt, portfolio['financial_year'], output_dir)
+            cgt_df = cgt['cgt_df']
+            cgt_df.to_csv(os.path.join(output_dir, f"cgt_records_FY{portfolio['financial_year']}.csv"),
+                          index=False)
+
+        row.update({
+            'status': 'done',
+            'files': len(files),
+            'transactions': len(dedup),
+            'sales': len(sales),
+            'cgt_records': len(cgt_df),
+            'total_gain_aud': round(float(cgt_df['Capital_Gain_Loss_AUD'].sum()), 2) if len(cgt_df) else 0.0,
+            'taxable_gain_aud': round(float(cgt_df['Taxable_Gain_AUD'].sum()), 2) if len(cgt_df) else 0.0,
+            'warnings': len(cgt['warnings']),
+            'conversion_errors': len(fifo['conversion_errors'])
+        })
+    except Exception as e:
+        row.update({'status': 'failed', 'error': str(e)})
+        if _VERBOSE:
+            traceback.print_exc()
+
+    row['wall_seconds'] = round(time.time() - started, 3)
+    return row
+
+
+# ---------------------------------------------------------------- batch
+
+def write_summary(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({column: row.get(column, '') for column in SUMMARY_COLUMNS})
+    return path
+
+
+def run_batch(portfolios, exchange_rates, output_dir=DEFAULT_OUTPUT_DIR, workers=None, verbose=False):
+    """
+    Run every portfolio and write the summary CSV. workers=1 runs in this
+    process; otherwise a process pool of `workers` (default: CPU count).
+    Returns the summary rows in manifest order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    output_root = os.path.abspath(output_dir)
+    rows = {}
+
+    def report(row):
+        rows[row['portfolio']] = row
+        icon = '✅' if row['status'] == 'done' else '❌'
+        detail = (f"{row['cgt_records']} CGT records, taxable ${row['taxable_gain_aud']:,.2f}"
+                  if row['status'] == 'done' else row['error'])
+        print(f"{icon} [{len(rows)}/{len(portfolios)}] {row['portfolio']} "
+              f"FY{row['financial_year']}: {detail} ({row['wall_seconds']:.2f}s)")
+
+    if workers == 1:
+        _init_worker(exchange_rates, verbose)
+        for portfolio in portfolios:
+            report(run_portfolio(portfolio, output_root))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(exchange_rates, verbose)) as executor:
+            futures = [executor.submit(run_portfolio, portfolio, output_root) for portfolio in portfolios]
+            for future in as_completed(futures):
+                report(future.result())
+
+    ordered = [rows[portfolio['name']] for portfolio in portfolios]
+    write_summary(ordered, os.path.join(output_dir, SUMMARY_FILE))
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Australian CGT for every portfolio in a manifest")
+    parser.add_argument('manifest', help="JSON or CSV manifest of portfolios")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count; 1 runs in-process)")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--rates-folder', default='rates', help="Folder with RBA FX_*.csv files")
+    parser.add_argument('--fy', help="Default financial year for portfolios that do not set one")
+    parser.add_argument('--strategy', choices=CGT_STRATEGIES, help="Default strategy")
+    parser.add_argument('--verbose', action='store_true', help="Show per-portfolio processing output")
+    args = parser.parse_args()
+
+    defaults = {key: value for key, value in (('financial_year', args.fy), ('strategy', args.strategy)) if value}
+    try:
+        portfolios = load_manifest(args.manifest, defaults)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 2
+
+    print(f"🚀 BATCH CGT RUN: {len(portfolios)} portfolios from {args.manifest}")
+    started = time.time()
+    with quiet(args.verbose):
+        exchange_rates = stage_rates(args.rates_folder)
+    print(f"💱 Loaded {len(exchange_rates)} RBA rates in {time.time() - started:.2f}s")
+
+    rows = run_batch(portfolios, exchange_rates, args.output_dir, args.workers, args.verbose)
+
+    failed = [row for row in rows if row['status'] != 'done']
+    print(f"\n📊 {len(rows) - len(failed)} done, {len(failed)} failed in {time.time() - started:.2f}s")
+    print(f"📄 Summary: {os.path.join(args.output_dir, SUMMARY_FILE)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
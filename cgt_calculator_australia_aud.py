@@ -11,6 +11,8 @@ BUGS FIXED:
 """
 
 import pandas as pd
+import numpy as np
+import importlib.util
 import json
 import os
 import re
@@ -18,14 +20,19 @@ from datetime import datetime, timedelta
 import warnings
 import traceback
 
-# For Excel writing
-try:
-    import openpyxl
-    EXCEL_AVAILABLE = True
-except ImportError:
-    EXCEL_AVAILABLE = False
-    print("⚠️ openpyxl not installed. Excel files will not be created.")
-    print("Install with: pip install openpyxl")
+from cost_basis_codec import BINARY_EXTENSION, load_cost_basis_file
+from cost_basis_lot_store import CostBasisLotStore
+from lazy_cost_basis import open_lazy_cost_basis
+
+# Excel writers are only imported when a workbook is written, so importing
+# this module stays cheap and silent
+EXCEL_AVAILABLE = importlib.util.find_spec('openpyxl') is not None
+
+# Optional: xlsxwriter gives true constant-memory Excel output
+XLSXWRITER_AVAILABLE = importlib.util.find_spec('xlsxwriter') is not None
+
+# Cost basis JSON files at least this large are loaded on demand by main()
+LAZY_LOAD_MIN_BYTES = 64 * 1024 * 1024
 
 def get_rba_exchange_rate(date, max_retries=3, cache={}):
     """
@@ -103,6 +110,32 @@ def get_rba_exchange_rate(date, max_retries=3, cache={}):
         return fallback_rate
 
 
+def normalize_sales_df(df):
+    """
+    Give an in-memory sales DataFrame the same shape load_sales_csv() returns:
+    a datetime 'Trade Date' column, sorted by date with a fresh index.
+    Lets callers that already hold the sales skip the file round trip.
+    """
+    df = df.copy()
+    
+    # Convert Trade Date to datetime if it exists
+    if 'Trade Date' in df.columns:
+        df['Trade Date'] = pd.to_datetime(df['Trade Date'])
+    elif 'Date' in df.columns:
+        df['Trade Date'] = pd.to_datetime(df['Date'])
+    else:
+        # Look for any date-like column
+        date_columns = [col for col in df.columns if 'date' in col.lower()]
+        if date_columns:
+            df['Trade Date'] = pd.to_datetime(df[date_columns[0]])
+            print(f"   📅 Using {date_columns[0]} as Trade Date")
+    
+    # Sort by date and reset index
+    if 'Trade Date' in df.columns:
+        df = df.sort_values('Trade Date').reset_index(drop=True)
+    
+    return df
+
 def load_sales_csv(file_path):
     """Load sales transactions from CSV or Excel file."""
     try:
@@ -141,22 +174,7 @@ def load_sales_csv(file_path):
         
         # Standardize column names and data
         print(f"   📊 Loaded {len(df)} rows with columns: {list(df.columns)}")
-        
-        # Convert Trade Date to datetime if it exists
-        if 'Trade Date' in df.columns:
-            df['Trade Date'] = pd.to_datetime(df['Trade Date'])
-        elif 'Date' in df.columns:
-            df['Trade Date'] = pd.to_datetime(df['Date'])
-        else:
-            # Look for any date-like column
-            date_columns = [col for col in df.columns if 'date' in col.lower()]
-            if date_columns:
-                df['Trade Date'] = pd.to_datetime(df[date_columns[0]])
-                print(f"   📅 Using {date_columns[0]} as Trade Date")
-        
-        # Sort by date and reset index
-        if 'Trade Date' in df.columns:
-            df = df.sort_values('Trade Date').reset_index(drop=True)
+        df = normalize_sales_df(df)
         
         print(f"✅ Successfully loaded {len(df)} sales transactions from {file_path}")
         
@@ -175,11 +193,27 @@ def load_sales_csv(file_path):
         print(f"   💡 Make sure the file exists and contains sales transaction data")
         return None
 
-def load_cost_basis_json_aud(json_file_path):
-    """Load AUD-enhanced cost basis dictionary from JSON file."""
+def load_cost_basis_json_aud(json_file_path, lazy=False):
+    """
+    Load AUD-enhanced cost basis dictionary from file.
+
+    The encoding is detected from the contents: legacy JSON (USD-only or
+    AUD-enhanced), versioned JSON, binary .cgtcb or Parquet (see cost_basis_codec.py).
+
+    With lazy=True a legacy JSON file is returned as a lot store that parses
+    each symbol only when it is sold (see lazy_cost_basis.py); other encodings
+    load normally.
+    """
+    if lazy:
+        try:
+            lot_store = open_lazy_cost_basis(json_file_path)
+            print(f"✅ Indexed cost basis for {len(lot_store)} symbols from {json_file_path} (loaded on demand)")
+            return lot_store
+        except (OSError, ValueError):
+            pass  # Not a legacy JSON file: load it whole
+
     try:
-        with open(json_file_path, 'r') as f:
-            cost_basis_dict = json.load(f)
+        cost_basis_dict = load_cost_basis_file(json_file_path)
         
         print(f"✅ Loaded AUD-enhanced cost basis for {len(cost_basis_dict)} symbols from {json_file_path}")
         
@@ -197,7 +231,7 @@ def load_cost_basis_json_aud(json_file_path):
         
         return cost_basis_dict
     except Exception as e:
-        print(f"❌ Error loading cost basis JSON: {e}")
+        print(f"❌ Error loading cost basis file: {e}")
         return None
 
 def parse_date_from_cost_basis(date_str):
@@ -219,362 +253,790 @@ def days_between_dates(buy_date_str, sell_date):
         print(f"   ⚠️ Error calculating days between {buy_date_str} and {sell_date}: {e}")
         return 0
 
-def select_optimal_units_for_cgt_aud(cost_basis_records, units_needed, sell_date):
+def order_lots_for_sale_aud(cost_basis_records, sell_date):
     """
-    Select the most tax-efficient units to sell for Australian CGT (AUD version).
-    
-    Strategy:
-    1. Prioritize units held > 12 months (for 50% CGT discount)
-    2. Within long-term holdings, select highest cost basis first (minimize gain)
-    3. If not enough long-term, use short-term with highest cost basis
-    
+    Order purchase records the way the 'tax_optimal' strategy consumes them.
+
+    Long-term lots (>= 365 days) come first, highest AUD cost per unit first,
+    followed by short-term lots in the same order (_tax_optimal_lot_groups()).
+    Nothing is printed and the records are not modified.
+
     Args:
         cost_basis_records (list): List of purchase records for the symbol
+        sell_date (datetime): Date of the (planned) sale
+
+    Returns:
+        list: Lot entries with 'lot_id' (index into cost_basis_records), 'units',
+              'date', 'days_held', 'long_term', 'price_aud', 'commission_aud',
+              'exchange_rate' and 'cost_per_unit_aud'
+    """
+    lot_entries = []
+    lot_units = []
+    for lot_id, record in enumerate(cost_basis_records):
+        units = record.get('units', 0)
+        lot_units.append(units)
+        if units <= 0:
+            continue
+        try:
+            buy_date = parse_date_from_cost_basis(record.get('date', '01.01.24'))
+        except Exception:
+            buy_date = None
+        lot_entries.append((lot_id, buy_date, record.get('price_aud', record.get('price', 0)),
+                            record.get('commission_aud', record.get('commission', 0))))
+
+    lots = []
+    for group in _tax_optimal_lot_groups(lot_entries, lot_units, sell_date):
+        for _, lot_id, days_held in group:
+            record = cost_basis_records[lot_id]
+            units = lot_units[lot_id]
+            price_aud = record.get('price_aud', record.get('price', 0))
+            commission_aud = record.get('commission_aud', record.get('commission', 0))
+            lots.append({
+                'lot_id': lot_id,
+                'units': units,
+                'date': record.get('date', '01.01.24'),
+                'days_held': days_held,
+                'long_term': days_held >= 365,
+                'price_aud': price_aud,
+                'commission_aud': commission_aud,
+                'exchange_rate': record.get('exchange_rate', 0),
+                # Actual AUD cost of one unit including its share of the buy commission
+                'cost_per_unit_aud': price_aud + (commission_aud / units)
+            })
+
+    return lots
+
+def build_lot_index_aud(cost_basis_dict, sell_date, symbols=None):
+    """
+    Build a per-symbol index of lots in tax-optimal consumption order.
+
+    Args:
+        cost_basis_dict (dict): AUD-enhanced cost basis dictionary
+        sell_date (datetime): Date used to classify lots as long/short term
+        symbols (iterable): Optional subset of symbols to index
+
+    Returns:
+        dict: symbol -> list of lot entries from order_lots_for_sale_aud()
+    """
+    if symbols is None:
+        symbols = cost_basis_dict.keys()
+
+    lot_index = {}
+    for symbol in symbols:
+        records = cost_basis_dict.get(symbol)
+        if records:
+            lot_index[symbol] = order_lots_for_sale_aud(records, sell_date)
+
+    return lot_index
+
+# CGT record columns, in report order
+CGT_COLUMNS = [
+    'Sale_Date', 'Symbol', 'Units_Sold', 'Sale_Price_Per_Unit_USD', 'Sale_Price_Per_Unit_AUD',
+    'Total_Proceeds_USD', 'Total_Proceeds_AUD', 'Sale_Commission_USD', 'Sale_Commission_AUD',
+    'Net_Proceeds_AUD', 'Buy_Date', 'Buy_Price_Per_Unit_AUD', 'Buy_Commission_AUD',
+    'Units_Matched', 'Days_Held', 'Long_Term_Eligible', 'Cost_Basis_AUD',
+    'Capital_Gain_Loss_AUD', 'CGT_Discount_Applied', 'Taxable_Gain_AUD',
+    'Purchase_Exchange_Rate', 'Sale_Exchange_Rate', 'Warning'
+]
+
+# Lot IDs used in match tuples for sales that could not be matched
+NO_COST_BASIS_LOT = -1
+NO_UNITS_LOT = -2
+
+# Lot matching strategies: tax-optimal (calculator default) or first-in-first-out
+CGT_STRATEGIES = ('tax_optimal', 'fifo')
+
+
+class CGTLotTable:
+    """
+    Flat per-lot arrays for the lots touched by a CGT run.
+
+    Lots are loaded a symbol at a time, on the first sale of that symbol, and
+    referenced by integer lot ID from the match table. Units left are written
+    back to the lot store with commit().
+
+    With as_of_sale_date=True a lot only becomes available to sales on or
+    after its buy date, so one lot store can hold a whole purchase history
+    (see cgt_multi_year.py). By default every lot is available, as when the
+    cost basis was built for a single financial year.
+    """
+
+    def __init__(self, as_of_sale_date=False):
+        self.as_of_sale_date = as_of_sale_date
+        self.source = []  # lot ID -> (symbol, record index) in the lot store
+        self.price = []
+        self.commission = []
+        self.price_aud = []
+        self.commission_aud = []
+        self.exchange_rate = []
+        self.date = []
+        self.units = []
+        self.integer_units = True  # every loaded lot has integer units (CGT unit columns stay int64)
+        self.symbol_lots = {}  # symbol -> list of working entries [lot_id, buy_date, sort_price_aud, commission_aud]
+        self._pending = {}  # symbol -> [(buy_date, record index)] not yet bought, latest first
+
+    def _add_lot(self, symbol, index, record, units, buy_date, entries):
+        lot_id = len(self.units)
+        price_aud = record.get('price_aud', record.get('price', 0))
+        commission_aud = record.get('commission_aud', record.get('commission', 0))
+
+        self.price.append(record.get('price', 0))
+        self.commission.append(record.get('commission', 0))
+        self.price_aud.append(price_aud)
+        self.commission_aud.append(commission_aud)
+        self.exchange_rate.append(record.get('exchange_rate', 0))
+        self.date.append(record.get('date', '01.01.24'))
+        self.units.append(units)
+        if not isinstance(record.get('units', 0), (int, np.integer)):
+            self.integer_units = False
+        self.source.append((symbol, index))
+        entries.append([lot_id, buy_date, price_aud, commission_aud])
+
+    def load_symbol(self, symbol, lot_store, sale_date=None):
+        """
+        Register a symbol's lots from the lot store and return its working lot entries.
+
+        If sale_date is given, lots bought after it are held back until
+        lots_for_sale() is called with a later date.
+        """
+        entries = []
+        pending = []
+        for index, record in enumerate(lot_store.base_records(symbol)):
+            units = lot_store.units_left(symbol, index)
+            if units <= 0:
+                continue
+
+            date_str = record.get('date', '01.01.24')
+            try:
+                buy_date = parse_date_from_cost_basis(date_str)
+            except Exception as e:
+                print(f"   ⚠️ Error parsing buy date {date_str}: {e}")
+                buy_date = None
+
+            if sale_date is not None and buy_date is not None and buy_date > sale_date:
+                pending.append((buy_date, index))
+                continue
+
+            self._add_lot(symbol, index, record, units, buy_date, entries)
+
+        if pending:
+            pending.sort(key=lambda x: x[0], reverse=True)
+            self._pending[symbol] = pending
+
+        self.symbol_lots[symbol] = entries
+        return entries
+
+    def lots_for_sale(self, symbol, sale_date, lot_store):
+        """Working lot entries available to a sale, or None if the symbol has no cost basis."""
+        entries = self.symbol_lots.get(symbol)
+        if entries is None:
+            if symbol not in lot_store:
+                return None
+            return self.load_symbol(symbol, lot_store, sale_date if self.as_of_sale_date else None)
+
+        pending = self._pending.get(symbol)
+        if pending and pending[-1][0] <= sale_date:
+            records = lot_store.base_records(symbol)
+            while pending and pending[-1][0] <= sale_date:
+                buy_date, index = pending.pop()
+                self._add_lot(symbol, index, records[index], lot_store.units_left(symbol, index), buy_date, entries)
+        return entries
+
+    def commit(self, lot_store):
+        """Record the units left in every loaded lot as deltas in the lot store."""
+        for (symbol, index), units in zip(self.source, self.units):
+            if units != lot_store.units_left(symbol, index):
+                lot_store.set_units_left(symbol, index, units)
+
+
+def _match_sale_to_lots(lot_entries, lot_units, units_needed, sell_date, strategy='tax_optimal'):
+    """
+    Match one sale against a symbol's lots.
+
+    'tax_optimal' uses _tax_optimal_lot_groups(): long-term lots with the
+    highest AUD cost first, then short-term lots with the highest AUD cost.
+    'fifo' uses the oldest lots first.
+
+    Consumed units are deducted from lot_units in place.
+
+    Args:
+        lot_entries (list): Working lot entries for the symbol (from CGTLotTable)
+        lot_units (list): Units left per lot ID
         units_needed (float): Number of units being sold
         sell_date (datetime): Date of the sale
-    
+        strategy (str): One of CGT_STRATEGIES
+
     Returns:
-        tuple: (selected_units, remaining_units_needed, updated_records)
+        tuple: (matches, remaining_units_needed) where matches is a list of
+               (lot_id, units, days_held, lot_units_before) tuples
     """
-    print(f"   🔍 Selecting optimal units: need {units_needed}, have {len(cost_basis_records)} purchase records")
-    
-    # Initialize return values
-    selected_units = []
+    if strategy == 'fifo':
+        groups = [sorted(
+            ((buy_date or datetime.min, lot_id, (sell_date - buy_date).days if buy_date is not None else 0)
+             for lot_id, buy_date, _, _ in lot_entries if lot_units[lot_id] > 0),
+            key=lambda x: (x[0], x[1])
+        )]
+    else:
+        groups = _tax_optimal_lot_groups(lot_entries, lot_units, sell_date)
+
+    matches = []
     remaining_units = units_needed
-    
-    try:
-        # Make a copy to avoid modifying original data
-        available_records = []
-        for record in cost_basis_records:
-            if record.get('units', 0) > 0:  # Only consider records with available units
-                # Use AUD amounts if available, fallback to USD
-                price_aud = record.get('price_aud', record.get('price', 0))
-                commission_aud = record.get('commission_aud', record.get('commission', 0))
-                
-                days_held = days_between_dates(record.get('date', '01.01.24'), sell_date)
-                total_cost_per_unit_aud = price_aud + (commission_aud / max(record.get('units', 1), 1))
-                
-                available_records.append({
-                    'units': record.get('units', 0),
-                    'price': record.get('price', 0),                    # USD price
-                    'commission': record.get('commission', 0),          # USD commission
-                    'price_aud': price_aud,                            # AUD price
-                    'commission_aud': commission_aud,                  # AUD commission
-                    'exchange_rate': record.get('exchange_rate', 0),   # Rate used
-                    'date': record.get('date', '01.01.24'),
-                    'days_held': days_held,
-                    'long_term': days_held >= 365,
-                    'total_cost_per_unit_aud': total_cost_per_unit_aud
-                })
-        
-        print(f"   📊 Available records: {len(available_records)} (from {len(cost_basis_records)} total)")
-        
-        if not available_records:
-            print(f"   ❌ No available units found")
-            return [], units_needed, []
-        
-        # Step 1: Prioritize long-term holdings (>= 365 days) with highest AUD cost basis first
-        long_term_records = [r for r in available_records if r['long_term']]
-        long_term_records.sort(key=lambda x: x['total_cost_per_unit_aud'], reverse=True)  # Highest AUD cost first
-        
-        print(f"   📈 Long-term records: {len(long_term_records)}")
-        
-        for record in long_term_records:
+    for group in groups:
+        for _, lot_id, days_held in group:
             if remaining_units <= 0:
                 break
-                
-            units_to_use = min(remaining_units, record['units'])
-            
-            selected_units.append({
-                'units': units_to_use,
-                'price': record['price'],                    # USD price per unit
-                'commission': record['commission'] * (units_to_use / record['units']),  # Proportional USD commission
-                'price_aud': record['price_aud'],           # AUD price per unit
-                'commission_aud': record['commission_aud'] * (units_to_use / record['units']),  # Proportional AUD commission
-                'exchange_rate': record['exchange_rate'],
-                'buy_date': record['date'],
-                'days_held': record['days_held'],
-                'long_term_eligible': True,
-                'total_cost_usd': (units_to_use * record['price']) + (record['commission'] * (units_to_use / record['units'])),
-                'total_cost_aud': (units_to_use * record['price_aud']) + (record['commission_aud'] * (units_to_use / record['units'])),
-                'cost_per_unit_aud': record['total_cost_per_unit_aud']
-            })
-            
+            available = lot_units[lot_id]
+            units_to_use = min(remaining_units, available)
+            matches.append((lot_id, units_to_use, days_held, available))
             remaining_units -= units_to_use
-            record['units'] -= units_to_use  # Update available units
-            
-            print(f"   ✅ Used {units_to_use} long-term units from {record['date']} @ ${record['total_cost_per_unit_aud']:.2f} AUD")
-        
-        # Step 2: If still need units, use short-term holdings with highest AUD cost basis
-        if remaining_units > 0:
-            print(f"   🔄 Still need {remaining_units} units, checking short-term holdings...")
-            short_term_records = [r for r in available_records if not r['long_term'] and r['units'] > 0]
-            short_term_records.sort(key=lambda x: x['total_cost_per_unit_aud'], reverse=True)  # Highest AUD cost first
-            
-            print(f"   📉 Short-term records: {len(short_term_records)}")
-            
-            for record in short_term_records:
-                if remaining_units <= 0:
-                    break
-                    
-                units_to_use = min(remaining_units, record['units'])
-                
-                selected_units.append({
-                    'units': units_to_use,
-                    'price': record['price'],                    # USD price per unit
-                    'commission': record['commission'] * (units_to_use / record['units']),
-                    'price_aud': record['price_aud'],           # AUD price per unit
-                    'commission_aud': record['commission_aud'] * (units_to_use / record['units']),
-                    'exchange_rate': record['exchange_rate'],
-                    'buy_date': record['date'],
-                    'days_held': record['days_held'],
-                    'long_term_eligible': False,
-                    'total_cost_usd': (units_to_use * record['price']) + (record['commission'] * (units_to_use / record['units'])),
-                    'total_cost_aud': (units_to_use * record['price_aud']) + (record['commission_aud'] * (units_to_use / record['units'])),
-                    'cost_per_unit_aud': record['total_cost_per_unit_aud']
-                })
-                
-                remaining_units -= units_to_use
-                record['units'] -= units_to_use
-                
-                print(f"   ⚠️ Used {units_to_use} short-term units from {record['date']} @ ${record['total_cost_per_unit_aud']:.2f} AUD")
-        
-        print(f"   ✅ Selection complete: {len(selected_units)} batches selected, {remaining_units} units still needed")
-        
-        return selected_units, remaining_units, available_records
-        
-    except Exception as e:
-        print(f"   ❌ Error in unit selection: {e}")
-        print(f"   🔧 Traceback: {traceback.format_exc()}")
-        return [], units_needed, []
+            lot_units[lot_id] = available - units_to_use
 
-# LOCATION 1: Replace the function definition 
-# Find this function in your script and replace it entirely:
+    return matches, remaining_units
 
-def calculate_australian_cgt_aud(sales_df, cost_basis_dict):
+
+def _tax_optimal_lot_groups(lot_entries, lot_units, sell_date):
     """
-    Calculate Australian Capital Gains Tax using RBA daily rates for BOTH buys and sales.
-    This ensures consistency and accuracy for ATO reporting.
+    Long-term then short-term lot candidates, each highest AUD cost first.
+
+    The one definition of the tax-optimal order, shared by the calculator and
+    order_lots_for_sale_aud(). Returns two lists of (sort cost, lot ID, days held).
     """
-    print(f"\n🇦🇺 CALCULATING AUSTRALIAN CGT WITH RBA DAILY RATES")
-    print(f"📊 Processing {len(sales_df)} sales transactions")
-    print(f"💱 Using RBA daily exchange rates for all sales (same as buy-side)")
-    print("=" * 60)
-    
-    # Create a working copy of cost basis dictionary
-    working_cost_basis = {}
-    for symbol, records in cost_basis_dict.items():
-        working_cost_basis[symbol] = [record.copy() for record in records]
-    
-    cgt_records = []
-    warnings_list = []
-    
-    # Cache for exchange rates to avoid repeated API calls
-    rate_cache = {}
-    
+    long_term = []
+    short_term = []
+    for lot_id, buy_date, price_aud, commission_aud in lot_entries:
+        units = lot_units[lot_id]
+        if units <= 0:
+            continue
+        days_held = (sell_date - buy_date).days if buy_date is not None else 0
+        candidate = (price_aud + (commission_aud / max(units, 1)), lot_id, days_held)
+        if days_held >= 365:
+            long_term.append(candidate)
+        else:
+            short_term.append(candidate)
+
+    long_term.sort(key=lambda x: x[0], reverse=True)  # Highest AUD cost first
+    short_term.sort(key=lambda x: x[0], reverse=True)
+    return long_term, short_term
+
+
+def _sale_column(sales_df, column, fallback_column=None, default=0.0):
+    """Read a numeric sales column (with fallback column name) as a float array."""
+    if column in sales_df.columns:
+        values = sales_df[column]
+    elif fallback_column and fallback_column in sales_df.columns:
+        values = sales_df[fallback_column]
+    else:
+        return np.full(len(sales_df), default, dtype=float)
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+
+
+def _build_cgt_dataframe(sales, match_sale, match_lot, match_units, match_days, match_lot_units, lot_table):
+    """
+    Compute every CGT column from the match table with column-wise NumPy operations.
+
+    Units_Sold and Units_Matched are int64 when the sale units and the lot
+    units are integers, as in the row-wise records, and float64 otherwise.
+
+    Args:
+        sales (dict): Per-sale arrays for the processed sales
+        match_*: Match table columns (sale index, lot ID, units, days held, lot units before match)
+        lot_table (CGTLotTable): Lots referenced by the match table
+
+    Returns:
+        DataFrame: CGT records with CGT_COLUMNS
+    """
+    if not match_sale:
+        return pd.DataFrame(columns=CGT_COLUMNS)
+
+    s = np.asarray(match_sale, dtype=np.int64)
+    lot = np.asarray(match_lot, dtype=np.int64)
+    units = np.asarray(match_units, dtype=float)
+    days_held = np.asarray(match_days, dtype=np.int64)
+    lot_units_before = np.asarray(match_lot_units, dtype=float)
+
+    matched = lot >= 0
+    no_cost_basis = lot == NO_COST_BASIS_LOT
+    lot_ix = np.where(matched, lot, 0)
+
+    def lot_column(values):
+        column = np.array([np.nan if v is None else v for v in values] or [0.0], dtype=float)
+        return column[lot_ix]
+
+    units_sold = sales['units_sold'][s]
+    rate = sales['exchange_rate'][s]
+    total_proceeds_usd = sales['total_proceeds_usd'][s]
+    sale_commission_usd = sales['sale_commission_usd'][s]
+    net_proceeds_usd = sales['net_proceeds_usd'][s]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        proportion = np.where(matched, units / np.where(matched, units_sold, 1.0), 1.0)
+        row_units = np.where(matched, units, units_sold)
+
+        proceeds_usd = total_proceeds_usd * proportion
+        commission_usd = sale_commission_usd * proportion
+        net_usd = net_proceeds_usd * proportion
+
+        price_aud = np.where(matched, lot_column(lot_table.price_aud), 0.0)
+        buy_commission_aud = np.where(
+            matched, lot_column(lot_table.commission_aud) * (units / np.where(matched, lot_units_before, 1.0)), 0.0
+        )
+
+    net_aud = net_usd / rate
+    cost_basis_aud = np.where(matched, (units * price_aud) + buy_commission_aud, 0.0)
+
+    capital_gain_aud = np.where(matched, net_aud - cost_basis_aud, np.where(no_cost_basis, net_aud, 0.0))
+    long_term = matched & (days_held >= 365)
+    discount_applied = long_term & (capital_gain_aud > 0)
+    taxable_gain_aud = np.where(discount_applied, capital_gain_aud * 0.5, capital_gain_aud)
+
+    warning = sales['warning'][s]
+    warning = np.where(no_cost_basis, 'NO COST BASIS DATA', warning)
+    warning = np.where(lot == NO_UNITS_LOT, 'NO UNITS AVAILABLE', warning)
+
+    buy_date = np.array(lot_table.date + ['N/A'], dtype=object)[np.where(matched, lot, len(lot_table.date))]
+
+    units_matched = np.where(matched, units, 0.0)
+    if sales['integer_units'] and lot_table.integer_units:
+        row_units = row_units.astype(np.int64)
+        units_matched = units_matched.astype(np.int64)
+
+    return pd.DataFrame({
+        'Sale_Date': sales['sale_date'][s],
+        'Symbol': sales['symbol'][s],
+        'Units_Sold': row_units,
+        'Sale_Price_Per_Unit_USD': sales['sale_price_usd'][s],
+        'Sale_Price_Per_Unit_AUD': sales['sale_price_usd'][s] / rate,
+        'Total_Proceeds_USD': proceeds_usd,
+        'Total_Proceeds_AUD': proceeds_usd / rate,
+        'Sale_Commission_USD': commission_usd,
+        'Sale_Commission_AUD': commission_usd / rate,
+        'Net_Proceeds_AUD': net_aud,
+        'Buy_Date': buy_date,
+        'Buy_Price_Per_Unit_AUD': price_aud,
+        'Buy_Commission_AUD': buy_commission_aud,
+        'Units_Matched': units_matched,
+        'Days_Held': np.where(matched, days_held, 0),
+        'Long_Term_Eligible': long_term,
+        'Cost_Basis_AUD': cost_basis_aud,
+        'Capital_Gain_Loss_AUD': capital_gain_aud,
+        'CGT_Discount_Applied': discount_applied,
+        'Taxable_Gain_AUD': taxable_gain_aud,
+        'Purchase_Exchange_Rate': np.where(matched, lot_column(lot_table.exchange_rate), 0.0),
+        'Sale_Exchange_Rate': rate,
+        'Warning': warning
+    }, columns=CGT_COLUMNS)
+
+
+def calculate_cgt_batch_aud(sales_df, lot_store, lot_table, rate_cache, warnings_list, verbose=True,
+                            strategy='tax_optimal', progress_callback=None):
+    """
+    Match one batch of sales against the lot table and build its CGT records.
+
+    Lot state lives in lot_table (and lot_store), so consecutive batches of a
+    date-sorted sale history continue where the previous batch stopped.
+    Call lot_table.commit(lot_store) after the last batch.
+
+    Args:
+        sales_df (DataFrame): Sales in this batch, sorted by Trade Date
+        lot_store (CostBasisLotStore): Cost basis the lots are loaded from
+        lot_table (CGTLotTable): Working lots shared across batches
+        rate_cache (dict): Sale exchange rate cache shared across batches
+        warnings_list (list): Warnings are appended here
+        verbose (bool): Print a line per sale and per warning
+        strategy (str): Lot matching strategy, one of CGT_STRATEGIES
+        progress_callback (callable): Called with (sales matched, total sales)
+
+    Returns:
+        DataFrame: CGT records for this batch (CGT_COLUMNS)
+    """
+    # Sale columns, read once
+    symbols = sales_df['Symbol'].tolist()
+    sale_dates = pd.to_datetime(sales_df['Trade Date'], errors='coerce').tolist()
+    units_sold_col = np.abs(_sale_column(sales_df, 'Units_Sold', 'Quantity'))
+    units_column = 'Units_Sold' if 'Units_Sold' in sales_df.columns else 'Quantity'
+    integer_units = units_column in sales_df.columns and pd.api.types.is_integer_dtype(sales_df[units_column])
+    sale_price_col = np.abs(_sale_column(sales_df, 'Sale_Price_Per_Unit', 'Price (USD)'))
+    sale_commission_col = np.abs(_sale_column(sales_df, 'Commission_Paid', 'Commission (USD)'))
+    total_proceeds_col = np.abs(_sale_column(sales_df, 'Total_Proceeds', 'Proceeds (USD)'))
+    if 'Net_Proceeds' in sales_df.columns:
+        net_proceeds_col = _sale_column(sales_df, 'Net_Proceeds')
+    else:
+        net_proceeds_col = total_proceeds_col - sale_commission_col
+
+    # Per processed sale
+    sale_rows = []
+    sale_date_strs = []
+    sale_rates = []
+    sale_warnings = []
+
+    # Match table: (sale index, lot ID, units, days held) + lot units before the match
+    match_sale = []
+    match_lot = []
+    match_units = []
+    match_days = []
+    match_lot_units = []
+
     # Process each sale transaction
-    for index, sale in sales_df.iterrows():
+    for row, (symbol, sale_date) in enumerate(zip(symbols, sale_dates)):
+        if progress_callback is not None:
+            progress_callback(row, len(symbols))
         try:
-            symbol = sale['Symbol']
-            units_sold = abs(sale.get('Units_Sold', sale.get('Quantity', 0)))
-            sale_price_per_unit_usd = abs(sale.get('Sale_Price_Per_Unit', sale.get('Price (USD)', 0)))
-            sale_date = sale['Trade Date']
-            sale_commission_usd = abs(sale.get('Commission_Paid', sale.get('Commission (USD)', 0)))
-            total_proceeds_usd = abs(sale.get('Total_Proceeds', sale.get('Proceeds (USD)', 0)))
-            net_proceeds_usd = sale.get('Net_Proceeds', total_proceeds_usd - sale_commission_usd)
-            
-            print(f"\n📉 Processing sale: {units_sold} units of {symbol} on {sale_date.strftime('%d.%m.%y')}")
-            
+            units_sold = units_sold_col[row]
+            sale_date_str = sale_date.strftime('%d.%m.%y')
+
+            if verbose:
+                print(f"\n📉 Processing sale: {units_sold} units of {symbol} on {sale_date_str}")
+
             # *** FIX: Get actual RBA daily rate for sale date ***
             sale_exchange_rate = get_rba_exchange_rate(sale_date, cache=rate_cache)
-            
-            # Check if symbol exists in cost basis
-            if symbol not in working_cost_basis:
+
+            lot_entries = lot_table.lots_for_sale(symbol, sale_date, lot_store)
+
+            sale_index = len(sale_rows)
+            warning_msg = ""
+
+            if lot_entries is None:
                 warning_msg = f"❌ NO COST BASIS FOUND for {symbol}"
                 warnings_list.append(warning_msg)
-                print(f"   {warning_msg}")
-                
-                cgt_records.append({
-                    'Sale_Date': sale_date.strftime('%d.%m.%y'),
-                    'Symbol': symbol,
-                    'Units_Sold': units_sold,
-                    'Sale_Price_Per_Unit_USD': sale_price_per_unit_usd,
-                    'Sale_Price_Per_Unit_AUD': sale_price_per_unit_usd / sale_exchange_rate,
-                    'Total_Proceeds_USD': total_proceeds_usd,
-                    'Total_Proceeds_AUD': total_proceeds_usd / sale_exchange_rate,
-                    'Sale_Commission_USD': sale_commission_usd,
-                    'Sale_Commission_AUD': sale_commission_usd / sale_exchange_rate,
-                    'Net_Proceeds_AUD': net_proceeds_usd / sale_exchange_rate,
-                    'Buy_Date': 'N/A',
-                    'Buy_Price_Per_Unit_AUD': 0,
-                    'Buy_Commission_AUD': 0,
-                    'Units_Matched': 0,
-                    'Days_Held': 0,
-                    'Long_Term_Eligible': False,
-                    'Cost_Basis_AUD': 0,
-                    'Capital_Gain_Loss_AUD': net_proceeds_usd / sale_exchange_rate,
-                    'CGT_Discount_Applied': False,
-                    'Taxable_Gain_AUD': net_proceeds_usd / sale_exchange_rate,
-                    'Purchase_Exchange_Rate': 0,
-                    'Sale_Exchange_Rate': sale_exchange_rate,
-                    'Warning': 'NO COST BASIS DATA'
-                })
-                continue
-            
-            # Select optimal units for this sale
-            print(f"   🔄 Selecting optimal cost basis for {units_sold} units...")
-            
-            selected_units, missing_units, updated_records = select_optimal_units_for_cgt_aud(
-                working_cost_basis[symbol], units_sold, sale_date
-            )
-            
-            # Update the working cost basis with remaining units
-            working_cost_basis[symbol] = updated_records
-            
-            # Check if we got any selected units
-            if not selected_units:
-                warning_msg = f"❌ NO UNITS AVAILABLE for {symbol}"
-                warnings_list.append(warning_msg)
-                print(f"   {warning_msg}")
-                
-                cgt_records.append({
-                    'Sale_Date': sale_date.strftime('%d.%m.%y'),
-                    'Symbol': symbol,
-                    'Units_Sold': units_sold,
-                    'Sale_Price_Per_Unit_USD': sale_price_per_unit_usd,
-                    'Sale_Price_Per_Unit_AUD': sale_price_per_unit_usd / sale_exchange_rate,
-                    'Total_Proceeds_USD': total_proceeds_usd,
-                    'Total_Proceeds_AUD': total_proceeds_usd / sale_exchange_rate,
-                    'Sale_Commission_USD': sale_commission_usd,
-                    'Sale_Commission_AUD': sale_commission_usd / sale_exchange_rate,
-                    'Net_Proceeds_AUD': net_proceeds_usd / sale_exchange_rate,
-                    'Buy_Date': 'N/A',
-                    'Buy_Price_Per_Unit_AUD': 0,
-                    'Buy_Commission_AUD': 0,
-                    'Units_Matched': 0,
-                    'Days_Held': 0,
-                    'Long_Term_Eligible': False,
-                    'Cost_Basis_AUD': 0,
-                    'Capital_Gain_Loss_AUD': 0,
-                    'CGT_Discount_Applied': False,
-                    'Taxable_Gain_AUD': 0,
-                    'Purchase_Exchange_Rate': 0,
-                    'Sale_Exchange_Rate': sale_exchange_rate,
-                    'Warning': 'NO UNITS AVAILABLE'
-                })
-                continue
-            
-            # Create detailed records for each matched purchase
-            for unit_selection in selected_units:
-                try:
-                    # Calculate proportional proceeds for this portion
-                    proportion = unit_selection['units'] / units_sold
-                    proportional_proceeds_usd = total_proceeds_usd * proportion
-                    proportional_sale_commission_usd = sale_commission_usd * proportion
-                    proportional_net_proceeds_usd = net_proceeds_usd * proportion
-                    
-                    # *** CONVERT TO AUD USING DAILY RBA RATE ***
-                    proportional_proceeds_aud = proportional_proceeds_usd / sale_exchange_rate
-                    proportional_sale_commission_aud = proportional_sale_commission_usd / sale_exchange_rate
-                    proportional_net_proceeds_aud = proportional_net_proceeds_usd / sale_exchange_rate
-                    
-                    # Get AUD cost basis (already converted at purchase date using daily rates)
-                    cost_basis_aud = unit_selection['total_cost_aud']
-                    
-                    # Calculate AUD gain/loss (PRIMARY CALCULATION FOR ATO)
-                    capital_gain_loss_aud = proportional_net_proceeds_aud - cost_basis_aud
-                    
-                    # Apply Australian CGT discount if eligible
-                    cgt_discount_applied = unit_selection['long_term_eligible'] and capital_gain_loss_aud > 0
-                    taxable_gain_aud = capital_gain_loss_aud
-                    if cgt_discount_applied:
-                        taxable_gain_aud = capital_gain_loss_aud * 0.5  # 50% CGT discount
-                    
-                    # Warning for missing units
-                    warning_msg = ""
-                    if missing_units > 0:
-                        warning_msg = f"MISSING {missing_units:.2f} UNITS"
-                    
-                    cgt_records.append({
-                        'Sale_Date': sale_date.strftime('%d.%m.%y'),
-                        'Symbol': symbol,
-                        'Units_Sold': unit_selection['units'],
-                        'Sale_Price_Per_Unit_USD': sale_price_per_unit_usd,
-                        'Sale_Price_Per_Unit_AUD': sale_price_per_unit_usd / sale_exchange_rate,
-                        'Total_Proceeds_USD': proportional_proceeds_usd,
-                        'Total_Proceeds_AUD': proportional_proceeds_aud,
-                        'Sale_Commission_USD': proportional_sale_commission_usd,
-                        'Sale_Commission_AUD': proportional_sale_commission_aud,
-                        'Net_Proceeds_AUD': proportional_net_proceeds_aud,
-                        'Buy_Date': unit_selection['buy_date'],
-                        'Buy_Price_Per_Unit_AUD': unit_selection['price_aud'],
-                        'Buy_Commission_AUD': unit_selection['commission_aud'],
-                        'Units_Matched': unit_selection['units'],
-                        'Days_Held': unit_selection['days_held'],
-                        'Long_Term_Eligible': unit_selection['long_term_eligible'],
-                        'Cost_Basis_AUD': cost_basis_aud,
-                        'Capital_Gain_Loss_AUD': capital_gain_loss_aud,
-                        'CGT_Discount_Applied': cgt_discount_applied,
-                        'Taxable_Gain_AUD': taxable_gain_aud,
-                        'Purchase_Exchange_Rate': unit_selection.get('exchange_rate', 0),
-                        'Sale_Exchange_Rate': sale_exchange_rate,
-                        'Warning': warning_msg
-                    })
-                    
-                    print(f"   ✅ Matched {unit_selection['units']:.2f} units from {unit_selection['buy_date']}")
-                    print(f"      💱 Buy rate: {unit_selection.get('exchange_rate', 0):.4f}, Sale rate: {sale_exchange_rate:.4f}")
-                    print(f"      💰 AUD: Cost ${cost_basis_aud:.2f}, Proceeds ${proportional_net_proceeds_aud:.2f}, Gain ${capital_gain_loss_aud:.2f}")
-                    
-                except Exception as e:
-                    print(f"   ❌ Error processing unit selection: {e}")
-                    continue
-            
+                if verbose:
+                    print(f"   {warning_msg}")
+                matches = [(NO_COST_BASIS_LOT, 0.0, 0, 0.0)]
+                missing_units = 0
+            else:
+                matches, missing_units = _match_sale_to_lots(
+                    lot_entries, lot_table.units, units_sold, sale_date, strategy
+                )
+
+                if not matches:
+                    warning_msg = f"❌ NO UNITS AVAILABLE for {symbol}"
+                    warnings_list.append(warning_msg)
+                    if verbose:
+                        print(f"   {warning_msg}")
+                    matches = [(NO_UNITS_LOT, 0.0, 0, 0.0)]
+                    missing_units = 0
+
+            for lot_id, units, days_held, lot_units_before in matches:
+                match_sale.append(sale_index)
+                match_lot.append(lot_id)
+                match_units.append(units)
+                match_days.append(days_held)
+                match_lot_units.append(lot_units_before)
+
+            sale_rows.append(row)
+            sale_date_strs.append(sale_date_str)
+            sale_rates.append(sale_exchange_rate)
+            sale_warnings.append(f"MISSING {missing_units:.2f} UNITS" if missing_units > 0 else "")
+
             if missing_units > 0:
                 warning_msg = f"⚠️  {symbol}: Missing {missing_units:.2f} units for complete matching"
                 warnings_list.append(warning_msg)
-                print(f"   {warning_msg}")
-                
+                if verbose:
+                    print(f"   {warning_msg}")
+
         except Exception as e:
-            print(f"   ❌ Error processing sale {index}: {e}")
+            print(f"   ❌ Error processing sale {sales_df.index[row]}: {e}")
             continue
-    
-    # Create remaining cost basis dictionary
-    remaining_cost_basis = {}
-    for symbol, records in working_cost_basis.items():
-        remaining_records = []
-        for record in records:
-            if record.get('units', 0) > 0:
-                remaining_records.append({
-                    'units': record['units'],
-                    'price': record.get('price', 0),
-                    'commission': record.get('commission', 0),
-                    'price_aud': record.get('price_aud', record.get('price', 0)),
-                    'commission_aud': record.get('commission_aud', record.get('commission', 0)),
-                    'exchange_rate': record.get('exchange_rate', 0),
-                    'date': record.get('date', '01.01.24')
-                })
-        
-        if remaining_records:
-            remaining_cost_basis[symbol] = remaining_records
-    
+
+    if progress_callback is not None:
+        progress_callback(len(symbols), len(symbols))
+
+    rows = np.asarray(sale_rows, dtype=np.int64)
+    sales = {
+        'symbol': np.array(symbols, dtype=object)[rows] if len(rows) else np.array([], dtype=object),
+        'sale_date': np.array(sale_date_strs, dtype=object),
+        'units_sold': units_sold_col[rows],
+        'sale_price_usd': sale_price_col[rows],
+        'sale_commission_usd': sale_commission_col[rows],
+        'total_proceeds_usd': total_proceeds_col[rows],
+        'net_proceeds_usd': net_proceeds_col[rows],
+        'exchange_rate': np.asarray(sale_rates, dtype=float),
+        'warning': np.array(sale_warnings, dtype=object),
+        'integer_units': integer_units
+    }
+
+    return _build_cgt_dataframe(
+        sales, match_sale, match_lot, match_units, match_days, match_lot_units, lot_table
+    )
+
+
+def calculate_australian_cgt_aud(sales_df, cost_basis_dict, strategy='tax_optimal', progress_callback=None):
+    """
+    Calculate Australian Capital Gains Tax using RBA daily rates for BOTH buys and sales.
+    This ensures consistency and accuracy for ATO reporting.
+
+    The match step only records compact (sale index, lot ID, units, days held)
+    tuples; proceeds, commissions, AUD conversions, gains and the CGT discount
+    are then computed column-wise over the whole match table.
+
+    cost_basis_dict may be a plain cost basis dictionary (never modified) or a
+    CostBasisLotStore, which receives the consumption deltas. Use
+    CostBasisLotStore(base).fork() to run what-if scenarios against one base.
+    remaining_cost_basis never shares lists or records with the input; the
+    records of symbols that were not sold are copied as they are.
+
+    strategy selects the lot matching order: 'tax_optimal' (default) or 'fifo'.
+    progress_callback, if given, is called with (sales matched, total sales).
+    """
+    if strategy not in CGT_STRATEGIES:
+        raise ValueError(f"Unknown CGT strategy '{strategy}' (expected one of {CGT_STRATEGIES})")
+
+    print(f"\n🇦🇺 CALCULATING AUSTRALIAN CGT WITH RBA DAILY RATES")
+    print(f"📊 Processing {len(sales_df)} sales transactions")
+    print(f"💱 Using RBA daily exchange rates for all sales (same as buy-side)")
+    print("=" * 60)
+
+    # Copy-on-write view: only symbols that are sold get loaded into the lot table
+    if isinstance(cost_basis_dict, CostBasisLotStore):
+        lot_store = cost_basis_dict
+    else:
+        lot_store = CostBasisLotStore(cost_basis_dict)
+
+    warnings_list = []
+
+    # Cache for exchange rates to avoid repeated API calls
+    rate_cache = {}
+
+    lot_table = CGTLotTable()
+
+    cgt_df = calculate_cgt_batch_aud(sales_df, lot_store, lot_table, rate_cache, warnings_list,
+                                     strategy=strategy, progress_callback=progress_callback)
+
+    # Remaining cost basis: untouched symbols are copied, touched ones rebuilt from deltas
+    lot_table.commit(lot_store)
+    remaining_cost_basis = lot_store.remaining_cost_basis(copy=True)
+
     print(f"\n✅ CGT calculation complete with RBA daily rates:")
-    print(f"   📊 {len(cgt_records)} matched transactions")
+    print(f"   📊 {len(cgt_df)} matched transactions")
     print(f"   💱 Used {len(rate_cache)} unique daily exchange rates")
     print(f"   ⚠️  {len(warnings_list)} warnings")
     print(f"   📋 {len(remaining_cost_basis)} symbols with remaining units")
-    
+
     # Show rate summary
     print(f"\n💱 Exchange Rate Summary:")
     for date_str, rate in sorted(rate_cache.items()):
         print(f"   {date_str}: {rate:.4f} AUD/USD")
-    
-    return pd.DataFrame(cgt_records), remaining_cost_basis, warnings_list
+
+    return cgt_df, remaining_cost_basis, warnings_list
+
+# AUD-focused columns for the ATO report sheets
+ATO_REPORT_COLUMNS = [
+    'Sale_Date', 'Symbol', 'Units_Sold',
+    'Sale_Price_Per_Unit_USD',    # ← ADDED THIS FOR QA
+    'Sale_Price_Per_Unit_AUD',
+    'Total_Proceeds_AUD', 'Sale_Commission_AUD', 'Net_Proceeds_AUD',
+    'Buy_Date', 'Buy_Price_Per_Unit_AUD', 'Buy_Commission_AUD',
+    'Days_Held', 'Long_Term_Eligible', 'Cost_Basis_AUD',
+    'Capital_Gain_Loss_AUD', 'CGT_Discount_Applied', 'Taxable_Gain_AUD',
+    'Purchase_Exchange_Rate', 'Sale_Exchange_Rate',  # Also useful for QA
+    'Warning'
+]
+
+
+class ATOSummaryAccumulator:
+    """
+    Running ATO summary figures over CGT records.
+
+    update() can be called once with a full cgt_df or once per batch when
+    streaming; each call is a single grouped aggregation pass.
+    """
+
+    def __init__(self):
+        self.total_capital_gains_aud = 0.0
+        self.total_capital_losses_aud = 0.0
+        self.net_capital_gain_aud = 0.0
+        self.total_taxable_gains_aud = 0.0
+        self.long_term_gains_aud = 0.0
+        self.short_term_gains_aud = 0.0
+        self.cgt_discount_count = 0
+        self.long_term_count = 0
+        self.short_term_count = 0
+        self.record_count = 0
+
+    def update(self, cgt_df):
+        """Add a batch of CGT records to the running totals."""
+        if len(cgt_df) == 0:
+            return
+
+        gain = cgt_df['Capital_Gain_Loss_AUD']
+        frame = pd.DataFrame({
+            'long_term': (cgt_df['Long_Term_Eligible'] == True).to_numpy(),
+            'sign': np.sign(gain.to_numpy(dtype=float)),
+            'gain': gain.to_numpy(dtype=float),
+            'taxable': cgt_df['Taxable_Gain_AUD'].to_numpy(dtype=float),
+            'discount': cgt_df['CGT_Discount_Applied'].to_numpy(dtype=float)
+        })
+        grouped = frame.groupby(['long_term', 'sign'], dropna=False).agg(
+            gain=('gain', 'sum'), taxable=('taxable', 'sum'),
+            discount=('discount', 'sum'), rows=('gain', 'size')
+        )
+
+        for (long_term, sign), row in grouped.iterrows():
+            self.net_capital_gain_aud += row['gain']
+            self.total_taxable_gains_aud += row['taxable']
+            self.cgt_discount_count += int(row['discount'])
+            self.record_count += int(row['rows'])
+            if sign > 0:
+                self.total_capital_gains_aud += row['gain']
+            elif sign < 0:
+                self.total_capital_losses_aud += row['gain']
+            if long_term:
+                self.long_term_gains_aud += row['gain']
+                self.long_term_count += int(row['rows'])
+            else:
+                self.short_term_gains_aud += row['gain']
+                self.short_term_count += int(row['rows'])
+
+    def summary_df(self, financial_year):
+        """ATO_Summary sheet contents."""
+        return pd.DataFrame({
+            'ATO_Reporting_Item': [
+                'Total Capital Gains (AUD)',
+                'Total Capital Losses (AUD)',
+                'Net Capital Gain/Loss (AUD)',
+                'Long-term Capital Gains (AUD)',
+                'Short-term Capital Gains (AUD)',
+                'Transactions with CGT Discount',
+                'TAXABLE AMOUNT FOR ATO (AUD)',
+                'Financial Year'
+            ],
+            'Amount_AUD': [
+                self.total_capital_gains_aud,
+                self.total_capital_losses_aud,
+                self.net_capital_gain_aud,
+                self.long_term_gains_aud,
+                self.short_term_gains_aud,
+                self.cgt_discount_count,
+                self.total_taxable_gains_aud,  # THIS IS THE KEY AMOUNT FOR ATO
+                financial_year
+            ],
+            'Notes': [
+                'Gains before CGT discount',
+                'Losses to offset against gains',
+                'Net position before CGT discount',
+                'Gains eligible for 50% CGT discount',
+                'Gains not eligible for CGT discount',
+                'Number of transactions with 50% discount applied',
+                '*** REPORT THIS AMOUNT TO ATO ***',
+                'Australian Financial Year'
+            ]
+        })
+
+    def print_summary(self, financial_year):
+        """Display the ATO summary."""
+        print(f"\n🇦🇺 ATO REPORTING SUMMARY FOR FY {financial_year}:")
+        print(f"   💰 Total Capital Gains: ${self.total_capital_gains_aud:,.2f} AUD")
+        print(f"   💰 Total Capital Losses: ${self.total_capital_losses_aud:,.2f} AUD")
+        print(f"   💰 Net Capital Gain: ${self.net_capital_gain_aud:,.2f} AUD")
+        print(f"   📋 Taxable Amount (report to ATO): ${self.total_taxable_gains_aud:,.2f} AUD")
+        print(f"   🟢 Long-term transactions: {self.long_term_count}")
+        print(f"   🟡 Short-term transactions: {self.short_term_count}")
+        print(f"   ✅ CGT discount applied: {int(self.cgt_discount_count)} transactions")
+
+
+def _excel_value(value):
+    """Convert a cell value to something both Excel backends accept."""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and (np.isnan(value) or np.isinf(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def _excel_rows(df):
+    """Rows of a DataFrame as tuples of plain Python values, NaN/inf as None."""
+    cells = df.astype(object)
+    keep = df.notna()
+    for column in df.select_dtypes(include='number').columns:
+        keep[column] &= np.isfinite(df[column].to_numpy(dtype=float))
+    return cells.where(keep, None).itertuples(index=False, name=None)
+
+
+class StreamingWorkbook:
+    """
+    Row-by-row Excel writer with bounded memory.
+
+    Uses xlsxwriter in constant_memory mode when installed, otherwise an
+    openpyxl write-only workbook. Rows must be appended in order per sheet.
+    output_file may be a path or a binary file object (e.g. BytesIO).
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        if XLSXWRITER_AVAILABLE:
+            import xlsxwriter
+            self.engine = 'xlsxwriter'
+            self._book = xlsxwriter.Workbook(output_file, {'constant_memory': True})
+        elif EXCEL_AVAILABLE:
+            import openpyxl
+            self.engine = 'openpyxl'
+            self._book = openpyxl.Workbook(write_only=True)
+        else:
+            raise RuntimeError("Neither xlsxwriter nor openpyxl is installed")
+        self._next_row = {}
+
+    def add_sheet(self, name, columns=None):
+        """Create a sheet, optionally writing a header row."""
+        if self.engine == 'xlsxwriter':
+            sheet = self._book.add_worksheet(name)
+        else:
+            sheet = self._book.create_sheet(name)
+        self._next_row[name] = 0
+        if columns is not None:
+            self.append_row(name, columns)
+        return name
+
+    def append_row(self, sheet, values):
+        """Append one row to a sheet."""
+        values = [_excel_value(v) for v in values]
+        if self.engine == 'xlsxwriter':
+            self._book.get_worksheet_by_name(sheet).write_row(self._next_row[sheet], 0, values)
+        else:
+            self._book[sheet].append(values)
+        self._next_row[sheet] += 1
+
+    def append_dataframe(self, sheet, df):
+        """Append every row of a DataFrame (no header) to a sheet."""
+        row_number = self._next_row[sheet]
+        if self.engine == 'xlsxwriter':
+            worksheet = self._book.get_worksheet_by_name(sheet)
+            for values in _excel_rows(df):
+                worksheet.write_row(row_number, 0, values)
+                row_number += 1
+        else:
+            worksheet = self._book[sheet]
+            for values in _excel_rows(df):
+                worksheet.append(values)
+                row_number += 1
+        self._next_row[sheet] = row_number
+
+    def write_dataframe(self, name, df):
+        """Create a sheet holding a DataFrame with its header."""
+        self.add_sheet(name, list(df.columns))
+        self.append_dataframe(name, df)
+
+    def close(self):
+        """Finish the workbook and write it to output_file."""
+        if self.engine == 'xlsxwriter':
+            self._book.close()
+        else:
+            self._book.save(self.output_file)
 
 def save_cgt_excel_aud(cgt_df, financial_year, output_file=None):
-    """Save AUD CGT calculations to Excel file formatted for Australian ATO reporting."""
+    """
+    Save AUD CGT calculations to Excel file formatted for Australian ATO reporting.
+
+    Summary figures come from one grouped pass (ATOSummaryAccumulator) and
+    sheets are streamed row by row (StreamingWorkbook), so large reports are
+    written with bounded memory. output_file may also be a binary file object.
+    """
     
-    if not EXCEL_AVAILABLE:
+    if not (EXCEL_AVAILABLE or XLSXWRITER_AVAILABLE):
         print("❌ openpyxl not available - cannot create Excel file")
+        print("Install with: pip install openpyxl")
         return None
     
     if output_file is None:
@@ -583,102 +1045,37 @@ def save_cgt_excel_aud(cgt_df, financial_year, output_file=None):
     print(f"\n💾 Creating AUD CGT Excel report for ATO: {output_file}")
     
     try:
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-            
-            # Main CGT sheet (AUD focus)
-            # Select AUD-focused columns for ATO reporting
-            aud_columns = [
-                'Sale_Date', 'Symbol', 'Units_Sold', 
-                'Sale_Price_Per_Unit_USD',    # ← ADDED THIS FOR QA
-                'Sale_Price_Per_Unit_AUD',
-                'Total_Proceeds_AUD', 'Sale_Commission_AUD', 'Net_Proceeds_AUD',
-                'Buy_Date', 'Buy_Price_Per_Unit_AUD', 'Buy_Commission_AUD',
-                'Days_Held', 'Long_Term_Eligible', 'Cost_Basis_AUD',
-                'Capital_Gain_Loss_AUD', 'CGT_Discount_Applied', 'Taxable_Gain_AUD',
-                'Purchase_Exchange_Rate', 'Sale_Exchange_Rate',  # Also useful for QA
-                'Warning'
-            ]
-            
-            cgt_aud_df = cgt_df[aud_columns].copy()
-            cgt_aud_df.to_excel(writer, sheet_name='CGT_Calculations_AUD', index=False)
-            
-            # ATO Summary sheet
-            total_capital_gains_aud = cgt_df[cgt_df['Capital_Gain_Loss_AUD'] > 0]['Capital_Gain_Loss_AUD'].sum()
-            total_capital_losses_aud = cgt_df[cgt_df['Capital_Gain_Loss_AUD'] < 0]['Capital_Gain_Loss_AUD'].sum()
-            net_capital_gain_aud = cgt_df['Capital_Gain_Loss_AUD'].sum()
-            total_taxable_gains_aud = cgt_df['Taxable_Gain_AUD'].sum()
-            long_term_gains_aud = cgt_df[cgt_df['Long_Term_Eligible'] == True]['Capital_Gain_Loss_AUD'].sum()
-            short_term_gains_aud = cgt_df[cgt_df['Long_Term_Eligible'] == False]['Capital_Gain_Loss_AUD'].sum()
-            cgt_discount_count = cgt_df['CGT_Discount_Applied'].sum()
-            
-            summary_data = {
-                'ATO_Reporting_Item': [
-                    'Total Capital Gains (AUD)',
-                    'Total Capital Losses (AUD)', 
-                    'Net Capital Gain/Loss (AUD)',
-                    'Long-term Capital Gains (AUD)',
-                    'Short-term Capital Gains (AUD)',
-                    'Transactions with CGT Discount',
-                    'TAXABLE AMOUNT FOR ATO (AUD)',
-                    'Financial Year'
-                ],
-                'Amount_AUD': [
-                    total_capital_gains_aud,
-                    total_capital_losses_aud,
-                    net_capital_gain_aud,
-                    long_term_gains_aud,
-                    short_term_gains_aud,
-                    cgt_discount_count,
-                    total_taxable_gains_aud,  # THIS IS THE KEY AMOUNT FOR ATO
-                    financial_year
-                ],
-                'Notes': [
-                    'Gains before CGT discount',
-                    'Losses to offset against gains',
-                    'Net position before CGT discount',
-                    'Gains eligible for 50% CGT discount',
-                    'Gains not eligible for CGT discount',
-                    'Number of transactions with 50% discount applied',
-                    '*** REPORT THIS AMOUNT TO ATO ***',
-                    'Australian Financial Year'
-                ]
-            }
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='ATO_Summary', index=False)
-            
-            # Exchange Rate Information
-            exchange_rate_data = []
-            for _, row in cgt_df.iterrows():
-                if row.get('Purchase_Exchange_Rate', 0) > 0:
-                    exchange_rate_data.append({
-                        'Symbol': row['Symbol'],
-                        'Buy_Date': row['Buy_Date'],
-                        'Sale_Date': row['Sale_Date'],
-                        'Purchase_Exchange_Rate': row['Purchase_Exchange_Rate'],
-                        'Sale_Exchange_Rate': row['Sale_Exchange_Rate'],
-                        'Rate_Source': 'RBA Historical Data'
-                    })
-            
-            if exchange_rate_data:
-                exchange_df = pd.DataFrame(exchange_rate_data).drop_duplicates()
-                exchange_df.to_excel(writer, sheet_name='Exchange_Rates', index=False)
-            
-            # Warnings sheet (if any)
-            warnings_data = cgt_df[cgt_df['Warning'] != '']
-            if len(warnings_data) > 0:
-                warnings_data[aud_columns].to_excel(writer, sheet_name='Warnings', index=False)
+        summary = ATOSummaryAccumulator()
+        summary.update(cgt_df)
+        
+        book = StreamingWorkbook(output_file)
+        
+        # Main CGT sheet (AUD focus)
+        book.write_dataframe('CGT_Calculations_AUD', cgt_df[ATO_REPORT_COLUMNS])
+        
+        # ATO Summary sheet
+        book.write_dataframe('ATO_Summary', summary.summary_df(financial_year))
+        
+        # Exchange Rate Information
+        exchange_df = cgt_df.loc[
+            cgt_df['Purchase_Exchange_Rate'] > 0,
+            ['Symbol', 'Buy_Date', 'Sale_Date', 'Purchase_Exchange_Rate', 'Sale_Exchange_Rate']
+        ]
+        if len(exchange_df) > 0:
+            exchange_df = exchange_df.assign(Rate_Source='RBA Historical Data').drop_duplicates()
+            book.write_dataframe('Exchange_Rates', exchange_df)
+        
+        # Warnings sheet (if any)
+        warnings_data = cgt_df[cgt_df['Warning'] != '']
+        if len(warnings_data) > 0:
+            book.write_dataframe('Warnings', warnings_data[ATO_REPORT_COLUMNS])
+        
+        book.close()
         
         print(f"✅ AUD CGT report saved: {output_file}")
         
         # Display ATO summary
-        print(f"\n🇦🇺 ATO REPORTING SUMMARY FOR FY {financial_year}:")
-        print(f"   💰 Total Capital Gains: ${total_capital_gains_aud:,.2f} AUD")
-        print(f"   💰 Total Capital Losses: ${total_capital_losses_aud:,.2f} AUD")
-        print(f"   💰 Net Capital Gain: ${net_capital_gain_aud:,.2f} AUD")
-        print(f"   📋 Taxable Amount (report to ATO): ${total_taxable_gains_aud:,.2f} AUD")
-        print(f"   🟢 Long-term transactions: {len(cgt_df[cgt_df['Long_Term_Eligible'] == True])}")
-        print(f"   🟡 Short-term transactions: {len(cgt_df[cgt_df['Long_Term_Eligible'] == False])}")
-        print(f"   ✅ CGT discount applied: {int(cgt_discount_count)} transactions")
+        summary.print_summary(financial_year)
         
         return output_file
         
@@ -687,21 +1084,42 @@ def save_cgt_excel_aud(cgt_df, financial_year, output_file=None):
         print(f"🔧 Traceback: {traceback.format_exc()}")
         return None
 
-def save_remaining_cost_basis_aud(remaining_cost_basis, financial_year, output_file=None):
-    """Save remaining AUD cost basis dictionary to JSON file."""
+def save_remaining_cost_basis_aud(remaining_cost_basis, financial_year, output_file=None,
+                                  snapshot_store=None, parent=None, changed=None):
+    """
+    Save remaining AUD cost basis dictionary to JSON file.
+
+    With a snapshot_store (cost_basis_snapshots.SnapshotStore) the result is
+    saved as a snapshot tagged post_FY<year> instead of a full JSON copy;
+    parent and changed (symbols touched since the parent snapshot) let it
+    reuse the parent's chunks. Returns the file name or the snapshot id.
+    """
     
     if output_file is None:
         output_file = f"cost_basis_dictionary_AUD_post_FY{financial_year}.json"
     
     try:
-        with open(output_file, 'w') as f:
-            json.dump(remaining_cost_basis, f, indent=2)
-        
-        print(f"✅ Remaining AUD cost basis saved: {output_file}")
+        if snapshot_store is not None:
+            manifest = snapshot_store.save_snapshot(remaining_cost_basis, tag=f"post_FY{financial_year}",
+                                                    source=output_file, parent=parent, changed=changed)
+            output_file = manifest['id']
+            print(f"✅ Remaining AUD cost basis snapshot: {output_file} "
+                  f"({manifest['new_chunks']} new, {manifest['reused_chunks']} reused chunks)")
+        else:
+            with open(output_file, 'w') as f:
+                if hasattr(remaining_cost_basis, 'write_json'):
+                    remaining_cost_basis.write_json(f)  # Lazy: unsold symbols copied without parsing
+                else:
+                    json.dump(remaining_cost_basis, f, indent=2)
+            
+            print(f"✅ Remaining AUD cost basis saved: {output_file}")
         
         total_symbols = len(remaining_cost_basis)
-        total_units = sum(sum(record['units'] for record in records) for records in remaining_cost_basis.values())
-        total_value_aud = sum(sum(record['units'] * record.get('price_aud', record.get('price', 0)) for record in records) for records in remaining_cost_basis.values())
+        if hasattr(remaining_cost_basis, 'holdings_totals'):
+            total_units, total_value_aud = remaining_cost_basis.holdings_totals()
+        else:
+            total_units = sum(sum(record['units'] for record in records) for records in remaining_cost_basis.values())
+            total_value_aud = sum(sum(record['units'] * record.get('price_aud', record.get('price', 0)) for record in records) for records in remaining_cost_basis.values())
         
         print(f"📊 Remaining holdings (AUD):")
         print(f"   🏷️  Symbols: {total_symbols}")
@@ -743,7 +1161,7 @@ def main():
     # Remove duplicates and sort
     sales_files = sorted(list(set(sales_files)))
     
-    cost_basis_files = [f for f in os.listdir('.') if ('cost_basis' in f.lower() or 'unified' in f.lower()) and 'aud' in f.lower() and f.endswith('.json')]
+    cost_basis_files = [f for f in os.listdir('.') if ('cost_basis' in f.lower() or 'unified' in f.lower()) and 'aud' in f.lower() and f.endswith(('.json', BINARY_EXTENSION))]
     
     print("🔍 Found potential files:")
     if sales_files:
@@ -787,7 +1205,8 @@ def main():
     # Load input files
     print(f"\n🔄 Loading input files...")
     sales_df = load_sales_csv(sales_file)
-    cost_basis_dict = load_cost_basis_json_aud(cost_basis_file)
+    lazy = os.path.exists(cost_basis_file) and os.path.getsize(cost_basis_file) >= LAZY_LOAD_MIN_BYTES
+    cost_basis_dict = load_cost_basis_json_aud(cost_basis_file, lazy=lazy)
     
     if sales_df is None or cost_basis_dict is None:
         print("❌ Failed to load input files")
@@ -0,0 +1,537 @@
+#!/usr/bin/env python3
+"""
+SQLite Store for Transactions, Lots, Rates and CGT Runs
+
+One embedded database instead of re-globbing and re-parsing CSV/HTML/JSON
+files for every question. CGTDatabase is a small repository API over five
+tables:
+- transactions       normalized trades (Symbol, Date, Activity, ...), one row each
+- lots               cost basis dictionaries saved under a label, one row per lot
+- rates              RBA AUD/USD rates by date
+- cgt_runs           one row per CGT calculation (FY, strategy, totals)
+- lot_consumptions   the CGT records of each run (one row per lot matched)
+
+Transactions and consumptions are indexed on (symbol, date) and
+financial_year, so each layer reads just the symbols or year it needs:
+- FIFO (fifo_cost_basis) reads the symbols' BUYs, their SELLs up to the
+  cutoff and the rates in that date range, and can rebuild only the
+  symbols with new trades
+- CGT (run_cgt) reads one FY's sales and only the sold symbols' lots
+- cgt_pipeline.py --db reads its transactions and rates from the store
+Writes use executemany in WAL mode. The web app is not backed by the store:
+its inputs are per-session uploads rather than a shared trade history.
+
+Usage:
+    python cgt_database.py --db cgt.db ingest [--rates-folder rates]
+    python cgt_database.py --db cgt.db import-cost-basis cost_basis.json post_FY2023-24
+    python cgt_database.py --db cgt.db fifo post_FY2023-24 --cutoff 2024-06-30 [--symbol AAPL ...]
+    python cgt_database.py --db cgt.db run 2024-25 post_FY2023-24 [--strategy fifo]
+    python cgt_database.py --db cgt.db runs
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    CGT_COLUMNS, CGT_STRATEGIES, calculate_australian_cgt_aud, parse_date_from_cost_basis
+)
+from cgt_multi_year import build_sales_history, financial_year_for_date
+from complete_unified_with_aud import RBAAUDConverter, apply_hybrid_fifo_processing_with_aud, robust_date_parser
+
+DEFAULT_DATABASE = 'cgt.db'
+
+# Days before a trade the converter may fall back to for its rate
+RATE_FALLBACK_DAYS = 7
+
+TRANSACTION_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price', 'Commission', 'Source']
+
+LOT_KEYS = ('units', 'price', 'commission', 'price_aud', 'commission_aud', 'exchange_rate', 'date')
+
+_SQL_TYPES = {
+    'Sale_Date': 'TEXT', 'Symbol': 'TEXT', 'Buy_Date': 'TEXT', 'Warning': 'TEXT',
+    'Days_Held': 'INTEGER', 'Long_Term_Eligible': 'INTEGER', 'CGT_Discount_Applied': 'INTEGER'
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    trade_date TEXT NOT NULL,
+    activity TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL NOT NULL,
+    commission REAL NOT NULL DEFAULT 0,
+    source TEXT,
+    financial_year TEXT NOT NULL,
+    UNIQUE (symbol, trade_date, activity, quantity, price)
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_symbol_date ON transactions (symbol, trade_date);
+CREATE INDEX IF NOT EXISTS idx_transactions_fy ON transactions (financial_year, activity);
+
+CREATE TABLE IF NOT EXISTS lots (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    lot_index INTEGER NOT NULL,
+    units REAL NOT NULL,
+    price REAL,
+    commission REAL,
+    price_aud REAL,
+    commission_aud REAL,
+    exchange_rate REAL,
+    date TEXT,
+    buy_date TEXT,
+    UNIQUE (label, symbol, lot_index)
+);
+CREATE INDEX IF NOT EXISTS idx_lots_symbol_date ON lots (label, symbol, buy_date);
+
+CREATE TABLE IF NOT EXISTS rates (
+    rate_date TEXT PRIMARY KEY,
+    aud_usd REAL NOT NULL,
+    source TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cgt_runs (
+    id INTEGER PRIMARY KEY,
+    financial_year TEXT NOT NULL,
+    strategy TEXT NOT NULL,
+    cost_basis_label TEXT,
+    created TEXT NOT NULL,
+    record_count INTEGER NOT NULL,
+    total_gain_loss_aud REAL NOT NULL,
+    total_taxable_gain_aud REAL NOT NULL,
+    warning_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cgt_runs_fy ON cgt_runs (financial_year);
+
+CREATE TABLE IF NOT EXISTS lot_consumptions (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES cgt_runs (id) ON DELETE CASCADE,
+    financial_year TEXT NOT NULL,
+    sale_date_iso TEXT,
+    {', '.join(f'{column} {_SQL_TYPES.get(column, "REAL")}' for column in CGT_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS idx_consumptions_run ON lot_consumptions (run_id);
+CREATE INDEX IF NOT EXISTS idx_consumptions_symbol_date ON lot_consumptions (Symbol, sale_date_iso);
+CREATE INDEX IF NOT EXISTS idx_consumptions_fy ON lot_consumptions (financial_year);
+"""
+
+
+def _iso_date(value):
+    """ISO date string for a transaction or cost basis date, None if unreadable."""
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.strftime('%Y-%m-%d')
+    parsed = robust_date_parser(value)
+    return parsed.strftime('%Y-%m-%d') if parsed.year > 1900 else None
+
+
+def _lot_buy_date(date_str):
+    try:
+        return parse_date_from_cost_basis(date_str).strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def _placeholders(values):
+    return ', '.join('?' for _ in values)
+
+
+class CGTDatabase:
+    """Repository over the SQLite CGT store."""
+
+    def __init__(self, path=DEFAULT_DATABASE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA foreign_keys=ON')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _query_df(self, sql, params=()):
+        return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    # ------------------------------------------------------------ transactions
+
+    def ingest_transactions(self, combined_df):
+        """
+        Insert normalized transactions (load_all_transactions() layout).
+        Duplicates on (Symbol, Date, Activity, Quantity, Price) are ignored.
+        Returns the number of new rows.
+        """
+        rows = []
+        skipped = 0
+        for symbol, date, activity, quantity, price, commission, source in zip(
+                combined_df['Symbol'], combined_df['Date'], combined_df['Activity'],
+                pd.to_numeric(combined_df['Quantity'], errors='coerce').abs(),
+                pd.to_numeric(combined_df['Price'], errors='coerce').abs(),
+                pd.to_numeric(combined_df['Commission'], errors='coerce').abs().fillna(0.0),
+                combined_df['Source'] if 'Source' in combined_df else [None] * len(combined_df)):
+            trade_date = _iso_date(date)
+            if trade_date is None or pd.isna(quantity) or pd.isna(price):
+                skipped += 1
+                continue
+            rows.append((symbol, trade_date, activity, float(quantity), float(price), float(commission), source,
+                         financial_year_for_date(datetime.strptime(trade_date, '%Y-%m-%d'))))
+
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO transactions '
+                '(symbol, trade_date, activity, quantity, price, commission, source, financial_year) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+        inserted = self.connection.total_changes - before
+        if skipped:
+            print(f"⚠️ Skipped {skipped} transactions with unreadable dates or amounts")
+        return inserted
+
+    def transactions(self, symbols=None, start_date=None, end_date=None, financial_year=None, activity=None,
+                     sells_until=None):
+        """
+        Transactions in the load_all_transactions() layout, Date as YYYY-MM-DD.
+        sells_until keeps every BUY but only the SELLs up to that date (the
+        hybrid FIFO slice).
+        """
+        conditions = []
+        params = []
+        if symbols is not None:
+            symbols = list(symbols)
+            conditions.append(f'symbol IN ({_placeholders(symbols)})')
+            params.extend(symbols)
+        if start_date is not None:
+            conditions.append('trade_date >= ?')
+            params.append(_iso_date(start_date))
+        if end_date is not None:
+            conditions.append('trade_date <= ?')
+            params.append(_iso_date(end_date))
+        if financial_year is not None:
+            conditions.append('financial_year = ?')
+            params.append(financial_year)
+        if activity is not None:
+            conditions.append('activity = ?')
+            params.append(activity)
+        if sells_until is not None:
+            conditions.append("(activity != 'SOLD' OR trade_date <= ?)")
+            params.append(_iso_date(sells_until))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._query_df(
+            'SELECT symbol AS Symbol, trade_date AS Date, activity AS Activity, quantity AS Quantity, '
+            f'price AS Price, commission AS Commission, source AS Source FROM transactions {where} '
+            'ORDER BY trade_date, id', params
+        )
+
+    def symbols(self):
+        return [row[0] for row in self.connection.execute('SELECT DISTINCT symbol FROM transactions ORDER BY symbol')]
+
+    def sales_for_financial_year(self, financial_year):
+        """Sales DataFrame for calculate_australian_cgt_aud() covering one FY."""
+        return build_sales_history(self.transactions(financial_year=financial_year, activity='SOLD'))
+
+    # ------------------------------------------------------------ lots
+
+    def save_cost_basis(self, cost_basis_dict, label, symbols=None):
+        """
+        Save a cost basis dictionary under label, replacing the label's
+        previous lots, or only those of symbols if given.
+        """
+        with self.connection:
+            self._delete_lots(label, symbols)
+            return self._insert_lots(cost_basis_dict, label)
+
+    def _delete_lots(self, label, symbols=None):
+        if symbols is None:
+            self.connection.execute('DELETE FROM lots WHERE label = ?', (label,))
+        else:
+            symbols = list(symbols)
+            self.connection.execute(f'DELETE FROM lots WHERE label = ? AND symbol IN ({_placeholders(symbols)})',
+                                    [label] + symbols)
+
+    def _insert_lots(self, cost_basis_dict, label):
+        rows = []
+        for symbol, records in cost_basis_dict.items():
+            for index, record in enumerate(records):
+                rows.append((label, symbol, index) + tuple(record.get(key) for key in LOT_KEYS)
+                            + (_lot_buy_date(record.get('date')),))
+        self.connection.executemany(
+            f"INSERT INTO lots (label, symbol, lot_index, {', '.join(LOT_KEYS)}, buy_date) "
+            f"VALUES ({_placeholders(range(len(LOT_KEYS) + 4))})", rows
+        )
+        return len(rows)
+
+    def load_cost_basis(self, label, symbols=None):
+        """Cost basis dictionary saved under label, optionally only some symbols."""
+        params = [label]
+        where = 'label = ?'
+        if symbols is not None:
+            symbols = list(symbols)
+            where += f' AND symbol IN ({_placeholders(symbols)})'
+            params.extend(symbols)
+
+        cost_basis_dict = {}
+        cursor = self.connection.execute(
+            f"SELECT symbol, {', '.join(LOT_KEYS)} FROM lots WHERE {where} ORDER BY symbol, lot_index", params
+        )
+        for symbol, units, price, commission, price_aud, commission_aud, exchange_rate, date in cursor:
+            if price_aud is None:
+                record = {'units': units, 'price': price, 'commission': commission, 'date': date}
+            else:
+                record = {'units': units, 'price': price, 'commission': commission, 'price_aud': price_aud,
+                          'commission_aud': commission_aud, 'exchange_rate': exchange_rate, 'date': date}
+            cost_basis_dict.setdefault(symbol, []).append(record)
+        return cost_basis_dict
+
+    def cost_basis_labels(self):
+        return [row[0] for row in self.connection.execute('SELECT DISTINCT label FROM lots ORDER BY label')]
+
+    def _copy_lots(self, from_label, to_label, exclude_symbols):
+        exclude_symbols = list(exclude_symbols)
+        self.connection.execute(
+            f"INSERT INTO lots (label, symbol, lot_index, {', '.join(LOT_KEYS)}, buy_date) "
+            f"SELECT ?, symbol, lot_index, {', '.join(LOT_KEYS)}, buy_date FROM lots "
+            f"WHERE label = ? AND symbol NOT IN ({_placeholders(exclude_symbols)})",
+            [to_label, from_label] + exclude_symbols
+        )
+
+    def save_remaining_cost_basis(self, remaining, from_label, to_label, sold_symbols):
+        """
+        Save the cost basis left after a CGT run over from_label's lots.
+
+        remaining holds only the sold symbols; the other symbols' lots are
+        copied inside the database. When to_label is from_label only the
+        sold symbols' lots are replaced. One transaction either way.
+        """
+        with self.connection:
+            if to_label == from_label:
+                self._delete_lots(to_label, sold_symbols)
+            else:
+                self._delete_lots(to_label)
+                self._copy_lots(from_label, to_label, sold_symbols)
+            self._insert_lots(remaining, to_label)
+
+    # ------------------------------------------------------------ FIFO
+
+    def fifo_cost_basis(self, sell_cutoff_date=None, symbols=None, label=None):
+        """
+        Hybrid FIFO cost basis from the stored transactions and rates.
+
+        Only the slice FIFO needs is read: the symbols' BUYs, their SELLs up
+        to sell_cutoff_date and the rates covering those trades. With symbols
+        (e.g. those with new trades) and a label, only those symbols' lots
+        are replaced under the label.
+
+        Returns (cost_basis_dict, conversion_errors).
+        """
+        transactions = self.transactions(symbols=symbols, sells_until=sell_cutoff_date)
+        if len(transactions) == 0:
+            return {}, []
+
+        first_trade = datetime.strptime(transactions['Date'].iloc[0], '%Y-%m-%d')
+        converter = self.aud_converter(first_trade - timedelta(days=RATE_FALLBACK_DAYS),
+                                       transactions['Date'].iloc[-1])
+        cost_basis_dict, _, conversion_errors = apply_hybrid_fifo_processing_with_aud(transactions, converter)
+        if label is not None:
+            self.save_cost_basis(cost_basis_dict, label,
+                                 symbols=None if symbols is None else transactions['Symbol'].unique().tolist())
+        return cost_basis_dict, conversion_errors
+
+    def content_digest(self):
+        """Digest of the stored transactions and rates, to key caches built from them."""
+        state = [
+            self.connection.execute('SELECT COUNT(*), MAX(id), TOTAL(quantity * price + commission) '
+                                    'FROM transactions').fetchone(),
+            self.connection.execute('SELECT COUNT(*), MIN(rate_date), MAX(rate_date), TOTAL(aud_usd) '
+                                    'FROM rates').fetchone()
+        ]
+        return hashlib.sha256(repr(state).encode('utf-8')).hexdigest()
+
+    # ------------------------------------------------------------ rates
+
+    def save_rates(self, rates, source=None):
+        """Save {YYYY-MM-DD: AUD/USD rate} (or an RBAAUDConverter's rates)."""
+        rates = getattr(rates, 'exchange_rates', rates)
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO rates (rate_date, aud_usd, source) VALUES (?, ?, ?)',
+                [(date, float(rate), source) for date, rate in rates.items()]
+            )
+        return len(rates)
+
+    def rate_for_date(self, date, max_days_back=7):
+        """AUD/USD rate for a date, falling back up to max_days_back earlier days."""
+        date = robust_date_parser(date) if not isinstance(date, datetime) else date
+        row = self.connection.execute(
+            'SELECT aud_usd FROM rates WHERE rate_date <= ? AND rate_date >= ? ORDER BY rate_date DESC LIMIT 1',
+            (date.strftime('%Y-%m-%d'), (date - timedelta(days=max_days_back)).strftime('%Y-%m-%d'))
+        ).fetchone()
+        return row[0] if row else None
+
+    def aud_converter(self, start_date=None, end_date=None):
+        """RBAAUDConverter filled from the rates table (optionally a date range)."""
+        sql = 'SELECT rate_date, aud_usd FROM rates'
+        params = []
+        if start_date is not None or end_date is not None:
+            sql += ' WHERE rate_date >= ? AND rate_date <= ?'
+            params = [_iso_date(start_date) if start_date is not None else '0000-00-00',
+                      _iso_date(end_date) if end_date is not None else '9999-99-99']
+        converter = RBAAUDConverter()
+        converter.exchange_rates = dict(self.connection.execute(sql + ' ORDER BY rate_date', params))
+        if converter.exchange_rates:
+            dates = list(converter.exchange_rates)
+            converter.date_range = (pd.Timestamp(dates[0]), pd.Timestamp(dates[-1]))
+        return converter
+
+    # ------------------------------------------------------------ CGT runs
+
+    def save_cgt_run(self, cgt_df, financial_year, strategy='tax_optimal', cost_basis_label=None, warning_count=0):
+        """Save a CGT run and its records; returns the run id."""
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO cgt_runs (financial_year, strategy, cost_basis_label, created, record_count, '
+                'total_gain_loss_aud, total_taxable_gain_aud, warning_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (financial_year, strategy, cost_basis_label, datetime.now().isoformat(timespec='seconds'),
+                 len(cgt_df), float(cgt_df['Capital_Gain_Loss_AUD'].sum()) if len(cgt_df) else 0.0,
+                 float(cgt_df['Taxable_Gain_AUD'].sum()) if len(cgt_df) else 0.0, warning_count)
+            )
+            run_id = cursor.lastrowid
+
+            sale_dates_iso = pd.to_datetime(cgt_df['Sale_Date'], format='%d.%m.%y', errors='coerce')
+            records = cgt_df[CGT_COLUMNS].astype(object).where(cgt_df[CGT_COLUMNS].notna(), None)
+            rows = [
+                (run_id, financial_year, None if pd.isna(iso) else iso.strftime('%Y-%m-%d')) + tuple(values)
+                for iso, values in zip(sale_dates_iso, records.itertuples(index=False, name=None))
+            ]
+            self.connection.executemany(
+                f"INSERT INTO lot_consumptions (run_id, financial_year, sale_date_iso, {', '.join(CGT_COLUMNS)}) "
+                f"VALUES ({_placeholders(range(len(CGT_COLUMNS) + 3))})", rows
+            )
+        return run_id
+
+    def cgt_runs(self, financial_year=None):
+        """CGT runs, newest first."""
+        if financial_year is None:
+            return self._query_df('SELECT * FROM cgt_runs ORDER BY id DESC')
+        return self._query_df('SELECT * FROM cgt_runs WHERE financial_year = ? ORDER BY id DESC', [financial_year])
+
+    def cgt_records(self, run_id):
+        """CGT records of one run with CGT_COLUMNS."""
+        df = self._query_df(
+            f"SELECT {', '.join(CGT_COLUMNS)} FROM lot_consumptions WHERE run_id = ? ORDER BY id", [run_id]
+        )
+        return df.astype({'Long_Term_Eligible': bool, 'CGT_Discount_Applied': bool})
+
+    def lot_consumptions(self, symbol=None, financial_year=None, latest_run_only=True):
+        """CGT records across runs, filtered by symbol and/or FY."""
+        conditions = []
+        params = []
+        if symbol is not None:
+            conditions.append('c.Symbol = ?')
+            params.append(symbol)
+        if financial_year is not None:
+            conditions.append('c.financial_year = ?')
+            params.append(financial_year)
+        if latest_run_only:
+            conditions.append('c.run_id IN (SELECT MAX(id) FROM cgt_runs GROUP BY financial_year)')
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return self._query_df(
+            f"SELECT c.run_id, c.financial_year, {', '.join('c.' + column for column in CGT_COLUMNS)} "
+            f"FROM lot_consumptions c {where} ORDER BY c.sale_date_iso, c.id", params
+        )
+
+    def run_cgt(self, financial_year, cost_basis_label, strategy='tax_optimal', remaining_label=None):
+        """
+        CGT for one FY from the stored sales and cost basis, saved as a run.
+
+        Only the lots of symbols sold in the FY are loaded. If remaining_label
+        is given, the remaining cost basis is saved under it (unsold symbols
+        are copied inside the database); it may be cost_basis_label itself.
+
+        Returns (run_id, cgt_df, warnings_list).
+        """
+        if strategy not in CGT_STRATEGIES:
+            raise ValueError(f"Unknown CGT strategy '{strategy}' (expected one of {', '.join(CGT_STRATEGIES)})")
+
+        sales_df = self.sales_for_financial_year(financial_year)
+        sold_symbols = sales_df['Symbol'].unique().tolist()
+        cost_basis_dict = self.load_cost_basis(cost_basis_label, symbols=sold_symbols)
+        cgt_df, remaining, warnings_list = calculate_australian_cgt_aud(sales_df, cost_basis_dict, strategy=strategy)
+
+        run_id = self.save_cgt_run(cgt_df, financial_year, strategy, cost_basis_label, len(warnings_list))
+        if remaining_label is not None:
+            self.save_remaining_cost_basis(remaining, cost_basis_label, remaining_label, sold_symbols)
+        return run_id, cgt_df, warnings_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite store for CGT data")
+    parser.add_argument('--db', default=DEFAULT_DATABASE, help="Database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help="Ingest HTML/CSV transactions (and RBA rates)")
+    ingest.add_argument('--rates-folder', help="Folder with RBA F11 CSV files")
+
+    import_cost_basis = commands.add_parser('import-cost-basis', help="Import a cost basis file under a label")
+    import_cost_basis.add_argument('cost_basis_file')
+    import_cost_basis.add_argument('label')
+
+    fifo = commands.add_parser('fifo', help="Build a hybrid FIFO cost basis from the stored trades and rates")
+    fifo.add_argument('label', help="Save the lots under this label")
+    fifo.add_argument('--cutoff', help="SELL cutoff date (YYYY-MM-DD); BUYs are always included")
+    fifo.add_argument('--symbol', action='append', help="Only rebuild these symbols' lots (repeatable)")
+
+    run = commands.add_parser('run', help="Calculate CGT for a financial year")
+    run.add_argument('financial_year')
+    run.add_argument('cost_basis_label')
+    run.add_argument('--strategy', choices=CGT_STRATEGIES, default='tax_optimal')
+    run.add_argument('--remaining-label', help="Save the remaining cost basis under this label")
+
+    commands.add_parser('runs', help="List CGT runs")
+
+    args = parser.parse_args()
+    with CGTDatabase(args.db) as db:
+        if args.command == 'ingest':
+            from complete_unified_with_aud import load_all_transactions, load_rba_exchange_rates
+            combined_df = load_all_transactions()
+            if combined_df is not None:
+                print(f"✅ {db.ingest_transactions(combined_df)} new transactions stored in {args.db}")
+            if args.rates_folder:
+                converter = load_rba_exchange_rates(args.rates_folder)
+                if converter:
+                    print(f"✅ {db.save_rates(converter, source='RBA F11')} exchange rates stored")
+
+        elif args.command == 'import-cost-basis':
+            from cost_basis_codec import load_cost_basis_file
+            lots = db.save_cost_basis(load_cost_basis_file(args.cost_basis_file), args.label)
+            print(f"✅ {lots} lots stored as '{args.label}'")
+
+        elif args.command == 'fifo':
+            cost_basis_dict, conversion_errors = db.fifo_cost_basis(args.cutoff, args.symbol, args.label)
+            print(f"✅ {sum(len(records) for records in cost_basis_dict.values())} lots for "
+                  f"{len(cost_basis_dict)} symbols stored as '{args.label}' "
+                  f"({len(conversion_errors)} conversion warnings)")
+
+        elif args.command == 'run':
+            run_id, cgt_df, warnings_list = db.run_cgt(args.financial_year, args.cost_basis_label,
+                                                       args.strategy, args.remaining_label)
+            print(f"✅ CGT run {run_id}: {len(cgt_df)} records, {len(warnings_list)} warnings")
+
+        elif args.command == 'runs':
+            print(db.cgt_runs().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Background Jobs for Long CGT Runs
+
+Runs processing functions on a shared worker pool so the caller (the
+Streamlit script thread) never blocks on them. Each job reports per-stage
+progress through a callback, and the registry keys jobs by their inputs:
+submitting a key that is already queued, running or finished attaches to
+that job instead of starting another one.
+
+Usage:
+    registry = JobRegistry(max_workers=2)
+    job = registry.submit(key, func, *args)   # func(*args, progress=job.report)
+    job.snapshot()                            # status, progress, result, error
+"""
+
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+DEFAULT_MAX_WORKERS = 2
+
+# Jobs waiting or running at once; None means unbounded
+DEFAULT_MAX_PENDING = None
+
+# Finished jobs kept for pick-up on rerun; the oldest are dropped first
+DEFAULT_KEEP_FINISHED = 32
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobRegistry.submit when max_pending jobs are already waiting or running."""
+
+
+class CGTJob:
+    """One submitted job: status, per-stage progress and the final result."""
+
+    def __init__(self, key):
+        self.key = key
+        self.status = JOB_QUEUED
+        self.progress = {}
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+        self._finished_event = threading.Event()
+
+    def report(self, stage, done, total=None, message=None):
+        """Progress callback: record that `done` of `total` items of `stage` are complete."""
+        with self._lock:
+            self.progress[stage] = (done, total)
+            if message is not None:
+                self.message = message
+
+    @property
+    def done(self):
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def elapsed(self):
+        """Seconds spent running (so far, if still running)."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def wait(self, timeout=None):
+        """Block until the job finishes; returns False on timeout."""
+        return self._finished_event.wait(timeout)
+
+    def snapshot(self):
+        """Consistent copy of the job state for display."""
+        with self._lock:
+            return {
+                'key': self.key,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'message': self.message,
+                'result': self.result,
+                'error': self.error,
+                'elapsed': self.elapsed()
+            }
+
+
+class JobRegistry:
+    """
+    Keyed jobs on a thread pool.
+
+    Threads rather than processes: jobs share the warm rate converter and the
+    in-process caches, and most of their time is spent in pandas/numpy.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, keep_finished=DEFAULT_KEEP_FINISHED,
+                 max_pending=DEFAULT_MAX_PENDING):
+        self.max_workers = max_workers
+        self.keep_finished = keep_finished
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cgt-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, key, func, *args, **kwargs):
+        """
+        Run func(*args, progress=job.report, **kwargs) in the background and
+        return its CGTJob. A key whose job is queued, running or done returns
+        that job; a failed job is replaced by a fresh attempt. Raises
+        JobQueueFull if a new job would exceed max_pending.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != JOB_FAILED:
+                self._jobs.move_to_end(key)
+                return job
+
+            if self.max_pending is not None and self._pending() >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs already queued or running")
+
+            job = CGTJob(key)
+            self._jobs[key] = job
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def get(self, key):
+        """The job submitted under key, or None."""
+        with self._lock:
+            return self._jobs.get(key)
+
+    def discard(self, key):
+        """Forget a finished job so the next submit runs it again; running jobs are kept."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.done:
+                del self._jobs[key]
+
+    def jobs(self):
+        """Snapshots of all known jobs, oldest first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.snapshot() for job in jobs]
+
+    def pending(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return self._pending()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, func, args, kwargs):
+        with job._lock:
+            job.status = JOB_RUNNING
+            job.started = time.time()
+
+        try:
+            result = func(*args, progress=job.report, **kwargs)
+            with job._lock:
+                job.result = result
+                job.status = JOB_DONE
+        except Exception as e:
+            with job._lock:
+                job.error = str(e)
+                job.traceback = traceback.format_exc()
+                job.status = JOB_FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._prune()
+            job._finished_event.set()
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if not job.done)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond keep_finished (caller holds the lock)."""
+        finished = [key for key, job in self._jobs.items() if job.done]
+        for key in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[key]
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Multi-Year Chained Australian CGT Run
+
+Replays the full transaction history once and produces, for every financial
+year:
+- The CGT records (same columns as calculate_australian_cgt_aud())
+- The remaining lots at 30 June
+- Capital losses applied and net capital losses carried forward
+
+All purchases go into one copy-on-write lot store and one lot table is kept
+across years, so each lot is loaded and matched once for the whole history
+instead of rebuilding and reloading a cost basis JSON per year. A lot only
+becomes available to sales on or after its buy date.
+
+Usage:
+    python cgt_multi_year.py --rates-folder rates --from-fy 2021-22 [--snapshot-store snapshots]
+"""
+
+import argparse
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    CGT_STRATEGIES, CGTLotTable, calculate_cgt_batch_aud, parse_date_from_cost_basis,
+    save_cgt_excel_aud, save_remaining_cost_basis_aud
+)
+from complete_unified_with_aud import (
+    create_purchase_record_with_aud, format_date_for_output, load_all_transactions,
+    load_rba_exchange_rates, robust_date_parser
+)
+from cost_basis_lot_store import CostBasisLotStore
+
+
+def financial_year_for_date(date):
+    """Australian financial year label ('2024-25') for a date."""
+    start_year = date.year if date.month >= 7 else date.year - 1
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+
+def financial_year_end(financial_year):
+    """30 June that ends a financial year label."""
+    return datetime(int(financial_year[:4]) + 1, 6, 30)
+
+
+def _next_financial_year(financial_year):
+    start_year = int(financial_year[:4]) + 1
+    return f"{start_year}-{str(start_year + 1)[-2:]}"
+
+
+def build_purchase_history(combined_df, aud_converter):
+    """
+    Convert every BUY in the transaction history to a cost basis record.
+
+    Returns:
+        tuple: (cost basis dictionary with all purchases per symbol in date
+               order, list of conversion errors)
+    """
+    buys = combined_df[combined_df['Activity'] == 'PURCHASED'].copy()
+    buys['date_obj'] = buys['Date'].apply(robust_date_parser)
+    buys = buys.sort_values('date_obj', kind='stable')
+
+    purchase_history = {}
+    conversion_errors = []
+    for symbol, date_value, date_obj, quantity, price, commission in zip(
+            buys['Symbol'], buys['Date'], buys['date_obj'],
+            buys['Quantity'], buys['Price'], buys['Commission']):
+        purchase, error_msg = create_purchase_record_with_aud(
+            symbol, float(quantity), float(price), float(commission),
+            date_obj, format_date_for_output(date_value), aud_converter
+        )
+        if error_msg:
+            conversion_errors.append(error_msg)
+        purchase_history.setdefault(symbol, []).append(purchase)
+
+    return purchase_history, conversion_errors
+
+
+def build_sales_history(combined_df):
+    """
+    All SELL transactions as a date-sorted sales DataFrame for the CGT
+    calculator, with a Financial_Year column.
+    """
+    sells = combined_df[combined_df['Activity'] == 'SOLD']
+    trade_dates = pd.to_datetime(sells['Date'].apply(robust_date_parser))
+
+    quantity = pd.to_numeric(sells['Quantity'], errors='coerce').abs()
+    price = pd.to_numeric(sells['Price'], errors='coerce').abs()
+    commission = pd.to_numeric(sells['Commission'], errors='coerce').abs()
+
+    sales_df = pd.DataFrame({
+        'Symbol': sells['Symbol'].values,
+        'Trade Date': trade_dates.values,
+        'Units_Sold': quantity.values,
+        'Sale_Price_Per_Unit': price.values,
+        'Total_Proceeds': (quantity * price).values,
+        'Commission_Paid': commission.values,
+        'Net_Proceeds': (quantity * price - commission).values,
+        'Source': sells['Source'].values
+    })
+
+    # robust_date_parser() returns 1900-01-01 for dates it cannot read
+    unparsed = sales_df['Trade Date'].dt.year <= 1900
+    if unparsed.any():
+        print(f"⚠️ Skipping {int(unparsed.sum())} sales with unreadable dates")
+        sales_df = sales_df[~unparsed]
+
+    sales_df = sales_df.sort_values('Trade Date', kind='stable').reset_index(drop=True)
+    sales_df['Financial_Year'] = sales_df['Trade Date'].apply(financial_year_for_date)
+    return sales_df
+
+
+def capital_gain_totals_aud(cgt_df):
+    """(discountable gains, other gains, losses) in AUD from CGT records, losses as a positive amount."""
+    gains = cgt_df['Capital_Gain_Loss_AUD'].fillna(0.0)
+    long_term = cgt_df['Long_Term_Eligible'] == True
+
+    return (
+        float(gains[long_term & (gains > 0)].sum()),
+        float(gains[~long_term & (gains > 0)].sum()),
+        float(-gains[gains < 0].sum())
+    )
+
+
+def apply_capital_losses_aud(cgt_df, carried_forward_loss_aud=0.0):
+    """
+    Net capital gain for one financial year, ATO method.
+
+    Current-year capital losses are applied first, then net capital losses
+    carried forward from earlier years. Losses reduce gains that do not get
+    the CGT discount before discountable (12-month) gains, and the 50%
+    discount applies to what is left of the discountable gains. Unused losses
+    carry forward to the next year.
+
+    Returns:
+        dict: gains, losses applied and net capital gain in AUD
+    """
+    return net_capital_gain_aud(*capital_gain_totals_aud(cgt_df), carried_forward_loss_aud)
+
+
+def net_capital_gain_aud(discountable_gains, other_gains, current_year_losses, carried_forward_loss_aud=0.0):
+    """apply_capital_losses_aud() from gross totals (see capital_gain_totals_aud())."""
+    total_gains = discountable_gains + other_gains
+
+    current_losses_applied = min(current_year_losses, total_gains)
+    prior_losses_applied = min(carried_forward_loss_aud, total_gains - current_losses_applied)
+    losses_applied = current_losses_applied + prior_losses_applied
+
+    other_gains_left = other_gains - min(losses_applied, other_gains)
+    discountable_gains_left = discountable_gains - max(losses_applied - other_gains, 0.0)
+    net_capital_gain = other_gains_left + discountable_gains_left * 0.5
+
+    return {
+        'Capital_Gains_AUD': total_gains,
+        'Discountable_Gains_AUD': discountable_gains,
+        'Current_Year_Losses_AUD': current_year_losses,
+        'Carried_Forward_Loss_In_AUD': carried_forward_loss_aud,
+        'Current_Year_Losses_Applied_AUD': current_losses_applied,
+        'Prior_Year_Losses_Applied_AUD': prior_losses_applied,
+        'CGT_Discount_AUD': discountable_gains_left * 0.5,
+        'Net_Capital_Gain_AUD': net_capital_gain,
+        'Carried_Forward_Loss_Out_AUD': (
+            carried_forward_loss_aud - prior_losses_applied + current_year_losses - current_losses_applied
+        )
+    }
+
+
+def _holdings_at(remaining_cost_basis, as_of_date, date_cache):
+    """Remaining records bought on or before as_of_date."""
+    holdings = {}
+    for symbol, records in remaining_cost_basis.items():
+        held = []
+        for record in records:
+            date_str = record.get('date', '01.01.24')
+            if date_str not in date_cache:
+                try:
+                    date_cache[date_str] = parse_date_from_cost_basis(date_str)
+                except Exception:
+                    date_cache[date_str] = None
+            buy_date = date_cache[date_str]
+            if buy_date is None or buy_date <= as_of_date:
+                held.append(record)
+        if len(held) == len(records):
+            holdings[symbol] = records
+        elif held:
+            holdings[symbol] = held
+    return holdings
+
+
+def run_multi_year_cgt(purchase_history, sales_df, from_fy=None, to_fy=None, strategy='tax_optimal',
+                       carried_forward_loss_aud=0.0, verbose=False):
+    """
+    Replay the whole sale history against one lot store, year by year.
+
+    Every year is replayed so lot state and losses are correct, but results
+    are only returned for years from from_fy to to_fy.
+
+    Args:
+        purchase_history (dict): All purchases per symbol (build_purchase_history())
+        sales_df (DataFrame): All sales, sorted, with Financial_Year (build_sales_history())
+        from_fy (str): First financial year to report, e.g. '2021-22'
+        to_fy (str): Last financial year to report (default: last year with sales)
+        strategy (str): Lot matching strategy, one of CGT_STRATEGIES
+        carried_forward_loss_aud (float): Net capital loss carried into the first year
+        verbose (bool): Print a line per sale
+
+    Returns:
+        list: One dict per financial year with financial_year, cgt_df,
+              warnings, remaining_cost_basis (holdings at 30 June),
+              changed_symbols (symbols whose holdings may differ from the
+              previous result's) and the apply_capital_losses_aud() figures
+              under 'losses'
+    """
+    if strategy not in CGT_STRATEGIES:
+        raise ValueError(f"Unknown CGT strategy '{strategy}' (expected one of {CGT_STRATEGIES})")
+
+    lot_store = CostBasisLotStore(purchase_history)
+    lot_table = CGTLotTable(as_of_sale_date=True)
+    rate_cache = {}
+    date_cache = {}
+
+    sale_years = sales_df['Financial_Year']
+    years = sorted(set(sale_years))
+    if not years:
+        print("📭 No sales in the transaction history")
+        return []
+    last_fy = to_fy or years[-1]
+
+    print(f"\n🔁 MULTI-YEAR CGT REPLAY: FY {years[0]} to FY {last_fy} ({strategy})")
+    print("=" * 60)
+
+    # Symbols bought in each FY: with that year's sales, what its 30 June holdings change by
+    bought_in = {}
+    for symbol, records in purchase_history.items():
+        for record in records:
+            date_str = record.get('date', '01.01.24')
+            if date_str not in date_cache:
+                try:
+                    date_cache[date_str] = parse_date_from_cost_basis(date_str)
+                except Exception:
+                    date_cache[date_str] = None
+            if date_cache[date_str] is not None:
+                bought_in.setdefault(financial_year_for_date(date_cache[date_str]), set()).add(symbol)
+
+    results = []
+    changed_symbols = set()
+    financial_year = years[0]
+    while financial_year <= last_fy:
+        fy_sales = sales_df[sale_years == financial_year]
+        changed_symbols |= set(fy_sales['Symbol']) | bought_in.get(financial_year, set())
+        warnings_list = []
+        cgt_df = calculate_cgt_batch_aud(fy_sales, lot_store, lot_table, rate_cache, warnings_list,
+                                         verbose=verbose, strategy=strategy)
+
+        losses = apply_capital_losses_aud(cgt_df, carried_forward_loss_aud)
+        carried_forward_loss_aud = losses['Carried_Forward_Loss_Out_AUD']
+
+        if from_fy is None or financial_year >= from_fy:
+            lot_table.commit(lot_store)
+            remaining = _holdings_at(lot_store.remaining_cost_basis(),
+                                     financial_year_end(financial_year), date_cache)
+            results.append({
+                'financial_year': financial_year,
+                'cgt_df': cgt_df,
+                'warnings': warnings_list,
+                'remaining_cost_basis': remaining,
+                'changed_symbols': changed_symbols,
+                'losses': losses
+            })
+            changed_symbols = set()
+
+        print(f"   📅 FY {financial_year}: {len(fy_sales)} sales, "
+              f"net capital gain ${losses['Net_Capital_Gain_AUD']:,.2f} AUD, "
+              f"loss carried forward ${carried_forward_loss_aud:,.2f} AUD")
+
+        financial_year = _next_financial_year(financial_year)
+
+    return results
+
+
+def multi_year_summary_df(results):
+    """One row per financial year with record counts and loss carry-forward figures."""
+    rows = []
+    for result in results:
+        cgt_df = result['cgt_df']
+        rows.append({
+            'Financial_Year': result['financial_year'],
+            'CGT_Records': len(cgt_df),
+            'Warnings': len(result['warnings']),
+            'Taxable_Gain_Before_Losses_AUD': float(cgt_df['Taxable_Gain_AUD'].sum()) if len(cgt_df) else 0.0,
+            **result['losses'],
+            'Symbols_Held_At_30_June': len(result['remaining_cost_basis'])
+        })
+    return pd.DataFrame(rows)
+
+
+def save_multi_year_outputs(results, output_dir="multi_year_cgt", snapshot_store=None):
+    """
+    Write per-FY Excel reports, 30 June cost basis JSON files and a summary CSV.
+
+    With a snapshot_store the 30 June cost bases are saved as a chain of
+    snapshots instead: each year reuses the previous year's chunks for the
+    symbols it did not buy or sell.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    parent = None
+    for result in results:
+        financial_year = result['financial_year']
+        if len(result['cgt_df']) > 0:
+            save_cgt_excel_aud(result['cgt_df'], financial_year,
+                               os.path.join(output_dir, f"Australian_CGT_Report_AUD_FY{financial_year}.xlsx"))
+        parent = save_remaining_cost_basis_aud(
+            result['remaining_cost_basis'], financial_year,
+            os.path.join(output_dir, f"cost_basis_dictionary_AUD_post_FY{financial_year}.json"),
+            snapshot_store=snapshot_store, parent=parent, changed=result['changed_symbols']
+        )
+
+    summary_file = os.path.join(output_dir, "Multi_Year_CGT_Summary.csv")
+    multi_year_summary_df(results).to_csv(summary_file, index=False)
+    print(f"✅ Multi-year summary saved: {summary_file}")
+    return summary_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chained multi-year Australian CGT run with loss carry-forward")
+    parser.add_argument('--rates-folder', default='rates', help="Folder with RBA FX_*.csv files")
+    parser.add_argument('--from-fy', help="First financial year to report, e.g. 2021-22")
+    parser.add_argument('--to-fy', help="Last financial year to report")
+    parser.add_argument('--strategy', choices=CGT_STRATEGIES, default='tax_optimal')
+    parser.add_argument('--carried-loss', type=float, default=0.0,
+                        help="Net capital loss (AUD) carried into the first year of the history")
+    parser.add_argument('--output-dir', default='multi_year_cgt')
+    parser.add_argument('--snapshot-store', help="Save 30 June cost bases to this snapshot store instead of JSON")
+    args = parser.parse_args()
+
+    print("🇦🇺 MULTI-YEAR AUSTRALIAN CGT (CHAINED)")
+    print("=" * 60)
+
+    aud_converter = load_rba_exchange_rates(args.rates_folder)
+    if not aud_converter:
+        print("❌ Cannot proceed without exchange rate data")
+        return None
+
+    combined_df = load_all_transactions()
+    if combined_df is None:
+        return None
+
+    purchase_history, conversion_errors = build_purchase_history(combined_df, aud_converter)
+    if conversion_errors:
+        print(f"⚠️ {len(conversion_errors)} purchases without an RBA rate (USD amounts used)")
+    sales_df = build_sales_history(combined_df)
+
+    results = run_multi_year_cgt(purchase_history, sales_df, args.from_fy, args.to_fy,
+                                 args.strategy, args.carried_loss)
+    if not results:
+        return None
+
+    snapshot_store = None
+    if args.snapshot_store:
+        from cost_basis_snapshots import SnapshotStore
+        snapshot_store = SnapshotStore(args.snapshot_store)
+    save_multi_year_outputs(results, args.output_dir, snapshot_store)
+    print(f"\n🎉 Reports for {len(results)} financial years saved to {args.output_dir}/")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Parquet/Arrow Export and Reload for CGT Data
+
+Columnar files for the four tables other tools need:
+- CGT records (cgt_df from calculate_australian_cgt_aud())
+- Cost basis dictionaries (remaining or complete), one row per lot
+- The standardized transaction table (Symbol, Date, Activity, ...)
+- FIFO events from apply_hybrid_fifo_processing_with_aud(fifo_events=[...])
+
+Every table has an explicit schema; symbols and other repeated labels are
+dictionary-encoded. Two file layouts are written, chosen by extension:
+
+- .parquet (default): zstd (or snappy) compressed, smallest on disk.
+  Reading decompresses every column into new buffers.
+- .arrow / .feather: uncompressed Arrow IPC. read_table() memory-maps the
+  file and the returned table's buffers point into the mapping, so a
+  reload costs no copy until the data is converted.
+
+The load_* readers accept either layout. Converting to what the calculator
+expects (DataFrames with plain string labels, or the cost basis dictionary)
+does copy the label columns and, for the dictionary, every value.
+
+Requires pyarrow (pip install pyarrow).
+"""
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import CGT_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+DEFAULT_COMPRESSION = 'zstd'
+
+# Extensions written as uncompressed Arrow IPC instead of Parquet
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+ARROW_MAGIC = b'ARROW1'
+
+# Cost basis record keys, in the order the JSON files use
+COST_BASIS_RECORD_KEYS = ('units', 'price', 'commission', 'price_aud', 'commission_aud', 'exchange_rate', 'date')
+
+
+def _require_pyarrow():
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("pyarrow not installed. Install with: pip install pyarrow")
+
+
+def _label():
+    """Dictionary-encoded string column type."""
+    return pa.dictionary(pa.int32(), pa.string())
+
+
+def cgt_schema():
+    """Schema for CGT records (CGT_COLUMNS)."""
+    _require_pyarrow()
+    types = {
+        'Sale_Date': pa.string(),
+        'Symbol': _label(),
+        'Buy_Date': pa.string(),
+        'Days_Held': pa.int64(),
+        'Long_Term_Eligible': pa.bool_(),
+        'CGT_Discount_Applied': pa.bool_(),
+        'Warning': _label()
+    }
+    return pa.schema([pa.field(column, types.get(column, pa.float64())) for column in CGT_COLUMNS])
+
+
+def cost_basis_schema():
+    """Schema for cost basis lots, one row per purchase record."""
+    _require_pyarrow()
+    return pa.schema([
+        pa.field('Symbol', _label()),
+        pa.field('Lot_Index', pa.int32()),
+        pa.field('units', pa.float64()),
+        pa.field('price', pa.float64()),
+        pa.field('commission', pa.float64()),
+        pa.field('price_aud', pa.float64()),        # null for legacy USD-only records
+        pa.field('commission_aud', pa.float64()),
+        pa.field('exchange_rate', pa.float64()),
+        pa.field('date', pa.string())
+    ])
+
+
+def transactions_schema():
+    """Schema for the standardized transaction table."""
+    _require_pyarrow()
+    return pa.schema([
+        pa.field('Symbol', _label()),
+        pa.field('Date', pa.string()),
+        pa.field('Activity', _label()),
+        pa.field('Quantity', pa.float64()),
+        pa.field('Price', pa.float64()),
+        pa.field('Commission', pa.float64()),
+        pa.field('Source', _label())
+    ])
+
+
+def fifo_events_schema():
+    """Schema for structured FIFO events."""
+    _require_pyarrow()
+    return pa.schema([
+        pa.field('Symbol', _label()),
+        pa.field('Sequence', pa.int64()),
+        pa.field('Date', pa.string()),
+        pa.field('Event', _label()),
+        pa.field('Units', pa.float64()),
+        pa.field('Price_USD', pa.float64()),
+        pa.field('Lot_Date', pa.string()),
+        pa.field('Units_Left', pa.float64()),
+        pa.field('Source', _label())
+    ])
+
+
+def _is_arrow_path(path):
+    return str(path).lower().endswith(ARROW_EXTENSIONS)
+
+
+def write_table(table, output_file, compression=DEFAULT_COMPRESSION):
+    """Write an Arrow table as Parquet, or as uncompressed Arrow IPC for .arrow/.feather paths."""
+    _require_pyarrow()
+    if _is_arrow_path(output_file):
+        with pa.OSFile(str(output_file), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        pq.write_table(table, output_file, compression=compression)
+    return output_file
+
+
+def _write_table(df, schema, output_file, compression):
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    return write_table(table, output_file, compression)
+
+
+def save_cgt_parquet(cgt_df, output_file, compression=DEFAULT_COMPRESSION):
+    """Save CGT records to Parquet (or Arrow IPC, see write_table)."""
+    _require_pyarrow()
+    return _write_table(cgt_df, cgt_schema(), output_file, compression)
+
+
+def cost_basis_to_table(cost_basis_dict):
+    """Arrow table of a cost basis dictionary, one row per lot."""
+    _require_pyarrow()
+    columns = {name: [] for name in cost_basis_schema().names}
+    for symbol, records in cost_basis_dict.items():
+        for index, record in enumerate(records):
+            columns['Symbol'].append(symbol)
+            columns['Lot_Index'].append(index)
+            columns['units'].append(record.get('units', 0))
+            columns['price'].append(record.get('price', 0))
+            columns['commission'].append(record.get('commission', 0))
+            columns['price_aud'].append(record.get('price_aud'))
+            columns['commission_aud'].append(record.get('commission_aud'))
+            columns['exchange_rate'].append(record.get('exchange_rate'))
+            columns['date'].append(record.get('date'))
+    return pa.table(columns, schema=cost_basis_schema())
+
+
+def save_cost_basis_parquet(cost_basis_dict, output_file, compression=DEFAULT_COMPRESSION):
+    """Save a cost basis dictionary to Parquet (or Arrow IPC, see write_table)."""
+    return write_table(cost_basis_to_table(cost_basis_dict), output_file, compression)
+
+
+def save_transactions_parquet(combined_df, output_file, compression=DEFAULT_COMPRESSION):
+    """Save the standardized transaction table to Parquet (or Arrow IPC)."""
+    _require_pyarrow()
+    df = combined_df.assign(Date=combined_df['Date'].astype(str))
+    return _write_table(df, transactions_schema(), output_file, compression)
+
+
+def save_fifo_events_parquet(fifo_events, output_file, compression=DEFAULT_COMPRESSION):
+    """Save FIFO events (list of dicts or DataFrame) to Parquet (or Arrow IPC)."""
+    _require_pyarrow()
+    df = fifo_events if isinstance(fifo_events, pd.DataFrame) else pd.DataFrame(
+        fifo_events, columns=fifo_events_schema().names
+    )
+    return _write_table(df, fifo_events_schema(), output_file, compression)
+
+
+def read_table(input_file, columns=None):
+    """
+    Arrow table from a file written by this module. Arrow IPC files are
+    memory-mapped without copying; Parquet files are decompressed.
+    """
+    _require_pyarrow()
+    with open(input_file, 'rb') as f:
+        is_arrow = f.read(len(ARROW_MAGIC)) == ARROW_MAGIC
+    if not is_arrow:
+        return pq.read_table(input_file, columns=columns, memory_map=True)
+
+    table = pa.ipc.open_file(pa.memory_map(str(input_file), 'r')).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def _to_pandas(table):
+    # Dictionary columns come back as categoricals; the calculator works with plain strings
+    return table.to_pandas(split_blocks=True, strings_to_categorical=False).astype(
+        {field.name: object for field in table.schema if pa.types.is_dictionary(field.type)}
+    )
+
+
+def load_cgt_parquet(input_file):
+    """CGT records as a DataFrame with CGT_COLUMNS."""
+    return _to_pandas(read_table(input_file))
+
+
+def load_transactions_parquet(input_file):
+    """Standardized transaction table as a DataFrame."""
+    return _to_pandas(read_table(input_file))
+
+
+def load_fifo_events_parquet(input_file):
+    """FIFO events as a DataFrame."""
+    return _to_pandas(read_table(input_file))
+
+
+def table_to_cost_basis(table):
+    """Cost basis dictionary from a cost_basis_schema() table."""
+    columns = {name: table.column(name).to_pylist() for name in table.schema.names}
+    cost_basis_dict = {}
+    for symbol, units, price, commission, price_aud, commission_aud, exchange_rate, date in zip(
+            columns['Symbol'], columns['units'], columns['price'], columns['commission'],
+            columns['price_aud'], columns['commission_aud'], columns['exchange_rate'], columns['date']):
+        if price_aud is None:
+            # Legacy USD-only record
+            record = {'units': units, 'price': price, 'commission': commission, 'date': date}
+        else:
+            record = {
+                'units': units,
+                'price': price,
+                'commission': commission,
+                'price_aud': price_aud,
+                'commission_aud': commission_aud,
+                'exchange_rate': exchange_rate,
+                'date': date
+            }
+        cost_basis_dict.setdefault(symbol, []).append(record)
+    return cost_basis_dict
+
+
+def load_cost_basis_parquet(input_file):
+    """Cost basis dictionary in the same layout as load_cost_basis_json_aud()."""
+    return table_to_cost_basis(read_table(input_file))
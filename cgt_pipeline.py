@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+CGT Pipeline as a Memoized Stage Graph
+
+The steps main() used to run implicitly are declared as stages:
+
+    rates ─────────────────────────────┐
+    html ─┬→ ingest → dedup ─┬→ fifo ┴→ cgt → export
+    csv ──┘                  └→ sales ─┘
+
+Each stage declares its upstream stages, the parameters it reads
+(sell_cutoff_date, financial_year, strategy, ...) and, for the first stages,
+the input files it reads. A stage's output is pickled under
+.pipeline_cache/<stage>/<key>.pkl, where key hashes the stage name and
+version, its parameters, the content hash of each upstream output and the
+content hashes of its input files. A stage reruns only when that key has no
+cached output, so:
+
+- Changing nothing returns every result from the cache
+- Changing only the FY reruns sales, cgt and export (keep --cutoff fixed)
+- An upstream stage that reruns but produces the same output does not
+  invalidate the stages after it
+
+Stages with no pending upstream stages run concurrently in worker threads,
+so rates, html and csv load at the same time and cold-start latency is
+that of the slowest source. --explain lists each stage, whether it ran or
+was cached, why, and its timing.
+
+Usage:
+    python cgt_pipeline.py --fy 2024-25 [--cutoff 2024-06-30] [--strategy fifo] [--explain]
+    python cgt_pipeline.py --fy 2024-25 --db cgt.db     # transactions and rates from the SQLite store
+    python cgt_pipeline.py --fy 2024-25 --journal transactions.jsonl
+"""
+
+import argparse
+import functools
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    CGT_STRATEGIES, calculate_australian_cgt_aud, save_cgt_excel_aud, save_remaining_cost_basis_aud
+)
+from cgt_database import CGTDatabase
+from cgt_multi_year import build_sales_history
+from complete_unified_with_aud import (
+    RBAAUDConverter, apply_hybrid_fifo_processing_with_aud, load_html_files_hybrid,
+    load_manual_csv_files_hybrid_FIXED, load_rba_exchange_rates, robust_date_parser, run_concurrently
+)
+from thread_output import quiet
+from transaction_journal import TransactionJournal, load_journal_transactions
+
+DEFAULT_CACHE_DIR = '.pipeline_cache'
+DEDUP_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price']
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _params_digest(value):
+    return _digest(json.dumps(value, sort_keys=True, default=str).encode('utf-8'))
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    func receives the outputs of deps and the declared params as keyword
+    arguments. inputs(params) lists the files the stage reads. If valid is
+    given, a cached output is only reused while valid(output) is True (for
+    stages whose output is files on disk, which a later run with other
+    params may have overwritten).
+    """
+
+    def __init__(self, name, func, deps=(), params=(), inputs=None, version=1, valid=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.params = tuple(params)
+        self.inputs = inputs
+        self.version = version
+        self.valid = valid
+
+
+class Pipeline:
+    """Runs stages in order, memoizing outputs on disk by content hash."""
+
+    def __init__(self, stages, cache_dir=DEFAULT_CACHE_DIR, verbose=False):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = [stage.name for stage in stages]
+        self.cache_dir = cache_dir
+        self.verbose = verbose
+        self.report = []
+        self.wall_seconds = 0.0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._file_hashes = self._load_json('file_hashes.json')
+
+    # ------------------------------------------------------------ cache files
+
+    def _load_json(self, name):
+        path = os.path.join(self.cache_dir, name)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_json(self, name, data):
+        path = os.path.join(self.cache_dir, name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(path + '.tmp', path)
+
+    def _file_digest(self, path):
+        """Content hash of a file, re-read only when its size or mtime changes."""
+        stat = os.stat(path)
+        cached = self._file_hashes.get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+        with open(path, 'rb') as f:
+            sha256 = _digest(f.read())
+        self._file_hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        return sha256
+
+    def _output_paths(self, name, key):
+        directory = os.path.join(self.cache_dir, name)
+        return os.path.join(directory, f"{key}.pkl"), os.path.join(directory, f"{key}.json")
+
+    # ------------------------------------------------------------ running
+
+    def _required(self, targets):
+        needed = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].deps)
+        return [name for name in self.order if name in needed]
+
+    def run(self, targets=None, **params):
+        """
+        Run (or load from cache) the stages needed for targets (default: all).
+        Stages whose upstream outputs are all available form a wave and run
+        concurrently (rates, html and csv start together). Returns
+        {stage name: output}; self.report says what ran, why and how long it took.
+        """
+        last_run = self._load_json('last_run.json')
+        outputs, output_digests, entries = {}, {}, {}
+        remaining = self._required(targets or self.order)
+        started = time.time()
+
+        wave_number = 0
+        while remaining:
+            wave = [name for name in remaining if all(dep in outputs for dep in self.stages[name].deps)]
+            remaining = [name for name in remaining if name not in wave]
+            wave_number += 1
+
+            to_run = {}
+            for name in wave:
+                stage = self.stages[name]
+                stage_started = time.time()
+                stage_params = {param: params.get(param) for param in stage.params}
+                input_digests = {}
+                if stage.inputs is not None:
+                    input_digests = {path: self._file_digest(path) for path in sorted(stage.inputs(stage_params))}
+                components = {
+                    'version': stage.version,
+                    'params': stage_params,
+                    'deps': {dep: output_digests[dep] for dep in stage.deps},
+                    'inputs': input_digests
+                }
+                key = _params_digest([name, components])[:24]
+                output_file, meta_file = self._output_paths(name, key)
+                previous = last_run.get(name)
+                last_run[name] = components
+
+                output = None
+                if os.path.exists(output_file) and os.path.exists(meta_file):
+                    with open(output_file, 'rb') as f:
+                        output = pickle.load(f)
+                    if stage.valid is not None and not stage.valid(output):
+                        output = None
+
+                entries[name] = {'stage': name, 'status': 'cached', 'reason': f"inputs unchanged (key {key[:10]})",
+                                 'seconds': time.time() - stage_started, 'wave': wave_number, 'key': key}
+                if output is not None:
+                    with open(meta_file) as f:
+                        output_digests[name] = json.load(f)['output_digest']
+                    outputs[name] = output
+                else:
+                    entries[name].update(status='ran', reason=self._why(previous, components))
+                    to_run[name] = functools.partial(stage.func, **{dep: outputs[dep] for dep in stage.deps},
+                                                     **stage_params)
+
+            for name, (output, seconds) in self._execute(to_run).items():
+                save_started = time.time()
+                output_file, meta_file = self._output_paths(name, entries[name]['key'])
+                data = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+                output_digests[name] = _digest(data)
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                with open(output_file, 'wb') as f:
+                    f.write(data)
+                with open(meta_file, 'w') as f:
+                    json.dump({'output_digest': output_digests[name], 'created': datetime.now().isoformat()}, f)
+                outputs[name] = output
+                entries[name]['seconds'] += seconds + time.time() - save_started
+
+        self.report = [entries[name] for name in self.order if name in entries]
+        self.wall_seconds = time.time() - started
+        self._save_json('last_run.json', last_run)
+        self._save_json('file_hashes.json', self._file_hashes)
+        return outputs
+
+    def _execute(self, tasks):
+        """
+        Run {name: func} and return {name: (output, seconds)}. Several tasks
+        run at once in worker threads; each one's output is captured
+        separately and replayed in order when verbose.
+        """
+        if len(tasks) == 1:
+            (name, func), = tasks.items()
+            started = time.time()
+            with quiet(self.verbose):
+                output = func()
+            return {name: (output, time.time() - started)}
+
+        outcomes = run_concurrently(tasks)
+        for outcome in outcomes.values():
+            if self.verbose:
+                print(outcome['output'], end='')
+        for outcome in outcomes.values():
+            if outcome['error'] is not None:
+                raise outcome['error']
+        return {name: (outcome['result'], outcome['seconds']) for name, outcome in outcomes.items()}
+
+    @staticmethod
+    def _why(previous, components):
+        """Reason a stage had to run, from the components of its previous run."""
+        if previous is None:
+            return "no previous run"
+        reasons = []
+        if previous.get('version') != components['version']:
+            reasons.append(f"stage version {previous.get('version')} → {components['version']}")
+        for param, value in components['params'].items():
+            old_value = previous.get('params', {}).get(param)
+            if old_value != value:
+                reasons.append(f"{param} {old_value} → {value}")
+        for dep, digest in components['deps'].items():
+            if previous.get('deps', {}).get(dep) != digest:
+                reasons.append(f"'{dep}' output changed")
+        old_inputs = previous.get('inputs', {})
+        new_inputs = components['inputs']
+        added = [p for p in new_inputs if p not in old_inputs]
+        removed = [p for p in old_inputs if p not in new_inputs]
+        modified = [p for p in new_inputs if p in old_inputs and old_inputs[p] != new_inputs[p]]
+        for label, paths in (('added', added), ('removed', removed), ('modified', modified)):
+            if paths:
+                reasons.append(f"{label}: {', '.join(os.path.basename(p) for p in paths)}")
+        return '; '.join(reasons) or "result not in cache"
+
+    def explain(self):
+        """Print which stages ran, why and how long they took (stages in one wave ran together)."""
+        print(f"\n🧭 PIPELINE STAGES ({self.wall_seconds:.2f}s wall)")
+        for entry in self.report:
+            icon = '🔄' if entry['status'] == 'ran' else '✅'
+            print(f"   {icon} {entry['stage']:<7} {entry['status']:<6} wave {entry['wave']}  "
+                  f"{entry['seconds']:6.2f}s  {entry['reason']}")
+
+
+# ---------------------------------------------------------------- CGT stages
+
+def _rates_inputs(params):
+    return glob.glob(os.path.join(params['rates_folder'], 'FX_*.csv'))
+
+
+def _html_inputs(params):
+    return glob.glob('html_folder/*.htm') + glob.glob('html_folder/*.html')
+
+
+def _csv_inputs(params):
+    return glob.glob('*.csv') + glob.glob('csv_folder/*.csv')
+
+
+def stage_rates(rates_folder):
+    converter = load_rba_exchange_rates(rates_folder)
+    if converter is None:
+        raise RuntimeError(f"No RBA exchange rates found in {rates_folder}")
+    return converter.exchange_rates
+
+
+def stage_html():
+    return load_html_files_hybrid()
+
+
+def stage_csv():
+    return load_manual_csv_files_hybrid_FIXED()
+
+
+def stage_ingest(html, csv):
+    frames = html + csv
+    if not frames:
+        raise RuntimeError("No transactions found in html_folder/ or CSV files")
+    return pd.concat(frames, ignore_index=True)
+
+
+def stage_rates_db(database, database_state):
+    with CGTDatabase(database) as db:
+        exchange_rates = db.aud_converter().exchange_rates
+    if not exchange_rates:
+        raise RuntimeError(f"No exchange rates stored in {database}")
+    return exchange_rates
+
+
+def stage_ingest_db(database, database_state):
+    with CGTDatabase(database) as db:
+        transactions = db.transactions()
+    if len(transactions) == 0:
+        raise RuntimeError(f"No transactions stored in {database}")
+    return transactions
+
+
+def stage_ingest_journal(journal, journal_size):
+    transactions, _ = load_journal_transactions(TransactionJournal(journal))
+    if len(transactions) == 0:
+        raise RuntimeError(f"No transactions in the journal {journal}")
+    return transactions
+
+
+def stage_dedup(ingest):
+    return ingest.drop_duplicates(subset=DEDUP_COLUMNS, keep='first').reset_index(drop=True)
+
+
+def stage_fifo(dedup, rates, sell_cutoff_date, progress_callback=None):
+    """Hybrid FIFO: all BUYs, SELLs up to the cutoff."""
+    converter = RBAAUDConverter()
+    converter.exchange_rates = rates
+    cutoff = datetime.strptime(sell_cutoff_date, '%Y-%m-%d')
+    dates = dedup['Date'].apply(robust_date_parser)
+    transactions = dedup[(dedup['Activity'] == 'PURCHASED') | (dates <= cutoff)]
+    cost_basis_dict, _, conversion_errors = apply_hybrid_fifo_processing_with_aud(
+        transactions, converter, progress_callback=progress_callback)
+    return {'cost_basis': cost_basis_dict, 'conversion_errors': conversion_errors}
+
+
+def stage_sales(dedup, financial_year):
+    sales_df = build_sales_history(dedup)
+    return sales_df[sales_df['Financial_Year'] == financial_year].reset_index(drop=True)
+
+
+def stage_cgt(sales, fifo, strategy, progress_callback=None):
+    cgt_df, remaining, warnings_list = calculate_australian_cgt_aud(sales, fifo['cost_basis'], strategy=strategy,
+                                                                    progress_callback=progress_callback)
+    return {'cgt_df': cgt_df, 'remaining_cost_basis': remaining, 'warnings': warnings_list}
+
+
+def _file_sha256(path):
+    with open(path, 'rb') as f:
+        return _digest(f.read())
+
+
+def _exports_unchanged(files):
+    """True while every exported file still has the content it was written with."""
+    return all(os.path.exists(path) and _file_sha256(path) == sha256 for path, sha256 in files.items())
+
+
+def stage_export(cgt, financial_year, output_dir):
+    """Write the Excel report and remaining cost basis; returns {path: sha256} of the files written."""
+    os.makedirs(output_dir, exist_ok=True)
+    excel_file = None
+    if len(cgt['cgt_df']):
+        excel_file = save_cgt_excel_aud(cgt['cgt_df'], financial_year, os.path.join(
+            output_dir, f"Australian_CGT_Report_FY{financial_year}_AUD.xlsx"))
+    json_file = save_remaining_cost_basis_aud(cgt['remaining_cost_basis'], financial_year, os.path.join(
+        output_dir, f"cost_basis_dictionary_AUD_post_FY{financial_year}.json"))
+    return {path: _file_sha256(path) for path in (excel_file, json_file) if path}
+
+
+def build_cgt_pipeline(cache_dir=DEFAULT_CACHE_DIR, verbose=False, database=False, journal=False):
+    """
+    The CGT pipeline: rates, html, csv, ingest, dedup, fifo, sales, cgt, export.
+
+    With database, rates and ingest read from a CGTDatabase instead of the
+    files (params database and database_state, its content_digest()). With
+    journal, ingest reads the trades appended to a TransactionJournal since
+    its last run (params journal and journal_size).
+    """
+    if database:
+        sources = [
+            Stage('rates', stage_rates_db, params=['database', 'database_state']),
+            Stage('ingest', stage_ingest_db, params=['database', 'database_state'])
+        ]
+    elif journal:
+        sources = [
+            Stage('rates', stage_rates, params=['rates_folder'], inputs=_rates_inputs),
+            Stage('ingest', stage_ingest_journal, params=['journal', 'journal_size'])
+        ]
+    else:
+        sources = [
+            Stage('rates', stage_rates, params=['rates_folder'], inputs=_rates_inputs),
+            Stage('html', stage_html, inputs=_html_inputs),
+            Stage('csv', stage_csv, inputs=_csv_inputs),
+            Stage('ingest', stage_ingest, deps=['html', 'csv'])
+        ]
+    return Pipeline(sources + [
+        Stage('dedup', stage_dedup, deps=['ingest']),
+        Stage('fifo', stage_fifo, deps=['dedup', 'rates'], params=['sell_cutoff_date']),
+        Stage('sales', stage_sales, deps=['dedup'], params=['financial_year']),
+        Stage('cgt', stage_cgt, deps=['sales', 'fifo'], params=['strategy']),
+        Stage('export', stage_export, deps=['cgt'], params=['financial_year', 'output_dir'], version=2,
+              valid=_exports_unchanged)
+    ], cache_dir=cache_dir, verbose=verbose)
+
+
+def default_sell_cutoff(financial_year):
+    """30 June before the financial year (the hybrid FIFO cutoff)."""
+    return f"{int(financial_year[:4])}-06-30"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CGT pipeline with cached stages")
+    parser.add_argument('--fy', default='2024-25', help="Financial year, e.g. 2024-25")
+    parser.add_argument('--cutoff', help="SELL cutoff for the FIFO cost basis (default: 30 June before the FY)")
+    parser.add_argument('--strategy', choices=CGT_STRATEGIES, default='tax_optimal')
+    parser.add_argument('--rates-folder', default='rates')
+    sources = parser.add_mutually_exclusive_group()
+    sources.add_argument('--db', help="Read transactions and rates from this cgt_database.py store")
+    sources.add_argument('--journal', help="Read transactions from this transaction_journal.py journal "
+                                           "(only trades added since the last run are read)")
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--explain', action='store_true', help="List which stages ran, why and their timings")
+    parser.add_argument('--verbose', action='store_true', help="Show stage output")
+    args = parser.parse_args()
+
+    database_state = None
+    if args.db:
+        with CGTDatabase(args.db) as db:
+            database_state = db.content_digest()
+
+    journal_size = os.path.getsize(args.journal) if args.journal else None
+
+    pipeline = build_cgt_pipeline(args.cache_dir, args.verbose, database=bool(args.db), journal=bool(args.journal))
+    started = time.time()
+    outputs = pipeline.run(
+        rates_folder=args.rates_folder,
+        database=args.db,
+        database_state=database_state,
+        journal=args.journal,
+        journal_size=journal_size,
+        sell_cutoff_date=args.cutoff or default_sell_cutoff(args.fy),
+        financial_year=args.fy,
+        strategy=args.strategy,
+        output_dir=args.output_dir
+    )
+
+    cgt = outputs['cgt']
+    print(f"✅ FY {args.fy}: {len(cgt['cgt_df'])} CGT records, {len(cgt['warnings'])} warnings "
+          f"in {time.time() - started:.2f}s")
+    for path in outputs['export']:
+        print(f"   📄 {path}")
+    if args.explain:
+        pipeline.explain()
+    return outputs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Quick Commands That Start Fast
+
+Small lookups that should not wait for pandas, NumPy or openpyxl to import:
+
+    holdings   units and AUD value per symbol in a cost basis file
+    rate       RBA AUD/USD rate for a date (previous business day fallback)
+    validate   check transaction CSV/HTML files before a full run
+
+Only the standard library and the light modules (rba_rates,
+transaction_formats, cost_basis_codec, lazy_cost_basis) are imported up
+front. Validating an HTML statement needs the full parser, so
+complete_unified_with_aud (and pandas) is imported for that file type only. bench_startup.py tracks the
+import and command times.
+
+Usage:
+    python cgt_quick.py holdings cost_basis_dictionary_AUD_post_FY2024-25.json [--symbol AAPL]
+    python cgt_quick.py rate 2024-08-15 [--rates-folder rates]
+    python cgt_quick.py validate csv_folder/*.csv html_folder/*.htm
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import sys
+from datetime import datetime
+
+from cost_basis_codec import load_cost_basis_file
+from lazy_cost_basis import symbol_stats
+from rba_rates import load_rba_rates, rate_for_date
+from transaction_formats import CSV_FORMATS, TRANSACTION_DATE_FORMATS, detect_csv_format
+
+# Problems listed per file before the rest are summarized
+MAX_PROBLEMS_SHOWN = 10
+
+
+def _is_transaction_date(value):
+    for fmt in TRANSACTION_DATE_FORMATS:
+        try:
+            datetime.strptime(value.strip(), fmt)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# ---------------------------------------------------------------- holdings
+
+def holdings_summary(cost_basis_file, symbols=None):
+    """[(symbol, stats)] for a cost basis file, stats as in the lazy loader's index."""
+    cost_basis_dict = load_cost_basis_file(cost_basis_file, symbols)
+    return [(symbol, symbol_stats(records)) for symbol, records in sorted(cost_basis_dict.items())]
+
+
+def cmd_holdings(args):
+    rows = holdings_summary(args.cost_basis_file, args.symbol)
+    rows = [(symbol, stats) for symbol, stats in rows if stats['units'] > 0 or args.all]
+    if not rows:
+        print("⚠️ No holdings found")
+        return 1
+
+    print(f"📋 {'Symbol':<8} {'Lots':>5} {'Units':>12} {'Cost (AUD)':>14}")
+    for symbol, stats in rows:
+        print(f"   {symbol:<8} {stats['lots_with_units']:>5} {stats['units']:>12,.2f} ${stats['value_aud']:>13,.2f}")
+    total = sum(stats['value_aud'] for _, stats in rows)
+    print(f"💰 {len(rows)} symbols, total cost ${total:,.2f} AUD")
+    return 0
+
+
+# ---------------------------------------------------------------- rate
+
+def cmd_rate(args):
+    try:
+        datetime.strptime(args.date, '%Y-%m-%d')
+    except ValueError:
+        print(f"❌ Date must be YYYY-MM-DD, got '{args.date}'")
+        return 2
+
+    exchange_rates = load_rba_rates(args.rates_folder)
+    if not exchange_rates:
+        print(f"❌ No RBA exchange rates found in {args.rates_folder}")
+        return 1
+
+    rate, rate_date = rate_for_date(exchange_rates, args.date)
+    if rate is None:
+        print(f"❌ No RBA rate for {args.date} or the 7 days before it")
+        return 1
+    note = '' if rate_date == args.date else f" (rate from {rate_date})"
+    print(f"💱 {args.date}: 1 AUD = {rate:.4f} USD, 1 USD = {1 / rate:.4f} AUD{note}")
+    return 0
+
+
+# ---------------------------------------------------------------- validate
+
+def validate_transaction_csv(csv_file):
+    """(format name, data rows, [problems]) for a transaction CSV, read with the csv module."""
+    with open(csv_file, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = reader.fieldnames or []
+        format_name = detect_csv_format(columns)
+        if format_name is None:
+            return None, 0, [f"unknown CSV format (columns: {', '.join(columns)})"]
+        spec = CSV_FORMATS[format_name]
+        date_col, type_col, price_col = spec['date_column'], spec['type_column'], spec['price_column']
+        types = set(spec['activities'])
+
+        problems = []
+        rows = 0
+        for line, row in enumerate(reader, start=2):
+            rows += 1
+            if not (row.get('Symbol') or '').strip():
+                problems.append(f"line {line}: missing Symbol")
+            if not _is_transaction_date(row.get(date_col) or ''):
+                problems.append(f"line {line}: unparseable {date_col} '{row.get(date_col)}'")
+            if row.get(type_col) not in types:
+                problems.append(f"line {line}: {type_col} '{row.get(type_col)}' is not one of {sorted(types)}")
+            for column in ('Quantity', price_col):
+                if not _is_number(row.get(column)):
+                    problems.append(f"line {line}: {column} '{row.get(column)}' is not a number")
+    return spec['label'], rows, problems
+
+
+def validate_html_statement(html_file):
+    """('HTML statement', transactions, [problems]) using the full HTML parser."""
+    from complete_unified_with_aud import standardize_html_file
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = standardize_html_file(html_file)
+    if df is None or len(df) == 0:
+        return 'HTML statement', 0, ["no transactions found"]
+    return 'HTML statement', len(df), []
+
+
+def cmd_validate(args):
+    failed = 0
+    for path in args.files:
+        name = os.path.basename(path)
+        if not os.path.exists(path):
+            print(f"❌ {name}: file not found")
+            failed += 1
+            continue
+
+        if path.lower().endswith(('.htm', '.html')):
+            file_format, rows, problems = validate_html_statement(path)
+        elif path.lower().endswith('.csv'):
+            file_format, rows, problems = validate_transaction_csv(path)
+        else:
+            print(f"⏭️ {name}: not a transaction file (.csv, .htm, .html)")
+            continue
+
+        if problems:
+            failed += 1
+            print(f"❌ {name}: {len(problems)} problems" + (f" ({file_format}, {rows} rows)" if file_format else ''))
+            for problem in problems[:MAX_PROBLEMS_SHOWN]:
+                print(f"   • {problem}")
+            if len(problems) > MAX_PROBLEMS_SHOWN:
+                print(f"   … and {len(problems) - MAX_PROBLEMS_SHOWN} more")
+        else:
+            print(f"✅ {name}: {file_format}, {rows} rows")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quick CGT lookups that do not load the full toolchain")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    holdings = commands.add_parser('holdings', help="Units and AUD cost per symbol in a cost basis file")
+    holdings.add_argument('cost_basis_file')
+    holdings.add_argument('--symbol', action='append', help="Only this symbol (repeatable)")
+    holdings.add_argument('--all', action='store_true', help="Include symbols with no units left")
+    holdings.set_defaults(func=cmd_holdings)
+
+    rate = commands.add_parser('rate', help="RBA AUD/USD rate for a date")
+    rate.add_argument('date', help="YYYY-MM-DD")
+    rate.add_argument('--rates-folder', default='rates', help="Folder with RBA FX_*.csv files")
+    rate.set_defaults(func=cmd_rate)
+
+    validate = commands.add_parser('validate', help="Check transaction CSV/HTML files")
+    validate.add_argument('files', nargs='+')
+    validate.set_defaults(func=cmd_validate)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Bounded Store for Web App Results
+
+Each processed upload produces a CGT match table, an Excel report and the
+remaining cost basis. Keeping those in st.session_state holds them for as
+long as the session lives, so memory grows with every concurrent user. This
+store keeps them in one process-wide place instead:
+
+- Artifacts marked for spilling (the Excel bytes, the full match table) go
+  straight to a disk cache and are read back only when they are needed
+  (a download, the detailed table)
+- Other artifacts stay in memory under a global memory budget; the least
+  recently used are spilled to disk when the budget is exceeded
+- The disk cache has its own budget; the least recently used results are
+  dropped entirely when it is exceeded, and get() then raises KeyError
+- Optionally results also expire ttl_seconds after they were stored, and
+  beyond max_results the least recently used are dropped
+
+Sessions attach to a result by id, several sessions can share one result,
+and usage() reports memory and disk per session and in total. A session is
+forgotten once it has not attached or asked for its result (session_result())
+for session_ttl_seconds, so closed browser tabs do not accumulate.
+
+Usage:
+    store = ResultStore('.app_cache/results', memory_budget=256 * 2**20, ttl_seconds=3600)
+    store.put(result_id, {'cgt_df': cgt_df, 'excel': data}, spill=('cgt_df', 'excel'))
+    store.attach(session_id, result_id)
+    store.get(result_id, 'excel')    # read from disk
+"""
+
+import atexit
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+DEFAULT_DISK_BUDGET = 2 * 1024 * 1024 * 1024
+DEFAULT_SESSION_TTL_SECONDS = 24 * 3600
+
+
+def _size_of(value):
+    """Approximate bytes held by an artifact."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True).sum())
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResultStore:
+    """Process-wide result artifacts with LRU spilling to disk (thread-safe)."""
+
+    def __init__(self, cache_dir, memory_budget=DEFAULT_MEMORY_BUDGET, disk_budget=DEFAULT_DISK_BUDGET,
+                 max_results=None, ttl_seconds=None, session_ttl_seconds=DEFAULT_SESSION_TTL_SECONDS,
+                 clock=time.monotonic):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.max_results = max_results
+        self.ttl_seconds = ttl_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self._clock = clock
+
+        # The index lives in memory, so each process spills into its own
+        # directory and removes it on exit
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = tempfile.mkdtemp(prefix='results_', dir=cache_dir)
+        atexit.register(shutil.rmtree, self.cache_dir, ignore_errors=True)
+
+        self._results = OrderedDict()     # result_id -> {name: entry}, least recently used first
+        self._in_memory = OrderedDict()   # (result_id, name) of artifacts held in memory, LRU first
+        self._stored_at = {}              # result_id -> clock() when put
+        self._sessions = {}               # session_id -> result_id
+        self._session_seen = {}           # session_id -> clock() when last attached or looked up
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------ results
+
+    def put(self, result_id, artifacts, spill=()):
+        """Store {name: value} under result_id, writing the names in spill to disk right away."""
+        with self._lock:
+            self._expire()
+            self._drop(result_id)
+            self._results[result_id] = {}
+            self._stored_at[result_id] = self._clock()
+            for name, value in artifacts.items():
+                entry = {'value': value, 'path': None, 'bytes': _size_of(value)}
+                self._results[result_id][name] = entry
+                if name in spill:
+                    self._spill(result_id, name)
+                else:
+                    self._in_memory[(result_id, name)] = True
+                    self._memory_bytes += entry['bytes']
+            self._enforce_budgets(keep=result_id)
+
+    def has(self, result_id):
+        with self._lock:
+            self._expire()
+            return result_id in self._results
+
+    def get(self, result_id, name):
+        """An artifact, read from the disk cache if it was spilled. KeyError if evicted."""
+        with self._lock:
+            self._expire()
+            entry = self._results[result_id][name]
+            self._results.move_to_end(result_id)
+            if entry['path'] is None:
+                self._in_memory.move_to_end((result_id, name))
+                return entry['value']
+            path = entry['path']
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise KeyError(result_id)  # dropped while we were reading
+        return data if path.endswith('.bin') else pickle.loads(data)
+
+    def drop(self, result_id):
+        """Forget a result and delete its files."""
+        with self._lock:
+            self._drop(result_id)
+
+    # ------------------------------------------------------------ sessions
+
+    def attach(self, session_id, result_id):
+        """Point a session at a result (replacing its previous one)."""
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = result_id
+            self._session_seen[session_id] = self._clock()
+            if result_id in self._results:
+                self._results.move_to_end(result_id)
+
+    def detach(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._session_seen.pop(session_id, None)
+
+    def session_result(self, session_id):
+        """The result id a session is attached to, or None if it has none or it was evicted."""
+        with self._lock:
+            self._expire()
+            result_id = self._sessions.get(session_id)
+            if result_id is None:
+                return None
+            self._session_seen[session_id] = self._clock()
+            return result_id if result_id in self._results else None
+
+    def usage(self):
+        """Memory and disk bytes in total and per session (shared results count for each session)."""
+        with self._lock:
+            self._expire()
+            sessions = {}
+            for session_id, result_id in self._sessions.items():
+                entries = self._results.get(result_id, {}).values()
+                sessions[session_id] = {
+                    'result_id': result_id if result_id in self._results else None,
+                    'memory_bytes': sum(e['bytes'] for e in entries if e['path'] is None),
+                    'disk_bytes': sum(e['bytes'] for e in entries if e['path'] is not None)
+                }
+            return {
+                'memory_bytes': self._memory_bytes,
+                'disk_bytes': self._disk_bytes,
+                'memory_budget': self.memory_budget,
+                'disk_budget': self.disk_budget,
+                'results': len(self._results),
+                'sessions': sessions
+            }
+
+    # ------------------------------------------------------------ internals (caller holds the lock)
+
+    def _spill(self, result_id, name):
+        entry = self._results[result_id][name]
+        value = entry['value']
+        directory = os.path.join(self.cache_dir, result_id)
+        os.makedirs(directory, exist_ok=True)
+        if isinstance(value, (bytes, bytearray)):
+            path, data = os.path.join(directory, f"{name}.bin"), bytes(value)
+        else:
+            path, data = os.path.join(directory, f"{name}.pkl"), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+
+        if self._in_memory.pop((result_id, name), None):
+            self._memory_bytes -= entry['bytes']
+        entry.update(value=None, path=path, bytes=len(data))
+        self._disk_bytes += len(data)
+
+    def _drop(self, result_id):
+        entries = self._results.pop(result_id, None)
+        if entries is None:
+            return
+        for name, entry in entries.items():
+            if entry['path'] is None:
+                self._in_memory.pop((result_id, name), None)
+                self._memory_bytes -= entry['bytes']
+            else:
+                self._disk_bytes -= entry['bytes']
+        del self._stored_at[result_id]
+        shutil.rmtree(os.path.join(self.cache_dir, result_id), ignore_errors=True)
+        for session_id in [s for s, r in self._sessions.items() if r == result_id]:
+            del self._sessions[session_id]
+            del self._session_seen[session_id]
+
+    def _expire(self):
+        """Drop results past ttl_seconds and forget sessions idle for session_ttl_seconds."""
+        now = self._clock()
+        if self.ttl_seconds is not None:
+            for result_id in [r for r, stored in self._stored_at.items() if now - stored > self.ttl_seconds]:
+                self._drop(result_id)
+        if self.session_ttl_seconds is not None:
+            for session_id in [s for s, seen in self._session_seen.items() if now - seen > self.session_ttl_seconds]:
+                del self._sessions[session_id]
+                del self._session_seen[session_id]
+
+    def _enforce_budgets(self, keep):
+        if self.max_results is not None:
+            for result_id in list(self._results)[:max(len(self._results) - self.max_results, 0)]:
+                if result_id != keep:
+                    self._drop(result_id)
+        while self._memory_bytes > self.memory_budget and self._in_memory:
+            result_id, name = next(iter(self._in_memory))
+            self._spill(result_id, name)
+        for result_id in list(self._results):
+            if self._disk_bytes <= self.disk_budget:
+                break
+            if result_id != keep:
+                self._drop(result_id)
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+Sell-to-Target Planner for Australian CGT (AUD)
+Chooses which holdings to sell to realize a target taxable gain or loss
+
+Typical use is near 30 June: gains have already been booked this FY and we want
+to realize just enough loss to offset them, or crystallize a gain up to a budget.
+
+How it works:
+- Lots are indexed in the same order calculate_australian_cgt_aud() consumes them
+  (long-term highest AUD cost first, then short-term), so the plan matches what
+  the CGT calculator will actually report for the resulting sales
+- Each symbol becomes a piecewise-linear curve of gross discountable gains,
+  other gains and losses (AUD) as a function of units sold
+- A plan is scored on the FY totals (booked sales plus planned ones) with the
+  ATO netting of cgt_multi_year.net_capital_gain_aud(): losses offset other
+  gains first and the 50% discount applies to the discountable gains left. The
+  score is the net capital gain, or minus the year's unused capital loss
+- A bounded search over the curve extremes finds the fewest sales that can reach
+  the target, then picks the final partial sale with the smallest deviation
+"""
+
+import bisect
+import math
+import os
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    build_lot_index_aud,
+    get_rba_exchange_rate,
+    load_cost_basis_json_aud
+)
+from cgt_multi_year import capital_gain_totals_aud, net_capital_gain_aud
+
+# Gross totals are (discountable gains, other gains, losses); a lot adds to one of them
+DISCOUNTABLE, OTHER, LOSS = 0, 1, 2
+NO_TOTALS = (0.0, 0.0, 0.0)
+
+
+def net_taxable_gain_aud(totals, carried_forward_loss_aud=0.0):
+    """
+    Net capital gain for gross FY totals, or minus the year's unused capital loss.
+
+    Args:
+        totals (tuple): (discountable gains, other gains, losses) in AUD
+        carried_forward_loss_aud (float): Net capital losses from earlier years
+
+    Returns:
+        float: Taxable gain after netting (negative for a net capital loss)
+    """
+    netted = net_capital_gain_aud(*totals, carried_forward_loss_aud)
+    unused_loss = netted['Current_Year_Losses_AUD'] - netted['Current_Year_Losses_Applied_AUD']
+    return netted['Net_Capital_Gain_AUD'] - unused_loss
+
+
+def _add_totals(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+
+def _build_symbol_curve(symbol, lots, sale_price_usd, exchange_rate, commission_rate):
+    """
+    Build the gross gain curve for one symbol.
+
+    Args:
+        symbol (str): Ticker
+        lots (list): Lot entries in consumption order (from build_lot_index_aud)
+        sale_price_usd (float): Current price per unit in USD
+        exchange_rate (float): AUD/USD rate used to value the sale
+        commission_rate (float): Sale commission as a fraction of proceeds
+
+    Returns:
+        dict: Curve with breakpoints and the gross totals at each of them
+    """
+    net_price_aud = sale_price_usd * (1 - commission_rate) / exchange_rate
+
+    cum_units = [0.0]
+    cum_totals = [NO_TOTALS]
+    slopes = []
+    buckets = []
+    for lot in lots:
+        gain_per_unit = net_price_aud - lot['cost_per_unit_aud']
+        if gain_per_unit < 0:
+            bucket = LOSS
+        else:
+            bucket = DISCOUNTABLE if lot['long_term'] else OTHER
+        step = [0.0, 0.0, 0.0]
+        step[bucket] = abs(gain_per_unit) * lot['units']
+        slopes.append(gain_per_unit)
+        buckets.append(bucket)
+        cum_units.append(cum_units[-1] + lot['units'])
+        cum_totals.append(_add_totals(cum_totals[-1], step))
+
+    return {
+        'symbol': symbol,
+        'lots': lots,
+        'sale_price_usd': sale_price_usd,
+        'net_price_aud': net_price_aud,
+        'cum_units': cum_units,
+        'cum_totals': cum_totals,
+        'slopes': slopes,
+        'buckets': buckets
+    }
+
+
+def _curve_totals(curve, units):
+    """Gross totals (AUD) of selling `units` units along the curve."""
+    cum_units = curve['cum_units']
+    if units <= 0:
+        return NO_TOTALS
+    if units >= cum_units[-1]:
+        return curve['cum_totals'][-1]
+
+    seg = bisect.bisect_right(cum_units, units) - 1
+    step = [0.0, 0.0, 0.0]
+    step[curve['buckets'][seg]] = abs(curve['slopes'][seg]) * (units - cum_units[seg])
+    return _add_totals(curve['cum_totals'][seg], step)
+
+
+def _curve_extreme(curve, base, direction, carried_forward):
+    """
+    Return (taxable, units) at the extreme of the curve in the given direction,
+    with the sale added to the `base` totals.
+
+    Within a lot only one total moves, so the net is monotone between lot
+    boundaries and the extremes sit on them.
+    """
+    values = [net_taxable_gain_aud(_add_totals(base, totals), carried_forward) for totals in curve['cum_totals']]
+    idx = max(range(len(values)), key=lambda i: (values[i] * direction, -i))
+    return values[idx], curve['cum_units'][idx]
+
+
+def _solve_units(curve, base, target, units_limit, carried_forward):
+    """Find the smallest units in [0, units_limit] where base plus the sale nets to `target`."""
+    cum_units = curve['cum_units']
+
+    def value(units):
+        return net_taxable_gain_aud(_add_totals(base, _curve_totals(curve, units)), carried_forward)
+
+    v1 = value(0.0)
+    for seg in range(len(curve['slopes'])):
+        if cum_units[seg] >= units_limit:
+            break
+        lo, hi = cum_units[seg], cum_units[seg + 1]
+        v0, v1 = v1, value(hi)
+        if v0 == v1 or (v0 - target) * (v1 - target) > 0:
+            continue
+
+        # Monotone and piecewise linear in between: narrow the bracket, then interpolate
+        rising = v1 > v0
+        for _ in range(50):
+            if hi - lo <= 1e-9 * max(1.0, hi):
+                break
+            mid = (lo + hi) / 2
+            if (value(mid) < target) == rising:
+                lo = mid
+            else:
+                hi = mid
+        v_lo, v_hi = value(lo), value(hi)
+        if v_hi == v_lo:
+            return hi
+        return lo + (hi - lo) * (target - v_lo) / (v_hi - v_lo)
+
+    return units_limit
+
+
+def _best_single_sale(curves, candidates, base, target, whole_units, carried_forward):
+    """
+    Pick the one additional sale that brings the net closest to `target`.
+
+    Candidates must be sorted by how far their extreme reaches in the target's
+    direction (largest first). Once a candidate cannot reach the target on its
+    own, no later candidate can either, so the scan stops there.
+
+    Returns:
+        tuple: (symbol, units, taxable) or None if no candidate moves towards the target
+    """
+    current = net_taxable_gain_aud(base, carried_forward)
+    direction = 1 if target > current else -1
+    best = None
+
+    for symbol in candidates:
+        curve = curves[symbol]
+        extreme_value, extreme_units = _curve_extreme(curve, base, direction, carried_forward)
+        if (extreme_value - current) * direction <= 0:
+            break
+
+        if (target - extreme_value) * direction > 0:
+            # Bound reached: this (and every later) candidate falls short on its own
+            if best is None:
+                best = (symbol, extreme_units, extreme_value)
+            break
+
+        units = _solve_units(curve, base, target, extreme_units, carried_forward)
+        options = [units]
+        if whole_units:
+            options = sorted({min(math.floor(units), extreme_units), min(math.ceil(units), extreme_units)})
+
+        for option in options:
+            if option <= 0:
+                continue
+            value = net_taxable_gain_aud(_add_totals(base, _curve_totals(curve, option)), carried_forward)
+            deviation = abs(target - value)
+            if best is None or deviation < abs(target - best[2]) - 1e-9:
+                best = (symbol, option, value)
+
+        if best is not None and abs(target - best[2]) <= 1e-9:
+            break
+
+    return best
+
+
+def _order_breakdown(curve, units):
+    """Split a planned sale into the lots the CGT calculator will match."""
+    breakdown = []
+    remaining = units
+    for lot, slope in zip(curve['lots'], curve['slopes']):
+        if remaining <= 0:
+            break
+        used = min(remaining, lot['units'])
+        breakdown.append({
+            'buy_date': lot['date'],
+            'units': used,
+            'days_held': lot['days_held'],
+            'long_term_eligible': lot['long_term'],
+            'cost_basis_aud': used * lot['cost_per_unit_aud'],
+            'capital_gain_aud': used * slope
+        })
+        remaining -= used
+    return breakdown
+
+
+def plan_sales_to_target(cost_basis_dict, current_prices_usd, target_taxable_gain_aud,
+                         valuation_date=None, exchange_rate=None, commission_rate=0.0,
+                         objective='transactions', whole_units=True, tolerance_aud=1.0,
+                         max_extra_trades=2, booked_cgt_df=None, carried_forward_loss_aud=0.0):
+    """
+    Choose which holdings to sell so the FY's net taxable gain lands on a target.
+
+    Args:
+        cost_basis_dict (dict): AUD-enhanced cost basis dictionary
+        current_prices_usd (dict): symbol -> current price per unit in USD
+        target_taxable_gain_aud (float): Net taxable gain for the FY after the planned
+                                         sales (negative for a net capital loss)
+        valuation_date (datetime): Planned sale date (default: today)
+        exchange_rate (float): AUD/USD rate; looked up for valuation_date if omitted
+        commission_rate (float): Expected sale commission as a fraction of proceeds
+        objective (str): 'transactions' for the fewest sales, 'deviation' to allow up to
+                         max_extra_trades extra sales when that gets closer to the target
+        whole_units (bool): Only sell whole units
+        tolerance_aud (float): Deviation treated as "on target"
+        max_extra_trades (int): Extra sales allowed for the 'deviation' objective
+        booked_cgt_df (DataFrame): CGT records of sales already made this FY
+                                   (calculate_australian_cgt_aud() output)
+        carried_forward_loss_aud (float): Net capital losses carried into this FY
+
+    Returns:
+        dict: Plan with 'orders', 'planned_taxable_gain_aud', 'deviation_aud' and inputs
+    """
+    if objective not in ('transactions', 'deviation'):
+        raise ValueError(f"Unknown objective: {objective}")
+
+    if valuation_date is None:
+        valuation_date = datetime.now()
+    if exchange_rate is None:
+        exchange_rate = get_rba_exchange_rate(valuation_date)
+
+    symbols = [s for s in cost_basis_dict if current_prices_usd.get(s)]
+    lot_index = build_lot_index_aud(cost_basis_dict, valuation_date, symbols)
+
+    curves = {}
+    for symbol, lots in lot_index.items():
+        if lots:
+            curves[symbol] = _build_symbol_curve(
+                symbol, lots, float(current_prices_usd[symbol]), exchange_rate, commission_rate
+            )
+
+    booked = NO_TOTALS
+    if booked_cgt_df is not None and len(booked_cgt_df) > 0:
+        booked = capital_gain_totals_aud(booked_cgt_df)
+    booked_taxable = net_taxable_gain_aud(booked, carried_forward_loss_aud)
+
+    planned = {}  # symbol -> units
+    base = booked
+    current = booked_taxable
+
+    def ranked(direction, exclude):
+        pool = [s for s in curves if s not in exclude]
+        reach = {s: _curve_extreme(curves[s], base, direction, carried_forward_loss_aud)[0] for s in pool}
+        return sorted(pool, key=lambda s: reach[s] * direction, reverse=True)
+
+    def add_sale(symbol, units, value):
+        nonlocal base, current
+        planned[symbol] = units
+        base = _add_totals(base, _curve_totals(curves[symbol], units))
+        current = value
+
+    target = float(target_taxable_gain_aud)
+    if abs(target - current) > tolerance_aud and curves:
+        direction = 1 if target > current else -1
+
+        # Fewest sales: fill with the largest reachable extremes until the rest fits in one sale
+        for symbol in ranked(direction, ()):
+            extreme_value, extreme_units = _curve_extreme(curves[symbol], base, direction, carried_forward_loss_aud)
+            if (extreme_value - current) * direction <= 0:
+                break
+            if (target - extreme_value) * direction <= tolerance_aud:
+                break
+            add_sale(symbol, extreme_units, extreme_value)
+
+        trades_allowed = 1 + (max_extra_trades if objective == 'deviation' else 0)
+        for _ in range(trades_allowed):
+            residual = target - current
+            if abs(residual) <= tolerance_aud:
+                break
+            direction = 1 if residual > 0 else -1
+            best = _best_single_sale(curves, ranked(direction, planned), base, target, whole_units,
+                                     carried_forward_loss_aud)
+            if best is None:
+                break
+            symbol, units, value = best
+            if abs(target - value) >= abs(residual):
+                break
+            add_sale(symbol, units, value)
+
+    orders = []
+    for symbol, units in planned.items():
+        curve = curves[symbol]
+        if units <= 0:
+            continue
+        lots = _order_breakdown(curve, units)
+        orders.append({
+            'symbol': symbol,
+            'units': units,
+            'sale_price_usd': curve['sale_price_usd'],
+            'sale_price_aud': curve['sale_price_usd'] / exchange_rate,
+            'expected_capital_gain_aud': sum(lot['capital_gain_aud'] for lot in lots),
+            'lots': lots
+        })
+
+    planned_gain = net_taxable_gain_aud(base, carried_forward_loss_aud)
+
+    return {
+        'valuation_date': valuation_date,
+        'exchange_rate': exchange_rate,
+        'commission_rate': commission_rate,
+        'objective': objective,
+        'target_taxable_gain_aud': target,
+        'booked_taxable_gain_aud': booked_taxable,
+        'planned_taxable_gain_aud': planned_gain,
+        'deviation_aud': planned_gain - target,
+        'transactions': len(orders),
+        'orders': orders
+    }
+
+
+def plan_to_sales_df(plan):
+    """
+    Convert a plan into a sales DataFrame accepted by calculate_australian_cgt_aud().
+
+    Useful to confirm the plan with the real CGT calculator before placing orders.
+    """
+    sales_data = []
+    for order in plan['orders']:
+        total_proceeds_usd = order['units'] * order['sale_price_usd']
+        commission_usd = total_proceeds_usd * plan['commission_rate']
+        sales_data.append({
+            'Symbol': order['symbol'],
+            'Trade Date': pd.Timestamp(plan['valuation_date']),
+            'Units_Sold': order['units'],
+            'Sale_Price_Per_Unit': order['sale_price_usd'],
+            'Total_Proceeds': total_proceeds_usd,
+            'Commission_Paid': commission_usd,
+            'Net_Proceeds': total_proceeds_usd - commission_usd
+        })
+
+    return pd.DataFrame(sales_data, columns=[
+        'Symbol', 'Trade Date', 'Units_Sold', 'Sale_Price_Per_Unit',
+        'Total_Proceeds', 'Commission_Paid', 'Net_Proceeds'
+    ])
+
+
+def display_plan(plan):
+    """Print a sell-to-target plan."""
+    print(f"\n🎯 SELL-TO-TARGET PLAN ({plan['valuation_date'].strftime('%Y-%m-%d')})")
+    print("=" * 60)
+    print(f"   Target taxable gain: ${plan['target_taxable_gain_aud']:,.2f} AUD")
+    print(f"   Already booked this FY: ${plan['booked_taxable_gain_aud']:,.2f} AUD")
+    print(f"   Planned taxable gain: ${plan['planned_taxable_gain_aud']:,.2f} AUD")
+    print(f"   Deviation: ${plan['deviation_aud']:,.2f} AUD")
+    print(f"   Sales needed: {plan['transactions']} (rate: {plan['exchange_rate']:.4f} AUD/USD)")
+
+    for order in plan['orders']:
+        print(f"\n   📉 SELL {order['units']:,.2f} {order['symbol']} @ ${order['sale_price_usd']:.2f} USD "
+              f"→ capital gain ${order['expected_capital_gain_aud']:,.2f} AUD")
+        for lot in order['lots']:
+            term = "long-term" if lot['long_term_eligible'] else "short-term"
+            print(f"      • {lot['units']:,.2f} units from {lot['buy_date']} ({term}): ${lot['capital_gain_aud']:,.2f} AUD")
+
+
+def load_prices_csv(file_path):
+    """Load current prices from a CSV with Symbol and Price_USD (or Price) columns."""
+    df = pd.read_csv(file_path)
+    price_column = 'Price_USD' if 'Price_USD' in df.columns else 'Price'
+    return {row['Symbol']: float(row[price_column]) for _, row in df.iterrows() if pd.notna(row[price_column])}
+
+
+def main():
+    """Interactive sell-to-target planning."""
+    print("🎯 SELL-TO-TARGET CGT PLANNER (AUD)")
+    print("=" * 60)
+    print("• Uses your AUD-enhanced cost basis dictionary")
+    print("• Plans sales to realize a target taxable gain or loss")
+    print("• Follows the same lot matching as the CGT calculator")
+    print()
+
+    cost_basis_files = [f for f in os.listdir('.') if 'cost_basis' in f.lower() and f.endswith('.json')]
+    if cost_basis_files:
+        print("🔍 Found cost basis files:")
+        for i, file in enumerate(cost_basis_files, 1):
+            print(f"   {i}. {file}")
+
+    try:
+        cost_choice = input("Cost basis JSON file (number or filename): ").strip()
+        try:
+            cost_basis_file = cost_basis_files[int(cost_choice) - 1]
+        except:
+            cost_basis_file = cost_choice
+
+        prices_file = input("Current prices CSV (Symbol, Price_USD): ").strip()
+        target = float(input("Target taxable gain in AUD (negative to realize a loss): ").strip())
+    except KeyboardInterrupt:
+        print("\n⚠️ Process interrupted")
+        return
+    except ValueError:
+        print("❌ Invalid target amount")
+        return
+
+    cost_basis_dict = load_cost_basis_json_aud(cost_basis_file)
+    if cost_basis_dict is None:
+        return
+
+    try:
+        prices = load_prices_csv(prices_file)
+        plan = plan_sales_to_target(cost_basis_dict, prices, target)
+        display_plan(plan)
+    except Exception as e:
+        print(f"❌ Error planning sales: {e}")
+        print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    main()
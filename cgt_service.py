@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Headless CGT Service
+
+A local HTTP/JSON service wrapping ingest → FIFO → CGT → export for batch
+work across many clients. The RBA rate table is loaded once at startup and
+shared by every job; jobs run on a JobRegistry worker pool (cgt_jobs) with a
+bounded queue, so a burst of uploads gets 429 responses instead of an
+unbounded backlog. Uploading the same files with the same settings attaches
+to the existing job.
+
+Endpoints:
+    POST /jobs                         multipart/form-data: one or more 'files'
+                                       (HTML statements, transaction CSVs) and
+                                       financial_year, strategy, sell_cutoff
+    GET  /jobs                         all known jobs
+    GET  /jobs/<id>[?wait=seconds]     status, progress and summary
+    GET  /jobs/<id>/artifacts/<name>   report.xlsx, cgt_records.csv,
+                                       remaining_cost_basis.json
+    GET  /stats                        job throughput, queue and latencies
+    GET  /health
+
+Standard library only (wsgiref). CGTService is a plain WSGI app, so tests
+drive it in-process through ServiceTestClient without opening a socket.
+
+Usage:
+    python cgt_service.py [--host 127.0.0.1] [--port 8765] [--workers 2] [--max-queue 16]
+"""
+
+import argparse
+import email.parser
+import email.policy
+import hashlib
+import io
+import json
+import os
+import re
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from urllib.parse import parse_qs
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import CGT_STRATEGIES, save_cgt_excel_aud
+from cgt_jobs import JOB_DONE, JOB_FAILED, JobQueueFull, JobRegistry
+from cgt_pipeline import default_sell_cutoff, stage_cgt, stage_dedup, stage_fifo, stage_rates, stage_sales
+from complete_unified_with_aud import is_transaction_csv, standardize_csv_file, standardize_html_file
+from thread_output import quiet
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE = 16
+
+# Request bodies above this size are rejected with 413
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+# Longest a GET /jobs/<id>?wait=... request may block
+MAX_WAIT_SECONDS = 30
+
+# Latency samples kept per route and for job run/wait times
+LATENCY_SAMPLES = 1000
+
+ARTIFACT_TYPES = {
+    'report.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'cgt_records.csv': 'text/csv; charset=utf-8',
+    'remaining_cost_basis.json': 'application/json'
+}
+
+HTTP_STATUS = {
+    200: '200 OK',
+    202: '202 Accepted',
+    400: '400 Bad Request',
+    404: '404 Not Found',
+    405: '405 Method Not Allowed',
+    413: '413 Payload Too Large',
+    429: '429 Too Many Requests',
+    500: '500 Internal Server Error'
+}
+
+
+class ServiceError(Exception):
+    """An error answered with an HTTP status and a JSON {'error': ...} body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_multipart(body, content_type):
+    """
+    Split a multipart/form-data body into ({field: str}, [(filename, bytes)]).
+    Parts with a filename are files; repeated file fields are all kept.
+    """
+    if not content_type.startswith('multipart/form-data'):
+        raise ServiceError(400, "Expected multipart/form-data")
+
+    header = f"Content-Type: {content_type}\r\n\r\n".encode('latin-1')
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + body)
+    if not message.is_multipart():
+        raise ServiceError(400, "Malformed multipart body")
+
+    fields, files = {}, []
+    for part in message.iter_parts():
+        payload = part.get_payload(decode=True) or b''
+        filename = part.get_filename()
+        if filename:
+            files.append((os.path.basename(filename), payload))
+        else:
+            fields[part.get_param('name', header='content-disposition')] = payload.decode('utf-8').strip()
+    return fields, files
+
+
+def encode_multipart(fields=None, files=None):
+    """
+    Build a multipart/form-data body from {field: value} and
+    [(field, filename, bytes)]. Returns (body, content_type).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in (fields or {}).items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for field, filename, data in (files or []):
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode('utf-8') + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _latency_summary(samples):
+    """count/p50/p95/max of a sequence of durations (nearest-rank percentiles)."""
+    values = sorted(samples)
+    if not values:
+        return {'count': 0, 'p50': None, 'p95': None, 'max': None}
+
+    def percentile(fraction):
+        return round(values[min(len(values) - 1, int(fraction * len(values)))], 4)
+
+    return {'count': len(values), 'p50': percentile(0.5), 'p95': percentile(0.95), 'max': round(values[-1], 4)}
+
+
+def standardize_upload(path, name):
+    """Standardized transactions from one uploaded file, or None if it is not a transaction file."""
+    lower = name.lower()
+    if lower.endswith(('.htm', '.html')):
+        return standardize_html_file(path)
+    if lower.endswith('.csv') and is_transaction_csv(name):
+        return standardize_csv_file(path)
+    return None
+
+
+class CGTService:
+    """
+    WSGI app and job runner. exchange_rates may be passed in directly
+    (a {YYYY-MM-DD: rate} dict); otherwise they are loaded from rates_folder.
+    """
+
+    def __init__(self, rates_folder='rates', workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE,
+                 exchange_rates=None, verbose=False):
+        self.verbose = verbose
+        if exchange_rates is None:
+            with quiet(verbose):
+                exchange_rates = stage_rates(rates_folder)
+        self.exchange_rates = exchange_rates
+
+        self.registry = JobRegistry(max_workers=workers, max_pending=max_queue)
+        self.started = time.time()
+
+        self._stats_lock = threading.Lock()
+        self._job_counts = Counter()
+        self._run_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._wait_seconds = deque(maxlen=LATENCY_SAMPLES)
+        self._request_ms = {}
+
+    # ------------------------------------------------------------ jobs
+
+    def submit(self, files, financial_year, strategy='tax_optimal', sell_cutoff=None):
+        """
+        Queue a job for [(filename, bytes)]. Returns (job, created); created
+        is False when identical files and settings attached to an existing job.
+        """
+        if not files:
+            raise ServiceError(400, "Upload at least one file")
+        if not re.fullmatch(r'\d{4}-\d{2}', financial_year or ''):
+            raise ServiceError(400, f"financial_year must look like 2024-25, got '{financial_year}'")
+        if strategy not in CGT_STRATEGIES:
+            raise ServiceError(400, f"strategy must be one of {CGT_STRATEGIES}")
+        sell_cutoff = sell_cutoff or default_sell_cutoff(financial_year)
+        try:
+            datetime.strptime(sell_cutoff, '%Y-%m-%d')
+        except ValueError:
+            raise ServiceError(400, f"sell_cutoff must be YYYY-MM-DD, got '{sell_cutoff}'")
+
+        key = hashlib.sha256(json.dumps([
+            financial_year, strategy, sell_cutoff,
+            [[name, hashlib.sha256(data).hexdigest()] for name, data in files]
+        ]).encode('utf-8')).hexdigest()[:20]
+
+        existing = self.registry.get(key)
+        try:
+            job = self.registry.submit(key, self.process_upload, time.time(), files,
+                                       financial_year, strategy, sell_cutoff)
+        except JobQueueFull as e:
+            self._count('rejected')
+            raise ServiceError(429, str(e))
+
+        created = job is not existing
+        self._count('submitted' if created else 'attached')
+        return job, created
+
+    def process_upload(self, submitted, files, financial_year, strategy, sell_cutoff, progress):
+        """
+        Job body: ingest → dedup → FIFO → sales → CGT → artifacts. Its
+        print() output is dropped unless verbose (per job thread, see thread_output).
+        """
+        started = time.time()
+        outcome = 'failed'
+        try:
+            with quiet(self.verbose):
+                result = self._process(files, financial_year, strategy, sell_cutoff, progress)
+            outcome = 'completed'
+            return result
+        finally:
+            with self._stats_lock:
+                self._job_counts[outcome] += 1
+                self._wait_seconds.append(started - submitted)
+                self._run_seconds.append(time.time() - started)
+
+    def _process(self, files, financial_year, strategy, sell_cutoff, progress):
+        timings = {}
+        stage_started = time.time()
+
+        frames, skipped = [], []
+        with tempfile.TemporaryDirectory(prefix='cgt_job_') as job_dir:
+            for number, (name, data) in enumerate(files):
+                progress('files', number, len(files), f"Parsing {name}")
+                file_dir = os.path.join(job_dir, str(number))
+                os.makedirs(file_dir)
+                path = os.path.join(file_dir, name)
+                with open(path, 'wb') as f:
+                    f.write(data)
+                standardized = standardize_upload(path, name)
+                if standardized is None or len(standardized) == 0:
+                    skipped.append(name)
+                else:
+                    frames.append(standardized)
+        progress('files', len(files), len(files))
+        timings['ingest'] = time.time() - stage_started
+
+        if not frames:
+            raise ValueError(f"No transactions found in the uploaded files ({', '.join(skipped)})")
+
+        stage_started = time.time()
+        dedup = stage_dedup(pd.concat(frames, ignore_index=True))
+        fifo = stage_fifo(dedup, self.exchange_rates, sell_cutoff,
+                          progress_callback=lambda done, total: progress('symbols', done, total))
+        timings['fifo'] = time.time() - stage_started
+
+        stage_started = time.time()
+        sales = stage_sales(dedup, financial_year)
+        cgt = stage_cgt(sales, fifo, strategy,
+                        progress_callback=lambda done, total: progress('sales', done, total))
+        timings['cgt'] = time.time() - stage_started
+
+        stage_started = time.time()
+        cgt_df = cgt['cgt_df']
+        artifacts = {
+            'cgt_records.csv': cgt_df.to_csv(index=False).encode('utf-8'),
+            'remaining_cost_basis.json': json.dumps(cgt['remaining_cost_basis'], indent=2).encode('utf-8')
+        }
+        if len(cgt_df):
+            buffer = io.BytesIO()
+            if save_cgt_excel_aud(cgt_df, financial_year, buffer):
+                artifacts['report.xlsx'] = buffer.getvalue()
+        timings['export'] = time.time() - stage_started
+
+        return {
+            'summary': {
+                'financial_year': financial_year,
+                'strategy': strategy,
+                'sell_cutoff': sell_cutoff,
+                'files': len(files),
+                'skipped_files': skipped,
+                'transactions': len(dedup),
+                'symbols_with_lots': len(fifo['cost_basis']),
+                'sales': len(sales),
+                'cgt_records': len(cgt_df),
+                'total_gain_aud': round(float(cgt_df['Capital_Gain_Loss_AUD'].sum()), 2) if len(cgt_df) else 0.0,
+                'taxable_gain_aud': round(float(cgt_df['Taxable_Gain_AUD'].sum()), 2) if len(cgt_df) else 0.0,
+                'warnings': cgt['warnings'],
+                'conversion_errors': fifo['conversion_errors'],
+                'stage_seconds': {stage: round(seconds, 4) for stage, seconds in timings.items()}
+            },
+            'artifacts': artifacts
+        }
+
+    def job_status(self, job):
+        """JSON-ready status of a job."""
+        return self.status_from_snapshot(job.snapshot())
+
+    @staticmethod
+    def status_from_snapshot(snapshot):
+        status = {
+            'id': snapshot['key'],
+            'status': snapshot['status'],
+            'progress': {stage: {'done': done, 'total': total}
+                         for stage, (done, total) in snapshot['progress'].items()},
+            'message': snapshot['message'],
+            'elapsed_seconds': round(snapshot['elapsed'], 4)
+        }
+        if snapshot['status'] == JOB_FAILED:
+            status['error'] = snapshot['error']
+        if snapshot['status'] == JOB_DONE:
+            status['summary'] = snapshot['result']['summary']
+            status['artifacts'] = {
+                name: f"/jobs/{snapshot['key']}/artifacts/{name}" for name in snapshot['result']['artifacts']
+            }
+        return status
+
+    def stats(self):
+        """Throughput, queue depth and latency figures."""
+        uptime = time.time() - self.started
+        jobs = self.registry.jobs()
+        with self._stats_lock:
+            counts = dict(self._job_counts)
+            return {
+                'uptime_seconds': round(uptime, 3),
+                'workers': self.registry.max_workers,
+                'max_queue': self.registry.max_pending,
+                'queue': {
+                    'queued': sum(1 for job in jobs if job['status'] == 'queued'),
+                    'running': sum(1 for job in jobs if job['status'] == 'running')
+                },
+                'jobs': counts,
+                'throughput_jobs_per_minute': round(counts.get('completed', 0) / uptime * 60, 3) if uptime else 0.0,
+                'job_run_seconds': _latency_summary(self._run_seconds),
+                'job_wait_seconds': _latency_summary(self._wait_seconds),
+                'requests_ms': {route: _latency_summary(samples) for route, samples in self._request_ms.items()}
+            }
+
+    def shutdown(self):
+        self.registry.shutdown(wait=True)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._job_counts[name] += 1
+
+    # ------------------------------------------------------------ HTTP
+
+    def __call__(self, environ, start_response):
+        started = time.time()
+        method = environ['REQUEST_METHOD']
+        parts = [part for part in environ.get('PATH_INFO', '').split('/') if part]
+        route = '/' + '/'.join(parts[:1] + ['<id>'] * (len(parts) > 1) + parts[2:3])
+
+        try:
+            status, body, content_type, headers = self._dispatch(method, parts, environ)
+        except ServiceError as e:
+            status, body, content_type, headers = e.status, {'error': str(e)}, None, []
+            if e.status == 429:
+                headers = [('Retry-After', '5')]
+        except Exception as e:
+            status, body, content_type, headers = 500, {'error': f"{type(e).__name__}: {e}"}, None, []
+
+        if content_type is None:
+            body = json.dumps(body, default=str).encode('utf-8')
+            content_type = 'application/json'
+        start_response(HTTP_STATUS[status], [
+            ('Content-Type', content_type), ('Content-Length', str(len(body)))
+        ] + headers)
+
+        with self._stats_lock:
+            self._request_ms.setdefault(f"{method} {route}", deque(maxlen=LATENCY_SAMPLES)).append(
+                (time.time() - started) * 1000)
+        return [body]
+
+    def _dispatch(self, method, parts, environ):
+        """(status, body, content_type, headers); a None content_type means a JSON body."""
+        if parts == ['health']:
+            return 200, {'status': 'ok', 'exchange_rates': len(self.exchange_rates)}, None, []
+        if parts == ['stats']:
+            return 200, self.stats(), None, []
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                return 200, {'jobs': [self.status_from_snapshot(job) for job in self.registry.jobs()]}, None, []
+            if method != 'POST':
+                raise ServiceError(405, f"{method} not allowed on /jobs")
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            if length > MAX_UPLOAD_BYTES:
+                raise ServiceError(413, f"Upload is {length} bytes; the limit is {MAX_UPLOAD_BYTES}")
+            fields, files = parse_multipart(environ['wsgi.input'].read(length), environ.get('CONTENT_TYPE', ''))
+            job, created = self.submit(files, fields.get('financial_year'), fields.get('strategy') or 'tax_optimal',
+                                       fields.get('sell_cutoff'))
+            return (202 if created else 200), self.job_status(job), None, [('Location', f"/jobs/{job.key}")]
+
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            if method != 'GET':
+                raise ServiceError(405, f"{method} not allowed on /jobs/{parts[1]}")
+            job = self.registry.get(parts[1])
+            if job is None:
+                raise ServiceError(404, f"No job '{parts[1]}'")
+
+            if len(parts) == 2:
+                wait = parse_qs(environ.get('QUERY_STRING', '')).get('wait')
+                if wait:
+                    try:
+                        seconds = float(wait[0])
+                    except ValueError:
+                        seconds = float('nan')
+                    if not seconds >= 0:
+                        raise ServiceError(400, f"wait must be a non-negative number of seconds, got '{wait[0]}'")
+                    job.wait(min(seconds, MAX_WAIT_SECONDS))
+                return 200, self.job_status(job), None, []
+
+            if len(parts) == 4 and parts[2] == 'artifacts':
+                if job.status != JOB_DONE or parts[3] not in job.result['artifacts']:
+                    raise ServiceError(404, f"No artifact '{parts[3]}' for job '{parts[1]}'")
+                return 200, job.result['artifacts'][parts[3]], ARTIFACT_TYPES[parts[3]], [
+                    ('Content-Disposition', f'attachment; filename="{parts[3]}"')
+                ]
+
+        raise ServiceError(404, f"No route for {method} /{'/'.join(parts)}")
+
+
+# ---------------------------------------------------------------- testing
+
+class ServiceResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ServiceTestClient:
+    """Calls a WSGI app in-process, without sockets."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=b'', content_type=None):
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'CONTENT_TYPE': content_type or '',
+            'CONTENT_LENGTH': str(len(body)),
+            'SERVER_NAME': 'testclient',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured['status'] = int(status.split()[0])
+            captured['headers'] = dict(headers)
+
+        body = b''.join(self.app(environ, start_response))
+        return ServiceResponse(captured['status'], captured['headers'], body)
+
+    def get(self, path):
+        return self.request('GET', path)
+
+    def post(self, path, fields=None, files=None):
+        """files is a list of (filename, bytes), sent as repeated 'files' fields."""
+        body, content_type = encode_multipart(fields, [('files', name, data) for name, data in (files or [])])
+        return self.request('POST', path, body, content_type)
+
+
+# ---------------------------------------------------------------- server
+
+class _ThreadingWSGIServer(socketserver.ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP/JSON service for batch CGT processing")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="Jobs queued or running before new uploads get 429")
+    parser.add_argument('--rates-folder', default='rates')
+    parser.add_argument('--verbose', action='store_true', help="Show job output and request logs")
+    args = parser.parse_args()
+
+    print("💱 Loading RBA exchange rates...")
+    service = CGTService(args.rates_folder, workers=args.workers, max_queue=args.max_queue, verbose=args.verbose)
+    print(f"✅ {len(service.exchange_rates)} exchange rates loaded")
+
+    handler = WSGIRequestHandler if args.verbose else _QuietHandler
+    server = make_server(args.host, args.port, service, server_class=_ThreadingWSGIServer, handler_class=handler)
+    print(f"🚀 CGT service on http://{args.host}:{args.port} "
+          f"({args.workers} workers, queue limit {args.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Shutting down")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Streaming Australian CGT Calculation
+
+Runs the same lot matching as calculate_australian_cgt_aud() over a sale
+history that arrives as an iterator sorted by date, and hands CGT records to
+sinks in fixed-size batches instead of collecting them in one DataFrame.
+
+- Sales can come from a DataFrame, an iterable of DataFrame chunks (e.g.
+  iter_sales_csv()) or an iterable of row dictionaries
+- Records go to pluggable sinks: CSV, Parquet or a constant-memory Excel workbook
+- ATO summary figures are kept as running aggregates
+- Memory grows with the number of lots sold from, not the number of sales
+"""
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    CGT_COLUMNS, ATO_REPORT_COLUMNS, CGTLotTable, ATOSummaryAccumulator,
+    StreamingWorkbook, calculate_cgt_batch_aud
+)
+from cgt_parquet_io import DEFAULT_COMPRESSION, PARQUET_AVAILABLE, cgt_schema
+from cost_basis_lot_store import CostBasisLotStore
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Warning messages kept in memory for the run summary (warning rows still reach the sinks)
+MAX_WARNINGS_KEPT = 100
+
+
+def iter_sales_csv(file_path, chunksize=DEFAULT_BATCH_SIZE):
+    """
+    Read a date-sorted sales CSV in chunks.
+
+    Yields DataFrames with 'Trade Date' parsed to datetime (taken from
+    'Trade Date' or 'Date', like load_sales_csv()).
+    """
+    for chunk in pd.read_csv(file_path, chunksize=chunksize):
+        if 'Trade Date' in chunk.columns:
+            chunk['Trade Date'] = pd.to_datetime(chunk['Trade Date'])
+        elif 'Date' in chunk.columns:
+            chunk['Trade Date'] = pd.to_datetime(chunk['Date'])
+        yield chunk
+
+
+def iter_sales_batches(sales, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Split sales into DataFrame batches of at most batch_size rows.
+
+    Raises ValueError if the sales are not sorted by 'Trade Date', since lot
+    matching (and the 12-month discount test) depends on processing order.
+    """
+    last_date = None
+
+    def checked(batch):
+        nonlocal last_date
+        dates = pd.to_datetime(batch['Trade Date'], errors='coerce')
+        valid = dates.dropna()
+        if len(valid) > 0:
+            if not valid.is_monotonic_increasing or (last_date is not None and valid.iloc[0] < last_date):
+                raise ValueError("Sales must be sorted by Trade Date for streaming CGT")
+            last_date = valid.iloc[-1]
+        return batch
+
+    if isinstance(sales, pd.DataFrame):
+        sales = [sales]
+
+    rows = []
+    for item in sales:
+        if isinstance(item, pd.DataFrame):
+            if rows:
+                yield checked(pd.DataFrame(rows))
+                rows = []
+            for start in range(0, len(item), batch_size):
+                yield checked(item.iloc[start:start + batch_size])
+        else:
+            rows.append(item)
+            if len(rows) >= batch_size:
+                yield checked(pd.DataFrame(rows))
+                rows = []
+
+    if rows:
+        yield checked(pd.DataFrame(rows))
+
+
+def stream_australian_cgt_aud(sales, cost_basis, batch_size=DEFAULT_BATCH_SIZE,
+                              warnings_callback=None, verbose=False, strategy='tax_optimal'):
+    """
+    Generator version of calculate_australian_cgt_aud().
+
+    Yields one CGT DataFrame (CGT_COLUMNS) per batch of sales. Records are
+    identical to a single calculate_australian_cgt_aud() run over the same
+    sales. Pass a CostBasisLotStore as cost_basis to read the remaining cost
+    basis once the generator is exhausted.
+
+    Args:
+        sales: DataFrame, iterable of DataFrames or iterable of row dicts, sorted by Trade Date
+        cost_basis: Cost basis dictionary (never modified) or CostBasisLotStore
+        batch_size (int): Sales per batch
+        warnings_callback (callable): Called with each batch's list of warnings
+        verbose (bool): Print a line per sale and per warning
+        strategy (str): Lot matching strategy ('tax_optimal' or 'fifo')
+    """
+    if isinstance(cost_basis, CostBasisLotStore):
+        lot_store = cost_basis
+    else:
+        lot_store = CostBasisLotStore(cost_basis)
+
+    lot_table = CGTLotTable()
+    rate_cache = {}
+
+    try:
+        for batch in iter_sales_batches(sales, batch_size):
+            batch_warnings = []
+            cgt_batch = calculate_cgt_batch_aud(
+                batch, lot_store, lot_table, rate_cache, batch_warnings, verbose=verbose, strategy=strategy
+            )
+            if warnings_callback is not None and batch_warnings:
+                warnings_callback(batch_warnings)
+            yield cgt_batch
+    finally:
+        # Keep the lot store consistent with what was yielded, even if the caller stops early
+        lot_table.commit(lot_store)
+
+
+class CSVCGTSink:
+    """Append CGT records to a CSV file."""
+
+    def __init__(self, output_file, columns=None):
+        self.output_file = output_file
+        self.columns = columns or CGT_COLUMNS
+        self._file = open(output_file, 'w', newline='')
+        self._file.write(','.join(self.columns) + '\n')
+
+    def write(self, cgt_batch):
+        cgt_batch.to_csv(self._file, columns=self.columns, header=False, index=False)
+
+    def close(self, summary):
+        self._file.close()
+        return self.output_file
+
+
+class ParquetCGTSink:
+    """Write CGT records to a Parquet file, one row group per batch."""
+
+    def __init__(self, output_file, compression=DEFAULT_COMPRESSION):
+        self.output_file = output_file
+        self.schema = cgt_schema()
+        self._writer = pq.ParquetWriter(output_file, self.schema, compression=compression)
+
+    def write(self, cgt_batch):
+        if len(cgt_batch) == 0:
+            return
+        self._writer.write_table(pa.Table.from_pandas(cgt_batch, schema=self.schema, preserve_index=False))
+
+    def close(self, summary):
+        self._writer.close()
+        return self.output_file
+
+
+class ExcelCGTSink:
+    """
+    Stream CGT records into an ATO report workbook in constant memory.
+
+    Same CGT_Calculations_AUD, ATO_Summary and Warnings sheets as
+    save_cgt_excel_aud(). The Exchange_Rates sheet is not produced, since it
+    needs de-duplication over the whole run.
+    """
+
+    def __init__(self, output_file, financial_year):
+        self.output_file = output_file
+        self.financial_year = financial_year
+        self._book = StreamingWorkbook(output_file)
+        self._book.add_sheet('CGT_Calculations_AUD', ATO_REPORT_COLUMNS)
+        self._book.add_sheet('ATO_Summary')
+        self._has_warnings_sheet = False
+
+    def write(self, cgt_batch):
+        if len(cgt_batch) == 0:
+            return
+        report_rows = cgt_batch[ATO_REPORT_COLUMNS]
+        self._book.append_dataframe('CGT_Calculations_AUD', report_rows)
+
+        warning_rows = report_rows[report_rows['Warning'] != '']
+        if len(warning_rows) > 0:
+            if not self._has_warnings_sheet:
+                self._book.add_sheet('Warnings', ATO_REPORT_COLUMNS)
+                self._has_warnings_sheet = True
+            self._book.append_dataframe('Warnings', warning_rows)
+
+    def close(self, summary):
+        summary_df = summary.summary_df(self.financial_year)
+        self._book.append_row('ATO_Summary', list(summary_df.columns))
+        self._book.append_dataframe('ATO_Summary', summary_df)
+        self._book.close()
+        return self.output_file
+
+
+def run_streaming_cgt(sales, cost_basis, sinks=(), financial_year=None,
+                      batch_size=DEFAULT_BATCH_SIZE, verbose=False, strategy='tax_optimal'):
+    """
+    Stream a sale history through the CGT calculation into sinks.
+
+    Returns:
+        dict: summary (ATOSummaryAccumulator), remaining_cost_basis,
+              warning_count, warnings (first MAX_WARNINGS_KEPT), sales_batches,
+              outputs (what each sink's close() returned)
+    """
+    lot_store = cost_basis if isinstance(cost_basis, CostBasisLotStore) else CostBasisLotStore(cost_basis)
+    summary = ATOSummaryAccumulator()
+    warning_state = {'count': 0, 'kept': []}
+
+    def on_warnings(batch_warnings):
+        warning_state['count'] += len(batch_warnings)
+        room = MAX_WARNINGS_KEPT - len(warning_state['kept'])
+        if room > 0:
+            warning_state['kept'].extend(batch_warnings[:room])
+
+    print(f"\n🌊 STREAMING AUSTRALIAN CGT (batches of {batch_size} sales)")
+
+    batches = 0
+    for cgt_batch in stream_australian_cgt_aud(sales, lot_store, batch_size=batch_size,
+                                               warnings_callback=on_warnings, verbose=verbose,
+                                               strategy=strategy):
+        batches += 1
+        summary.update(cgt_batch)
+        for sink in sinks:
+            sink.write(cgt_batch)
+
+    outputs = [sink.close(summary) for sink in sinks]
+    remaining_cost_basis = lot_store.remaining_cost_basis(copy=True)
+
+    print(f"✅ Streamed {summary.record_count} CGT records in {batches} batches")
+    print(f"   ⚠️  {warning_state['count']} warnings")
+    print(f"   📋 {len(remaining_cost_basis)} symbols with remaining units")
+    if financial_year is not None:
+        summary.print_summary(financial_year)
+
+    return {
+        'summary': summary,
+        'remaining_cost_basis': remaining_cost_basis,
+        'warning_count': warning_state['count'],
+        'warnings': warning_state['kept'],
+        'sales_batches': batches,
+        'outputs': outputs
+    }
@@ -15,15 +15,20 @@ PERFECT FOR: CGT optimization + ATO-compliant AUD reporting!
 """
 
 import pandas as pd
-import numpy as np
 import json
 import os
 import glob
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import warnings
 import re
 import traceback
 
+from rba_rates import parse_rba_date, parse_rba_rate_row, rate_for_date
+from transaction_formats import CSV_FORMATS, TRANSACTION_DATE_FORMATS, detect_csv_format, standardize_frame
+from thread_output import capture_output
+
 # RBA AUD Converter Class
 class RBAAUDConverter:
     """RBA AUD/USD exchange rate converter for CGT calculations."""
@@ -95,45 +100,14 @@ class RBAAUDConverter:
         
         try:
             for index, row in df.iterrows():
-                try:
-                    # Convert row to list to work with positions
-                    row_values = [str(val).strip() for val in row.values if pd.notna(val)]
-                    
-                    if len(row_values) < 2:
-                        continue
-                    
-                    # Try to parse first column as date
-                    date_str = row_values[0]
-                    rate_str = row_values[1] if len(row_values) > 1 else None
-                    
-                    # Skip header rows and metadata
-                    if any(word in date_str.lower() for word in ['date', 'series', 'unit', 'frequency', 'f11']):
-                        continue
-                    
-                    # Try multiple date formats
-                    parsed_date = self._parse_date_flexible(date_str)
-                    if not parsed_date:
-                        continue
-                    
-                    # Try to parse rate
-                    if rate_str and rate_str != '':
-                        try:
-                            # Remove any non-numeric characters except decimal points
-                            clean_rate = re.sub(r'[^\d.]', '', rate_str)
-                            if clean_rate:
-                                rate = float(clean_rate)
-                                
-                                # Sanity check: AUD/USD rate should be between 0.4 and 1.2
-                                if 0.4 <= rate <= 1.2:
-                                    rates_data.append({
-                                        'date': parsed_date,
-                                        'aud_usd_rate': rate
-                                    })
-                        except (ValueError, TypeError):
-                            continue
-                            
-                except Exception:
-                    continue
+                # Convert row to list to work with positions
+                row_values = [str(val).strip() for val in row.values if pd.notna(val)]
+                parsed = parse_rba_rate_row(row_values)
+                if parsed:
+                    rates_data.append({
+                        'date': parsed[0],
+                        'aud_usd_rate': parsed[1]
+                    })
             
             # If we didn't find data in standard format, try alternative parsing
             if not rates_data:
@@ -193,47 +167,18 @@ class RBAAUDConverter:
         """Parse dates in multiple formats commonly used by RBA."""
         if not date_str or pd.isna(date_str):
             return None
-            
-        date_str = str(date_str).strip()
-        
-        # Skip obviously non-date strings
-        if len(date_str) < 6 or any(word in date_str.lower() for word in ['nan', 'series', 'unit']):
-            return None
-        
-        formats_to_try = [
-            "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d",
-            "%d %b %Y", "%d-%b-%Y", "%b %d, %Y"
-        ]
-        
-        for fmt in formats_to_try:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
-        
-        return None
+        return parse_rba_date(date_str)
     
     def get_rate_for_date(self, date, fallback_method='previous_business_day'):
         """Get AUD/USD exchange rate for a specific date."""
         if isinstance(date, str):
             date = datetime.strptime(date, '%Y-%m-%d')
         
-        date_str = date.strftime('%Y-%m-%d')
-        
-        # Direct lookup
-        if date_str in self.exchange_rates:
-            return self.exchange_rates[date_str]
+        if fallback_method != 'previous_business_day':
+            return self.exchange_rates.get(date.strftime('%Y-%m-%d'))
         
-        # Fallback methods
-        if fallback_method == 'previous_business_day':
-            # Go back up to 7 days
-            for i in range(1, 8):
-                fallback_date = date - timedelta(days=i)
-                fallback_str = fallback_date.strftime('%Y-%m-%d')
-                if fallback_str in self.exchange_rates:
-                    return self.exchange_rates[fallback_str]
-        
-        return None
+        # Direct lookup, else go back up to 7 days
+        return rate_for_date(self.exchange_rates, date)[0]
     
     def convert_usd_to_aud(self, usd_amount, date):
         """Convert USD amount to AUD using historical exchange rate."""
@@ -394,12 +339,7 @@ def robust_date_parser(date_str):
         return datetime(1900, 1, 1)
     
     date_str = str(date_str).strip()
-    formats_to_try = [
-        "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d.%m.%y", "%d.%m.%Y",
-        "%Y-%m-%d %H:%M:%S", "%d/%m/%y", "%m/%d/%y"
-    ]
-    
-    for fmt in formats_to_try:
+    for fmt in TRANSACTION_DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt)
         except ValueError:
@@ -422,6 +362,28 @@ def format_date_for_output(date_str):
             return '.'.join(parts)
     return str(date_str)
 
+def standardize_html_file(html_file, sell_cutoff_date=None):
+    """
+    Parse one HTML statement into the standardized transaction layout
+    (Symbol, Date, Activity, Quantity, Price, Commission, Source).
+    Returns None if the file has no transactions.
+    """
+    df = parse_html_file_with_hybrid_filtering(html_file, sell_cutoff_date)
+    if df is None or len(df) == 0:
+        return None
+    
+    standardized = pd.DataFrame()
+    standardized['Symbol'] = df['Symbol']
+    standardized['Date'] = df['Trade Date'].astype(str)
+    standardized['Activity'] = df['Type'].map({'BUY': 'PURCHASED', 'SELL': 'SOLD'})
+    standardized['Quantity'] = df['Quantity'].abs()
+    standardized['Price'] = df['Price (USD)'].abs()
+    standardized['Commission'] = df['Commission (USD)'].abs()
+    standardized['Source'] = f'HTML_{os.path.basename(html_file)}'
+    
+    # Clean up
+    return standardized.dropna(subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'])
+
 def load_html_files_hybrid(sell_cutoff_date=None):
     """Load and parse HTML files with hybrid filtering."""
     print(f"\n📁 LOADING HTML FILES (HYBRID MODE)")
@@ -448,23 +410,9 @@ def load_html_files_hybrid(sell_cutoff_date=None):
             print(f"   • {os.path.basename(html_file)}")
     
     for html_file in html_files:
-        # Parse HTML with hybrid filtering
-        df = parse_html_file_with_hybrid_filtering(html_file, sell_cutoff_date)
+        standardized = standardize_html_file(html_file, sell_cutoff_date)
         
-        if df is not None and len(df) > 0:
-            # Standardize HTML data
-            standardized = pd.DataFrame()
-            standardized['Symbol'] = df['Symbol']
-            standardized['Date'] = df['Trade Date'].astype(str)
-            standardized['Activity'] = df['Type'].map({'BUY': 'PURCHASED', 'SELL': 'SOLD'})
-            standardized['Quantity'] = df['Quantity'].abs()
-            standardized['Price'] = df['Price (USD)'].abs()
-            standardized['Commission'] = df['Commission (USD)'].abs()
-            standardized['Source'] = f'HTML_{os.path.basename(html_file)}'
-            
-            # Clean up
-            standardized = standardized.dropna(subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'])
-            
+        if standardized is not None:
             if len(standardized) > 0:
                 html_data.append(standardized)
                 
@@ -485,6 +433,46 @@ Fix for CSV Loading Issue in complete_unified_with_aud.py
 Replace the load_manual_csv_files_hybrid() function with this enhanced version
 """
 
+def is_transaction_csv(csv_file):
+    """False for sales-only files and report/output CSVs."""
+    name = csv_file.lower()
+    if 'sales_only' in name:
+        return False
+    return not any(keyword in name for keyword in ['report', 'output', 'cgt_', 'result'])
+
+def standardize_csv_file(csv_file, sell_cutoff_date=None):
+    """
+    Read one transaction CSV (manual or parsed-HTML format) into the
+    standardized transaction layout. Returns None for unknown formats.
+    """
+    df = pd.read_csv(csv_file)
+    print(f"\n🔄 Processing {csv_file}:")
+    print(f"   📊 Shape: {df.shape}")
+    print(f"   📋 Columns: {list(df.columns)}")
+    
+    # Detect file format (Manual CSV or Parsed HTML, see transaction_formats.py)
+    format_name = detect_csv_format(df.columns)
+    if format_name is None:
+        print(f"   ❌ Unknown CSV format - skipping")
+        return None
+    spec = CSV_FORMATS[format_name]
+    print(f"   📝 Detected: {spec['label']} format")
+    
+    # Apply hybrid filtering: keep ALL BUY transactions, SELLs up to the cutoff
+    keep_sell = None
+    if sell_cutoff_date:
+        keep_sell = lambda dates: dates <= sell_cutoff_date
+    standardized = standardize_frame(df, format_name, f"{spec['source_prefix']}_{os.path.basename(csv_file)}",
+                                     parse_dates=bool(sell_cutoff_date), keep_sell=keep_sell)
+    
+    if sell_cutoff_date:
+        sell_filtered_count = int((df[spec['type_column']].map(spec['activities']) == 'SOLD').sum()
+                                  - (standardized['Activity'] == 'SOLD').sum())
+        if sell_filtered_count > 0:
+            print(f"   ⏹️ Filtered {sell_filtered_count} SELL transactions after cutoff")
+    
+    return standardized
+
 def load_manual_csv_files_hybrid_FIXED(sell_cutoff_date=None):
     """Load ALL CSV files with transaction data, not just 'manual' files."""
     print(f"\n📁 LOADING ALL CSV TRANSACTION FILES (FIXED VERSION)")
@@ -509,13 +497,10 @@ def load_manual_csv_files_hybrid_FIXED(sell_cutoff_date=None):
     # 3. Filter for transaction files (exclude sales-only files)
     transaction_files = []
     for csv_file in all_csv_files:
-        # Skip files that are clearly sales-only
-        if 'sales_only' in csv_file.lower():
-            print(f"   ⏩ Skipping sales-only file: {os.path.basename(csv_file)}")
-            continue
-        # Skip files that might be reports or outputs
-        if any(keyword in csv_file.lower() for keyword in ['report', 'output', 'cgt_', 'result']):
-            print(f"   ⏩ Skipping output file: {os.path.basename(csv_file)}")
+        # Skip sales-only files and reports or outputs
+        if not is_transaction_csv(csv_file):
+            kind = 'sales-only' if 'sales_only' in csv_file.lower() else 'output'
+            print(f"   ⏩ Skipping {kind} file: {os.path.basename(csv_file)}")
             continue
         transaction_files.append(csv_file)
     
@@ -530,90 +515,10 @@ def load_manual_csv_files_hybrid_FIXED(sell_cutoff_date=None):
     # Process each transaction file
     for csv_file in transaction_files:
         try:
-            df = pd.read_csv(csv_file)
-            print(f"\n🔄 Processing {csv_file}:")
-            print(f"   📊 Shape: {df.shape}")
-            print(f"   📋 Columns: {list(df.columns)}")
+            standardized = standardize_csv_file(csv_file, sell_cutoff_date)
             
-            # Detect file format and standardize
-            standardized = None
-            
-            # Format 1: Manual CSV format (Date, Activity_Type, Symbol, Quantity, Price_USD, etc.)
-            if all(col in df.columns for col in ['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']):
-                print(f"   📝 Detected: Manual CSV format")
-                
-                # Apply hybrid filtering for manual CSV
-                if sell_cutoff_date:
-                    df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%y', errors='coerce')
-                    
-                    # Split into SELL and BUY transactions
-                    sell_transactions = df[df['Activity_Type'] == 'SOLD']
-                    buy_transactions = df[df['Activity_Type'] == 'PURCHASED']
-                    
-                    # Filter SELL transactions by cutoff date
-                    sell_before_cutoff = sell_transactions[sell_transactions['Date'] <= sell_cutoff_date]
-                    sell_filtered_count = len(sell_transactions) - len(sell_before_cutoff)
-                    
-                    # Keep ALL BUY transactions
-                    df_filtered = pd.concat([buy_transactions, sell_before_cutoff], ignore_index=True)
-                    
-                    if sell_filtered_count > 0:
-                        print(f"   ⏹️ Filtered {sell_filtered_count} SELL transactions after cutoff")
-                    
-                    df = df_filtered
-                
-                # Create standardized DataFrame
-                standardized = pd.DataFrame()
-                standardized['Symbol'] = df['Symbol']
-                standardized['Date'] = df['Date'].astype(str)
-                standardized['Activity'] = df['Activity_Type'].map({'PURCHASED': 'PURCHASED', 'SOLD': 'SOLD'})
-                standardized['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce').abs()
-                standardized['Price'] = pd.to_numeric(df['Price_USD'], errors='coerce').abs()
-                standardized['Commission'] = 30.0  # Default for manual transactions
-                standardized['Source'] = f'Manual_{os.path.basename(csv_file)}'
-            
-            # Format 2: Parsed format (Symbol, Trade Date, Type, Quantity, Price (USD), etc.)
-            elif all(col in df.columns for col in ['Symbol', 'Trade Date', 'Type', 'Quantity', 'Price (USD)']):
-                print(f"   📝 Detected: Parsed HTML format")
-                
-                # Apply hybrid filtering for parsed CSV
-                if sell_cutoff_date:
-                    df['Trade Date'] = pd.to_datetime(df['Trade Date'])
-                    
-                    # Split into SELL and BUY transactions
-                    sell_transactions = df[df['Type'] == 'SELL']
-                    buy_transactions = df[df['Type'] == 'BUY']
-                    
-                    # Filter SELL transactions by cutoff date
-                    sell_before_cutoff = sell_transactions[sell_transactions['Trade Date'] <= sell_cutoff_date]
-                    sell_filtered_count = len(sell_transactions) - len(sell_before_cutoff)
-                    
-                    # Keep ALL BUY transactions
-                    df_filtered = pd.concat([buy_transactions, sell_before_cutoff], ignore_index=True)
-                    
-                    if sell_filtered_count > 0:
-                        print(f"   ⏹️ Filtered {sell_filtered_count} SELL transactions after cutoff")
-                    
-                    df = df_filtered
-                
-                # Create standardized DataFrame
-                standardized = pd.DataFrame()
-                standardized['Symbol'] = df['Symbol']
-                standardized['Date'] = df['Trade Date'].astype(str)
-                standardized['Activity'] = df['Type'].map({'BUY': 'PURCHASED', 'SELL': 'SOLD'})
-                standardized['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce').abs()
-                standardized['Price'] = pd.to_numeric(df['Price (USD)'], errors='coerce').abs()
-                standardized['Commission'] = pd.to_numeric(df.get('Commission (USD)', 0), errors='coerce').abs()
-                standardized['Source'] = f'Parsed_{os.path.basename(csv_file)}'
-            
-            else:
-                print(f"   ❌ Unknown CSV format - skipping")
-                continue
-            
-            # Clean up and validate
+            # Validate
             if standardized is not None:
-                standardized = standardized.dropna(subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'])
-                
                 if len(standardized) > 0:
                     manual_data.append(standardized)
                     
@@ -643,8 +548,64 @@ def load_manual_csv_files_hybrid_FIXED(sell_cutoff_date=None):
 # def load_manual_csv_files_hybrid(sell_cutoff_date=None):
 # And replace the entire function with the version above
 
-def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutoff_date=None):
-    """Apply HYBRID FIFO processing with AUD conversion."""
+def create_purchase_record_with_aud(symbol, quantity, price_usd, commission_usd, date_obj, date_str, aud_converter):
+    """
+    Build a cost basis purchase record with USD and AUD amounts.
+
+    Returns:
+        tuple: (purchase record, conversion error message or None)
+    """
+    # Convert USD amounts to AUD at purchase date
+    total_cost_usd = (quantity * price_usd) + commission_usd
+    total_cost_aud, exchange_rate = aud_converter.convert_usd_to_aud(total_cost_usd, date_obj)
+    error_msg = None
+    
+    if total_cost_aud is None:
+        error_msg = f"⚠️ No exchange rate for {symbol} purchase on {date_str}"
+        # Use USD values as fallback
+        price_aud = price_usd
+        commission_aud = commission_usd
+        exchange_rate = None
+    else:
+        # Calculate AUD per-unit price and commission
+        price_aud = (quantity * price_usd) / quantity / exchange_rate  # Price per unit in AUD
+        commission_aud = commission_usd / exchange_rate
+    
+    purchase = {
+        'units': quantity,
+        'price': price_usd,              # USD price per unit
+        'commission': commission_usd,    # USD commission
+        'price_aud': price_aud,          # AUD price per unit
+        'commission_aud': commission_aud, # AUD commission
+        'exchange_rate': exchange_rate,   # AUD/USD rate used
+        'date': date_str
+    }
+    return purchase, error_msg
+
+def _fifo_event(symbol, fifo_events, date_str, event, units, price_usd, lot_date, units_left, source):
+    """Structured FIFO event row (see apply_hybrid_fifo_processing_with_aud)."""
+    return {
+        'Symbol': symbol,
+        'Sequence': len(fifo_events),
+        'Date': date_str,
+        'Event': event,
+        'Units': units,
+        'Price_USD': price_usd,
+        'Lot_Date': lot_date,
+        'Units_Left': units_left,
+        'Source': source
+    }
+
+def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutoff_date=None, fifo_events=None,
+                                          progress_callback=None):
+    """
+    Apply HYBRID FIFO processing with AUD conversion.
+
+    If fifo_events is a list, one dict per BUY, SELL, lot consumption and
+    shortfall is appended to it (Symbol, Sequence, Date, Event, Units,
+    Price_USD, Lot_Date, Units_Left, Source) for columnar export.
+    progress_callback, if given, is called with (symbols processed, total symbols).
+    """
     print(f"\n🔄 APPLYING HYBRID FIFO PROCESSING WITH AUD CONVERSION")
     if sell_cutoff_date:
         print(f"⏹️ SELL transactions processed up to: {sell_cutoff_date.strftime('%Y-%m-%d')}")
@@ -661,7 +622,10 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
     print(f"   BUY: {len(combined_df[combined_df['Activity'] == 'PURCHASED'])}")
     print(f"   SELL: {len(combined_df[combined_df['Activity'] == 'SOLD'])}")
     
-    for symbol in combined_df['Symbol'].unique():
+    symbols = combined_df['Symbol'].unique()
+    for symbol_number, symbol in enumerate(symbols):
+        if progress_callback is not None:
+            progress_callback(symbol_number, len(symbols))
         symbol_transactions = combined_df[combined_df['Symbol'] == symbol].copy()
         
         # Sort by date
@@ -683,32 +647,14 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
             source = transaction['Source']
             
             if activity == 'PURCHASED':
-                # Convert USD amounts to AUD at purchase date
-                total_cost_usd = (quantity * price_usd) + commission_usd
-                total_cost_aud, exchange_rate = aud_converter.convert_usd_to_aud(total_cost_usd, date_obj)
-                
-                if total_cost_aud is None:
-                    error_msg = f"⚠️ No exchange rate for {symbol} purchase on {date_str}"
+                purchase, error_msg = create_purchase_record_with_aud(
+                    symbol, quantity, price_usd, commission_usd, date_obj, date_str, aud_converter
+                )
+                if error_msg:
                     conversion_errors.append(error_msg)
                     print(f"   {error_msg}")
-                    # Use USD values as fallback
-                    price_aud = price_usd
-                    commission_aud = commission_usd
-                    exchange_rate = None
-                else:
-                    # Calculate AUD per-unit price and commission
-                    price_aud = (quantity * price_usd) / quantity / exchange_rate  # Price per unit in AUD
-                    commission_aud = commission_usd / exchange_rate
-                
-                purchase = {
-                    'units': quantity,
-                    'price': price_usd,              # USD price per unit
-                    'commission': commission_usd,    # USD commission
-                    'price_aud': price_aud,          # AUD price per unit
-                    'commission_aud': commission_aud, # AUD commission
-                    'exchange_rate': exchange_rate,   # AUD/USD rate used
-                    'date': date_str
-                }
+                price_aud = purchase['price_aud']
+                exchange_rate = purchase['exchange_rate']
                 purchase_queue.append(purchase)
                 
                 if exchange_rate:
@@ -717,12 +663,16 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
                     print(f"   📈 BUY: {quantity} units @ ${price_usd:.2f} USD on {date_str} (NO AUD RATE)")
                 
                 fifo_operations.append(f"BUY: {quantity} units @ ${price_usd:.2f} USD + ${commission_usd:.2f} on {date_str} ({source})")
+                if fifo_events is not None:
+                    fifo_events.append(_fifo_event(symbol, fifo_events, date_str, 'BUY', quantity, price_usd, date_str, quantity, source))
                 
             elif activity == 'SOLD':
                 units_to_sell = quantity
                 
                 print(f"   📉 SELL: {units_to_sell} units on {date_str} ({source})")
                 fifo_operations.append(f"SELL: {units_to_sell} units on {date_str} ({source})")
+                if fifo_events is not None:
+                    fifo_events.append(_fifo_event(symbol, fifo_events, date_str, 'SELL', units_to_sell, price_usd, None, None, source))
                 
                 # Apply FIFO
                 remaining_to_sell = units_to_sell
@@ -734,6 +684,8 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
                     elif purchase['units'] <= remaining_to_sell:
                         print(f"      ✂️ Used all {purchase['units']} units from {purchase['date']} @ ${purchase['price']:.2f} USD")
                         fifo_operations.append(f"   ✂️ Used all {purchase['units']} units from {purchase['date']} @ ${purchase['price']:.2f} USD")
+                        if fifo_events is not None:
+                            fifo_events.append(_fifo_event(symbol, fifo_events, date_str, 'CONSUME', purchase['units'], purchase['price'], purchase['date'], 0.0, source))
                         remaining_to_sell -= purchase['units']
                     else:
                         units_used = remaining_to_sell
@@ -741,6 +693,8 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
                         
                         print(f"      ✂️ Used {units_used} units from {purchase['date']} @ ${purchase['price']:.2f} USD (kept {units_remaining})")
                         fifo_operations.append(f"   ✂️ Used {units_used} units from {purchase['date']} @ ${purchase['price']:.2f} USD (kept {units_remaining})")
+                        if fifo_events is not None:
+                            fifo_events.append(_fifo_event(symbol, fifo_events, date_str, 'CONSUME', units_used, purchase['price'], purchase['date'], units_remaining, source))
                         
                         # Create updated purchase with proportional amounts
                         proportion = units_remaining / purchase['units']
@@ -758,6 +712,8 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
                     warning = f"      ⚠️ WARNING: Tried to sell {remaining_to_sell} more units than available!"
                     print(warning)
                     fifo_operations.append(warning)
+                    if fifo_events is not None:
+                        fifo_events.append(_fifo_event(symbol, fifo_events, date_str, 'SHORTFALL', remaining_to_sell, price_usd, None, None, source))
         
         # Store remaining purchases with both USD and AUD amounts
         if purchase_queue:
@@ -773,6 +729,9 @@ def apply_hybrid_fifo_processing_with_aud(combined_df, aud_converter, sell_cutof
         
         fifo_log[symbol] = fifo_operations
     
+    if progress_callback is not None:
+        progress_callback(len(symbols), len(symbols))
+    
     if conversion_errors:
         print(f"\n⚠️ CONVERSION WARNINGS ({len(conversion_errors)}):")
         for error in conversion_errors[:5]:  # Show first 5
@@ -1005,13 +964,110 @@ def save_results_hybrid_with_aud(cost_basis_dict, fifo_log, conversion_errors, s
         print(f"❌ Error saving files: {e}")
         return None
 
-def load_rba_exchange_rates():
+def load_all_transactions(sell_cutoff_date=None):
+    """
+    Load HTML and CSV transactions into one de-duplicated DataFrame.
+
+    Columns: Symbol, Date, Activity (PURCHASED/SOLD), Quantity, Price,
+    Commission, Source. Returns None if nothing was loaded.
+    """
+    # Load HTML files, then manual CSV files, with hybrid processing
+    html_data = load_html_files_hybrid(sell_cutoff_date)
+    manual_data = load_manual_csv_files_hybrid_FIXED(sell_cutoff_date)
+    return combine_transactions(html_data + manual_data)
+
+def combine_transactions(all_data):
+    """Concatenate standardized frames (HTML first) and drop duplicates; None if empty."""
+    if not all_data:
+        print("❌ No data loaded from any source")
+        return None
+    
+    # Combine all data
+    combined_df = pd.concat(all_data, ignore_index=True)
+    
+    # Remove duplicates
+    before_count = len(combined_df)
+    combined_df = combined_df.drop_duplicates(
+        subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'], 
+        keep='first'
+    )
+    after_count = len(combined_df)
+    
+    if before_count != after_count:
+        print(f"✂️ Removed {before_count - after_count} duplicates")
+    
+    print(f"\n📊 COMBINED DATA SUMMARY:")
+    print(f"   Total transactions: {len(combined_df)}")
+    print(f"   Unique symbols: {combined_df['Symbol'].nunique()}")
+    print(f"   BUY transactions: {len(combined_df[combined_df['Activity'] == 'PURCHASED'])}")
+    print(f"   SELL transactions: {len(combined_df[combined_df['Activity'] == 'SOLD'])}")
+    print(f"   Sources: {dict(combined_df['Source'].value_counts())}")
+    
+    return combined_df
+
+def run_concurrently(tasks):
+    """
+    Run {name: func} at once in worker threads and wait for all of them.
+    Returns {name: {'result', 'error', 'seconds', 'output'}} where output is
+    the task's print() text (thread_output.capture_output), kept separate so
+    the caller can replay it in task order. Plain threads, so it also works
+    when the caller is inside a running event loop.
+    """
+    def run(func):
+        started = time.time()
+        with capture_output() as output:
+            try:
+                outcome = {'result': func(), 'error': None}
+            except Exception as e:
+                outcome = {'result': None, 'error': e}
+        outcome.update(seconds=time.time() - started, output=''.join(output))
+        return outcome
+
+    with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+        futures = {name: executor.submit(run, func) for name, func in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def load_sources_concurrently(sell_cutoff_date=None, rates_folder=None):
+    """
+    Load RBA rates, HTML files and CSV files at the same time.
+
+    The three sources are independent, so startup takes as long as the
+    slowest one rather than their sum. Each loader's output is printed in
+    the usual order (rates, HTML, CSV) once all have finished, followed by
+    the stage timings. Returns (aud_converter, combined_df, timings).
+    """
+    started = time.time()
+    outcomes = run_concurrently({
+        'rates': lambda: load_rba_exchange_rates(rates_folder),
+        'html': lambda: load_html_files_hybrid(sell_cutoff_date),
+        'csv': lambda: load_manual_csv_files_hybrid_FIXED(sell_cutoff_date)
+    })
+    wall = time.time() - started
+
+    for outcome in outcomes.values():
+        print(outcome['output'], end='')
+    for outcome in outcomes.values():
+        if outcome['error'] is not None:
+            raise outcome['error']
+
+    timings = {name: outcome['seconds'] for name, outcome in outcomes.items()}
+    timings['wall'] = wall
+    print(f"\n⏱️ Sources loaded in {wall:.2f}s (rates {timings['rates']:.2f}s, "
+          f"HTML {timings['html']:.2f}s, CSV {timings['csv']:.2f}s)")
+
+    aud_converter = outcomes['rates']['result']
+    combined_df = combine_transactions(outcomes['html']['result'] + outcomes['csv']['result'])
+    return aud_converter, combined_df, timings
+
+def load_rba_exchange_rates(rates_folder=None):
     """Load RBA exchange rate data from the rates folder."""
     print(f"\n💱 LOADING RBA EXCHANGE RATES")
     print("=" * 50)
     
     # RBA file paths
-    rates_folder = "/Users/roifine/My python projects/Ozi_Tax_Agent/rates"
+    if rates_folder is None:
+        rates_folder = "/Users/roifine/My python projects/Ozi_Tax_Agent/rates"
     rba_files = [
         os.path.join(rates_folder, "FX_2018-2022.csv"),
         os.path.join(rates_folder, "FX_2023-2025.csv")
@@ -1094,13 +1150,7 @@ def main():
     print("• BONUS: Automatically extracts sales CSV for CGT calculator")
     print()
     
-    # Load RBA exchange rates first
-    aud_converter = load_rba_exchange_rates()
-    if not aud_converter:
-        print("❌ Cannot proceed without exchange rate data")
-        return None
-    
-    # Get hybrid configuration
+    # Get hybrid configuration (the sources are loaded with its cutoff)
     sell_cutoff_date = get_hybrid_configuration()
     
     if sell_cutoff_date:
@@ -1115,40 +1165,14 @@ def main():
         print(f"💱 AUD conversion: RBA historical rates")
     
     try:
-        all_data = []
-        
-        # Load HTML files with hybrid processing
-        html_data = load_html_files_hybrid(sell_cutoff_date)
-        all_data.extend(html_data)
-        
-        # Load manual CSV files with hybrid processing
-        manual_data = load_manual_csv_files_hybrid(sell_cutoff_date)
-        all_data.extend(manual_data)
-        
-        if not all_data:
-            print("❌ No data loaded from any source")
+        # Rates, HTML and CSV load concurrently and join before FIFO
+        aud_converter, combined_df, _ = load_sources_concurrently(sell_cutoff_date)
+        if not aud_converter:
+            print("❌ Cannot proceed without exchange rate data")
             return None
         
-        # Combine all data
-        combined_df = pd.concat(all_data, ignore_index=True)
-        
-        # Remove duplicates
-        before_count = len(combined_df)
-        combined_df = combined_df.drop_duplicates(
-            subset=['Symbol', 'Date', 'Activity', 'Quantity', 'Price'], 
-            keep='first'
-        )
-        after_count = len(combined_df)
-        
-        if before_count != after_count:
-            print(f"✂️ Removed {before_count - after_count} duplicates")
-        
-        print(f"\n📊 COMBINED DATA SUMMARY:")
-        print(f"   Total transactions: {len(combined_df)}")
-        print(f"   Unique symbols: {combined_df['Symbol'].nunique()}")
-        print(f"   BUY transactions: {len(combined_df[combined_df['Activity'] == 'PURCHASED'])}")
-        print(f"   SELL transactions: {len(combined_df[combined_df['Activity'] == 'SOLD'])}")
-        print(f"   Sources: {dict(combined_df['Source'].value_counts())}")
+        if combined_df is None:
+            return None
         
         # Extract sales for the following financial year automatically
         sales_filename = None
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Versioned Cost Basis File Formats
+
+Cost basis dictionaries ({symbol: [purchase records]}) have been saved as
+indented JSON that repeats every key name for every lot. This module adds a
+versioned schema with two compact encodings:
+
+- Binary (.cgtcb): one float64 array per numeric field, a date string table
+  and per-lot flags, preceded by a small JSON header. Several times smaller
+  than indented JSON and decoded with NumPy.
+- Text (JSON v1): {"format": "cgt-cost-basis", "version": 1, "symbols": {...}}
+  with one row array per lot instead of one object, written without
+  indentation (orjson is used when installed).
+
+load_cost_basis_file() detects the encoding from the file contents and also
+reads the legacy layouts (USD-only and AUD-enhanced record objects) and
+Parquet or Arrow IPC files from cgt_parquet_io.py. Every loader returns the legacy
+dictionary layout, so the calculator does not change.
+
+Only the cost basis keys are stored (units, price, commission, price_aud,
+commission_aud, exchange_rate, date); numbers load as floats.
+
+Usage:
+    python cost_basis_codec.py cost_basis.json [output.cgtcb]
+"""
+
+import json
+import struct
+import sys
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+FORMAT_NAME = 'cgt-cost-basis'
+FORMAT_VERSION = 1
+
+BINARY_MAGIC = b'CGTCB\x00'
+BINARY_EXTENSION = '.cgtcb'
+PARQUET_MAGIC = b'PAR1'
+ARROW_MAGIC = b'ARROW1'
+
+NUMERIC_FIELDS = ('units', 'price', 'commission', 'price_aud', 'commission_aud', 'exchange_rate')
+USD_FIELDS = ('units', 'price', 'commission', 'date')
+AUD_FIELDS = NUMERIC_FIELDS + ('date',)
+
+# Per-lot flags in the binary encoding
+FLAG_HAS_AUD = 1            # Record has price_aud/commission_aud/exchange_rate keys
+FLAG_NO_EXCHANGE_RATE = 2   # exchange_rate is None (no RBA rate at purchase)
+
+_HEADER = struct.Struct('<6sHI')  # magic, version, header length
+
+
+def _json_default(value):
+    # numpy scalars (FIFO and CGT outputs carry numpy floats); json handles them as float subclasses
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def json_dumps(data):
+    """Compact JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, default=_json_default)
+    return json.dumps(data, separators=(',', ':'), default=_json_default).encode('utf-8')
+
+
+def json_loads(data):
+    """Parse JSON from bytes or str."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _has_aud(record):
+    return 'price_aud' in record
+
+
+# ---------------------------------------------------------------- text (JSON v1)
+
+def encode_cost_basis_json(cost_basis_dict):
+    """Versioned text form: one row array per lot (4 fields USD-only, 7 with AUD)."""
+    symbols = {}
+    for symbol, records in cost_basis_dict.items():
+        rows = []
+        for record in records:
+            fields = AUD_FIELDS if _has_aud(record) else USD_FIELDS
+            rows.append([record.get(field) for field in fields])
+        symbols[symbol] = rows
+    return json_dumps({
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'usd_fields': list(USD_FIELDS),
+        'aud_fields': list(AUD_FIELDS),
+        'symbols': symbols
+    })
+
+
+def decode_cost_basis_json(document):
+    """Cost basis dictionary from a parsed versioned text document."""
+    _check_version(document.get('version'))
+    usd_fields = tuple(document.get('usd_fields', USD_FIELDS))
+    aud_fields = tuple(document.get('aud_fields', AUD_FIELDS))
+    return {
+        symbol: [dict(zip(aud_fields if len(row) == len(aud_fields) else usd_fields, row)) for row in rows]
+        for symbol, rows in document['symbols'].items()
+    }
+
+
+# ---------------------------------------------------------------- binary
+
+def encode_cost_basis_binary(cost_basis_dict):
+    """Binary form: JSON header followed by column arrays for every lot."""
+    import numpy as np
+
+    symbols = list(cost_basis_dict.keys())
+    counts = [len(cost_basis_dict[symbol]) for symbol in symbols]
+    total = sum(counts)
+
+    # USD-only files do not store the AUD columns
+    any_aud = any(_has_aud(record) for records in cost_basis_dict.values() for record in records)
+    numeric_fields = NUMERIC_FIELDS if any_aud else USD_FIELDS[:3]
+
+    columns = {field: np.empty(total, dtype='<f8') for field in numeric_fields}
+    flags = np.zeros(total, dtype=np.uint8)
+    date_index = np.empty(total, dtype='<u4')
+    date_table = {}
+
+    position = 0
+    for symbol in symbols:
+        for record in cost_basis_dict[symbol]:
+            for field in numeric_fields:
+                value = record.get(field)
+                columns[field][position] = np.nan if value is None else value
+            if _has_aud(record):
+                flags[position] = FLAG_HAS_AUD
+                if record.get('exchange_rate') is None:
+                    flags[position] |= FLAG_NO_EXCHANGE_RATE
+            date_index[position] = date_table.setdefault(record.get('date'), len(date_table))
+            position += 1
+
+    header = json_dumps({
+        'format': FORMAT_NAME,
+        'symbols': symbols,
+        'counts': counts,
+        'dates': list(date_table.keys()),
+        'numeric_fields': list(numeric_fields)
+    })
+
+    parts = [_HEADER.pack(BINARY_MAGIC, FORMAT_VERSION, len(header)), header]
+    parts.extend(columns[field].tobytes() for field in numeric_fields)
+    parts.append(date_index.tobytes())
+    parts.append(flags.tobytes())
+    return b''.join(parts)
+
+
+def decode_cost_basis_binary(data, symbols=None):
+    """
+    Cost basis dictionary from binary bytes.
+
+    If symbols is given, only those symbols are decoded (others are skipped
+    without reading their lots).
+    """
+    import numpy as np
+
+    magic, version, header_length = _HEADER.unpack_from(data, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a binary cost basis file")
+    _check_version(version)
+
+    offset = _HEADER.size
+    header = json_loads(data[offset:offset + header_length])
+    offset += header_length
+    total = sum(header['counts'])
+
+    arrays = {}
+    for field in header['numeric_fields']:
+        arrays[field] = np.frombuffer(data, dtype='<f8', count=total, offset=offset)
+        offset += total * 8
+    date_index = np.frombuffer(data, dtype='<u4', count=total, offset=offset)
+    offset += total * 4
+    flags = np.frombuffer(data, dtype=np.uint8, count=total, offset=offset)
+
+    starts = np.concatenate(([0], np.cumsum(header['counts'])))
+    positions = {symbol: i for i, symbol in enumerate(header['symbols'])}
+    wanted = header['symbols'] if symbols is None else [s for s in symbols if s in positions]
+
+    dates = header['dates']
+    cost_basis_dict = {}
+    for symbol in wanted:
+        i = positions[symbol]
+        block = slice(int(starts[i]), int(starts[i + 1]))
+        cost_basis_dict[symbol] = _decode_block(
+            {field: array[block].tolist() for field, array in arrays.items()},
+            [dates[d] for d in date_index[block].tolist()],
+            flags[block]
+        )
+    return cost_basis_dict
+
+
+def _decode_block(columns, dates, flags):
+    """Records for one symbol from its column slices."""
+    units, price, commission = columns['units'], columns['price'], columns['commission']
+    price_aud, commission_aud, exchange_rate = (
+        columns.get('price_aud'), columns.get('commission_aud'), columns.get('exchange_rate')
+    )
+
+    if price_aud is not None and (flags == FLAG_HAS_AUD).all():
+        # Common case: every lot is AUD-enhanced with a rate
+        return [
+            {'units': u, 'price': p, 'commission': c, 'price_aud': pa, 'commission_aud': ca,
+             'exchange_rate': er, 'date': d}
+            for u, p, c, pa, ca, er, d in zip(units, price, commission, price_aud, commission_aud, exchange_rate, dates)
+        ]
+
+    records = []
+    for i, flag in enumerate(flags.tolist()):
+        if flag & FLAG_HAS_AUD:
+            records.append({
+                'units': units[i],
+                'price': price[i],
+                'commission': commission[i],
+                'price_aud': price_aud[i],
+                'commission_aud': commission_aud[i],
+                'exchange_rate': None if flag & FLAG_NO_EXCHANGE_RATE else exchange_rate[i],
+                'date': dates[i]
+            })
+        else:
+            records.append({'units': units[i], 'price': price[i], 'commission': commission[i], 'date': dates[i]})
+    return records
+
+
+def _check_version(version):
+    if version is None or version > FORMAT_VERSION:
+        raise ValueError(f"Unsupported cost basis format version {version} (this version reads up to {FORMAT_VERSION})")
+
+
+# ---------------------------------------------------------------- files
+
+def detect_cost_basis_format(file_path):
+    """
+    Identify a cost basis file: 'binary', 'parquet', 'arrow', 'json-v1',
+    'json-legacy-aud' or 'json-legacy-usd'.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return _detect(data, file_path)[0]
+
+
+def _detect(data, file_path):
+    if data.startswith(BINARY_MAGIC):
+        return 'binary', None
+    if data.startswith(PARQUET_MAGIC):
+        return 'parquet', None
+    if data.startswith(ARROW_MAGIC):
+        return 'arrow', None
+
+    document = json_loads(data)
+    if isinstance(document, dict) and document.get('format') == FORMAT_NAME:
+        return 'json-v1', document
+    if not isinstance(document, dict):
+        raise ValueError(f"{file_path} is not a cost basis dictionary")
+
+    sample = next((records[0] for records in document.values() if records), {})
+    return ('json-legacy-aud' if _has_aud(sample) else 'json-legacy-usd'), document
+
+
+def load_cost_basis_file(file_path, symbols=None):
+    """
+    Load a cost basis dictionary from any supported encoding.
+
+    symbols optionally limits the result to those symbols; the binary
+    encoding then skips the other symbols' lots entirely.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    file_format, document = _detect(data, file_path)
+    if file_format == 'binary':
+        return decode_cost_basis_binary(data, symbols)
+    if file_format in ('parquet', 'arrow'):
+        from cgt_parquet_io import load_cost_basis_parquet
+        cost_basis_dict = load_cost_basis_parquet(file_path)
+    elif file_format == 'json-v1':
+        cost_basis_dict = decode_cost_basis_json(document)
+    else:
+        cost_basis_dict = document
+
+    if symbols is not None:
+        cost_basis_dict = {symbol: cost_basis_dict[symbol] for symbol in symbols if symbol in cost_basis_dict}
+    return cost_basis_dict
+
+
+def save_cost_basis_file(cost_basis_dict, file_path, encoding='binary'):
+    """Save a cost basis dictionary as 'binary' or versioned 'json'."""
+    if encoding == 'binary':
+        data = encode_cost_basis_binary(cost_basis_dict)
+    elif encoding == 'json':
+        data = encode_cost_basis_json(cost_basis_dict)
+    else:
+        raise ValueError(f"Unknown cost basis encoding '{encoding}' (expected 'binary' or 'json')")
+
+    with open(file_path, 'wb') as f:
+        f.write(data)
+    return file_path
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python cost_basis_codec.py cost_basis.json [output.cgtcb]")
+        return None
+
+    input_file = sys.argv[1]
+    output_file = sys.argv[2] if len(sys.argv) > 2 else input_file.rsplit('.', 1)[0] + BINARY_EXTENSION
+
+    print(f"🔍 Detected format: {detect_cost_basis_format(input_file)}")
+    cost_basis_dict = load_cost_basis_file(input_file)
+    encoding = 'json' if output_file.lower().endswith('.json') else 'binary'
+    save_cost_basis_file(cost_basis_dict, output_file, encoding)
+
+    lots = sum(len(records) for records in cost_basis_dict.values())
+    print(f"✅ Saved {len(cost_basis_dict)} symbols ({lots} lots) to {output_file} ({encoding})")
+    return output_file
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Structural Diff Between Two Cost Basis Snapshots
+
+Compares two cost basis dictionaries lot by lot instead of by eye:
+- Symbols whose records serialise identically (same per-symbol digest as the
+  snapshot store) are skipped without aligning their lots
+- Lots are aligned by (symbol, date, price); repeated keys pair up in order
+- Each changed lot is reported as added, removed, consumed (fewer units left)
+  or increased, with unit and AUD cost basis deltas
+- Per-symbol totals show units and AUD cost basis before and after
+
+AUD cost basis is units * price_aud (price for USD-only records), as in the
+remaining holdings summary of the CGT calculator.
+
+Usage:
+    python cost_basis_diff.py old.json new.json [--csv lot_changes.csv]
+    python cost_basis_diff.py --store snapshots OLD_TAG NEW_TAG
+"""
+
+import argparse
+
+import pandas as pd
+
+from cost_basis_codec import load_cost_basis_file
+from cost_basis_snapshots import SnapshotStore, symbol_digests
+
+LOT_CHANGE_COLUMNS = [
+    'Symbol', 'Date', 'Price_USD', 'Change', 'Units_Before', 'Units_After', 'Unit_Delta',
+    'Price_AUD', 'Cost_AUD_Before', 'Cost_AUD_After', 'Cost_AUD_Delta'
+]
+
+SYMBOL_TOTAL_COLUMNS = [
+    'Symbol', 'Status', 'Lots_Added', 'Lots_Removed', 'Lots_Consumed', 'Lots_Increased',
+    'Units_Before', 'Units_After', 'Unit_Delta', 'Cost_AUD_Before', 'Cost_AUD_After', 'Cost_AUD_Delta'
+]
+
+# Prices are matched to this many decimal places
+PRICE_DECIMALS = 6
+
+
+def _lot_key(record):
+    return record.get('date'), round(record.get('price', 0), PRICE_DECIMALS)
+
+
+def _price_aud(record):
+    return record.get('price_aud', record.get('price', 0))
+
+
+def _group_lots(records):
+    """(date, price) -> records with that key, in file order."""
+    groups = {}
+    for record in records:
+        groups.setdefault(_lot_key(record), []).append(record)
+    return groups
+
+
+def _lot_change(symbol, old, new):
+    """Change row for an aligned pair of lots (either may be None), or None if unchanged."""
+    units_before = old.get('units', 0) if old else 0
+    units_after = new.get('units', 0) if new else 0
+    if old and new and units_before == units_after:
+        return None
+
+    if old is None:
+        change = 'added'
+    elif new is None:
+        change = 'removed'
+    elif units_after < units_before:
+        change = 'consumed'
+    else:
+        change = 'increased'
+
+    reference = new or old
+    price_aud = _price_aud(reference)
+    cost_before = units_before * _price_aud(old) if old else 0.0
+    cost_after = units_after * _price_aud(new) if new else 0.0
+    return {
+        'Symbol': symbol,
+        'Date': reference.get('date'),
+        'Price_USD': reference.get('price', 0),
+        'Change': change,
+        'Units_Before': units_before,
+        'Units_After': units_after,
+        'Unit_Delta': units_after - units_before,
+        'Price_AUD': price_aud,
+        'Cost_AUD_Before': cost_before,
+        'Cost_AUD_After': cost_after,
+        'Cost_AUD_Delta': cost_after - cost_before
+    }
+
+
+def diff_symbol(symbol, old_records, new_records):
+    """Lot change rows for one symbol."""
+    old_groups = _group_lots(old_records)
+    new_groups = _group_lots(new_records)
+
+    changes = []
+    for key in list(old_groups) + [k for k in new_groups if k not in old_groups]:
+        old_lots = old_groups.get(key, [])
+        new_lots = new_groups.get(key, [])
+        for i in range(max(len(old_lots), len(new_lots))):
+            row = _lot_change(symbol,
+                              old_lots[i] if i < len(old_lots) else None,
+                              new_lots[i] if i < len(new_lots) else None)
+            if row:
+                changes.append(row)
+    return changes
+
+
+def _symbol_total(symbol, old_records, new_records, changes):
+    counts = {change: 0 for change in ('added', 'removed', 'consumed', 'increased')}
+    for row in changes:
+        counts[row['Change']] += 1
+
+    units_before = sum(r.get('units', 0) for r in old_records)
+    units_after = sum(r.get('units', 0) for r in new_records)
+    cost_before = sum(r.get('units', 0) * _price_aud(r) for r in old_records)
+    cost_after = sum(r.get('units', 0) * _price_aud(r) for r in new_records)
+
+    if not old_records:
+        status = 'added'
+    elif not new_records:
+        status = 'removed'
+    else:
+        status = 'changed'
+    return {
+        'Symbol': symbol,
+        'Status': status,
+        'Lots_Added': counts['added'],
+        'Lots_Removed': counts['removed'],
+        'Lots_Consumed': counts['consumed'],
+        'Lots_Increased': counts['increased'],
+        'Units_Before': units_before,
+        'Units_After': units_after,
+        'Unit_Delta': units_after - units_before,
+        'Cost_AUD_Before': cost_before,
+        'Cost_AUD_After': cost_after,
+        'Cost_AUD_Delta': cost_after - cost_before
+    }
+
+
+def diff_cost_basis(old_cost_basis, new_cost_basis, old_digests=None, new_digests=None):
+    """
+    Diff two cost basis dictionaries.
+
+    old_digests/new_digests ({symbol: digest}, e.g. from snapshot manifests)
+    are computed if not given. Returns a dict with 'lots' and 'symbols'
+    DataFrames, the number of symbols without lot changes and how many of
+    those were skipped by digest.
+    """
+    old_digests = symbol_digests(old_cost_basis) if old_digests is None else old_digests
+    new_digests = symbol_digests(new_cost_basis) if new_digests is None else new_digests
+
+    changed_symbols = [s for s in old_digests if old_digests[s] != new_digests.get(s)]
+    changed_symbols += [s for s in new_digests if s not in old_digests]
+
+    lot_rows = []
+    symbol_rows = []
+    for symbol in changed_symbols:
+        old_records = old_cost_basis.get(symbol, [])
+        new_records = new_cost_basis.get(symbol, [])
+        changes = diff_symbol(symbol, old_records, new_records)
+        if not changes and old_records and new_records:
+            continue  # Same lots, only number formatting or key order differs
+        lot_rows.extend(changes)
+        symbol_rows.append(_symbol_total(symbol, old_records, new_records, changes))
+
+    all_symbols = len(old_digests.keys() | new_digests.keys())
+    return {
+        'lots': pd.DataFrame(lot_rows, columns=LOT_CHANGE_COLUMNS),
+        'symbols': pd.DataFrame(symbol_rows, columns=SYMBOL_TOTAL_COLUMNS),
+        'identical_symbols': all_symbols - len(symbol_rows),
+        'digest_skipped': all_symbols - len(changed_symbols)
+    }
+
+
+def diff_snapshots(store, old_ref, new_ref):
+    """Diff two snapshots in a SnapshotStore, loading only the symbols that differ."""
+    old_manifest = store.resolve(old_ref)
+    new_manifest = store.resolve(new_ref)
+    old_digests = old_manifest['symbols']
+    new_digests = new_manifest['symbols']
+
+    changed = {s for s in old_digests.keys() | new_digests.keys() if old_digests.get(s) != new_digests.get(s)}
+    return diff_cost_basis(store.load_snapshot(old_manifest['id'], symbols=changed),
+                           store.load_snapshot(new_manifest['id'], symbols=changed),
+                           old_digests, new_digests)
+
+
+def print_diff(result):
+    """Print per-symbol totals and lot changes."""
+    symbols = result['symbols']
+    print(f"🔍 {len(symbols)} symbols changed, {result['identical_symbols']} identical "
+          f"({result['digest_skipped']} skipped by digest)")
+    if symbols.empty:
+        return
+
+    for row in symbols.itertuples(index=False):
+        print(f"\n📈 {row.Symbol} ({row.Status}): units {row.Units_Before:,.2f} → {row.Units_After:,.2f} "
+              f"({row.Unit_Delta:+,.2f}), cost ${row.Cost_AUD_Before:,.2f} → ${row.Cost_AUD_After:,.2f} AUD "
+              f"({row.Cost_AUD_Delta:+,.2f})")
+        for lot in result['lots'][result['lots']['Symbol'] == row.Symbol].itertuples(index=False):
+            print(f"   {lot.Change:<9} {lot.Date} @ ${lot.Price_USD:.2f}: "
+                  f"{lot.Units_Before:,.2f} → {lot.Units_After:,.2f} units ({lot.Cost_AUD_Delta:+,.2f} AUD)")
+
+    print(f"\n💰 Total: {symbols['Unit_Delta'].sum():+,.2f} units, "
+          f"{symbols['Cost_AUD_Delta'].sum():+,.2f} AUD cost basis")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two cost basis snapshots")
+    parser.add_argument('old', help="Old cost basis file (or snapshot tag/id with --store)")
+    parser.add_argument('new', help="New cost basis file (or snapshot tag/id with --store)")
+    parser.add_argument('--store', help="Snapshot store directory")
+    parser.add_argument('--csv', help="Write lot changes to this CSV file")
+    args = parser.parse_args()
+
+    if args.store:
+        result = diff_snapshots(SnapshotStore(args.store), args.old, args.new)
+    else:
+        result = diff_cost_basis(load_cost_basis_file(args.old), load_cost_basis_file(args.new))
+
+    print_diff(result)
+    if args.csv:
+        result['lots'].to_csv(args.csv, index=False)
+        print(f"✅ Lot changes saved: {args.csv}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
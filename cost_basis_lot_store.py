@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Copy-on-Write Lot Store for Cost Basis Dictionaries
+
+Wraps a cost basis dictionary ({symbol: [purchase records]}) without copying it.
+Units consumed by sales are recorded as per-lot deltas (the units left in
+each touched lot), so:
+- Symbols that are never sold cost nothing (their record lists are shared)
+- The base dictionary is never modified
+- Many what-if scenarios can fork() from one base and only pay for their own deltas
+"""
+
+# Keys of a record in the remaining cost basis layout
+REMAINING_RECORD_KEYS = ('units', 'price', 'commission', 'price_aud', 'commission_aud', 'exchange_rate', 'date')
+
+
+def _is_remaining_layout(records):
+    """True if records can be returned as-is in a remaining cost basis."""
+    for record in records:
+        if record.get('units', 0) <= 0 or len(record) != len(REMAINING_RECORD_KEYS):
+            return False
+        if any(key not in record for key in REMAINING_RECORD_KEYS):
+            return False
+    return True
+
+
+def _remaining_record(record, units):
+    """Build a remaining cost basis record from a purchase record."""
+    return {
+        'units': units,
+        'price': record.get('price', 0),
+        'commission': record.get('commission', 0),
+        'price_aud': record.get('price_aud', record.get('price', 0)),
+        'commission_aud': record.get('commission_aud', record.get('commission', 0)),
+        'exchange_rate': record.get('exchange_rate', 0),
+        'date': record.get('date', '01.01.24')
+    }
+
+
+class CostBasisLotStore:
+    """Cost basis with copy-on-write consumption deltas."""
+
+    def __init__(self, base_cost_basis):
+        self._base = base_cost_basis    # symbol -> list of records, never modified
+        self._units_left = {}           # symbol -> {record index: units left}, touched lots only
+
+    def __contains__(self, symbol):
+        return symbol in self._base
+
+    def __len__(self):
+        return len(self._base)
+
+    def symbols(self):
+        """Symbols in the base cost basis."""
+        return self._base.keys()
+
+    def base_records(self, symbol):
+        """Original (unconsumed) purchase records for a symbol. Treat as read-only."""
+        return self._base.get(symbol, [])
+
+    def is_touched(self, symbol):
+        """True if any units of this symbol have been consumed."""
+        return symbol in self._units_left
+
+    def units_left(self, symbol, index):
+        """Units still available in one lot."""
+        deltas = self._units_left.get(symbol)
+        if deltas and index in deltas:
+            return deltas[index]
+        return self._base[symbol][index].get('units', 0)
+
+    def consume(self, symbol, index, units):
+        """Record that `units` units of a lot were sold."""
+        if units == 0:
+            return
+        self.set_units_left(symbol, index, self.units_left(symbol, index) - units)
+
+    def set_units_left(self, symbol, index, units):
+        """Record the units left in a lot after consumption."""
+        self._units_left.setdefault(symbol, {})[index] = units
+
+    def consumed_lots(self):
+        """Yield (symbol, record index, units consumed) for every touched lot."""
+        for symbol, deltas in self._units_left.items():
+            records = self._base[symbol]
+            for index, units in deltas.items():
+                yield symbol, index, records[index].get('units', 0) - units
+
+    def remaining_records(self, symbol, copy=False):
+        """Records with units left, in the remaining cost basis layout (copies if copy)."""
+        records = self._base.get(symbol, [])
+        deltas = self._units_left.get(symbol)
+
+        if not deltas and _is_remaining_layout(records):
+            if copy:
+                return [dict(record) for record in records]
+            return records  # Untouched: share the base list
+
+        remaining = []
+        for index, record in enumerate(records):
+            units = deltas.get(index, record.get('units', 0)) if deltas else record.get('units', 0)
+            if units > 0:
+                remaining.append(_remaining_record(record, units))
+        return remaining
+
+    def remaining_cost_basis(self, copy=False):
+        """
+        Remaining cost basis dictionary after all recorded consumption.
+
+        Record lists of untouched symbols are shared with the base dictionary,
+        so the result must be treated as read-only (fork a store to keep going),
+        unless copy is set: then every list and record is new.
+        """
+        remaining_cost_basis = {}
+        for symbol in self._base:
+            records = self.remaining_records(symbol, copy=copy)
+            if records:
+                remaining_cost_basis[symbol] = records
+        return remaining_cost_basis
+
+    def fork(self):
+        """New store over the same base with a private copy of the deltas."""
+        child = type(self)(self._base)
+        child._units_left = {symbol: dict(deltas) for symbol, deltas in self._units_left.items()}
+        return child
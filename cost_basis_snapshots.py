@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Snapshot Store for Cost Basis and Log Artifacts
+
+json_folder/ keeps full copies of near-identical cost basis files (backups,
+corrected versions, as-of copies). A snapshot store saves each one as
+per-symbol chunks addressed by the SHA-256 of their JSON, plus a small
+manifest. A chunk that already exists is not written again, so a new
+snapshot only adds the symbols (and artifacts) that changed. When the
+caller knows which symbols changed since a parent snapshot (a FIFO or CGT
+run knows what it touched), the others are not even encoded or hashed.
+
+Layout:
+    snapshots/objects/ab/abcdef...   zlib-compressed chunks
+    snapshots/manifests/<id>.json    one manifest per snapshot
+
+A snapshot is retrieved by id, tag (latest snapshot with that tag) or date
+(latest snapshot taken on or before it).
+
+Usage:
+    python cost_basis_snapshots.py save cost_basis.json [--tag TAG] [--date YYYY-MM-DD] [--artifact log.txt ...]
+    python cost_basis_snapshots.py list
+    python cost_basis_snapshots.py restore TAG_OR_ID output.json
+    python cost_basis_snapshots.py restore --date 2024-06-30 output.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from datetime import datetime
+
+from cost_basis_codec import json_dumps, json_loads, load_cost_basis_file
+
+DEFAULT_STORE = 'snapshots'
+
+
+def chunk_digest(data):
+    """Content address of a chunk (SHA-256 hex of its bytes)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def encode_symbol(records):
+    """Chunk bytes for one symbol's records (compact JSON)."""
+    return json_dumps(records)
+
+
+def symbol_digests(cost_basis_dict):
+    """{symbol: chunk digest} for a cost basis dictionary."""
+    return {symbol: chunk_digest(encode_symbol(records)) for symbol, records in cost_basis_dict.items()}
+
+
+def _parse_date(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class SnapshotStore:
+    """Deduplicating store of cost basis snapshots and their log artifacts."""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.manifests_dir = os.path.join(root, 'manifests')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+    # ------------------------------------------------------------ chunks
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest[2:])
+
+    def has_chunk(self, digest):
+        return os.path.exists(self._object_path(digest))
+
+    def put_chunk(self, data):
+        """Store bytes once; returns (digest, True if newly written)."""
+        digest = chunk_digest(data)
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, zlib.compress(data))
+        return digest, True
+
+    def get_chunk(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return zlib.decompress(f.read())
+
+    # ------------------------------------------------------------ snapshots
+
+    def save_snapshot(self, cost_basis_dict, tag=None, date=None, source=None, artifacts=None,
+                      parent=None, changed=None):
+        """
+        Save a cost basis dictionary (and optional artifacts) as a snapshot.
+
+        artifacts maps a name to bytes, str or a file path to read. With a
+        parent snapshot (id, tag or manifest) and the set of changed symbols,
+        the other symbols reuse the parent's chunks without being encoded or
+        hashed, so the save costs only what changed. Returns the manifest.
+        """
+        created = _parse_date(date) or datetime.now()
+        parent_manifest = None
+        if parent is not None and changed is not None:
+            parent_manifest = parent if isinstance(parent, dict) else self.resolve(parent)
+        parent_symbols = parent_manifest['symbols'] if parent_manifest else {}
+        parent_lots = parent_manifest.get('symbol_lots', {}) if parent_manifest else {}
+
+        symbols = {}
+        symbol_lots = {}
+        new_chunks = 0
+        new_bytes = 0
+        reused_chunks = 0
+        for symbol in cost_basis_dict:
+            if symbol in parent_symbols and symbol in parent_lots and symbol not in changed:
+                # Unchanged: the records are not even read (lazy dictionaries stay unparsed)
+                symbols[symbol] = parent_symbols[symbol]
+                symbol_lots[symbol] = parent_lots[symbol]
+                reused_chunks += 1
+                continue
+            records = cost_basis_dict[symbol]
+            symbol_lots[symbol] = len(records)
+            data = encode_symbol(records)
+            symbols[symbol], is_new = self.put_chunk(data)
+            if is_new:
+                new_chunks += 1
+                new_bytes += len(data)
+
+        artifact_digests = {}
+        for name, content in (artifacts or {}).items():
+            if isinstance(content, str) and os.path.isfile(content):
+                with open(content, 'rb') as f:
+                    content = f.read()
+            elif isinstance(content, str):
+                content = content.encode('utf-8')
+            artifact_digests[name], is_new = self.put_chunk(content)
+            if is_new:
+                new_chunks += 1
+                new_bytes += len(content)
+
+        content_digest = chunk_digest(json_dumps({'symbols': symbols, 'artifacts': artifact_digests}))
+        manifest = {
+            'id': f"{created:%Y%m%dT%H%M%S%f}-{content_digest[:12]}",
+            'tag': tag,
+            'created': created.isoformat(),
+            'source': source,
+            'content_digest': content_digest,
+            'symbol_count': len(symbols),
+            'lot_count': sum(symbol_lots.values()),
+            'parent': parent_manifest['id'] if parent_manifest else None,
+            'new_chunks': new_chunks,
+            'reused_chunks': reused_chunks,
+            'new_bytes': new_bytes,
+            'symbols': symbols,
+            'symbol_lots': symbol_lots,
+            'artifacts': artifact_digests
+        }
+        _write_atomic(os.path.join(self.manifests_dir, manifest['id'] + '.json'), json_dumps(manifest))
+        return manifest
+
+    def list_snapshots(self):
+        """All manifests, oldest first."""
+        manifests = []
+        for name in os.listdir(self.manifests_dir):
+            if name.endswith('.json'):
+                with open(os.path.join(self.manifests_dir, name), 'rb') as f:
+                    manifests.append(json_loads(f.read()))
+        return sorted(manifests, key=lambda m: (m['created'], m['id']))
+
+    def resolve(self, ref=None, date=None):
+        """
+        Manifest for a snapshot id or tag, or the latest snapshot taken on or
+        before date. With neither, the latest snapshot.
+        """
+        manifests = self.list_snapshots()
+        if ref is not None:
+            path = os.path.join(self.manifests_dir, f"{ref}.json")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    return json_loads(f.read())
+            tagged = [m for m in manifests if m.get('tag') == ref]
+            if not tagged:
+                raise KeyError(f"No snapshot with id or tag '{ref}'")
+            manifests = tagged
+
+        if date is not None:
+            cutoff = _parse_date(date)
+            if cutoff.time() == datetime.min.time():
+                cutoff = cutoff.replace(hour=23, minute=59, second=59, microsecond=999999)
+            manifests = [m for m in manifests if datetime.fromisoformat(m['created']) <= cutoff]
+            if not manifests:
+                raise KeyError(f"No snapshot taken on or before {date}")
+
+        if not manifests:
+            raise KeyError("Snapshot store is empty")
+        return manifests[-1]
+
+    def load_snapshot(self, ref=None, date=None, symbols=None):
+        """Cost basis dictionary of a snapshot (optionally only some symbols)."""
+        manifest = self.resolve(ref, date)
+        wanted = manifest['symbols'] if symbols is None else [s for s in symbols if s in manifest['symbols']]
+        return {symbol: json_loads(self.get_chunk(manifest['symbols'][symbol])) for symbol in wanted}
+
+    def load_artifact(self, name, ref=None, date=None):
+        """Bytes of an artifact saved with a snapshot."""
+        manifest = self.resolve(ref, date)
+        return self.get_chunk(manifest['artifacts'][name])
+
+    def prune(self, max_age=None, max_count=None):
+        """
+        Delete snapshots older than max_age (a timedelta) and the oldest
+        beyond max_count, then the chunks no remaining snapshot references.
+        Not safe while another thread or process saves to the store.
+        Returns the number of snapshots deleted.
+        """
+        manifests = self.list_snapshots()
+        expired = []
+        if max_age is not None:
+            cutoff = datetime.now() - max_age
+            expired = [m for m in manifests if datetime.fromisoformat(m['created']) < cutoff]
+            manifests = [m for m in manifests if m not in expired]
+        if max_count is not None and len(manifests) > max_count:
+            expired += manifests[:len(manifests) - max_count]
+            manifests = manifests[len(manifests) - max_count:]
+        if not expired:
+            return 0
+
+        for manifest in expired:
+            os.remove(os.path.join(self.manifests_dir, manifest['id'] + '.json'))
+
+        referenced = set()
+        for manifest in manifests:
+            referenced.update(manifest['symbols'].values())
+            referenced.update(manifest['artifacts'].values())
+        for directory, _, files in os.walk(self.objects_dir):
+            for name in files:
+                digest = os.path.basename(directory) + name
+                if digest not in referenced and not name.startswith('.tmp-'):
+                    os.remove(os.path.join(directory, name))
+        return len(expired)
+
+    def stats(self):
+        """Stored vs logical size, to show how much deduplication saves."""
+        stored_bytes = 0
+        chunk_count = 0
+        for directory, _, files in os.walk(self.objects_dir):
+            for name in files:
+                stored_bytes += os.path.getsize(os.path.join(directory, name))
+                chunk_count += 1
+
+        manifests = self.list_snapshots()
+        referenced = sum(len(m['symbols']) + len(m['artifacts']) for m in manifests)
+        return {
+            'snapshots': len(manifests),
+            'chunks': chunk_count,
+            'chunk_references': referenced,
+            'stored_bytes': stored_bytes,
+            'new_bytes_written': sum(m['new_bytes'] for m in manifests)
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed cost basis snapshots")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="Snapshot store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    save = commands.add_parser('save', help="Save a cost basis file as a snapshot")
+    save.add_argument('cost_basis_file')
+    save.add_argument('--tag')
+    save.add_argument('--date', help="Snapshot date (default: now)")
+    save.add_argument('--artifact', action='append', default=[], help="Log or report file to keep with it")
+
+    commands.add_parser('list', help="List snapshots")
+
+    restore = commands.add_parser('restore', help="Write a snapshot back out as JSON")
+    restore.add_argument('ref', nargs='?', help="Snapshot id or tag")
+    restore.add_argument('output_file')
+    restore.add_argument('--date', help="Latest snapshot taken on or before this date")
+
+    args = parser.parse_args()
+    store = SnapshotStore(args.store)
+
+    if args.command == 'save':
+        cost_basis_dict = load_cost_basis_file(args.cost_basis_file)
+        artifacts = {os.path.basename(path): path for path in args.artifact}
+        manifest = store.save_snapshot(cost_basis_dict, tag=args.tag, date=args.date,
+                                       source=args.cost_basis_file, artifacts=artifacts)
+        print(f"✅ Snapshot {manifest['id']}: {manifest['symbol_count']} symbols, "
+              f"{manifest['new_chunks']} new chunks ({manifest['new_bytes']:,} bytes)")
+
+    elif args.command == 'list':
+        for manifest in store.list_snapshots():
+            print(f"   {manifest['id']}  {manifest.get('tag') or '-':<30} {manifest['symbol_count']:>4} symbols  "
+                  f"{manifest['new_chunks']:>4} new chunks  {manifest.get('source') or ''}")
+        stats = store.stats()
+        print(f"📊 {stats['snapshots']} snapshots, {stats['chunks']} chunks "
+              f"({stats['chunk_references']} references), {stats['stored_bytes']:,} bytes stored")
+
+    elif args.command == 'restore':
+        manifest = store.resolve(args.ref, args.date)
+        with open(args.output_file, 'w') as f:
+            json.dump(store.load_snapshot(manifest['id']), f, indent=2)
+        print(f"✅ Restored {manifest['id']} ({manifest.get('tag') or 'untagged'}) to {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
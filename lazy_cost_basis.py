@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Lazy Loader for Large Cost Basis JSON Files
+
+A CGT run usually sells a handful of symbols, but load_cost_basis_json_aud()
+parses the whole cost basis file. This module indexes the byte range of
+every symbol's lot list once, caches the index next to the file
+(<file>.index.json, invalidated when the file's size or mtime changes) and
+parses a symbol's lots only when they are first needed.
+
+open_lazy_cost_basis() returns a LazyCostBasisLotStore that can be passed
+straight to calculate_australian_cgt_aud(). Its remaining cost basis is a
+read-only view: symbols that were not sold are read from the file only if
+accessed, and save_remaining_cost_basis_aud() copies their JSON text across
+without parsing it.
+
+Only the legacy layout ({symbol: [records]}) is indexed; use
+cost_basis_codec.py for the binary and versioned formats.
+"""
+
+import json
+import os
+import re
+from collections.abc import Mapping
+
+from cost_basis_codec import json_loads
+from cost_basis_lot_store import CostBasisLotStore, _is_remaining_layout
+
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.index.json'
+
+_WHITESPACE = re.compile(r'\s*')
+
+
+def _skip_whitespace(text, pos):
+    return _WHITESPACE.match(text, pos).end()
+
+
+def symbol_stats(records):
+    """Index entry fields derived from a symbol's records."""
+    return {
+        'lots': len(records),
+        'lots_with_units': sum(1 for r in records if r.get('units', 0) > 0),
+        'units': sum(r.get('units', 0) for r in records),
+        'value_aud': sum(r.get('units', 0) * r.get('price_aud', r.get('price', 0)) for r in records),
+        'canonical': _is_remaining_layout(records)
+    }
+
+
+def build_cost_basis_index(file_path):
+    """
+    Scan a legacy cost basis JSON file once and record, per symbol, the byte
+    offset and length of its lot list plus a few totals.
+
+    Raises ValueError if the file is not a legacy {symbol: [records]} layout.
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    text = data.decode('utf-8')
+    ascii_only = text.isascii()
+    decoder = json.JSONDecoder()
+
+    # Character offset -> byte offset (identical for ASCII files)
+    byte_position = {'chars': 0, 'bytes': 0}
+
+    def to_bytes(char_offset):
+        if ascii_only:
+            return char_offset
+        byte_position['bytes'] += len(text[byte_position['chars']:char_offset].encode('utf-8'))
+        byte_position['chars'] = char_offset
+        return byte_position['bytes']
+
+    pos = _skip_whitespace(text, 0)
+    if not text.startswith('{', pos):
+        raise ValueError(f"{file_path} is not a cost basis dictionary")
+    pos = _skip_whitespace(text, pos + 1)
+
+    symbols = {}
+    while not text.startswith('}', pos):
+        symbol, pos = decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if not text.startswith(':', pos):
+            raise ValueError(f"Malformed cost basis JSON at character {pos}")
+        start = _skip_whitespace(text, pos + 1)
+        records, end = decoder.raw_decode(text, start)
+        if not isinstance(records, list):
+            raise ValueError(f"{file_path} is not a legacy cost basis layout ('{symbol}' is not a list)")
+
+        start_byte = to_bytes(start)
+        entry = symbol_stats(records)
+        entry['offset'] = start_byte
+        entry['length'] = to_bytes(end) - start_byte
+        symbols[symbol] = entry
+
+        pos = _skip_whitespace(text, end)
+        if text.startswith(',', pos):
+            pos = _skip_whitespace(text, pos + 1)
+
+    stat = os.stat(file_path)
+    return {
+        'version': INDEX_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'symbols': symbols
+    }
+
+
+def load_cost_basis_index(file_path):
+    """Cached index for a cost basis file, rebuilt if the file changed."""
+    index_path = file_path + INDEX_SUFFIX
+    stat = os.stat(file_path)
+
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'rb') as f:
+                index = json_loads(f.read())
+            if (index.get('version') == INDEX_VERSION and index.get('size') == stat.st_size
+                    and index.get('mtime_ns') == stat.st_mtime_ns):
+                return index
+        except (OSError, ValueError):
+            pass
+
+    print(f"🗂️ Indexing cost basis file: {os.path.basename(file_path)}")
+    index = build_cost_basis_index(file_path)
+    try:
+        with open(index_path, 'w') as f:
+            json.dump(index, f)
+    except OSError as e:
+        print(f"   ⚠️ Could not cache index next to the file: {e}")
+    return index
+
+
+class LazyCostBasis(Mapping):
+    """Read-only {symbol: records} mapping that parses each symbol on first access."""
+
+    def __init__(self, file_path, index=None):
+        self.file_path = file_path
+        self.index = index if index is not None else load_cost_basis_index(file_path)
+        self._entries = self.index['symbols']
+        self._loaded = {}
+
+    def __getitem__(self, symbol):
+        records = self._loaded.get(symbol)
+        if records is None:
+            records = json_loads(self.raw_json(symbol))
+            self._loaded[symbol] = records
+        return records
+
+    def __contains__(self, symbol):
+        return symbol in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def raw_json(self, symbol):
+        """JSON text of a symbol's lot list, exactly as stored in the file."""
+        entry = self._entries[symbol]
+        with open(self.file_path, 'rb') as f:
+            f.seek(entry['offset'])
+            return f.read(entry['length'])
+
+    def entry(self, symbol):
+        """Index entry (offset, length, lots, units, value_aud, ...) for a symbol."""
+        return self._entries[symbol]
+
+    def loaded_symbols(self):
+        """Symbols parsed so far."""
+        return list(self._loaded)
+
+
+class LazyRemainingCostBasis(Mapping):
+    """
+    Remaining cost basis of a LazyCostBasisLotStore.
+
+    Sold symbols are rebuilt from the store's deltas; unsold symbols are read
+    from the file only when accessed (and copied when accessed if copy).
+    """
+
+    def __init__(self, lot_store, copy=False):
+        self._store = lot_store
+        self._copy = copy
+        self._base = lot_store._base
+        self._symbols = []
+        for symbol in self._base:
+            if lot_store.is_touched(symbol):
+                if lot_store.remaining_records(symbol):
+                    self._symbols.append(symbol)
+            elif self._base.entry(symbol)['lots_with_units'] > 0:
+                self._symbols.append(symbol)
+        self._known = set(self._symbols)
+
+    def __getitem__(self, symbol):
+        if symbol not in self._known:
+            raise KeyError(symbol)
+        return self._store.remaining_records(symbol, copy=self._copy)
+
+    def __iter__(self):
+        return iter(self._symbols)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def _is_raw_copy(self, symbol):
+        return not self._store.is_touched(symbol) and self._base.entry(symbol)['canonical']
+
+    def write_json(self, f):
+        """Write as indented JSON, copying unsold symbols' text from the source file."""
+        f.write('{')
+        for i, symbol in enumerate(self._symbols):
+            f.write(',\n  ' if i else '\n  ')
+            f.write(json.dumps(symbol) + ': ')
+            if self._is_raw_copy(symbol):
+                f.write(self._base.raw_json(symbol).decode('utf-8'))
+            else:
+                f.write(json.dumps(self[symbol], indent=2).replace('\n', '\n  '))
+        f.write('\n}' if self._symbols else '}')
+
+    def holdings_totals(self):
+        """(total units, total AUD cost basis value) without parsing unsold symbols."""
+        total_units = 0
+        total_value_aud = 0
+        for symbol in self._symbols:
+            if self._is_raw_copy(symbol):
+                entry = self._base.entry(symbol)
+                total_units += entry['units']
+                total_value_aud += entry['value_aud']
+            else:
+                records = self[symbol]
+                total_units += sum(r['units'] for r in records)
+                total_value_aud += sum(r['units'] * r.get('price_aud', r.get('price', 0)) for r in records)
+        return total_units, total_value_aud
+
+
+class LazyCostBasisLotStore(CostBasisLotStore):
+    """CostBasisLotStore over a LazyCostBasis whose remaining cost basis stays lazy."""
+
+    def remaining_cost_basis(self, copy=False):
+        return LazyRemainingCostBasis(self, copy=copy)
+
+
+def open_lazy_cost_basis(file_path):
+    """Lot store over a legacy cost basis JSON file, loading symbols on demand."""
+    return LazyCostBasisLotStore(LazyCostBasis(file_path))
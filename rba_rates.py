@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+RBA Exchange Rate Files Without pandas
+
+Row parsing and date lookup for the RBA F11.1 AUD/USD CSV files, shared by
+RBAAUDConverter (complete_unified_with_aud.py) and the quick commands in
+cgt_quick.py. Standard library only, so a one-off rate lookup does not pay
+for importing pandas.
+"""
+
+import csv
+import glob
+import os
+import re
+from datetime import datetime, timedelta
+
+RBA_DATE_FORMATS = [
+    "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d",
+    "%d %b %Y", "%d-%b-%Y", "%b %d, %Y"
+]
+
+# Plausible AUD/USD range; anything outside is a header or a typo
+MIN_AUD_USD_RATE = 0.4
+MAX_AUD_USD_RATE = 1.2
+
+# A missing date falls back to the closest earlier rate within this many days
+FALLBACK_DAYS = 7
+
+
+def parse_rba_date(date_str):
+    """Parse dates in the formats RBA files use; None if it is not a date."""
+    if not date_str:
+        return None
+
+    date_str = str(date_str).strip()
+
+    # Skip obviously non-date strings
+    if len(date_str) < 6 or any(word in date_str.lower() for word in ['nan', 'series', 'unit']):
+        return None
+
+    for fmt in RBA_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_rba_rate_row(values):
+    """(date, rate) from one F11.1 row's non-empty cells, or None for header/metadata rows."""
+    if len(values) < 2:
+        return None
+
+    date_str, rate_str = values[0], values[1]
+
+    # Skip header rows and metadata
+    if any(word in date_str.lower() for word in ['date', 'series', 'unit', 'frequency', 'f11']):
+        return None
+
+    parsed_date = parse_rba_date(date_str)
+    if not parsed_date or not rate_str:
+        return None
+
+    # Remove any non-numeric characters except decimal points
+    clean_rate = re.sub(r'[^\d.]', '', rate_str)
+    try:
+        rate = float(clean_rate)
+    except ValueError:
+        return None
+    if not MIN_AUD_USD_RATE <= rate <= MAX_AUD_USD_RATE:
+        return None
+    return parsed_date, rate
+
+
+def read_rba_csv(csv_file):
+    """{YYYY-MM-DD: AUD/USD rate} from one F11.1 CSV file."""
+    rates = {}
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            parsed = parse_rba_rate_row([cell.strip() for cell in row if cell.strip()])
+            if parsed:
+                rates.setdefault(parsed[0].strftime('%Y-%m-%d'), parsed[1])
+    return rates
+
+
+def load_rba_rates(rates_folder):
+    """{YYYY-MM-DD: AUD/USD rate} from every FX_*.csv file in rates_folder, in date order."""
+    rates = {}
+    for csv_file in sorted(glob.glob(os.path.join(rates_folder, 'FX_*.csv'))):
+        for date_str, rate in read_rba_csv(csv_file).items():
+            rates.setdefault(date_str, rate)
+    return dict(sorted(rates.items()))
+
+
+def rate_for_date(exchange_rates, date, fallback_days=FALLBACK_DAYS):
+    """
+    (rate, rate date) for date, falling back to the previous business day
+    up to fallback_days back. (None, None) if there is no rate.
+    """
+    if isinstance(date, str):
+        date = datetime.strptime(date, '%Y-%m-%d')
+
+    for days_back in range(fallback_days + 1):
+        date_str = (date - timedelta(days=days_back)).strftime('%Y-%m-%d')
+        if date_str in exchange_rates:
+            return exchange_rates[date_str], date_str
+    return None, None
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the web app's cost basis path, run without a Streamlit server.
+build_cost_basis_and_sales() must give the CLI's hybrid FIFO lots, and a lot
+checkpoint must only be reused for the same inputs, rates and cutoff.
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import app
+from complete_unified_with_aud import RBAAUDConverter, apply_hybrid_fifo_processing_with_aud, standardize_csv_file
+
+TRANSACTIONS = pd.DataFrame([
+    ['05.01.23', 'PURCHASED', 'AAA', 100, 10.0],
+    ['07.02.23', 'PURCHASED', 'AAA', 50, 14.0],
+    ['10.03.23', 'PURCHASED', 'BBB', 40, 30.0],
+    ['01.03.24', 'SOLD', 'AAA', 120, 12.0],      # before the FY 2024-25 cutoff
+    ['15.08.24', 'SOLD', 'AAA', 10, 15.0],
+    ['20.11.24', 'SOLD', 'BBB', 5, 35.0],
+    ['02.09.25', 'SOLD', 'BBB', 15, 40.0],       # before the FY 2025-26 cutoff
+], columns=['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD'])
+
+
+def make_converter(shift=0.0):
+    converter = RBAAUDConverter()
+    day = datetime(2022, 1, 1)
+    while day <= datetime(2026, 6, 30):
+        converter.exchange_rates[day.strftime('%Y-%m-%d')] = 0.66 + shift + (day.day % 7) / 1000
+        day += timedelta(days=1)
+    return converter
+
+
+@pytest.fixture
+def fifo_runs(tmp_path, monkeypatch):
+    """Checkpoints in tmp_path; returns the list of cutoffs FIFO actually ran for."""
+    monkeypatch.setattr(app, 'LOT_CHECKPOINT_DIR', str(tmp_path / 'lot_checkpoints'))
+    runs = []
+
+    def counting_fifo(transactions, aud_converter, sell_cutoff_date, **kwargs):
+        runs.append(sell_cutoff_date)
+        return apply_hybrid_fifo_processing_with_aud(transactions, aud_converter, sell_cutoff_date, **kwargs)
+
+    monkeypatch.setattr(app, 'apply_hybrid_fifo_processing_with_aud', counting_fifo)
+    return runs
+
+
+def build(financial_year, converter):
+    transactions = app.standardize_transaction_csv(TRANSACTIONS, financial_year, 'broker.csv')
+    input_hash = app.content_hash(transactions.to_csv(index=False).encode())
+    return app.build_cost_basis_and_sales(input_hash, financial_year, [transactions], converter)
+
+
+def test_app_lots_match_hybrid_fifo_for_pre_cutoff_sells(fifo_runs, tmp_path):
+    converter = make_converter()
+    overview, cost_basis, sales_df = build('2024-25', converter)
+
+    # The CLI path: load with SELLs up to the cutoff, then hybrid FIFO
+    csv_file = tmp_path / 'broker.csv'
+    TRANSACTIONS.to_csv(csv_file, index=False)
+    cutoff = datetime(2024, 6, 30)
+    expected, _, _ = apply_hybrid_fifo_processing_with_aud(standardize_csv_file(str(csv_file), cutoff),
+                                                           converter, cutoff)
+    assert cost_basis == expected
+    assert sum(lot['units'] for lot in cost_basis['AAA']) == 30   # the March 2024 sell consumed lots
+    assert sales_df['Symbol'].tolist() == ['AAA', 'BBB']
+    assert overview['sale_count'] == 2
+
+    # A second build (e.g. after a restart) loads the same lots from the checkpoint
+    assert build('2024-25', converter)[1] == cost_basis
+    assert len(fifo_runs) == 1
+
+
+def test_checkpoint_is_not_reused_when_rates_or_cutoff_change(fifo_runs):
+    converter = make_converter()
+    _, cost_basis, _ = build('2024-25', converter)
+
+    _, shifted_cost_basis, _ = build('2024-25', make_converter(shift=0.05))
+    assert len(fifo_runs) == 2
+    assert shifted_cost_basis['AAA'][0]['price_aud'] != pytest.approx(cost_basis['AAA'][0]['price_aud'])
+
+    _, next_year_cost_basis, _ = build('2025-26', converter)
+    assert fifo_runs[-1] == datetime(2025, 6, 30)
+    assert next_year_cost_basis != cost_basis
+
+    assert len({
+        app.lot_checkpoint_key('input', datetime(2024, 6, 30), converter),
+        app.lot_checkpoint_key('input', datetime(2024, 6, 30), make_converter(shift=0.05)),
+        app.lot_checkpoint_key('input', datetime(2025, 6, 30), converter),
+    }) == 3
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for batch CGT runs over a portfolio manifest.
+"""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from cgt_batch import load_manifest, run_batch
+from cgt_pipeline import stage_rates
+
+RATES_FOLDER = os.path.abspath('rates')
+
+
+def write_transactions(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame(rows, columns=['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']).to_csv(path, index=False)
+
+
+def test_manifest_portfolios_run_on_process_pool(tmp_path):
+    write_transactions(str(tmp_path / 'clients/a/manual_transactions.csv'), [
+        ['05.01.23', 'PURCHASED', 'AAA', 100, 10.0],
+        ['01.03.24', 'SOLD', 'AAA', 20, 12.0],
+        ['15.08.24', 'SOLD', 'AAA', 30, 15.0],
+    ])
+    write_transactions(str(tmp_path / 'clients/b/manual_transactions.csv'), [
+        ['07.02.23', 'PURCHASED', 'BBB', 50, 40.0],
+        ['15.08.23', 'SOLD', 'BBB', 10, 45.0],
+    ])
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({
+        'defaults': {'financial_year': '2024-25'},
+        'portfolios': [
+            {'name': 'client_a', 'inputs': 'clients/a'},
+            {'name': 'client_b', 'inputs': ['clients/b'], 'financial_year': '2023-24', 'strategy': 'fifo'},
+            {'name': 'client_c', 'inputs': 'clients/missing'}
+        ]
+    }))
+
+    portfolios = load_manifest(str(manifest))
+    assert portfolios[1]['sell_cutoff'] == '2023-06-30'
+
+    output_dir = tmp_path / 'out'
+    rows = run_batch(portfolios, stage_rates(RATES_FOLDER), str(output_dir), workers=2)
+    assert [row['status'] for row in rows] == ['done', 'done', 'failed']
+    assert [row['cgt_records'] for row in rows[:2]] == [1, 1]
+    assert 'Input not found' in rows[2]['error']
+
+    # The pre-cutoff sale consumed AAA lots before FY 2024-25
+    with open(output_dir / 'client_a' / 'cost_basis_dictionary_AUD_post_FY2024-25.json') as f:
+        assert sum(lot['units'] for lot in json.load(f)['AAA']) == 50
+    assert (output_dir / 'client_b' / 'Australian_CGT_Report_FY2023-24_AUD.xlsx').exists()
+
+    summary = pd.read_csv(output_dir / 'batch_summary.csv')
+    assert summary['portfolio'].tolist() == ['client_a', 'client_b', 'client_c']
+    assert (summary['wall_seconds'][:2] > 0).all()
+    assert summary['status'].tolist() == ['done', 'done', 'failed']
+
+
+def test_invalid_manifest_entries_are_all_reported(tmp_path):
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text("name,inputs,financial_year,strategy\n"
+                        "ok,a;b,2024-25,\n"
+                        "ok,a,2024,\n"
+                        "bad name,a,2024-25,lifo\n")
+    with pytest.raises(ValueError) as error:
+        load_manifest(str(manifest))
+    message = str(error.value)
+    assert "financial_year must look like 2024-25, got '2024'" in message
+    assert "duplicate name" in message and "name must be" in message
+    assert "strategy must be one of" in message
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests for the column-wise CGT calculation.
+Compares calculate_australian_cgt_aud() with a row-wise reference (the
+per-sale, per-lot record building it replaced) on values, dtypes, the
+remaining cost basis and the warnings.
+"""
+
+import copy
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    calculate_australian_cgt_aud, days_between_dates, get_rba_exchange_rate, order_lots_for_sale_aud
+)
+
+
+def lot(units, price, date, rate=0.66):
+    return {'units': units, 'price': price, 'commission': 9.5, 'price_aud': price / rate,
+            'commission_aud': 9.5 / rate, 'exchange_rate': rate, 'date': date}
+
+
+def sale(symbol, units, price, date):
+    return {'Symbol': symbol, 'Trade Date': pd.Timestamp(date), 'Units_Sold': units,
+            'Sale_Price_Per_Unit': price, 'Total_Proceeds': units * price,
+            'Commission_Paid': 4.0, 'Net_Proceeds': units * price - 4.0}
+
+
+def sort_cost(candidate):
+    record = candidate[0]
+    return record['price_aud'] + record['commission_aud'] / max(record['units'], 1)
+
+
+def reference_cgt(sales_df, cost_basis_dict):
+    """Row-wise tax-optimal CGT records, one dict per matched lot."""
+    working = {symbol: [dict(record) for record in records] for symbol, records in cost_basis_dict.items()}
+    cgt_records = []
+    warnings_list = []
+    rate_cache = {}
+
+    for _, sale_row in sales_df.iterrows():
+        symbol = sale_row['Symbol']
+        units_sold = abs(sale_row['Units_Sold'])
+        sale_price_usd = abs(sale_row['Sale_Price_Per_Unit'])
+        sale_date = sale_row['Trade Date']
+        commission_usd = abs(sale_row['Commission_Paid'])
+        proceeds_usd = abs(sale_row['Total_Proceeds'])
+        net_usd = sale_row['Net_Proceeds']
+        rate = get_rba_exchange_rate(sale_date, cache=rate_cache)
+
+        unmatched = {
+            'Sale_Date': sale_date.strftime('%d.%m.%y'), 'Symbol': symbol, 'Units_Sold': units_sold,
+            'Sale_Price_Per_Unit_USD': sale_price_usd, 'Sale_Price_Per_Unit_AUD': sale_price_usd / rate,
+            'Total_Proceeds_USD': proceeds_usd, 'Total_Proceeds_AUD': proceeds_usd / rate,
+            'Sale_Commission_USD': commission_usd, 'Sale_Commission_AUD': commission_usd / rate,
+            'Net_Proceeds_AUD': net_usd / rate, 'Buy_Date': 'N/A', 'Buy_Price_Per_Unit_AUD': 0,
+            'Buy_Commission_AUD': 0, 'Units_Matched': 0, 'Days_Held': 0, 'Long_Term_Eligible': False,
+            'Cost_Basis_AUD': 0, 'Capital_Gain_Loss_AUD': 0, 'CGT_Discount_Applied': False,
+            'Taxable_Gain_AUD': 0, 'Purchase_Exchange_Rate': 0, 'Sale_Exchange_Rate': rate
+        }
+        if symbol not in working:
+            warnings_list.append(f"❌ NO COST BASIS FOUND for {symbol}")
+            cgt_records.append(dict(unmatched, Capital_Gain_Loss_AUD=net_usd / rate,
+                                    Taxable_Gain_AUD=net_usd / rate, Warning='NO COST BASIS DATA'))
+            continue
+
+        records = working[symbol]
+        missing = units_sold
+        selected = []
+        # Long-term lots first, then short-term, each highest AUD cost per unit first
+        candidates = [(record, days_between_dates(record['date'], sale_date)) for record in records
+                      if record['units'] > 0]
+        candidates = sorted((c for c in candidates if c[1] >= 365), key=sort_cost, reverse=True) + \
+            sorted((c for c in candidates if c[1] < 365), key=sort_cost, reverse=True)
+        for record, days_held in candidates:
+            if missing <= 0:
+                break
+            used = min(missing, record['units'])
+            share = used / record['units']
+            selected.append((record, used, share, days_held))
+            missing -= used
+            record['units'] -= used
+
+        if not selected:
+            warnings_list.append(f"❌ NO UNITS AVAILABLE for {symbol}")
+            cgt_records.append(dict(unmatched, Warning='NO UNITS AVAILABLE'))
+            continue
+
+        for record, used, share, days_held in selected:
+            proportion = used / units_sold
+            net_aud = net_usd * proportion / rate
+            cost_basis_aud = used * record['price_aud'] + record['commission_aud'] * share
+            gain = net_aud - cost_basis_aud
+            long_term = days_held >= 365
+            discount = long_term and gain > 0
+            cgt_records.append(dict(
+                unmatched, Units_Sold=used, Total_Proceeds_USD=proceeds_usd * proportion,
+                Total_Proceeds_AUD=proceeds_usd * proportion / rate,
+                Sale_Commission_USD=commission_usd * proportion,
+                Sale_Commission_AUD=commission_usd * proportion / rate, Net_Proceeds_AUD=net_aud,
+                Buy_Date=record['date'], Buy_Price_Per_Unit_AUD=record['price_aud'],
+                Buy_Commission_AUD=record['commission_aud'] * share, Units_Matched=used, Days_Held=days_held,
+                Long_Term_Eligible=long_term, Cost_Basis_AUD=cost_basis_aud, Capital_Gain_Loss_AUD=gain,
+                CGT_Discount_Applied=discount, Taxable_Gain_AUD=gain * 0.5 if discount else gain,
+                Purchase_Exchange_Rate=record['exchange_rate'],
+                Warning=f"MISSING {missing:.2f} UNITS" if missing > 0 else ""
+            ))
+        if missing > 0:
+            warnings_list.append(f"⚠️  {symbol}: Missing {missing:.2f} units for complete matching")
+
+    remaining = {
+        symbol: [dict(record) for record in records if record['units'] > 0]
+        for symbol, records in working.items()
+    }
+    return pd.DataFrame(cgt_records), {s: r for s, r in remaining.items() if r}, warnings_list
+
+
+def assert_matches_reference(cost_basis, sales_df):
+    before = copy.deepcopy(cost_basis)
+    cgt_df, remaining, warnings_list = calculate_australian_cgt_aud(sales_df, cost_basis)
+    expected_df, expected_remaining, expected_warnings = reference_cgt(sales_df, cost_basis)
+
+    pd.testing.assert_frame_equal(cgt_df, expected_df[cgt_df.columns])
+    assert remaining == expected_remaining
+    assert warnings_list == expected_warnings
+    assert cost_basis == before
+
+    # The planner's lot order is the calculator's
+    for symbol, records in cost_basis.items():
+        first_sale = sales_df[sales_df['Symbol'] == symbol]['Trade Date']
+        if len(first_sale):
+            matched = cgt_df[cgt_df['Symbol'] == symbol]
+            first = matched[matched['Sale_Date'] == first_sale.iloc[0].strftime('%d.%m.%y')]
+            planned = [lot['date'] for lot in order_lots_for_sale_aud(records, first_sale.iloc[0])]
+            assert first['Buy_Date'].tolist() == planned[:len(first)]
+
+
+def portfolio(units_type):
+    cost_basis = {
+        'AAA': [lot(100, 10.0, '01.3.22'), lot(50, 14.0, '01.3.24'), lot(40, 12.0, '15.7.23')],
+        'BBB': [lot(80, 30.0, '05.5.21')],
+        'CCC': [lot(25, 50.0, '10.10.23')],
+        'DDD': [lot(60, 5.0, '02.2.20')],
+    }
+    for records in cost_basis.values():
+        for record in records:
+            record['units'] = units_type(record['units'])
+    sales_df = pd.DataFrame([
+        sale('AAA', 70, 15.0, datetime(2024, 9, 2)),
+        sale('BBB', 30, 25.0, datetime(2024, 10, 1)),
+        sale('AAA', 90, 16.0, datetime(2024, 11, 4)),   # partial lots left by the first sale
+        sale('CCC', 40, 45.0, datetime(2024, 12, 2)),   # 15 units missing
+        sale('CCC', 5, 45.0, datetime(2025, 1, 6)),     # nothing left
+        sale('ZZZ', 10, 20.0, datetime(2025, 2, 3)),    # no cost basis
+    ])
+    sales_df['Units_Sold'] = sales_df['Units_Sold'].astype(units_type)
+    return cost_basis, sales_df
+
+
+def test_integer_units_match_row_wise_reference():
+    cost_basis, sales_df = portfolio(int)
+    assert_matches_reference(cost_basis, sales_df)
+
+    cgt_df, _, _ = calculate_australian_cgt_aud(sales_df, cost_basis)
+    assert cgt_df['Units_Sold'].dtype == 'int64' and cgt_df['Units_Matched'].dtype == 'int64'
+
+
+def test_fractional_units_match_row_wise_reference():
+    cost_basis, sales_df = portfolio(float)
+    cost_basis['AAA'][0]['units'] = 100.5
+    sales_df.loc[0, 'Units_Sold'] = 70.25
+    assert_matches_reference(cost_basis, sales_df)
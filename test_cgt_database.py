@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite CGT store.
+"""
+
+import pandas as pd
+import pytest
+
+from cgt_calculator_australia_aud import calculate_australian_cgt_aud
+from cgt_database import CGTDatabase
+from test_cgt_streaming import make_history
+
+TRANSACTIONS = pd.DataFrame({
+    'Symbol': ['AAA', 'AAA', 'AAA', 'BBB', 'AAA'],
+    'Date': ['2023-01-05', '2023-01-05 10:31:02', '2024-08-01', '2024-09-01', '05.02.25'],
+    'Activity': ['PURCHASED', 'PURCHASED', 'SOLD', 'PURCHASED', 'SOLD'],
+    'Quantity': [10.0, 10.0, -4.0, 7.0, 2.0],
+    'Price': [10.0, 10.0, 15.0, 30.0, 16.0],
+    'Commission': [1.0, 1.0, 1.5, 2.0, 1.0],
+    'Source': ['statement.htm', 'statement_parsed.csv', 'manual.csv', 'manual.csv', 'manual.csv']
+})
+
+
+def test_transactions_rates_and_slices(tmp_path):
+    with CGTDatabase(str(tmp_path / 'cgt.db')) as db:
+        # The HTML and parsed-CSV copies of the first trade collapse to one row
+        assert db.ingest_transactions(TRANSACTIONS) == 4
+        assert db.ingest_transactions(TRANSACTIONS) == 0
+        assert db.connection.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+        aaa = db.transactions(symbols=['AAA'])
+        assert aaa['Date'].tolist() == ['2023-01-05', '2024-08-01', '2025-02-05']
+        assert db.transactions(end_date='2024-08-31')['Symbol'].tolist() == ['AAA', 'AAA']
+
+        sales = db.sales_for_financial_year('2024-25')
+        assert sales['Units_Sold'].tolist() == [4.0, 2.0]
+        assert (sales['Financial_Year'] == '2024-25').all()
+
+        db.save_rates({'2024-08-01': 0.66, '2024-08-05': 0.65})
+        assert db.rate_for_date('2024-08-04') == 0.66
+        assert db.rate_for_date('2024-08-20') is None
+        assert db.aud_converter().convert_usd_to_aud(6.5, '2024-08-05') == (10.0, 0.65)
+
+
+def test_cgt_run_round_trip(tmp_path):
+    cost_basis, sales_df = make_history()
+    expected_df, expected_remaining, expected_warnings = calculate_australian_cgt_aud(sales_df, cost_basis)
+
+    transactions = pd.DataFrame({
+        'Symbol': sales_df['Symbol'], 'Date': sales_df['Trade Date'], 'Activity': 'SOLD',
+        'Quantity': sales_df['Units_Sold'], 'Price': sales_df['Sale_Price_Per_Unit'],
+        'Commission': sales_df['Commission_Paid'], 'Source': 'test'
+    })
+
+    with CGTDatabase(str(tmp_path / 'cgt.db')) as db:
+        db.ingest_transactions(transactions)
+        db.save_cost_basis(cost_basis, 'start')
+        assert db.load_cost_basis('start') == cost_basis
+        assert db.load_cost_basis('start', symbols=['S1']) == {'S1': cost_basis['S1']}
+
+        run_id, cgt_df, warnings_list = db.run_cgt('2024-25', 'start', remaining_label='end')
+        assert len(warnings_list) == len(expected_warnings)
+        pd.testing.assert_frame_equal(cgt_df, expected_df, check_dtype=False)
+        pd.testing.assert_frame_equal(db.cgt_records(run_id), expected_df, check_dtype=False)
+        assert db.load_cost_basis('end') == expected_remaining
+
+        runs = db.cgt_runs('2024-25')
+        assert runs['total_taxable_gain_aud'][0] == pytest.approx(expected_df['Taxable_Gain_AUD'].sum())
+        s1 = db.lot_consumptions(symbol='S1', financial_year='2024-25')
+        assert len(s1) == (expected_df['Symbol'] == 'S1').sum()
+
+
+def test_remaining_cost_basis_can_replace_its_own_label(tmp_path):
+    cost_basis = {
+        'AAA': [{'units': 10.0, 'price': 10.0, 'commission': 1.0, 'date': '05.01.23'}],
+        'BBB': [{'units': 5.0, 'price': 20.0, 'commission': 1.0, 'date': '07.02.23'}]
+    }
+    with CGTDatabase(str(tmp_path / 'cgt.db')) as db:
+        db.ingest_transactions(TRANSACTIONS[TRANSACTIONS['Date'] == '2024-08-01'])
+        db.save_cost_basis(cost_basis, 'cb')
+
+        db.run_cgt('2024-25', 'cb', remaining_label='cb')
+        updated = db.load_cost_basis('cb')
+        assert updated['BBB'] == cost_basis['BBB']
+        assert [record['units'] for record in updated['AAA']] == [6.0]
+
+
+def test_fifo_reads_only_the_requested_symbols(tmp_path):
+    with CGTDatabase(str(tmp_path / 'cgt.db')) as db:
+        db.ingest_transactions(TRANSACTIONS)
+        db.save_rates({'2023-01-05': 0.68, '2024-08-01': 0.66, '2024-09-01': 0.67, '2025-02-05': 0.62})
+
+        cost_basis, errors = db.fifo_cost_basis('2024-12-31', label='lots')
+        assert not errors
+        assert [record['units'] for record in cost_basis['AAA']] == [6.0]
+        assert db.load_cost_basis('lots') == cost_basis
+
+        # Rebuilding one symbol with a later cutoff leaves the other symbols' lots alone
+        aaa, _ = db.fifo_cost_basis('2025-06-30', symbols=['AAA'], label='lots')
+        assert [record['units'] for record in aaa['AAA']] == [4.0]
+        assert db.load_cost_basis('lots') == {'AAA': aaa['AAA'], 'BBB': cost_basis['BBB']}
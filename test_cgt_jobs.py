@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the background job registry.
+"""
+
+import threading
+
+from cgt_jobs import JOB_DONE, JOB_FAILED, JobRegistry
+
+
+def test_repeated_submit_attaches_to_running_job():
+    release = threading.Event()
+    calls = []
+
+    def work(items, progress):
+        calls.append(items)
+        for done in range(len(items)):
+            progress('symbols', done, len(items))
+        release.wait(5)
+        progress('symbols', len(items), len(items))
+        return sum(items)
+
+    registry = JobRegistry(max_workers=2)
+    first = registry.submit('portfolio-a', work, [1, 2, 3])
+    second = registry.submit('portfolio-a', work, [1, 2, 3])
+    assert second is first
+    assert not first.done
+
+    release.set()
+    assert first.wait(5)
+    snapshot = first.snapshot()
+    assert snapshot['status'] == JOB_DONE
+    assert snapshot['result'] == 6
+    assert snapshot['progress'] == {'symbols': (3, 3)}
+
+    # Finished jobs are picked up again rather than re-run
+    assert registry.submit('portfolio-a', work, [1, 2, 3]) is first
+    assert calls == [[1, 2, 3]]
+    registry.shutdown()
+
+
+def test_failed_job_is_reported_and_retried():
+    attempts = []
+
+    def flaky(progress):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("no exchange rates loaded")
+        return 'ok'
+
+    registry = JobRegistry(max_workers=1, keep_finished=1)
+    job = registry.submit('key', flaky)
+    job.wait(5)
+    assert job.status == JOB_FAILED
+    assert job.error == "no exchange rates loaded"
+    assert 'ValueError' in job.traceback
+
+    retry = registry.submit('key', flaky)
+    retry.wait(5)
+    assert retry is not job and retry.result == 'ok'
+
+    # Only the newest finished job is kept
+    registry.submit('other', flaky).wait(5)
+    assert registry.get('key') is None
+    registry.shutdown()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the chained multi-year CGT run and capital-loss carry-forward.
+"""
+
+import pandas as pd
+import pytest
+
+from cgt_calculator_australia_aud import calculate_australian_cgt_aud
+from cgt_multi_year import (
+    apply_capital_losses_aud, build_purchase_history, build_sales_history, run_multi_year_cgt,
+    save_multi_year_outputs
+)
+from cost_basis_snapshots import SnapshotStore
+
+
+class FixedRateConverter:
+    """Stands in for RBAAUDConverter with one AUD/USD rate."""
+
+    def convert_usd_to_aud(self, usd_amount, date):
+        return usd_amount / 0.65, 0.65
+
+
+def transactions(rows):
+    return pd.DataFrame(rows, columns=['Symbol', 'Date', 'Activity', 'Quantity', 'Price', 'Commission', 'Source'])
+
+
+HISTORY = transactions([
+    ('AAA', '2021-03-01', 'PURCHASED', 100, 10.0, 5.0, 'test'),
+    ('BBB', '2021-05-01', 'PURCHASED', 50, 40.0, 5.0, 'test'),
+    ('AAA', '2022-09-15', 'SOLD', 40, 8.0, 5.0, 'test'),       # FY 2022-23 loss
+    ('BBB', '2022-11-01', 'SOLD', 10, 20.0, 5.0, 'test'),      # FY 2022-23 loss
+    ('AAA', '2023-08-01', 'PURCHASED', 30, 5.0, 5.0, 'test'),
+    ('AAA', '2023-10-01', 'SOLD', 80, 15.0, 5.0, 'test'),      # FY 2023-24 gain
+])
+
+
+def test_chained_run_matches_year_by_year_runs():
+    purchase_history, _ = build_purchase_history(HISTORY, FixedRateConverter())
+    sales_df = build_sales_history(HISTORY)
+
+    results = run_multi_year_cgt(purchase_history, sales_df)
+    assert [r['financial_year'] for r in results] == ['2022-23', '2023-24']
+
+    # Year by year the old way: FY 2022-23 cost basis only has the lots bought by then
+    first_basis = {symbol: records[:1] for symbol, records in purchase_history.items()}
+    first_year = sales_df[sales_df['Financial_Year'] == '2022-23']
+    cgt_df, remaining, _ = calculate_australian_cgt_aud(first_year, first_basis)
+    pd.testing.assert_frame_equal(results[0]['cgt_df'].reset_index(drop=True), cgt_df)
+    assert results[0]['remaining_cost_basis'] == remaining
+
+    second_basis = {'AAA': remaining['AAA'] + purchase_history['AAA'][1:], 'BBB': remaining['BBB']}
+    second_year = sales_df[sales_df['Financial_Year'] == '2023-24']
+    cgt_df, remaining, _ = calculate_australian_cgt_aud(second_year, second_basis)
+    pd.testing.assert_frame_equal(results[1]['cgt_df'].reset_index(drop=True), cgt_df)
+    assert results[1]['remaining_cost_basis'] == remaining
+
+
+def test_lots_are_not_sold_before_they_are_bought():
+    history = transactions([
+        ('AAA', '2022-01-10', 'PURCHASED', 10, 10.0, 0.0, 'test'),
+        ('AAA', '2022-02-01', 'SOLD', 15, 12.0, 0.0, 'test'),
+        ('AAA', '2022-03-01', 'PURCHASED', 10, 11.0, 0.0, 'test'),
+    ])
+    purchase_history, _ = build_purchase_history(history, FixedRateConverter())
+    results = run_multi_year_cgt(purchase_history, build_sales_history(history))
+
+    cgt_df = results[0]['cgt_df']
+    assert cgt_df['Units_Matched'].sum() == 10
+    assert cgt_df['Warning'].iloc[0] == 'MISSING 5.00 UNITS'
+    assert sum(r['units'] for r in results[0]['remaining_cost_basis']['AAA']) == 10
+
+
+def test_losses_carry_forward_and_offset_non_discount_gains_first():
+    purchase_history, _ = build_purchase_history(HISTORY, FixedRateConverter())
+    results = run_multi_year_cgt(purchase_history, build_sales_history(HISTORY))
+
+    first, second = results[0]['losses'], results[1]['losses']
+    assert first['Net_Capital_Gain_AUD'] == 0.0
+    assert first['Carried_Forward_Loss_Out_AUD'] == pytest.approx(first['Current_Year_Losses_AUD'])
+    assert second['Carried_Forward_Loss_In_AUD'] == first['Carried_Forward_Loss_Out_AUD']
+
+    cgt_df = pd.DataFrame({
+        'Capital_Gain_Loss_AUD': [1000.0, 400.0, -300.0],
+        'Long_Term_Eligible': [True, False, False]
+    })
+    losses = apply_capital_losses_aud(cgt_df, carried_forward_loss_aud=200.0)
+    # 500 of losses wipe out the 400 short-term gain, then 100 of the discountable gain
+    assert losses['Net_Capital_Gain_AUD'] == pytest.approx(450.0)
+    assert losses['Carried_Forward_Loss_Out_AUD'] == 0.0
+
+
+def test_yearly_cost_bases_chain_into_snapshots(tmp_path):
+    purchase_history, _ = build_purchase_history(HISTORY, FixedRateConverter())
+    results = run_multi_year_cgt(purchase_history, build_sales_history(HISTORY))
+    assert [r['changed_symbols'] for r in results] == [{'AAA', 'BBB'}, {'AAA'}]
+
+    store = SnapshotStore(tmp_path / 'snapshots')
+    save_multi_year_outputs(results, str(tmp_path / 'out'), snapshot_store=store)
+
+    first, second = store.list_snapshots()
+    assert second['parent'] == first['id'] and second['reused_chunks'] == 1  # BBB untouched in FY 2023-24
+    for result in results:
+        assert store.load_snapshot(f"post_FY{result['financial_year']}") == result['remaining_cost_basis']
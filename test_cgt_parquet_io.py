@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for the Parquet/Arrow export of CGT data.
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from cgt_calculator_australia_aud import load_cost_basis_json_aud
+from cgt_parquet_io import (
+    load_cost_basis_parquet, load_fifo_events_parquet, load_transactions_parquet, read_table,
+    save_cost_basis_parquet, save_fifo_events_parquet, save_transactions_parquet
+)
+from complete_unified_with_aud import apply_hybrid_fifo_processing_with_aud
+
+
+class FixedRateConverter:
+    def convert_usd_to_aud(self, usd_amount, date):
+        return usd_amount / 0.65, 0.65
+
+
+TRANSACTIONS = pd.DataFrame({
+    'Symbol': ['AAA', 'AAA', 'BBB', 'AAA'],
+    'Date': ['2023-01-05', '2023-02-05', '2023-03-01', '2023-04-01'],
+    'Activity': ['PURCHASED', 'PURCHASED', 'PURCHASED', 'SOLD'],
+    'Quantity': [10.0, 5.0, 7.0, 12.0],
+    'Price': [10.0, 12.0, 30.0, 15.0],
+    'Commission': [1.0, 1.0, 2.0, 1.5],
+    'Source': ['test.csv'] * 4
+})
+
+
+def test_cost_basis_round_trip_aud_and_legacy(tmp_path):
+    fifo_events = []
+    cost_basis, _, _ = apply_hybrid_fifo_processing_with_aud(TRANSACTIONS, FixedRateConverter(),
+                                                             fifo_events=fifo_events)
+    save_cost_basis_parquet(cost_basis, tmp_path / 'aud.parquet')
+    assert load_cost_basis_parquet(tmp_path / 'aud.parquet') == cost_basis
+
+    with open('json_folder/cost_basis_dictionary_post_FY2024-25.json') as f:
+        legacy = json.load(f)
+    save_cost_basis_parquet(legacy, tmp_path / 'legacy.parquet')
+    assert load_cost_basis_json_aud(str(tmp_path / 'legacy.parquet')) == legacy
+
+    symbol_type = read_table(tmp_path / 'legacy.parquet').schema.field('Symbol').type
+    assert pa.types.is_dictionary(symbol_type)
+
+
+def test_transactions_and_fifo_events_round_trip(tmp_path):
+    fifo_events = []
+    apply_hybrid_fifo_processing_with_aud(TRANSACTIONS, FixedRateConverter(), fifo_events=fifo_events)
+    assert [e['Event'] for e in fifo_events if e['Symbol'] == 'AAA'] == ['BUY', 'BUY', 'SELL', 'CONSUME', 'CONSUME']
+
+    save_fifo_events_parquet(fifo_events, tmp_path / 'events.parquet')
+    events = load_fifo_events_parquet(tmp_path / 'events.parquet')
+    assert events['Units'].tolist() == [e['Units'] for e in fifo_events]
+    assert events['Symbol'].tolist() == [e['Symbol'] for e in fifo_events]
+
+    save_transactions_parquet(TRANSACTIONS, tmp_path / 'transactions.parquet')
+    pd.testing.assert_frame_equal(load_transactions_parquet(tmp_path / 'transactions.parquet'), TRANSACTIONS,
+                                  check_dtype=False)
+
+
+def test_arrow_ipc_reload_is_memory_mapped_without_copy(tmp_path):
+    save_transactions_parquet(TRANSACTIONS, tmp_path / 'transactions.arrow')
+    with open(tmp_path / 'transactions.arrow', 'rb') as f:
+        assert f.read(6) == b'ARROW1'
+
+    allocated = pa.total_allocated_bytes()
+    table = read_table(tmp_path / 'transactions.arrow')
+    assert pa.total_allocated_bytes() == allocated
+    assert table.column('Quantity').to_pylist() == TRANSACTIONS['Quantity'].tolist()
+
+    pd.testing.assert_frame_equal(load_transactions_parquet(tmp_path / 'transactions.arrow'), TRANSACTIONS,
+                                  check_dtype=False)
+    cost_basis, _, _ = apply_hybrid_fifo_processing_with_aud(TRANSACTIONS, FixedRateConverter())
+    save_cost_basis_parquet(cost_basis, tmp_path / 'lots.arrow')
+    assert load_cost_basis_json_aud(str(tmp_path / 'lots.arrow')) == cost_basis
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Tests for the memoized CGT pipeline stage graph.
+"""
+
+import os
+import threading
+
+import pandas as pd
+
+from cgt_pipeline import Pipeline, Stage, build_cgt_pipeline
+
+RATES_FOLDER = os.path.abspath('rates')
+
+
+def test_stages_rerun_only_when_their_key_changes(tmp_path):
+    calls = []
+
+    def source(path):
+        calls.append('source')
+        with open(path) as f:
+            return f.read().strip()
+
+    def parse(source):
+        calls.append('parse')
+        return source.lower()
+
+    def report(parse, suffix):
+        calls.append('report')
+        return parse + suffix
+
+    input_file = tmp_path / 'input.txt'
+    input_file.write_text('HELLO')
+
+    def build():
+        return Pipeline([
+            Stage('source', source, params=['path'], inputs=lambda params: [params['path']]),
+            Stage('parse', parse, deps=['source']),
+            Stage('report', report, deps=['parse'], params=['suffix'])
+        ], cache_dir=str(tmp_path / 'cache'))
+
+    assert build().run(path=str(input_file), suffix='!')['report'] == 'hello!'
+    assert calls == ['source', 'parse', 'report']
+
+    calls.clear()
+    pipeline = build()
+    assert pipeline.run(path=str(input_file), suffix='?')['report'] == 'hello?'
+    assert calls == ['report']
+    assert pipeline.report[-1]['reason'] == 'suffix ! → ?'
+
+    # Same parsed output: the report stage is served from the cache
+    calls.clear()
+    input_file.write_text('hello')
+    pipeline.run(path=str(input_file), suffix='?')
+    assert calls == ['source', 'parse']
+    assert 'modified: input.txt' in pipeline.report[0]['reason']
+
+
+def test_independent_stages_run_concurrently(tmp_path, capsys):
+    # Each source stage waits for the other: run one after another, they would time out
+    barrier = threading.Barrier(2, timeout=10)
+
+    def source(name):
+        def load():
+            print(f"loading {name}")
+            barrier.wait()
+            return name
+        return load
+
+    pipeline = Pipeline([
+        Stage('first', source('first')),
+        Stage('second', source('second')),
+        Stage('joined', lambda first, second: first + second, deps=['first', 'second'])
+    ], cache_dir=str(tmp_path / 'cache'), verbose=True)
+
+    assert pipeline.run()['joined'] == 'firstsecond'
+    assert capsys.readouterr().out == 'loading first\nloading second\n'
+    assert [entry['wave'] for entry in pipeline.report] == [1, 1, 2]
+    assert pipeline.wall_seconds >= max(entry['seconds'] for entry in pipeline.report[:2])
+
+
+def test_changing_fy_reruns_only_sales_and_cgt(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('csv_folder')
+    pd.DataFrame({
+        'Date': ['05.01.23', '07.02.23', '15.08.23', '15.08.24'],
+        'Activity_Type': ['PURCHASED', 'PURCHASED', 'SOLD', 'SOLD'],
+        'Symbol': ['AAA', 'BBB', 'AAA', 'BBB'],
+        'Quantity': [100, 50, 30, 10],
+        'Price_USD': [10.0, 40.0, 15.0, 45.0]
+    }).to_csv('csv_folder/manual_transactions.csv', index=False)
+
+    params = dict(rates_folder=RATES_FOLDER, sell_cutoff_date='2023-06-30', strategy='tax_optimal',
+                  output_dir='out')
+    first = build_cgt_pipeline().run(financial_year='2023-24', **params)
+    assert first['cgt']['cgt_df']['Symbol'].tolist() == ['AAA']
+
+    pipeline = build_cgt_pipeline()
+    second = pipeline.run(financial_year='2024-25', **params)
+    ran = [entry['stage'] for entry in pipeline.report if entry['status'] == 'ran']
+    assert ran == ['sales', 'cgt', 'export']
+    assert second['cgt']['cgt_df']['Symbol'].tolist() == ['BBB']
+    assert all(os.path.exists(path) for path in second['export'])
+
+    pipeline.run(financial_year='2024-25', **params)
+    assert all(entry['status'] == 'cached' for entry in pipeline.report)
+
+
+def test_export_reruns_when_another_strategy_overwrote_its_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('csv_folder')
+    pd.DataFrame({
+        'Date': ['05.01.23', '07.02.23', '15.08.24'],
+        'Activity_Type': ['PURCHASED', 'PURCHASED', 'SOLD'],
+        'Symbol': ['AAA', 'AAA', 'AAA'],
+        'Quantity': [50, 50, 30],
+        'Price_USD': [10.0, 20.0, 25.0]
+    }).to_csv('csv_folder/manual_transactions.csv', index=False)
+
+    params = dict(rates_folder=RATES_FOLDER, sell_cutoff_date='2024-06-30', financial_year='2024-25',
+                  output_dir='out')
+
+    def remaining_cost_basis(outputs):
+        path, = [path for path in outputs['export'] if path.endswith('.json')]
+        with open(path) as f:
+            return f.read()
+
+    tax_optimal = build_cgt_pipeline().run(strategy='tax_optimal', **params)
+    expected = remaining_cost_basis(tax_optimal)
+    assert remaining_cost_basis(build_cgt_pipeline().run(strategy='fifo', **params)) != expected
+
+    # Same export key as the first run, but the fifo run overwrote its files
+    pipeline = build_cgt_pipeline()
+    outputs = pipeline.run(strategy='tax_optimal', **params)
+    assert pipeline.report[-1]['stage'] == 'export' and pipeline.report[-1]['status'] == 'ran'
+    assert remaining_cost_basis(outputs) == expected
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the fast-starting quick commands and import side effects.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+from cgt_quick import main
+from rba_rates import load_rba_rates, rate_for_date
+
+RATES_FOLDER = os.path.abspath('rates')
+
+
+def imported_after(statement):
+    """(heavy modules loaded, stdout) after running statement in a fresh interpreter."""
+    code = (f"import sys; {statement}; "
+            "print('LOADED', [m for m in ('pandas', 'numpy', 'openpyxl', 'xlsxwriter') if m in sys.modules])")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    output, _, loaded = result.stdout.rpartition('LOADED ')
+    return loaded.strip(), output
+
+
+def test_imports_are_light_and_silent():
+    assert imported_after('import cgt_quick') == ('[]', '')
+
+    # The calculator still needs pandas, but no Excel writer and no import-time output
+    assert imported_after('import cgt_calculator_australia_aud') == ("['pandas', 'numpy']", '')
+
+
+def test_quick_commands(tmp_path, capsys):
+    assert rate_for_date(load_rba_rates(RATES_FOLDER), '2024-08-17')[1] == '2024-08-16'
+    assert main(['rate', '2024-08-17', '--rates-folder', RATES_FOLDER]) == 0
+    assert '(rate from 2024-08-16)' in capsys.readouterr().out
+
+    cost_basis = tmp_path / 'cost_basis.json'
+    cost_basis.write_text(json.dumps({
+        'AAA': [{'units': 10, 'price': 5.0, 'commission': 0.0, 'price_aud': 7.5, 'commission_aud': 0.0,
+                 'exchange_rate': 0.66, 'date': '05.01.23'}],
+        'BBB': [{'units': 0, 'price': 1.0, 'commission': 0.0, 'date': '05.01.23'}]
+    }))
+    assert main(['holdings', str(cost_basis)]) == 0
+    out = capsys.readouterr().out
+    assert 'AAA' in out and 'BBB' not in out and '1 symbols, total cost $75.00 AUD' in out
+
+    transactions = tmp_path / 'manual_transactions.csv'
+    transactions.write_text("Date,Activity_Type,Symbol,Quantity,Price_USD\n"
+                            "05.01.23,PURCHASED,AAA,10,5.0\n"
+                            "11.17.21,SOLD,AAA,ten,5.0\n")
+    unknown = tmp_path / 'notes.csv'
+    unknown.write_text("a,b\n1,2\n")
+    assert main(['validate', str(transactions), str(unknown)]) == 1
+    out = capsys.readouterr().out
+    assert "line 3: unparseable Date '11.17.21'" in out
+    assert "line 3: Quantity 'ten' is not a number" in out
+    assert 'notes.csv: 1 problems' in out and 'unknown CSV format' in out
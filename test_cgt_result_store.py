@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the bounded web app result store.
+"""
+
+import pandas as pd
+import pytest
+
+from cgt_result_store import ResultStore
+
+
+def test_spilled_artifacts_reload_and_memory_budget_evicts_lru(tmp_path):
+    store = ResultStore(str(tmp_path), memory_budget=3000, disk_budget=10 ** 6)
+    cgt_df = pd.DataFrame({'Symbol': ['AAA', 'BBB'], 'Taxable_Gain_AUD': [10.0, 20.0]})
+
+    store.put('r1', {'cgt_df': cgt_df, 'excel': b'PK' + b'x' * 500, 'remaining': {'AAA': [1.0] * 50}},
+              spill=('cgt_df', 'excel'))
+    store.attach('session-a', 'r1')
+    usage = store.usage()
+    assert usage['disk_bytes'] > 500 and 0 < usage['memory_bytes'] < 3000
+    assert store.get('r1', 'excel') == b'PK' + b'x' * 500
+    assert store.get('r1', 'cgt_df').equals(cgt_df)
+
+    # r2 pushes memory over budget: r1's in-memory artifact (least recently used) is spilled
+    store.put('r2', {'remaining': b'r' * 2900})
+    store.attach('session-b', 'r2')
+    store.attach('session-c', 'r2')
+    usage = store.usage()
+    assert usage['memory_bytes'] <= 3000
+    assert usage['sessions']['session-a']['memory_bytes'] == 0
+    assert usage['sessions']['session-b']['memory_bytes'] == 2900
+    assert store.get('r1', 'remaining') == {'AAA': [1.0] * 50}
+    assert usage['sessions']['session-b'] == usage['sessions']['session-c']
+
+
+def test_disk_budget_drops_least_recently_used_result(tmp_path):
+    store = ResultStore(str(tmp_path), memory_budget=0, disk_budget=2500)
+    for result_id in ('r1', 'r2'):
+        store.put(result_id, {'excel': b'x' * 1000}, spill=('excel',))
+        store.attach(f"session-{result_id}", result_id)
+    store.get('r1', 'excel')
+
+    store.put('r3', {'excel': b'y' * 1000}, spill=('excel',))
+    assert store.has('r1') and store.has('r3') and not store.has('r2')
+    assert store.session_result('session-r2') is None
+    assert store.usage()['disk_bytes'] == 2000
+    with pytest.raises(KeyError):
+        store.get('r2', 'excel')
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_results_and_idle_sessions_expire(tmp_path):
+    clock = FakeClock()
+    store = ResultStore(str(tmp_path), ttl_seconds=100, session_ttl_seconds=30, clock=clock)
+    store.put('r1', {'remaining': b'x' * 10})
+    store.attach('session-a', 'r1')
+    store.attach('session-b', 'r1')
+
+    # session-a keeps asking for its result, session-b's tab was closed
+    clock.now = 20
+    assert store.session_result('session-a') == 'r1'
+    clock.now = 40
+    assert set(store.usage()['sessions']) == {'session-a'}
+    assert store.session_result('session-b') is None
+
+    clock.now = 101
+    assert not store.has('r1')
+    usage = store.usage()
+    assert (usage['memory_bytes'], usage['results'], usage['sessions']) == (0, 0, {})
+
+
+def test_max_results_drops_least_recently_used(tmp_path):
+    store = ResultStore(str(tmp_path), max_results=2)
+    for result_id in ('r1', 'r2'):
+        store.put(result_id, {'remaining': result_id})
+    store.get('r1', 'remaining')
+
+    store.put('r3', {'remaining': 'r3'})
+    assert store.has('r1') and store.has('r3') and not store.has('r2')
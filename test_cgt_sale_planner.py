@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the sell-to-target planner.
+Checks that planned sales produce the expected net taxable gain when run
+through the real CGT calculator and the ATO loss netting, and that large
+portfolios plan quickly.
+"""
+
+import random
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import calculate_australian_cgt_aud
+from cgt_multi_year import apply_capital_losses_aud
+from cgt_sale_planner import plan_sales_to_target, plan_to_sales_df
+
+VALUATION_DATE = datetime(2025, 6, 20)
+RATE = 0.65
+
+
+def make_lot(units, price_usd, date, commission=10.0):
+    return {
+        'units': units,
+        'price': price_usd,
+        'commission': commission,
+        'price_aud': price_usd / RATE,
+        'commission_aud': commission / RATE,
+        'exchange_rate': RATE,
+        'date': date
+    }
+
+
+def sample_cost_basis():
+    return {
+        'AAA': [make_lot(100, 50.0, '10.1.22'), make_lot(50, 80.0, '10.1.25')],
+        'BBB': [make_lot(200, 20.0, '15.3.21'), make_lot(100, 35.0, '15.3.24')],
+        'CCC': [make_lot(300, 12.0, '01.2.25')],
+    }
+
+
+def test_plan_realizes_loss_target_through_calculator():
+    cost_basis = sample_cost_basis()
+    prices = {'AAA': 40.0, 'BBB': 25.0, 'CCC': 9.0}
+
+    # Default valuation uses the same RBA rate lookup as the calculator's sale side
+    plan = plan_sales_to_target(cost_basis, prices, -3000.0, valuation_date=VALUATION_DATE)
+
+    assert plan['transactions'] >= 1
+    assert abs(plan['deviation_aud']) < 100
+
+    cgt_df, _, _ = calculate_australian_cgt_aud(plan_to_sales_df(plan), cost_basis)
+
+    assert abs(net_taxable(cgt_df) - plan['planned_taxable_gain_aud']) < 0.01
+
+
+def net_taxable(cgt_df):
+    netted = apply_capital_losses_aud(cgt_df)
+    return netted['Net_Capital_Gain_AUD'] - (netted['Current_Year_Losses_AUD']
+                                             - netted['Current_Year_Losses_Applied_AUD'])
+
+
+def test_plan_nets_losses_against_discountable_gains():
+    # MIX sells a long-term gain lot before its short-term loss lot
+    cost_basis = {'MIX': [make_lot(50, 10.0, '10.1.22'), make_lot(200, 30.0, '10.1.25')]}
+    prices = {'MIX': 20.0}
+    booked = pd.DataFrame({'Capital_Gain_Loss_AUD': [1000.0], 'Long_Term_Eligible': [True]})
+
+    plan = plan_sales_to_target(cost_basis, prices, 0.0, valuation_date=VALUATION_DATE,
+                                booked_cgt_df=booked)
+
+    assert plan['booked_taxable_gain_aud'] == 500.0
+    assert abs(plan['deviation_aud']) < 10
+
+    # Discounting each lot on its own would stop once the loss covers half the booked gain
+    cgt_df, _, _ = calculate_australian_cgt_aud(plan_to_sales_df(plan), cost_basis)
+    assert (cgt_df['Capital_Gain_Loss_AUD'] > 0).any() and (cgt_df['Capital_Gain_Loss_AUD'] < 0).any()
+    assert -cgt_df['Capital_Gain_Loss_AUD'].sum() > 900
+
+    booked_and_planned = pd.concat([booked, cgt_df[booked.columns]], ignore_index=True)
+    assert abs(net_taxable(booked_and_planned) - plan['planned_taxable_gain_aud']) < 0.01
+
+
+def test_plan_uses_fewest_sales():
+    cost_basis = sample_cost_basis()
+    prices = {'AAA': 40.0, 'BBB': 25.0, 'CCC': 9.0}
+
+    # CCC alone can realize ~1,385 AUD of loss
+    plan = plan_sales_to_target(cost_basis, prices, -500.0,
+                                valuation_date=VALUATION_DATE, exchange_rate=RATE)
+
+    assert plan['transactions'] == 1
+    assert all(float(order['units']).is_integer() for order in plan['orders'])
+
+
+def test_plan_is_fast_for_thousands_of_lots():
+    rng = random.Random(7)
+    cost_basis = {}
+    prices = {}
+    for s in range(300):
+        symbol = f"S{s:03d}"
+        cost_basis[symbol] = [
+            make_lot(rng.randint(1, 500), rng.uniform(5, 300),
+                     f"{rng.randint(1, 28):02d}.{rng.randint(1, 12)}.{rng.randint(19, 25)}")
+            for _ in range(15)
+        ]
+        prices[symbol] = rng.uniform(5, 300)
+
+    start = time.perf_counter()
+    plan = plan_sales_to_target(cost_basis, prices, -25000.0, valuation_date=VALUATION_DATE,
+                                exchange_rate=RATE, objective='deviation')
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 1.0
+    assert abs(plan['deviation_aud']) < 50
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless CGT service, driven in-process.
+"""
+
+import io
+import os
+import threading
+
+import pandas as pd
+
+from cgt_service import CGTService, ServiceTestClient
+
+RATES_FOLDER = os.path.abspath('rates')
+
+
+def manual_csv(rows):
+    df = pd.DataFrame(rows, columns=['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD'])
+    return df.to_csv(index=False).encode('utf-8')
+
+
+BROKER_A = manual_csv([
+    ['05.01.23', 'PURCHASED', 'AAA', 100, 10.0],
+    ['07.02.23', 'PURCHASED', 'BBB', 50, 40.0],
+    ['01.03.24', 'SOLD', 'AAA', 20, 12.0],
+    ['15.08.24', 'SOLD', 'AAA', 30, 15.0],
+])
+BROKER_B = manual_csv([['20.11.24', 'SOLD', 'BBB', 10, 55.0]])
+
+
+def test_upload_process_and_download_artifacts():
+    service = CGTService(RATES_FOLDER, workers=2)
+    client = ServiceTestClient(service)
+    try:
+        files = [('broker_a.csv', BROKER_A), ('broker_b.csv', BROKER_B), ('notes.txt', b'ignored')]
+        response = client.post('/jobs', fields={'financial_year': '2024-25'}, files=files)
+        assert response.status == 202
+        job_id = response.json()['id']
+
+        status = client.get(f'/jobs/{job_id}?wait=30').json()
+        assert status['status'] == 'done'
+        summary = status['summary']
+        assert summary['cgt_records'] == 2 and summary['sales'] == 2
+        assert summary['skipped_files'] == ['notes.txt']
+        assert status['progress']['files'] == {'done': 3, 'total': 3}
+        assert status['progress']['sales'] == {'done': 2, 'total': 2}
+
+        # The pre-cutoff sale consumed AAA lots before the FY
+        remaining = client.get(status['artifacts']['remaining_cost_basis.json']).json()
+        assert sum(lot['units'] for lot in remaining['AAA']) == 50
+        records = pd.read_csv(io.BytesIO(client.get(status['artifacts']['cgt_records.csv']).body))
+        assert records['Symbol'].tolist() == ['AAA', 'BBB']
+        report = client.get(status['artifacts']['report.xlsx'])
+        assert report.status == 200 and report.body[:2] == b'PK'
+
+        # Same files and settings attach to the finished job
+        again = client.post('/jobs', fields={'financial_year': '2024-25'}, files=files)
+        assert again.status == 200 and again.json()['id'] == job_id
+
+        stats = client.get('/stats').json()
+        assert stats['jobs'] == {'submitted': 1, 'attached': 1, 'completed': 1}
+        assert stats['job_run_seconds']['count'] == 1
+        assert stats['requests_ms']['POST /jobs']['count'] == 2
+    finally:
+        service.shutdown()
+
+
+def test_validation_and_bounded_queue():
+    service = CGTService(workers=1, max_queue=1, exchange_rates={})
+    client = ServiceTestClient(service)
+    release = threading.Event()
+
+    def blocked(submitted, files, financial_year, strategy, sell_cutoff, progress):
+        release.wait(5)
+        return {'summary': {}, 'artifacts': {}}
+
+    service.process_upload = blocked
+    try:
+        assert client.post('/jobs', fields={'financial_year': '2024'}, files=[('a.csv', BROKER_A)]).status == 400
+        assert client.post('/jobs', fields={'financial_year': '2024-25'}).status == 400
+        assert client.get('/jobs/unknown').status == 404
+
+        first = client.post('/jobs', fields={'financial_year': '2024-25'}, files=[('a.csv', BROKER_A)])
+        assert first.status == 202
+        assert client.get(f"/jobs/{first.json()['id']}?wait=abc").status == 400
+        assert client.get(f"/jobs/{first.json()['id']}?wait=nan").status == 400
+        full = client.post('/jobs', fields={'financial_year': '2024-25'}, files=[('b.csv', BROKER_B)])
+        assert full.status == 429 and full.headers['Retry-After'] == '5'
+        assert client.get('/stats').json()['jobs']['rejected'] == 1
+    finally:
+        release.set()
+        service.shutdown()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for streaming CGT calculation.
+Streaming in small batches must give the same records, remaining cost basis
+and ATO totals as a single calculate_australian_cgt_aud() run.
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from cgt_calculator_australia_aud import calculate_australian_cgt_aud, save_cgt_excel_aud
+from cgt_parquet_io import load_cgt_parquet
+from cgt_streaming import CSVCGTSink, ExcelCGTSink, ParquetCGTSink, PARQUET_AVAILABLE, run_streaming_cgt
+from cost_basis_lot_store import CostBasisLotStore
+
+
+def make_history(seed=3):
+    rng = random.Random(seed)
+    cost_basis = {}
+    for s in range(6):
+        cost_basis[f"S{s}"] = [
+            {'units': rng.randint(5, 60), 'price': rng.uniform(10, 90), 'commission': 5.0,
+             'price_aud': rng.uniform(15, 130), 'commission_aud': 7.5, 'exchange_rate': 0.68,
+             'date': f"{rng.randint(1, 28):02d}.{rng.randint(1, 12)}.{rng.randint(20, 23)}"}
+            for _ in range(5)
+        ]
+
+    sales = []
+    day = datetime(2024, 7, 1)
+    for _ in range(40):
+        day += timedelta(days=rng.randint(0, 8))
+        units = rng.randint(1, 30)
+        price = rng.uniform(10, 120)
+        # S6 has no cost basis, so warnings are exercised too
+        sales.append({'Symbol': f"S{rng.randint(0, 6)}", 'Trade Date': pd.Timestamp(day),
+                      'Units_Sold': units, 'Sale_Price_Per_Unit': price,
+                      'Total_Proceeds': units * price, 'Commission_Paid': 2.0,
+                      'Net_Proceeds': units * price - 2.0})
+    return cost_basis, pd.DataFrame(sales)
+
+
+def test_streaming_matches_single_run(tmp_path):
+    cost_basis, sales_df = make_history()
+    expected_df, expected_remaining, expected_warnings = calculate_australian_cgt_aud(sales_df, cost_basis)
+
+    csv_file = tmp_path / 'cgt.csv'
+    xlsx_file = tmp_path / 'cgt.xlsx'
+    result = run_streaming_cgt(sales_df.to_dict('records'), CostBasisLotStore(cost_basis),
+                               sinks=[CSVCGTSink(csv_file), ExcelCGTSink(xlsx_file, '2024-25')],
+                               batch_size=7)
+
+    streamed_df = pd.read_csv(csv_file, keep_default_na=False)
+    assert len(streamed_df) == len(expected_df)
+    assert (streamed_df['Symbol'] == expected_df['Symbol']).all()
+    assert streamed_df['Taxable_Gain_AUD'].to_numpy() == pytest.approx(expected_df['Taxable_Gain_AUD'].to_numpy())
+    assert result['remaining_cost_basis'] == expected_remaining
+    assert result['warning_count'] == len(expected_warnings)
+
+    summary = result['summary']
+    assert summary.record_count == len(expected_df)
+    assert summary.total_taxable_gains_aud == pytest.approx(expected_df['Taxable_Gain_AUD'].sum())
+    assert summary.cgt_discount_count == expected_df['CGT_Discount_Applied'].sum()
+
+    book = openpyxl.load_workbook(xlsx_file, read_only=True)
+    assert book.sheetnames == ['CGT_Calculations_AUD', 'ATO_Summary', 'Warnings']
+    assert book['CGT_Calculations_AUD'].max_row == len(expected_df) + 1
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow not installed")
+def test_parquet_sink_and_sort_check(tmp_path):
+    cost_basis, sales_df = make_history()
+    parquet_file = tmp_path / 'cgt.parquet'
+
+    run_streaming_cgt(sales_df, cost_basis, sinks=[ParquetCGTSink(parquet_file)], batch_size=10)
+    expected_df, _, _ = calculate_australian_cgt_aud(sales_df, cost_basis)
+    pd.testing.assert_frame_equal(load_cgt_parquet(parquet_file), expected_df, check_dtype=False)
+
+    with pytest.raises(ValueError):
+        run_streaming_cgt(sales_df.iloc[::-1], cost_basis, batch_size=10)
+
+
+def test_excel_report_summary_and_exchange_rates(tmp_path):
+    cost_basis, sales_df = make_history()
+    cgt_df, _, _ = calculate_australian_cgt_aud(sales_df, cost_basis)
+
+    report = save_cgt_excel_aud(cgt_df, '2024-25', tmp_path / 'report.xlsx')
+    sheets = pd.read_excel(report, sheet_name=None)
+
+    assert list(sheets) == ['CGT_Calculations_AUD', 'ATO_Summary', 'Exchange_Rates', 'Warnings']
+    amounts = sheets['ATO_Summary']['Amount_AUD']
+    gains = cgt_df['Capital_Gain_Loss_AUD']
+    assert float(amounts[0]) == pytest.approx(gains[gains > 0].sum())
+    assert float(amounts[1]) == pytest.approx(gains[gains < 0].sum())
+    assert float(amounts[3]) == pytest.approx(gains[cgt_df['Long_Term_Eligible']].sum())
+    assert float(amounts[6]) == pytest.approx(cgt_df['Taxable_Gain_AUD'].sum())
+
+    rates = cgt_df[cgt_df['Purchase_Exchange_Rate'] > 0]
+    expected = rates[['Symbol', 'Buy_Date', 'Sale_Date', 'Purchase_Exchange_Rate', 'Sale_Exchange_Rate']]
+    assert len(sheets['Exchange_Rates']) == len(expected.drop_duplicates())
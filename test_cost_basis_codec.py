@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the versioned cost basis encodings and the auto-detecting loader.
+"""
+
+import json
+
+import pytest
+
+from cgt_calculator_australia_aud import load_cost_basis_json_aud
+from cost_basis_codec import (
+    FORMAT_VERSION, detect_cost_basis_format, encode_cost_basis_binary, load_cost_basis_file,
+    save_cost_basis_file
+)
+
+AUD_COST_BASIS = {
+    'AAA': [
+        {'units': 100.0, 'price': 10.0, 'commission': 5.0, 'price_aud': 15.2, 'commission_aud': 7.6,
+         'exchange_rate': 0.658, 'date': '01.3.22'},
+        # No RBA rate at purchase: USD amounts used and exchange_rate is None
+        {'units': 20.0, 'price': 12.5, 'commission': 1.0, 'price_aud': 12.5, 'commission_aud': 1.0,
+         'exchange_rate': None, 'date': '15.11.23'},
+    ],
+    'BBB': [
+        {'units': 3.5, 'price': 200.0, 'commission': 0.0, 'price_aud': 300.0, 'commission_aud': 0.0,
+         'exchange_rate': 0.667, 'date': '01.3.22'},
+    ],
+    'CCC': [],
+}
+
+
+@pytest.mark.parametrize('encoding, expected_format', [('binary', 'binary'), ('json', 'json-v1')])
+def test_round_trip(tmp_path, encoding, expected_format):
+    path = tmp_path / 'cost_basis'
+    save_cost_basis_file(AUD_COST_BASIS, path, encoding)
+
+    assert detect_cost_basis_format(path) == expected_format
+    assert load_cost_basis_file(path) == AUD_COST_BASIS
+    assert load_cost_basis_file(path, symbols=['BBB', 'ZZZ']) == {'BBB': AUD_COST_BASIS['BBB']}
+
+
+def test_legacy_layouts_are_detected_and_converted(tmp_path):
+    legacy_usd = 'json_folder/cost_basis_dictionary_post_FY2024-25.json'
+    with open(legacy_usd) as f:
+        usd_cost_basis = json.load(f)
+    assert detect_cost_basis_format(legacy_usd) == 'json-legacy-usd'
+
+    legacy_aud = tmp_path / 'legacy_aud.json'
+    legacy_aud.write_text(json.dumps(AUD_COST_BASIS, indent=2))
+    assert detect_cost_basis_format(legacy_aud) == 'json-legacy-aud'
+
+    binary = tmp_path / 'usd.cgtcb'
+    save_cost_basis_file(usd_cost_basis, binary)
+    assert load_cost_basis_json_aud(str(binary)) == usd_cost_basis
+
+
+def test_binary_is_several_times_smaller(tmp_path):
+    lot = AUD_COST_BASIS['AAA'][0]
+    cost_basis = {f"S{s:03d}": [dict(lot, units=float(i + 1)) for i in range(20)] for s in range(50)}
+
+    binary = tmp_path / 'large.cgtcb'
+    save_cost_basis_file(cost_basis, binary)
+    assert binary.stat().st_size * 3 < len(json.dumps(cost_basis, indent=2))
+
+
+def test_newer_versions_are_rejected(tmp_path):
+    data = bytearray(encode_cost_basis_binary(AUD_COST_BASIS))
+    data[6:8] = (FORMAT_VERSION + 1).to_bytes(2, 'little')
+    path = tmp_path / 'future.cgtcb'
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError):
+        load_cost_basis_file(path)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the cost basis snapshot diff.
+"""
+
+import json
+
+import pytest
+
+from cost_basis_diff import diff_cost_basis, diff_snapshots
+from cost_basis_snapshots import SnapshotStore
+
+
+def lot(units, price, date, price_aud=None):
+    return {'units': units, 'price': price, 'commission': 1.0, 'price_aud': price_aud or price * 1.5,
+            'commission_aud': 1.5, 'exchange_rate': 0.66, 'date': date}
+
+
+OLD = {
+    'AAA': [lot(10, 5.0, '01.1.24'), lot(20, 6.0, '01.2.24'), lot(5, 6.0, '01.2.24')],
+    'BBB': [lot(7, 30.0, '05.3.24')],
+    'CCC': [lot(3, 100.0, '09.9.23')]
+}
+NEW = {
+    'AAA': [lot(20, 6.0, '01.2.24'), lot(2, 6.0, '01.2.24'), lot(4, 7.0, '01.6.24')],
+    'BBB': [lot(7, 30.0, '05.3.24')],
+    'DDD': [lot(1, 50.0, '02.2.25')]
+}
+
+
+def test_lot_changes_and_symbol_totals():
+    result = diff_cost_basis(OLD, NEW)
+    lots = result['lots'].set_index(['Symbol', 'Date', 'Price_USD', 'Units_Before'])
+
+    assert lots.loc[('AAA', '01.1.24', 5.0, 10), 'Change'] == 'removed'
+    consumed = lots.loc[('AAA', '01.2.24', 6.0, 5)]
+    assert consumed['Change'] == 'consumed' and consumed['Unit_Delta'] == -3
+    assert consumed['Cost_AUD_Delta'] == pytest.approx(-3 * 9.0)
+    assert lots.loc[('AAA', '01.6.24', 7.0, 0), 'Change'] == 'added'
+    assert len(lots) == 5  # AAA x3, CCC removed, DDD added
+
+    totals = result['symbols'].set_index('Symbol')
+    assert list(totals.index) == ['AAA', 'CCC', 'DDD']
+    assert totals.loc['AAA', 'Unit_Delta'] == -9
+    assert totals.loc['AAA', 'Cost_AUD_Delta'] == pytest.approx(-10 * 7.5 - 3 * 9.0 + 4 * 10.5)
+    assert totals.loc['CCC', 'Status'] == 'removed' and totals.loc['DDD', 'Status'] == 'added'
+    assert result['identical_symbols'] == 1 and result['digest_skipped'] == 1
+
+
+def test_snapshot_diff_loads_only_changed_symbols(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshots')
+    store.save_snapshot(OLD, tag='old')
+    store.save_snapshot(NEW, tag='new')
+    assert diff_snapshots(store, 'old', 'new')['lots'].equals(diff_cost_basis(OLD, NEW)['lots'])
+
+    # Same lots written with integer vs float units: no lot changes
+    with open('json_folder/cost_basis_dictionary_FY2024-25.json') as f:
+        before = json.load(f)
+    with open('json_folder/cost_basis_dictionary_post_FY2024-25.json') as f:
+        after = json.load(f)
+    result = diff_cost_basis(before, after)
+    assert set(result['symbols']['Symbol']) == {'LRN', 'SPXU', 'TSM', 'NVDA', 'SPLK'}
+    assert result['identical_symbols'] == len(before.keys() | after.keys()) - 5
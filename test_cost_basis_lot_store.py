@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the copy-on-write lot store used by calculate_australian_cgt_aud().
+"""
+
+import copy
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import calculate_australian_cgt_aud
+from cost_basis_lot_store import CostBasisLotStore
+
+
+def lot(units, price, date):
+    return {'units': units, 'price': price, 'commission': 10.0, 'price_aud': price / 0.66,
+            'commission_aud': 10.0 / 0.66, 'exchange_rate': 0.66, 'date': date}
+
+
+BASE = {
+    'AAA': [lot(100, 10.0, '01.3.22'), lot(50, 12.0, '01.3.24')],
+    'BBB': [lot(80, 30.0, '05.5.21')],
+}
+
+
+def sale(symbol, units, price, date):
+    return {'Symbol': symbol, 'Trade Date': pd.Timestamp(date), 'Units_Sold': units,
+            'Sale_Price_Per_Unit': price, 'Total_Proceeds': units * price,
+            'Commission_Paid': 5.0, 'Net_Proceeds': units * price - 5.0}
+
+
+def test_untouched_symbols_are_shared_in_the_store_and_copied_in_results():
+    base = copy.deepcopy(BASE)
+    sales_df = pd.DataFrame([sale('AAA', 120, 15.0, datetime(2024, 9, 2))])
+
+    lot_store = CostBasisLotStore(base)
+    cgt_df, remaining, _ = calculate_australian_cgt_aud(sales_df, lot_store)
+
+    assert base == BASE
+    assert lot_store.remaining_cost_basis()['BBB'] is base['BBB']
+    assert remaining['BBB'] == base['BBB'] and remaining['BBB'] is not base['BBB']
+    assert sum(r['units'] for r in remaining['AAA']) == 30
+    assert cgt_df['Units_Matched'].sum() == 120
+
+    # Changing the result must not reach the caller's cost basis
+    remaining['BBB'][0]['units'] = 1
+    assert base == BASE
+
+
+def test_what_if_forks_do_not_interfere():
+    store = CostBasisLotStore(BASE)
+    small = pd.DataFrame([sale('AAA', 10, 15.0, datetime(2024, 9, 2))])
+    large = pd.DataFrame([sale('AAA', 140, 15.0, datetime(2024, 9, 2))])
+
+    scenario_a = store.fork()
+    scenario_b = store.fork()
+    _, remaining_a, _ = calculate_australian_cgt_aud(small, scenario_a)
+    _, remaining_b, _ = calculate_australian_cgt_aud(large, scenario_b)
+
+    assert sum(r['units'] for r in remaining_a['AAA']) == 140
+    assert sum(r['units'] for r in remaining_b['AAA']) == 10
+    assert not store.is_touched('AAA')
+    assert sorted(units for _, _, units in scenario_b.consumed_lots()) == [40, 100]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed cost basis snapshot store.
+"""
+
+import json
+
+import pytest
+
+from cost_basis_snapshots import SnapshotStore
+
+
+def load(name):
+    with open(f'json_folder/{name}') as f:
+        return json.load(f)
+
+
+def test_snapshots_dedupe_unchanged_symbols(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshots')
+    original = load('unified_cost_basis_dictionary.json')
+
+    first = store.save_snapshot(original, tag='original', date='2024-06-30')
+    assert first['new_chunks'] == len(original)
+
+    backup = store.save_snapshot(load('unified_cost_basis_dictionary_backup.json'), tag='backup', date='2024-07-01')
+    assert backup['new_chunks'] == 0
+
+    changed = dict(original)
+    symbol = next(iter(changed))
+    changed[symbol] = changed[symbol][1:]
+    third = store.save_snapshot(changed, tag='changed', date='2024-07-02T09:30:00',
+                                artifacts={'run.log': 'FIFO log text'})
+    assert third['new_chunks'] == 2  # The changed symbol and the log
+
+    assert store.load_snapshot('original') == original
+    assert store.load_snapshot(third['id'], symbols=[symbol]) == {symbol: changed[symbol]}
+    assert store.load_artifact('run.log', 'changed') == b'FIFO log text'
+    assert store.stats()['chunks'] == len(original) + 2
+
+
+def test_resolve_by_date_and_tag(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshots')
+    store.save_snapshot({'AAA': []}, tag='fy24', date='2024-06-30')
+    store.save_snapshot({'AAA': [], 'BBB': []}, tag='fy25', date='2025-06-30')
+    store.save_snapshot({'CCC': []}, tag='fy24', date='2024-07-15')
+
+    assert store.resolve(date='2024-06-30')['tag'] == 'fy24'
+    assert store.resolve(date='2025-01-01')['created'].startswith('2024-07-15')
+    assert store.resolve('fy24', date='2024-07-01')['symbols'].keys() == {'AAA'}
+    assert store.load_snapshot('fy24') == {'CCC': []}
+    assert store.resolve()['tag'] == 'fy25'
+
+    with pytest.raises(KeyError):
+        store.resolve(date='2020-01-01')
+    with pytest.raises(KeyError):
+        store.resolve('missing')
+
+
+def test_child_snapshot_reuses_parent_chunks_for_unchanged_symbols(tmp_path):
+    store = SnapshotStore(tmp_path / 'snapshots')
+    original = load('unified_cost_basis_dictionary.json')
+    parent = store.save_snapshot(original, tag='fy24')
+
+    class OnlyChangedReadable(dict):
+        def __getitem__(self, symbol):
+            assert symbol == changed_symbol, f"unchanged symbol {symbol} was read"
+            return dict.__getitem__(self, symbol)
+
+    changed_symbol = next(iter(original))
+    updated = OnlyChangedReadable(original)
+    dict.__setitem__(updated, changed_symbol, original[changed_symbol][1:])
+
+    child = store.save_snapshot(updated, tag='fy25', parent='fy24', changed={changed_symbol})
+    assert child['parent'] == parent['id']
+    assert (child['new_chunks'], child['reused_chunks']) == (1, len(original) - 1)
+    assert child['lot_count'] == parent['lot_count'] - 1
+    assert store.load_snapshot('fy25') == {**original, changed_symbol: original[changed_symbol][1:]}
+
+
+def test_prune_drops_old_snapshots_and_their_unshared_chunks(tmp_path):
+    from datetime import timedelta
+
+    store = SnapshotStore(tmp_path / 'snapshots')
+    store.save_snapshot({'AAA': [1], 'BBB': [2]}, tag='old', date='2020-01-01')
+    store.save_snapshot({'AAA': [1], 'CCC': [3]}, tag='newer')
+    store.save_snapshot({'DDD': [4]}, tag='newest')
+
+    assert store.prune(max_age=timedelta(days=30)) == 1
+    assert store.stats()['chunks'] == 3  # BBB's chunk went with 'old'; AAA is still shared
+    assert store.load_snapshot('newer') == {'AAA': [1], 'CCC': [3]}
+
+    assert store.prune(max_count=1) == 1
+    assert [m['tag'] for m in store.list_snapshots()] == ['newest']
+    assert store.stats()['chunks'] == 1
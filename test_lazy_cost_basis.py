@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the lazy cost basis loader.
+A lazy run must match an eager run while only parsing the symbols that are sold.
+"""
+
+import json
+import os
+
+from cgt_calculator_australia_aud import (
+    calculate_australian_cgt_aud, load_cost_basis_json_aud, save_remaining_cost_basis_aud
+)
+from lazy_cost_basis import INDEX_SUFFIX, load_cost_basis_index, open_lazy_cost_basis
+from test_cgt_streaming import make_history
+
+
+def test_lazy_run_matches_eager_run(tmp_path):
+    cost_basis, sales_df = make_history()
+    cost_basis['ZZZ'] = [{'units': 4, 'price': 2.5, 'commission': 1, 'date': '01.02.21'}]  # USD-only record
+    cost_basis['ÉTF'] = cost_basis['S1'][:2]
+    cost_basis_file = str(tmp_path / 'cost_basis.json')
+    with open(cost_basis_file, 'w') as f:
+        json.dump(cost_basis, f, indent=2, ensure_ascii=False)
+
+    sold = set(sales_df['Symbol'].unique())
+    sales_df = sales_df[sales_df['Symbol'] != 'S2']
+
+    expected_df, expected_remaining, _ = calculate_australian_cgt_aud(sales_df, cost_basis)
+    lot_store = load_cost_basis_json_aud(cost_basis_file, lazy=True)
+    cgt_df, remaining, _ = calculate_australian_cgt_aud(sales_df, lot_store)
+
+    assert cgt_df.equals(expected_df)
+    assert set(lot_store._base.loaded_symbols()) <= sold - {'S2'}
+    assert len(remaining) == len(expected_remaining)
+
+    save_remaining_cost_basis_aud(remaining, '2024-25', str(tmp_path / 'remaining.json'))
+    with open(tmp_path / 'remaining.json') as f:
+        assert json.load(f) == expected_remaining
+    assert set(lot_store._base.loaded_symbols()) <= sold - {'S2'} | {'ZZZ'}
+    assert dict(remaining) == expected_remaining
+
+
+def test_index_cached_and_rebuilt_when_file_changes(tmp_path):
+    cost_basis, _ = make_history()
+    cost_basis_file = str(tmp_path / 'cost_basis.json')
+    with open(cost_basis_file, 'w') as f:
+        json.dump(cost_basis, f)
+
+    index = load_cost_basis_index(cost_basis_file)
+    assert os.path.exists(cost_basis_file + INDEX_SUFFIX)
+    assert open_lazy_cost_basis(cost_basis_file)._base['S3'] == cost_basis['S3']
+
+    del cost_basis['S0']
+    with open(cost_basis_file, 'w') as f:
+        json.dump(cost_basis, f, indent=4)
+    os.utime(cost_basis_file, ns=(index['mtime_ns'] + 10**9, index['mtime_ns'] + 10**9))
+
+    lazy = open_lazy_cost_basis(cost_basis_file)._base
+    assert 'S0' not in lazy and dict(lazy) == cost_basis
+
+    # Versioned and binary encodings are not indexed; they load whole
+    from cost_basis_codec import save_cost_basis_file
+    save_cost_basis_file(cost_basis, str(tmp_path / 'cost_basis.cgtcb'))
+    assert load_cost_basis_json_aud(str(tmp_path / 'cost_basis.cgtcb'), lazy=True) == cost_basis
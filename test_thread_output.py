@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for per-thread print() routing and run_concurrently().
+"""
+
+import asyncio
+import sys
+import threading
+
+from complete_unified_with_aud import run_concurrently
+from thread_output import capture_output, quiet
+
+
+def test_threads_capture_and_drop_their_own_output(capsys):
+    barrier = threading.Barrier(3, timeout=10)
+    captured = {}
+
+    def capturing():
+        with capture_output() as output:
+            barrier.wait()
+            print("captured")
+            barrier.wait()
+        captured['output'] = ''.join(output)
+
+    def quiet_thread():
+        with quiet():
+            barrier.wait()
+            print("dropped")
+            barrier.wait()
+
+    threads = [threading.Thread(target=capturing), threading.Thread(target=quiet_thread)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    print("main")
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    assert captured['output'] == 'captured\n'
+    assert capsys.readouterr().out == 'main\n'
+
+
+def test_run_concurrently_inside_a_running_loop_and_overlapping(capsys):
+    stdout = sys.stdout
+
+    def task(name):
+        def run():
+            print(f"loading {name}")
+            return name
+        return run
+
+    async def in_loop():
+        return run_concurrently({'a': task('a'), 'b': task('b')})
+
+    outcomes = asyncio.run(in_loop())
+    assert {name: outcome['output'] for name, outcome in outcomes.items()} == {'a': 'loading a\n', 'b': 'loading b\n'}
+
+    # Two overlapping calls each keep their own output and leave nothing routed
+    results = {}
+    threads = [threading.Thread(target=lambda n=n: results.update({n: run_concurrently({n: task(n)})}))
+               for n in ('x', 'y')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results['x']['x']['output'] == 'loading x\n' and results['y']['y']['output'] == 'loading y\n'
+    print("after")
+    assert capsys.readouterr().out == 'after\n'
+    assert getattr(sys.stdout, 'stream', sys.stdout) is stdout
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared transaction CSV format registry.
+"""
+
+import io
+from datetime import datetime
+
+import pandas as pd
+
+from transaction_formats import detect_csv_format, iter_csv_chunks, read_csv_header, standardize_frame
+
+MANUAL_CSV = (b"Date,Activity_Type,Symbol,Quantity,Price_USD\n"
+              b"05.01.23,PURCHASED,AAA,100,10.0\n"
+              b"01.03.24,SOLD,AAA,-20,12.0\n"
+              b"15.08.24,SOLD,AAA,30,15.0\n"
+              b"20.11.24,DIVIDEND,AAA,0,1.0\n")
+
+
+def test_format_is_detected_from_the_header_only():
+    stream = io.BytesIO(MANUAL_CSV)
+    stream.seek(5)
+    assert read_csv_header(stream) == ['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']
+    assert stream.tell() == 5
+
+    assert detect_csv_format(read_csv_header(MANUAL_CSV)) == 'manual'
+    parsed_header = b'Symbol,Trade Date,Type,Quantity,Price (USD),Commission (USD)\n'
+    assert detect_csv_format(read_csv_header(parsed_header)) == 'parsed'
+    assert detect_csv_format(read_csv_header(b'a,b\n' + b'1,2\n' * 1000)) is None
+    assert read_csv_header(b'') == []
+
+
+def test_chunked_standardizing_matches_whole_file():
+    def keep_sell(dates):
+        return dates <= datetime(2024, 6, 30)
+
+    whole = standardize_frame(pd.read_csv(io.BytesIO(MANUAL_CSV)), 'manual', 'Manual_a.csv', keep_sell=keep_sell)
+    chunked = pd.concat([standardize_frame(chunk, 'manual', 'Manual_a.csv', keep_sell=keep_sell)
+                         for chunk in iter_csv_chunks(MANUAL_CSV, chunksize=2)])
+
+    assert whole.equals(chunked)
+    assert whole['Activity'].tolist() == ['PURCHASED', 'SOLD']
+    assert whole['Date'].tolist() == ['2023-01-05', '2024-03-01']
+    assert whole['Quantity'].tolist() == [100, 20]
+    assert (whole['Commission'] == 30.0).all()
+
+    # Without date parsing, manual dates keep their DD.MM.YY text
+    raw = standardize_frame(pd.read_csv(io.BytesIO(MANUAL_CSV)), 'manual', 'Manual_a.csv', parse_dates=False)
+    assert raw['Date'].tolist() == ['05.01.23', '01.03.24', '15.08.24']
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the append-only transaction journal.
+"""
+
+import os
+
+import pandas as pd
+
+from cgt_database import CGTDatabase
+from transaction_journal import TransactionJournal, load_journal_transactions, sync_to_database
+
+JULY = pd.DataFrame({
+    'Symbol': ['AAA', 'AAA', 'BBB'],
+    'Date': ['2024-07-02', '2024-07-02 10:31:02', '03.07.24'],
+    'Activity': ['PURCHASED', 'PURCHASED', 'SOLD'],
+    'Quantity': [10.0, 10.0, -5.0],
+    'Price': [12.5, 12.500000001, 30.0],
+    'Commission': [1.0, 1.0, 2.0],
+    'Source': ['statement.htm', 'statement_parsed.csv', 'manual.csv']
+})
+
+AUGUST = pd.DataFrame({
+    'Symbol': ['AAA', 'CCC'],
+    'Date': ['2024-08-01', '2024-08-02'],
+    'Activity': ['SOLD', 'PURCHASED'],
+    'Quantity': [4.0, 3.0],
+    'Price': [14.0, 50.0],
+    'Commission': [1.0, 1.0],
+    'Source': ['manual.csv', 'manual.csv']
+})
+
+
+def test_duplicates_rejected_and_consumers_read_only_new_trades(tmp_path):
+    path = str(tmp_path / 'transactions.jsonl')
+    journal = TransactionJournal(path)
+    assert journal.append_transactions(JULY) == (2, 1, 0)
+    assert journal.append_transactions(pd.concat([JULY, AUGUST])) == (2, 3, 0)
+
+    with CGTDatabase(str(tmp_path / 'cgt.db')) as db:
+        assert sync_to_database(journal, db) == 4
+        assert sync_to_database(journal, db) == 0
+
+        # Reopening loads the persistent index
+        journal = TransactionJournal(path)
+        assert len(journal) == 4
+        assert journal.append_transactions(AUGUST) == (0, 2, 0)
+        journal.append_transactions(AUGUST.assign(Date=['2024-09-01', '2024-09-02']))
+
+        new_df, offset = journal.read_new('cgt_database')
+        assert new_df['Date'].tolist() == ['2024-09-01', '2024-09-02']
+        assert sync_to_database(journal, db) == 2
+        assert journal.cursor('cgt_database') == offset == os.path.getsize(path)
+
+
+def test_recovers_torn_write_and_stale_index(tmp_path):
+    path = str(tmp_path / 'transactions.jsonl')
+    journal = TransactionJournal(path)
+    journal.append_transactions(JULY)
+    journal.append_transactions(AUGUST)
+
+    # Crash after the journal write but before the index write, then a torn line
+    with open(path + '.index', 'rb+') as f:
+        f.truncate(os.path.getsize(path + '.index') - 24)
+    with open(path, 'ab') as f:
+        f.write(b'{"id": "ab')
+
+    journal = TransactionJournal(path)
+    assert len(journal) == 4
+    assert os.path.getsize(path + '.index') == 4 * 24
+    entries, _ = journal.read_from(0)
+    assert [e['Symbol'] for e in entries] == ['AAA', 'BBB', 'AAA', 'CCC']
+    assert journal.append_transactions(AUGUST) == (0, 2, 0)
+
+
+def test_journal_ingest_reads_only_trades_since_the_committed_offset(tmp_path):
+    journal = TransactionJournal(str(tmp_path / 'transactions.jsonl'))
+    journal.append_transactions(JULY)
+    transactions, read = load_journal_transactions(journal)
+    assert (len(transactions), read) == (2, 2)
+
+    journal.append_transactions(AUGUST)
+    transactions, read = load_journal_transactions(journal)
+    assert read == 2
+    assert transactions['Symbol'].tolist() == ['AAA', 'BBB', 'AAA', 'CCC']
+    assert load_journal_transactions(journal)[1] == 0
+
+    # A lost consumer table is rebuilt from the start
+    os.remove(journal.path + '.cgt_pipeline.pkl')
+    transactions, read = load_journal_transactions(journal)
+    assert read == 4 and len(transactions) == 4
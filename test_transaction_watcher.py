@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental processing of the input folders.
+Each refresh must give the same CGT records and remaining cost basis as a
+full recompute, while only touching the symbols in changed files.
+"""
+
+import os
+import time
+
+import pandas as pd
+
+from transaction_watcher import TransactionWatcher
+
+
+class FixedRateConverter:
+    def convert_usd_to_aud(self, usd_amount, date):
+        return usd_amount / 0.65, 0.65
+
+
+def write_manual_csv(path, rows, mtime=None):
+    pd.DataFrame(rows, columns=['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD']).to_csv(path, index=False)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def make_watcher(tmp_path, state='state'):
+    return TransactionWatcher('2024-25', FixedRateConverter(), html_folder=str(tmp_path / 'html'),
+                              csv_folder=str(tmp_path / 'csv'), state_dir=str(tmp_path / state),
+                              output_dir=str(tmp_path / 'out'), debounce_seconds=5)
+
+
+def assert_matches_full_recompute(watcher, tmp_path):
+    full = make_watcher(tmp_path, state='full_state')
+    full.refresh(now=time.time() + 60)
+    pd.testing.assert_frame_equal(watcher.cgt_df(), full.cgt_df())
+    assert watcher.remaining == full.remaining
+
+
+def test_refresh_recomputes_only_affected_symbols(tmp_path):
+    os.makedirs(tmp_path / 'csv')
+    os.makedirs(tmp_path / 'html')
+    old = time.time() - 60
+    write_manual_csv(tmp_path / 'csv' / 'broker_a.csv', [
+        ['05.01.23', 'PURCHASED', 'AAA', 100, 10.0],
+        ['07.02.23', 'PURCHASED', 'BBB', 50, 40.0],
+        ['01.03.24', 'SOLD', 'AAA', 20, 12.0],
+        ['15.08.24', 'SOLD', 'AAA', 30, 15.0],
+    ], mtime=old)
+
+    watcher = make_watcher(tmp_path)
+    first = watcher.refresh()
+    assert first['affected_symbols'] == ['AAA', 'BBB']
+    assert len(watcher.cgt_df()) == 1
+    excel_file, json_file = watcher.write_outputs()
+    assert os.path.exists(excel_file) and os.path.exists(json_file)
+
+    # A new export only touches BBB; it is debounced until it stops changing
+    write_manual_csv(tmp_path / 'csv' / 'broker_b.csv', [['20.11.24', 'SOLD', 'BBB', 10, 55.0]])
+    assert watcher.refresh()['pending'] == [str(tmp_path / 'csv' / 'broker_b.csv')]
+    second = watcher.refresh(now=time.time() + 10)
+    assert second['affected_symbols'] == ['BBB']
+    assert_matches_full_recompute(watcher, tmp_path)
+
+    # Touching a file without changing it does nothing
+    os.utime(tmp_path / 'csv' / 'broker_a.csv', (old + 5, old + 5))
+    assert watcher.refresh()['affected_symbols'] == []
+
+    # Deleting a file retracts its rows
+    os.remove(tmp_path / 'csv' / 'broker_b.csv')
+    third = watcher.refresh()
+    assert third['deleted'] == [str(tmp_path / 'csv' / 'broker_b.csv')]
+    assert third['affected_symbols'] == ['BBB']
+    assert set(watcher.cgt_df()['Symbol']) == {'AAA'}
+    assert_matches_full_recompute(watcher, tmp_path)
+
+    # A restarted watcher reuses the manifest and cached rows
+    restarted = make_watcher(tmp_path)
+    assert restarted.detect_changes() == ([], [], [])
+    restarted.refresh()
+    pd.testing.assert_frame_equal(restarted.cgt_df(), watcher.cgt_df())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Per-Thread print() Routing
+
+The loaders and CGT steps print progress for the CLI. When they run in
+worker threads (pipeline waves, service jobs, batch portfolios) that output
+has to be captured or dropped per thread; contextlib.redirect_stdout swaps
+the process-wide sys.stdout, so concurrent callers would capture each
+other's output and restore each other's streams.
+
+Instead one sys.stdout wrapper is installed (and re-installed if something
+else replaced sys.stdout since) and looks up the calling thread's route:
+
+    with quiet(verbose):          # drop this thread's output unless verbose
+        ...
+    with capture_output() as out: # collect this thread's output in a list
+        ...
+    ''.join(out)
+
+Threads without a route write through to the wrapped stream. Routes nest and
+are restored on exit. Standard library only.
+"""
+
+import contextlib
+import sys
+import threading
+
+_DROP = object()
+_routes = {}  # thread ident -> list collecting output, or _DROP
+_install_lock = threading.Lock()
+
+
+class _ThreadRoutedStdout:
+    """sys.stdout stand-in that sends each thread's writes along its route."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        route = _routes.get(threading.get_ident())
+        if route is None:
+            return self.stream.write(text)
+        if route is not _DROP:
+            route.append(text)
+        return len(text)
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _install():
+    with _install_lock:
+        if not isinstance(sys.stdout, _ThreadRoutedStdout):
+            sys.stdout = _ThreadRoutedStdout(sys.stdout)
+
+
+@contextlib.contextmanager
+def _route(target):
+    _install()
+    ident = threading.get_ident()
+    previous = _routes.get(ident)
+    _routes[ident] = target
+    try:
+        yield target
+    finally:
+        if previous is None:
+            del _routes[ident]
+        else:
+            _routes[ident] = previous
+
+
+def capture_output():
+    """Collect the calling thread's print() output in the yielded list."""
+    return _route([])
+
+
+@contextlib.contextmanager
+def quiet(verbose=False):
+    """Drop the calling thread's print() output unless verbose."""
+    if verbose:
+        yield
+    else:
+        with _route(_DROP):
+            yield
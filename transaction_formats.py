@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Transaction CSV Format Registry
+
+The transaction CSV layouts the tools accept, declared once and shared by
+the CLI loader (standardize_csv_file), the web app and cgt_quick.py:
+
+- manual: Date (DD.MM.YY), Activity_Type (PURCHASED/SOLD), Symbol, Quantity, Price_USD
+- parsed: Symbol, Trade Date, Type (BUY/SELL), Quantity, Price (USD), Commission (USD)
+  (the CSV written from an HTML statement)
+
+A format is recognised from the header row alone (read_csv_header +
+detect_csv_format), so unknown files can be rejected before their body is
+read. standardize_frame() turns rows of a known format into the standardized
+layout (Symbol, Date, Activity, Quantity, Price, Commission, Source) and can
+be applied chunk by chunk (iter_csv_chunks) because it works row-wise.
+
+Importing this module does not import pandas; the chunk reader and
+standardize_frame() do.
+"""
+
+import csv
+import io
+import os
+
+STANDARD_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price', 'Commission', 'Source']
+REQUIRED_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price']
+
+# Date formats accepted in the standardized Date column (robust_date_parser, cgt_quick validate)
+TRANSACTION_DATE_FORMATS = [
+    "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d.%m.%y", "%d.%m.%Y",
+    "%Y-%m-%d %H:%M:%S", "%d/%m/%y", "%m/%d/%y"
+]
+
+CSV_FORMATS = {
+    'manual': {
+        'label': 'Manual CSV',
+        'source_prefix': 'Manual',
+        'columns': ['Date', 'Activity_Type', 'Symbol', 'Quantity', 'Price_USD'],
+        'date_column': 'Date',
+        'date_format': '%d.%m.%y',
+        'type_column': 'Activity_Type',
+        'activities': {'PURCHASED': 'PURCHASED', 'SOLD': 'SOLD'},
+        'price_column': 'Price_USD',
+        'commission_column': None,
+        'default_commission': 30.0  # Default for manual transactions
+    },
+    'parsed': {
+        'label': 'Parsed HTML',
+        'source_prefix': 'Parsed',
+        'columns': ['Symbol', 'Trade Date', 'Type', 'Quantity', 'Price (USD)'],
+        'date_column': 'Trade Date',
+        'date_format': None,
+        'type_column': 'Type',
+        'activities': {'BUY': 'PURCHASED', 'SELL': 'SOLD'},
+        'price_column': 'Price (USD)',
+        'commission_column': 'Commission (USD)',
+        'default_commission': 0.0
+    }
+}
+
+# Longest header line read when sniffing a format
+MAX_HEADER_BYTES = 64 * 1024
+
+DEFAULT_CHUNK_ROWS = 50000
+
+
+def detect_csv_format(columns):
+    """Name of the registered format whose required columns are all present, or None."""
+    for name, spec in CSV_FORMATS.items():
+        if all(col in columns for col in spec['columns']):
+            return name
+    return None
+
+
+def read_csv_header(source):
+    """
+    Column names from the first line of a CSV given as a path, bytes or a
+    binary file object (read from the start; its position is restored).
+    Only the header line is read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        first = bytes(source[:MAX_HEADER_BYTES]).split(b'\n', 1)[0]
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            first = f.readline(MAX_HEADER_BYTES)
+    else:
+        position = source.tell()
+        source.seek(0)
+        first = source.readline(MAX_HEADER_BYTES)
+        source.seek(position)
+
+    text = first.decode('utf-8-sig', errors='replace').strip()
+    return next(csv.reader([text]), []) if text else []
+
+
+def iter_csv_chunks(source, chunksize=DEFAULT_CHUNK_ROWS):
+    """DataFrame chunks of a CSV given as a path, bytes or a binary file object."""
+    import pandas as pd
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    yield from pd.read_csv(source, chunksize=chunksize)
+
+
+def standardize_frame(df, format_name, source, parse_dates=True, keep_sell=None):
+    """
+    Rows of a registered format in the standardized layout.
+
+    parse_dates converts the date column to datetimes before it is written
+    as text (manual dates otherwise stay DD.MM.YY). keep_sell(dates) returns
+    a boolean mask of the SOLD rows to keep (it needs parse_dates); BUY rows
+    are always kept.
+    """
+    import pandas as pd
+
+    spec = CSV_FORMATS[format_name]
+    date_column, type_column = spec['date_column'], spec['type_column']
+
+    dates = df[date_column]
+    if parse_dates:
+        if spec['date_format']:
+            dates = pd.to_datetime(dates, format=spec['date_format'], errors='coerce')
+        else:
+            dates = pd.to_datetime(dates)
+
+    activity = df[type_column].map(spec['activities'])
+    if keep_sell is not None:
+        keep = (activity == 'PURCHASED') | ((activity == 'SOLD') & keep_sell(dates))
+        df, dates, activity = df[keep], dates[keep], activity[keep]
+
+    if spec['commission_column'] is None:
+        commission = spec['default_commission']
+    else:
+        commission = pd.to_numeric(df.get(spec['commission_column'], 0), errors='coerce').abs()
+
+    standardized = pd.DataFrame({
+        'Symbol': df['Symbol'],
+        'Date': dates.astype(str),
+        'Activity': activity,
+        'Quantity': pd.to_numeric(df['Quantity'], errors='coerce').abs(),
+        'Price': pd.to_numeric(df[spec['price_column']], errors='coerce').abs(),
+        'Commission': commission,
+        'Source': source
+    }, columns=STANDARD_COLUMNS)
+    return standardized.dropna(subset=REQUIRED_COLUMNS)
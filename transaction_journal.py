@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Append-Only Transaction Journal
+
+Ingest used to mean globbing every CSV/HTML file and rebuilding from scratch,
+deduplicating with drop_duplicates on raw strings and floats. The journal
+keeps every normalized trade once, in arrival order:
+
+- transactions.jsonl        one JSON trade per line, appended and fsync'd
+- transactions.jsonl.index  16-byte trade id + 8-byte line offset per trade
+
+Each trade's id is a hash of (Symbol, trade day, Activity, Quantity, Price)
+with the numbers rounded, so the same trade from an HTML statement and a
+parsed CSV (or with float noise in the price) gets the same id. The index
+is loaded into a set when the journal is opened and duplicates are rejected
+in O(1) at ingest.
+
+Downstream stages read sequentially from an offset they store under a
+consumer name (transactions.jsonl.cursors.json), so adding a month of
+trades costs only that month: sync_to_database() feeds the SQLite store and
+load_journal_transactions() keeps a consumer's transaction table up to date
+(cgt_pipeline.py --journal uses it as its ingest stage).
+
+Crash safety: a torn last line is truncated on open and trades appended to
+the journal but missing from the index are re-indexed.
+
+Usage:
+    python transaction_journal.py ingest [--journal transactions.jsonl]
+    python transaction_journal.py sync-database [--db cgt.db]
+    python transaction_journal.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+
+import pandas as pd
+
+from complete_unified_with_aud import robust_date_parser
+from cost_basis_codec import json_dumps, json_loads
+
+DEFAULT_JOURNAL = 'transactions.jsonl'
+
+TRANSACTION_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price', 'Commission', 'Source']
+
+# Rounding used for trade ids
+QUANTITY_DECIMALS = 6
+PRICE_DECIMALS = 4
+
+_INDEX_ENTRY = struct.Struct('<16sQ')  # trade id digest, line offset
+
+
+def trade_id(symbol, trade_date, activity, quantity, price):
+    """Stable content id (32 hex chars) of a normalized trade."""
+    key = (f"{symbol}|{trade_date}|{activity}|{round(quantity, QUANTITY_DECIMALS):.{QUANTITY_DECIMALS}f}|"
+           f"{round(price, PRICE_DECIMALS):.{PRICE_DECIMALS}f}")
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def normalize_transactions(combined_df):
+    """
+    Journal entries from a load_all_transactions() style DataFrame.
+    Returns (entries, skipped) where skipped counts unreadable rows.
+    """
+    entries = []
+    skipped = 0
+    sources = combined_df['Source'] if 'Source' in combined_df else [None] * len(combined_df)
+    for symbol, date, activity, quantity, price, commission, source in zip(
+            combined_df['Symbol'], combined_df['Date'], combined_df['Activity'],
+            pd.to_numeric(combined_df['Quantity'], errors='coerce').abs(),
+            pd.to_numeric(combined_df['Price'], errors='coerce').abs(),
+            pd.to_numeric(combined_df['Commission'], errors='coerce').abs().fillna(0.0), sources):
+        parsed = date if isinstance(date, pd.Timestamp) else robust_date_parser(date)
+        if parsed.year <= 1900 or pd.isna(quantity) or pd.isna(price):
+            skipped += 1
+            continue
+        trade_date = parsed.strftime('%Y-%m-%d')
+        entries.append({
+            'id': trade_id(symbol, trade_date, activity, quantity, price),
+            'Symbol': symbol,
+            'Date': trade_date,
+            'Activity': activity,
+            'Quantity': float(quantity),
+            'Price': float(price),
+            'Commission': float(commission),
+            'Source': source
+        })
+    return entries, skipped
+
+
+def _fsync_append(path, data):
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class TransactionJournal:
+    """Append-only, deduplicating journal of normalized trades."""
+
+    def __init__(self, path=DEFAULT_JOURNAL):
+        self.path = path
+        self.index_path = path + '.index'
+        self.cursors_path = path + '.cursors.json'
+        for file_path in (self.path, self.index_path):
+            if not os.path.exists(file_path):
+                open(file_path, 'ab').close()
+        self._ids = set()
+        self._recover()
+
+    def _recover(self):
+        """Load the index, repairing a torn journal tail or a stale index."""
+        # Drop a partially written last line
+        size = os.path.getsize(self.path)
+        if size:
+            with open(self.path, 'rb+') as f:
+                f.seek(max(size - 1, 0))
+                if f.read(1) != b'\n':
+                    f.seek(0)
+                    data = f.read()
+                    f.truncate(data.rfind(b'\n') + 1)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        with open(self.index_path, 'rb') as f:
+            index_data = f.read()
+        complete = len(index_data) - len(index_data) % _INDEX_ENTRY.size
+        if complete != len(index_data):
+            with open(self.index_path, 'rb+') as f:
+                f.truncate(complete)
+
+        indexed_end = 0
+        for digest, offset in _INDEX_ENTRY.iter_unpack(index_data[:complete]):
+            self._ids.add(digest)
+            indexed_end = offset
+
+        # Re-index trades appended after the last indexed one
+        with open(self.path, 'rb') as f:
+            if self._ids:
+                f.seek(indexed_end)
+                f.readline()
+            missing = []
+            offset = f.tell()
+            for line in f:
+                digest = bytes.fromhex(json_loads(line)['id'])
+                self._ids.add(digest)
+                missing.append(_INDEX_ENTRY.pack(digest, offset))
+                offset += len(line)
+        if missing:
+            _fsync_append(self.index_path, b''.join(missing))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, trade_id_hex):
+        return bytes.fromhex(trade_id_hex) in self._ids
+
+    def append(self, entries):
+        """Append new entries (duplicates rejected); returns the number appended."""
+        lines = []
+        index_entries = []
+        offset = os.path.getsize(self.path)
+        for entry in entries:
+            digest = bytes.fromhex(entry['id'])
+            if digest in self._ids:
+                continue
+            self._ids.add(digest)
+            line = json_dumps(entry) + b'\n'
+            lines.append(line)
+            index_entries.append(_INDEX_ENTRY.pack(digest, offset))
+            offset += len(line)
+
+        if lines:
+            _fsync_append(self.path, b''.join(lines))
+            _fsync_append(self.index_path, b''.join(index_entries))
+        return len(lines)
+
+    def append_transactions(self, combined_df):
+        """Normalize and append a transactions DataFrame; returns (appended, duplicates, skipped)."""
+        entries, skipped = normalize_transactions(combined_df)
+        appended = self.append(entries)
+        return appended, len(entries) - appended, skipped
+
+    def read_from(self, offset=0):
+        """(entries after offset, offset to resume from)."""
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1  # Ignore a line still being written
+        entries = [json_loads(line) for line in data[:end].splitlines()]
+        return entries, offset + end
+
+    # ------------------------------------------------------------ consumers
+
+    def _load_cursors(self):
+        if not os.path.exists(self.cursors_path):
+            return {}
+        with open(self.cursors_path) as f:
+            return json.load(f)
+
+    def cursor(self, consumer):
+        return self._load_cursors().get(consumer, 0)
+
+    def commit(self, consumer, offset):
+        """Store a consumer's offset (atomic replace)."""
+        cursors = self._load_cursors()
+        cursors[consumer] = offset
+        temp_path = self.cursors_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(cursors, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.cursors_path)
+
+    def read_new(self, consumer):
+        """
+        New trades for a consumer as a transactions DataFrame, plus the offset
+        to commit() once they have been processed.
+        """
+        entries, offset = self.read_from(self.cursor(consumer))
+        return pd.DataFrame(entries, columns=['id'] + TRANSACTION_COLUMNS), offset
+
+
+def load_journal_transactions(journal, consumer='cgt_pipeline'):
+    """
+    All journal trades as a transactions DataFrame, reading only the trades
+    added since this consumer's committed offset.
+
+    The consumer keeps its materialized table next to the journal
+    (<journal>.<consumer>.pkl) with the offset it covers; new trades are
+    appended to it and the offset committed. If the table is missing or
+    out of step with the cursor, it is rebuilt from the start.
+    Returns (transactions DataFrame, number of trades read).
+    """
+    state_path = f"{journal.path}.{consumer}.pkl"
+    offset, frame = 0, pd.DataFrame(columns=TRANSACTION_COLUMNS)
+    if os.path.exists(state_path):
+        state = pd.read_pickle(state_path)
+        if state['offset'] == journal.cursor(consumer):
+            offset, frame = state['offset'], state['frame']
+
+    entries, new_offset = journal.read_from(offset)
+    if entries:
+        new_df = pd.DataFrame(entries, columns=TRANSACTION_COLUMNS)
+        frame = new_df if len(frame) == 0 else pd.concat([frame, new_df], ignore_index=True)
+    if new_offset != offset or not os.path.exists(state_path):
+        pd.to_pickle({'offset': new_offset, 'frame': frame}, state_path + '.tmp')
+        os.replace(state_path + '.tmp', state_path)
+        journal.commit(consumer, new_offset)
+    return frame, len(entries)
+
+
+def sync_to_database(journal, db, consumer='cgt_database'):
+    """Ingest trades added since the last sync into a CGTDatabase; returns rows inserted."""
+    new_df, offset = journal.read_new(consumer)
+    inserted = db.ingest_transactions(new_df) if len(new_df) else 0
+    journal.commit(consumer, offset)
+    return inserted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only transaction journal")
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL, help="Journal file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('ingest', help="Append trades from the HTML/CSV folders")
+    sync = commands.add_parser('sync-database', help="Copy new trades into the SQLite store")
+    sync.add_argument('--db', default='cgt.db')
+    commands.add_parser('stats', help="Show journal size and consumer offsets")
+
+    args = parser.parse_args()
+    journal = TransactionJournal(args.journal)
+
+    if args.command == 'ingest':
+        from complete_unified_with_aud import load_all_transactions
+        combined_df = load_all_transactions()
+        if combined_df is not None:
+            appended, duplicates, skipped = journal.append_transactions(combined_df)
+            print(f"✅ Journal: {appended} new trades, {duplicates} duplicates rejected, {skipped} unreadable")
+
+    elif args.command == 'sync-database':
+        from cgt_database import CGTDatabase
+        with CGTDatabase(args.db) as db:
+            print(f"✅ {sync_to_database(journal, db)} new transactions stored in {args.db}")
+
+    elif args.command == 'stats':
+        print(f"📒 {args.journal}: {len(journal)} trades, {os.path.getsize(args.journal):,} bytes")
+        for consumer, offset in journal._load_cursors().items():
+            print(f"   {consumer}: offset {offset:,}")
+
+
+if __name__ == "__main__":
+    main()
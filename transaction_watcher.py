@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for csv_folder/ and html_folder/
+
+Keeps the cost basis and CGT report for one financial year up to date as
+broker exports are dropped into the folders:
+
+- A manifest records each file's mtime, size and SHA-256. A file whose mtime
+  and size are unchanged is not read; one that was only touched (same hash)
+  is not re-parsed.
+- Changes are debounced: a file is processed once it has not been modified
+  for debounce_seconds, so half-written exports are left alone.
+- Only changed files are re-parsed. Rows from deleted files are retracted.
+- FIFO and CGT are recomputed only for the symbols in the changed or deleted
+  files; every other symbol keeps its previous cost basis and CGT records.
+
+Parsed rows are cached per file hash in the state directory, so a restart
+does not re-parse unchanged files.
+
+The cost basis follows the hybrid rule used by complete_unified_with_aud.py:
+all BUYs, and SELLs up to 30 June before the financial year.
+
+Usage:
+    python transaction_watcher.py --fy 2024-25 [--rates-folder rates] [--once]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from cgt_calculator_australia_aud import (
+    CGT_COLUMNS, CGT_STRATEGIES, calculate_australian_cgt_aud, save_cgt_excel_aud,
+    save_remaining_cost_basis_aud
+)
+from cgt_multi_year import build_sales_history
+from complete_unified_with_aud import (
+    apply_hybrid_fifo_processing_with_aud, is_transaction_csv, load_rba_exchange_rates,
+    robust_date_parser, standardize_csv_file, standardize_html_file
+)
+from thread_output import quiet
+
+DEFAULT_STATE_DIR = '.watch_state'
+DEDUP_COLUMNS = ['Symbol', 'Date', 'Activity', 'Quantity', 'Price']
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TransactionWatcher:
+    """Incremental FIFO/CGT for one financial year over the input folders."""
+
+    def __init__(self, financial_year, aud_converter, html_folder='html_folder', csv_folder='csv_folder',
+                 state_dir=DEFAULT_STATE_DIR, output_dir='.', strategy='tax_optimal', debounce_seconds=2.0,
+                 verbose=False):
+        if strategy not in CGT_STRATEGIES:
+            raise ValueError(f"Unknown CGT strategy '{strategy}' (expected one of {', '.join(CGT_STRATEGIES)})")
+        self.financial_year = financial_year
+        self.aud_converter = aud_converter
+        self.html_folder = html_folder
+        self.csv_folder = csv_folder
+        self.state_dir = state_dir
+        self.output_dir = output_dir
+        self.strategy = strategy
+        self.debounce_seconds = debounce_seconds
+        self.verbose = verbose
+
+        # Hybrid cutoff: SELLs up to the end of the previous financial year
+        self.sell_cutoff_date = datetime(int(financial_year[:4]), 6, 30)
+
+        self.manifest_path = os.path.join(state_dir, 'manifest.json')
+        self.rows_dir = os.path.join(state_dir, 'rows')
+        os.makedirs(self.rows_dir, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+
+        self.file_rows = {}         # path -> standardized rows
+        self.cost_basis = {}        # symbol -> lots at the start of the FY
+        self.remaining = {}         # symbol -> lots after the FY's sales
+        self.cgt_by_symbol = {}     # symbol -> CGT records
+        self._computed = False
+
+    # ------------------------------------------------------------ files
+
+    def input_files(self):
+        """Watched files, HTML first (same order as load_all_transactions())."""
+        html_files = []
+        for ext in ['*.htm', '*.html']:
+            html_files.extend(glob.glob(os.path.join(self.html_folder, ext)))
+        csv_files = [f for f in glob.glob(os.path.join(self.csv_folder, '*.csv')) if is_transaction_csv(f)]
+        return sorted(html_files) + sorted(csv_files)
+
+    def _parse(self, path):
+        try:
+            with quiet(self.verbose):
+                if path.lower().endswith(('.htm', '.html')):
+                    rows = standardize_html_file(path)
+                else:
+                    rows = standardize_csv_file(path)
+        except Exception as e:
+            print(f"   ❌ Error loading {path}: {e}")
+            rows = None
+        if rows is None:
+            rows = pd.DataFrame(columns=DEDUP_COLUMNS + ['Commission', 'Source'])
+        return rows.reset_index(drop=True)
+
+    def _rows_cache_path(self, sha256):
+        return os.path.join(self.rows_dir, f"{sha256}.json")
+
+    def _cached_rows(self, path):
+        """Rows for an unchanged file, from memory or the per-hash cache."""
+        if path not in self.file_rows:
+            cache_path = self._rows_cache_path(self.manifest[path]['sha256'])
+            if os.path.exists(cache_path):
+                with open(cache_path) as f:
+                    self.file_rows[path] = pd.DataFrame(json.load(f))
+            else:
+                self.file_rows[path] = self._parse(path)
+        return self.file_rows[path]
+
+    def detect_changes(self, now=None):
+        """
+        Compare the folders with the manifest.
+
+        Returns (changed, deleted, pending): changed files are ready to
+        re-ingest, pending ones were modified too recently (debounce).
+        """
+        now = time.time() if now is None else now
+        changed, pending = [], []
+        files = self.input_files()
+        for path in files:
+            stat = os.stat(path)
+            entry = self.manifest.get(path)
+            if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+                continue
+            if now - stat.st_mtime < self.debounce_seconds:
+                pending.append(path)
+                continue
+            sha256 = file_sha256(path)
+            if entry and entry['sha256'] == sha256:
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)  # Touched only
+                continue
+            changed.append((path, stat, sha256))
+
+        deleted = [path for path in self.manifest if path not in set(files)]
+        return changed, deleted, pending
+
+    # ------------------------------------------------------------ refresh
+
+    def refresh(self, now=None):
+        """
+        Re-ingest changed files, retract deleted ones and recompute the
+        affected symbols. Returns a summary dict.
+        """
+        changed, deleted, pending = self.detect_changes(now)
+        affected = set()
+
+        for path, stat, sha256 in changed:
+            if path in self.manifest:
+                affected.update(self.manifest[path]['symbols'])
+            rows = self._parse(path)
+            with open(self._rows_cache_path(sha256), 'w') as f:
+                json.dump(rows.to_dict('records'), f)
+            self.file_rows[path] = rows
+            symbols = sorted(rows['Symbol'].dropna().unique().tolist())
+            affected.update(symbols)
+            self.manifest[path] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha256,
+                                   'symbols': symbols, 'rows': len(rows)}
+
+        for path in deleted:
+            affected.update(self.manifest.pop(path)['symbols'])
+            self.file_rows.pop(path, None)
+
+        if not self._computed:
+            affected = None  # First refresh: every symbol
+        if affected is None or affected:
+            affected = self.recompute(affected)
+            self._computed = True
+
+        self._save_manifest()
+        return {
+            'changed': [path for path, _, _ in changed],
+            'deleted': deleted,
+            'pending': pending,
+            'affected_symbols': sorted(affected or [])
+        }
+
+    def _save_manifest(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def combined_transactions(self):
+        """All watched rows, de-duplicated like load_all_transactions()."""
+        frames = [self._cached_rows(path) for path in self.input_files() if path in self.manifest]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=DEDUP_COLUMNS + ['Commission', 'Source'])
+        return pd.concat(frames, ignore_index=True).drop_duplicates(subset=DEDUP_COLUMNS, keep='first')
+
+    def recompute(self, symbols=None):
+        """FIFO and CGT for the given symbols (all if None); returns the symbols recomputed."""
+        combined = self.combined_transactions()
+        if symbols is None:
+            symbols = set(combined['Symbol'].unique()) | set(self.cost_basis) | set(self.cgt_by_symbol)
+        transactions = combined[combined['Symbol'].isin(symbols)]
+
+        # Hybrid FIFO: all BUYs, SELLs up to the cutoff
+        dates = transactions['Date'].apply(robust_date_parser)
+        fifo_input = transactions[(transactions['Activity'] == 'PURCHASED') | (dates <= self.sell_cutoff_date)]
+        with quiet(self.verbose):
+            cost_basis, _, _ = apply_hybrid_fifo_processing_with_aud(fifo_input, self.aud_converter)
+
+        sales_df = build_sales_history(transactions) if len(transactions) else pd.DataFrame()
+        if len(sales_df):
+            sales_df = sales_df[sales_df['Financial_Year'] == self.financial_year].reset_index(drop=True)
+
+        if len(sales_df):
+            with quiet(self.verbose):
+                cgt_df, remaining, _ = calculate_australian_cgt_aud(sales_df, cost_basis, strategy=self.strategy)
+        else:
+            cgt_df, remaining = pd.DataFrame(columns=CGT_COLUMNS), dict(cost_basis)
+
+        for symbol in symbols:
+            for state, values in ((self.cost_basis, cost_basis), (self.remaining, remaining)):
+                if symbol in values:
+                    state[symbol] = values[symbol]
+                else:
+                    state.pop(symbol, None)
+            records = cgt_df[cgt_df['Symbol'] == symbol]
+            if len(records):
+                self.cgt_by_symbol[symbol] = records
+            else:
+                self.cgt_by_symbol.pop(symbol, None)
+        return set(symbols)
+
+    def cgt_df(self):
+        """CGT records for the financial year, in sale date order."""
+        frames = [frame for frame in self.cgt_by_symbol.values() if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=CGT_COLUMNS)
+        cgt_df = pd.concat(frames, ignore_index=True)
+        sale_dates = pd.to_datetime(cgt_df['Sale_Date'], format='%d.%m.%y')
+        return cgt_df.iloc[sale_dates.argsort(kind='stable')].reset_index(drop=True)
+
+    def write_outputs(self):
+        """Excel report and remaining cost basis JSON; returns their paths."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        cgt_df = self.cgt_df()
+        with quiet(self.verbose):
+            excel_file = save_cgt_excel_aud(cgt_df, self.financial_year, os.path.join(
+                self.output_dir, f"Australian_CGT_Report_FY{self.financial_year}_AUD.xlsx")) if len(cgt_df) else None
+            json_file = save_remaining_cost_basis_aud(self.remaining, self.financial_year, os.path.join(
+                self.output_dir, f"cost_basis_dictionary_AUD_post_FY{self.financial_year}.json"))
+        return excel_file, json_file
+
+    def watch(self, interval=1.0):
+        """Poll the folders until interrupted, refreshing outputs after each change."""
+        print(f"👀 Watching {self.html_folder}/ and {self.csv_folder}/ for FY {self.financial_year} (Ctrl+C to stop)")
+        try:
+            while True:
+                started = time.time()
+                result = self.refresh()
+                if result['changed'] or result['deleted'] or result['affected_symbols']:
+                    excel_file, json_file = self.write_outputs()
+                    print(f"🔄 {len(result['changed'])} changed, {len(result['deleted'])} deleted → "
+                          f"recomputed {len(result['affected_symbols'])} symbols in {time.time() - started:.2f}s")
+                    print(f"   📄 {excel_file or 'no sales'} | {json_file}")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n⏹️ Stopped watching")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch input folders and keep the CGT report up to date")
+    parser.add_argument('--fy', required=True, help="Financial year, e.g. 2024-25")
+    parser.add_argument('--rates-folder', default='rates', help="Folder with RBA F11 CSV files")
+    parser.add_argument('--html-folder', default='html_folder')
+    parser.add_argument('--csv-folder', default='csv_folder')
+    parser.add_argument('--state-dir', default=DEFAULT_STATE_DIR)
+    parser.add_argument('--output-dir', default='.')
+    parser.add_argument('--strategy', choices=CGT_STRATEGIES, default='tax_optimal')
+    parser.add_argument('--debounce', type=float, default=2.0, help="Seconds a file must be unchanged")
+    parser.add_argument('--interval', type=float, default=1.0, help="Polling interval in seconds")
+    parser.add_argument('--once', action='store_true', help="Refresh once and exit")
+    args = parser.parse_args()
+
+    aud_converter = load_rba_exchange_rates(args.rates_folder)
+    if aud_converter is None:
+        return
+
+    watcher = TransactionWatcher(args.fy, aud_converter, args.html_folder, args.csv_folder, args.state_dir,
+                                 args.output_dir, args.strategy, args.debounce)
+    if args.once:
+        result = watcher.refresh(now=time.time() + args.debounce)
+        excel_file, json_file = watcher.write_outputs()
+        print(f"✅ Recomputed {len(result['affected_symbols'])} symbols: {excel_file or 'no sales'} | {json_file}")
+    else:
+        watcher.watch(args.interval)
+
+
+if __name__ == "__main__":
+    main()